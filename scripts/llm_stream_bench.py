@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Per-token CPU benchmark for dialog-engine LLM stream transports.
+
+Compares the openai SDK chunk parsing path (LLM_STREAM_TRANSPORT=sdk) with
+the raw SSE parser (LLM_STREAM_TRANSPORT=raw). Both run against an in-process
+httpx MockTransport that replays an OpenAI-compatible SSE stream, so the
+numbers isolate client-side parsing cost from network and model latency.
+
+Usage:
+  PYTHONPATH=services/dialog-engine/src python scripts/llm_stream_bench.py \
+    --tokens 500 \
+    --streams 200 \
+    --concurrency 50
+
+Requires: openai, httpx (orjson optional, used by the raw path when present)
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict
+
+import httpx
+
+from dialog_engine.llm_client import OpenAIChatClient
+from dialog_engine.settings import LLMSettings, OpenAISettings
+
+
+def build_sse_body(tokens: int) -> bytes:
+    parts = []
+    for i in range(tokens):
+        event = {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": "bench",
+            "choices": [{"index": 0, "delta": {"content": f"tok{i} "}, "finish_reason": None}],
+        }
+        parts.append(b"data: " + json.dumps(event).encode("utf-8") + b"\n\n")
+    parts.append(b"data: [DONE]\n\n")
+    return b"".join(parts)
+
+
+def make_client(transport: str, body: bytes) -> OpenAIChatClient:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=body, headers={"content-type": "text/event-stream"})
+
+    llm_cfg = LLMSettings(
+        enabled=True,
+        model="bench",
+        temperature=0.0,
+        max_tokens=1024,
+        top_p=1.0,
+        frequency_penalty=0.0,
+        presence_penalty=0.0,
+        timeout=30.0,
+        retry_limit=0,
+        retry_backoff_seconds=0.0,
+        stream_transport=transport,
+    )
+    openai_cfg = OpenAISettings(api_key="bench", organization=None, base_url="http://bench.local/v1")
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return OpenAIChatClient(openai_cfg, llm_cfg, http_client=http_client)
+
+
+async def run_transport(transport: str, *, tokens: int, streams: int, concurrency: int) -> Dict[str, float]:
+    client = make_client(transport, build_sse_body(tokens))
+    semaphore = asyncio.Semaphore(concurrency)
+    received = 0
+
+    async def one_stream() -> None:
+        nonlocal received
+        async with semaphore:
+            async for _ in client.stream_chat([{"role": "user", "content": "bench"}]):
+                received += 1
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one_stream() for _ in range(streams)))
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    await client.close()
+    return {
+        "tokens": received,
+        "cpu_s": cpu,
+        "wall_s": wall,
+        "cpu_us_per_token": cpu / received * 1e6 if received else float("nan"),
+        "tokens_per_s": received / wall if wall else float("nan"),
+    }
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    results = {}
+    for transport in ("sdk", "raw"):
+        # Warm imports and code paths before measuring.
+        await run_transport(transport, tokens=10, streams=2, concurrency=2)
+        results[transport] = await run_transport(
+            transport,
+            tokens=args.tokens,
+            streams=args.streams,
+            concurrency=args.concurrency,
+        )
+
+    for transport, stats in results.items():
+        print(
+            f"{transport:>4}: tokens={stats['tokens']} cpu={stats['cpu_s']:.3f}s "
+            f"cpu/token={stats['cpu_us_per_token']:.1f}us throughput={stats['tokens_per_s']:.0f} tok/s"
+        )
+    sdk, raw = results["sdk"]["cpu_us_per_token"], results["raw"]["cpu_us_per_token"]
+    if raw:
+        print(f"raw parser uses {raw / sdk:.0%} of the SDK per-token CPU ({sdk / raw:.1f}x faster)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare LLM stream transport CPU cost")
+    parser.add_argument("--tokens", type=int, default=500, help="tokens per stream")
+    parser.add_argument("--streams", type=int, default=200, help="number of streams")
+    parser.add_argument("--concurrency", type=int, default=50, help="concurrent streams")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
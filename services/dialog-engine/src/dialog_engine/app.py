@@ -13,9 +13,11 @@ from fastapi import BackgroundTasks, FastAPI, HTTPException, Request
 from fastapi.responses import JSONResponse, StreamingResponse
 
 from .chat_service import ChatService
+from .http_pool import shared_pool as http_pool
 from .audio import AudioBundle, AudioIngestor, AudioPreprocessor, IngestLimits
 from .asr import AsrOptions, AsrService
-from .tts_streamer import stream_text as tts_stream_text
+from .tts_streamer import shutdown as tts_shutdown, stream_text as tts_stream_text, warmup as tts_warmup
+from .warmup import WarmupState, run_warmup
 from .ltm_outbox import add_event as outbox_add_event, start_flush_task as outbox_start_flush
 
 
@@ -25,7 +27,11 @@ logger = logging.getLogger(__name__)
 SYNC_TTS_STREAMING = os.getenv("SYNC_TTS_STREAMING", "false").lower() in {"1", "true", "yes", "on"}
 ENABLE_ASYNC_EXT = os.getenv("ENABLE_ASYNC_EXT", "false").lower() in {"1", "true", "yes", "on"}
 VISION_MAX_BYTES = int(os.getenv("VISION_MAX_BYTES", 4 * 1024 * 1024))
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() in {"1", "true", "yes", "on"}
+WARMUP_TIMEOUT_SECONDS = float(os.getenv("WARMUP_TIMEOUT_SECONDS", "120"))
 _flush_task = None
+_warmup_task = None
+warmup_state = WarmupState()
 
 try:
     from .settings import settings as runtime_settings
@@ -55,6 +61,50 @@ except Exception:  # pragma: no cover - fallback to mock provider if config inva
     logger.exception("chat.audio.provider_init_failed")
     asr_service = AsrService()
 
+_BINARY_CONTENT_PREFIXES = ("audio/", "image/", "application/octet-stream")
+
+
+def _is_binary_request(request: Request) -> bool:
+    content_type = request.headers.get("content-type", "").lower()
+    return content_type.startswith(_BINARY_CONTENT_PREFIXES)
+
+
+async def _read_request_body(request: Request, *, field: str, max_bytes: int, too_large: str) -> Dict[str, Any]:
+    """Parse either a JSON body or a raw binary upload into the JSON body shape.
+
+    Binary uploads carry the media bytes as the request body (optionally chunked)
+    and the remaining fields as query parameters, with ``meta`` JSON-encoded.
+    The body is consumed incrementally and rejected as soon as it exceeds
+    ``max_bytes``, so callers can stream without base64 or buffering twice.
+    """
+    if not _is_binary_request(request):
+        try:
+            return await request.json()
+        except Exception:
+            raise HTTPException(status_code=400, detail="invalid json")
+
+    parts: list[bytes] = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:
+            raise HTTPException(status_code=413, detail=too_large)
+        parts.append(chunk)
+
+    body: Dict[str, Any] = {key: value for key, value in request.query_params.items() if key != "meta"}
+    raw_meta = request.query_params.get("meta")
+    if raw_meta:
+        try:
+            meta = json.loads(raw_meta)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="invalid meta")
+        if isinstance(meta, dict):
+            body["meta"] = meta
+    content_type = request.headers.get("content-type", "").split(";", 1)[0].strip()
+    body.setdefault("contentType" if field == "audio" else "mimeType", content_type)
+    body[field] = b"".join(parts)
+    return body
+
 
 def _emit_async_events(
     *,
@@ -111,7 +161,10 @@ def _emit_async_events(
 async def _prepare_audio_request(body: Dict[str, Any]) -> tuple[str, AudioBundle, str | None, Dict[str, Any]]:
     session_id = str(body.get("sessionId") or "default")
     raw_audio = body.get("audio")
-    if not isinstance(raw_audio, str) or not raw_audio.strip():
+    if isinstance(raw_audio, bytes):
+        if not raw_audio:
+            raise HTTPException(status_code=400, detail="audio required")
+    elif not isinstance(raw_audio, str) or not raw_audio.strip():
         raise HTTPException(status_code=400, detail="audio required")
 
     content_type = str(body.get("contentType") or "audio/wav")
@@ -124,10 +177,13 @@ async def _prepare_audio_request(body: Dict[str, Any]) -> tuple[str, AudioBundle
     else:
         meta = {}
 
-    try:
-        audio_bytes = base64.b64decode(raw_audio, validate=True)
-    except (binascii.Error, TypeError):
-        raise HTTPException(status_code=400, detail="invalid audio encoding")
+    if isinstance(raw_audio, bytes):
+        audio_bytes = raw_audio
+    else:
+        try:
+            audio_bytes = base64.b64decode(raw_audio, validate=True)
+        except (binascii.Error, TypeError):
+            raise HTTPException(status_code=400, detail="invalid audio encoding")
 
     try:
         payload = await audio_ingestor.from_bytes(
@@ -152,14 +208,43 @@ async def health() -> Dict[str, Any]:
         "tts_provider": os.getenv("SYNC_TTS_PROVIDER", "mock"),
         "asr_enabled": _asr_enabled,
         "asr_provider": asr_service.provider.name if _asr_enabled else None,
+        "asr_tiers": asr_service.provider.stats() if _asr_enabled and hasattr(asr_service.provider, "stats") else None,
+        "asr_cache": asr_service.result_cache.stats() if _asr_enabled and asr_service.result_cache else None,
+        "llm_connections": chat_service.llm_connection_stats(),
+        "llm_hedging": chat_service.llm_hedge_stats(),
+        "llm_singleflight": chat_service.singleflight_stats(),
+        "llm_rate_limit": chat_service.rate_limit_stats(),
+        "semantic_cache": chat_service.semantic_cache_stats(),
+        "http_pools": http_pool.stats(),
+        "llm_routing": chat_service.router.stats() if chat_service.router else None,
+        "stm_summary": chat_service.summarizer.stats() if chat_service.summarizer else None,
+        "ready": warmup_state.ready,
+        "warmup": warmup_state.as_dict(),
     }
 
 
+@app.get("/ready")
+async def ready() -> JSONResponse:
+    """Readiness probe: 503 until the startup warm-up phase has finished."""
+    payload = warmup_state.as_dict()
+    return JSONResponse(payload, status_code=200 if warmup_state.ready else 503)
+
+
 def _sse_format(event: str, data: Dict[str, Any]) -> bytes:
     payload = json.dumps(data, ensure_ascii=False)
     return f"event: {event}\n" f"data: {payload}\n\n".encode("utf-8")
 
 
+@app.get("/llm/routing")
+async def llm_routing(limit: int = 50) -> Dict[str, Any]:
+    """Per-tier routing stats and the most recent routing decisions for auditing."""
+
+    router = chat_service.router
+    if router is None:
+        return {"enabled": False, "tiers": None, "decisions": []}
+    return {"enabled": True, "tiers": router.stats(), "decisions": router.recent_decisions(limit)}
+
+
 @app.post("/chat/stream")
 async def chat_stream(request: Request) -> StreamingResponse:
     try:
@@ -191,7 +276,11 @@ async def chat_stream(request: Request) -> StreamingResponse:
             if await request.is_disconnected():
                 return
 
-        stats = {"ttft_ms": round(ttft_ms or 0.0, 1), "tokens": chat_service.last_token_count}
+        stats = {
+            "ttft_ms": round(ttft_ms or 0.0, 1),
+            "tokens": chat_service.last_token_count,
+            "usage": chat_service.last_usage,
+        }
         yield _sse_format("done", {"stats": stats})
 
         # Emit async events via outbox
@@ -233,10 +322,12 @@ async def chat_audio(request: Request) -> JSONResponse:
     if not _asr_enabled:
         raise HTTPException(status_code=503, detail="audio input disabled")
 
-    try:
-        body = await request.json()
-    except Exception:
-        raise HTTPException(status_code=400, detail="invalid json")
+    body = await _read_request_body(
+        request,
+        field="audio",
+        max_bytes=_ingest_limits.max_bytes,
+        too_large="audio payload too large",
+    )
 
     try:
         session_id, bundle, lang, meta = await _prepare_audio_request(body)
@@ -250,6 +341,7 @@ async def chat_audio(request: Request) -> JSONResponse:
     asr_options = AsrOptions(
         lang=lang or getattr(asr_cfg, "default_lang", None),
         sample_rate=bundle.metadata.sample_rate,
+        session_id=session_id,
     )
     try:
         asr_result = await asr_service.transcribe_bundle(bundle, options=asr_options)
@@ -289,12 +381,15 @@ async def chat_audio(request: Request) -> JSONResponse:
             "provider": asr_result.provider or asr_service.provider.name,
             "latency_ms": round(asr_latency_ms, 1),
             "duration_seconds": asr_result.duration_seconds,
+            "language": asr_result.language,
+            "cached": asr_result.cached,
         },
         "chat": {
             "ttft_ms": round(chat_service.last_ttft_ms or 0.0, 1)
             if chat_service.last_ttft_ms is not None
             else None,
             "tokens": chat_service.last_token_count,
+            "usage": chat_service.last_usage,
             "latency_ms": round((reply_completed - asr_completed) * 1000.0, 1),
         },
         "total_latency_ms": round((reply_completed - asr_started) * 1000.0, 1),
@@ -326,10 +421,12 @@ async def chat_audio_stream(request: Request) -> StreamingResponse:
     if not _asr_enabled:
         raise HTTPException(status_code=503, detail="audio input disabled")
 
-    try:
-        body = await request.json()
-    except Exception:
-        raise HTTPException(status_code=400, detail="invalid json")
+    body = await _read_request_body(
+        request,
+        field="audio",
+        max_bytes=_ingest_limits.max_bytes,
+        too_large="audio payload too large",
+    )
 
     try:
         session_id, bundle, lang, meta = await _prepare_audio_request(body)
@@ -343,6 +440,7 @@ async def chat_audio_stream(request: Request) -> StreamingResponse:
     asr_options = AsrOptions(
         lang=lang or getattr(asr_cfg, "default_lang", None),
         sample_rate=bundle.metadata.sample_rate,
+        session_id=session_id,
     )
     try:
         asr_result = await asr_service.transcribe_bundle(bundle, options=asr_options)
@@ -400,12 +498,15 @@ async def chat_audio_stream(request: Request) -> StreamingResponse:
                 "provider": asr_result.provider or asr_service.provider.name,
                 "latency_ms": round(asr_latency_ms, 1),
                 "duration_seconds": asr_result.duration_seconds,
+                "language": asr_result.language,
+                "cached": asr_result.cached,
             },
             "chat": {
                 "ttft_ms": round(chat_service.last_ttft_ms or 0.0, 1)
                 if chat_service.last_ttft_ms is not None
                 else None,
                 "tokens": chat_service.last_token_count,
+                "usage": chat_service.last_usage,
                 "latency_ms": round((reply_completed - reply_start) * 1000.0, 1),
             },
             "total_latency_ms": round((reply_completed - asr_started) * 1000.0, 1),
@@ -434,20 +535,24 @@ async def chat_audio_stream(request: Request) -> StreamingResponse:
 
 @app.post("/chat/vision")
 async def chat_vision(request: Request) -> JSONResponse:
-    try:
-        body = await request.json()
-    except Exception:
-        raise HTTPException(status_code=400, detail="invalid json")
+    body = await _read_request_body(
+        request,
+        field="image",
+        max_bytes=VISION_MAX_BYTES,
+        too_large="image payload too large",
+    )
 
     session_id = str(body.get("sessionId") or "default")
     raw_image = body.get("image")
-    if not isinstance(raw_image, str) or not raw_image.strip():
+    if isinstance(raw_image, bytes):
+        image_bytes = raw_image
+    elif not isinstance(raw_image, str) or not raw_image.strip():
         raise HTTPException(status_code=400, detail="image required")
-
-    try:
-        image_bytes = base64.b64decode(raw_image, validate=True)
-    except (binascii.Error, TypeError):
-        raise HTTPException(status_code=400, detail="invalid image encoding")
+    else:
+        try:
+            image_bytes = base64.b64decode(raw_image, validate=True)
+        except (binascii.Error, TypeError):
+            raise HTTPException(status_code=400, detail="invalid image encoding")
 
     if not image_bytes:
         raise HTTPException(status_code=400, detail="image required")
@@ -550,9 +655,24 @@ if __name__ == "__main__":
 
     uvicorn.run("dialog_engine.app:app", host="0.0.0.0", port=int(os.getenv("PORT", "8100")), reload=False)
 
+def _warmup_steps() -> Dict[str, Any]:
+    steps: Dict[str, Any] = {"llm": chat_service.warmup}
+    if _asr_enabled:
+        steps["asr"] = asr_service.warmup
+    if SYNC_TTS_STREAMING:
+        steps["tts"] = tts_warmup
+    return steps
+
+
 @app.on_event("startup")
 async def _on_startup():
-    global _flush_task
+    global _flush_task, _warmup_task
+    if WARMUP_ENABLED:
+        _warmup_task = asyncio.create_task(
+            run_warmup(warmup_state, _warmup_steps(), timeout=WARMUP_TIMEOUT_SECONDS)
+        )
+    else:
+        warmup_state.mark_ready()
     if ENABLE_ASYNC_EXT:
         # best-effort Redis connection for outbox flusher
         try:
@@ -568,5 +688,10 @@ async def _on_shutdown():
     try:
         if _flush_task:
             _flush_task.cancel()
+        if _warmup_task and not _warmup_task.done():
+            _warmup_task.cancel()
+        await chat_service.shutdown()
+        await tts_shutdown()
+        await http_pool.aclose()
     except Exception:
         pass
@@ -1,6 +1,16 @@
 """ASR scaffolding for dialog-engine."""
 
+from .language_cache import LanguageCache
+from .result_cache import AsrResultCache, RedisAsrResultCache
 from .service import AsrService
 from .types import AsrOptions, AsrPartial, AsrResult
 
-__all__ = ["AsrService", "AsrOptions", "AsrPartial", "AsrResult"]
+__all__ = [
+    "AsrService",
+    "LanguageCache",
+    "AsrResultCache",
+    "RedisAsrResultCache",
+    "AsrOptions",
+    "AsrPartial",
+    "AsrResult",
+]
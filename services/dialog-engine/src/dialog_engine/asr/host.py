@@ -0,0 +1,160 @@
+"""Standalone ASR host process.
+
+Owns the ASR model and serves transcription requests from dialog-engine
+workers over a Unix socket, so the model is loaded once regardless of the
+number of HTTP workers and inference never runs on a worker's event loop.
+
+Run with ``python -m dialog_engine.asr.host``. The provider is taken from
+``ASR_HOST_PROVIDER`` (default ``whisper``) and the remaining ``ASR_*``
+settings; the socket path from ``ASR_HOST_SOCKET`` or the first entry of
+``ASR_REMOTE_SOCKETS``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import logging
+import os
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Dict, Optional
+
+from ..settings import AsrSettings, settings as runtime_settings
+from .providers.remote import (
+    LOCAL_SEGMENTS,
+    options_from_dict,
+    read_frame,
+    write_frame,
+)
+from .service import AsrService
+from .types import result_to_dict
+
+logger = logging.getLogger(__name__)
+
+
+def _read_shared_audio(name: str, size: int) -> bytes:
+    segment = shared_memory.SharedMemory(name=name)
+    try:
+        return bytes(segment.buf[:size])
+    finally:
+        segment.close()
+        if name not in LOCAL_SEGMENTS:
+            # The client owns and unlinks the segment; stop this process's
+            # resource tracker from unlinking it a second time on exit.
+            try:
+                resource_tracker.unregister(segment._name, "shared_memory")  # type: ignore[attr-defined]
+            except Exception:  # pragma: no cover - tracker internals vary by version
+                pass
+
+
+class AsrHostServer:
+    """Unix-socket server wrapping a single ASR provider."""
+
+    def __init__(self, *, service: AsrService, socket_path: str, max_concurrency: int = 1) -> None:
+        self._service = service
+        self._socket_path = socket_path
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.requests = 0
+
+    async def start(self) -> None:
+        if os.path.exists(self._socket_path):
+            os.unlink(self._socket_path)
+        os.makedirs(os.path.dirname(self._socket_path) or ".", exist_ok=True)
+        self._server = await asyncio.start_unix_server(self._handle, path=self._socket_path)
+        logger.info("asr.host.listening", extra={"socket": self._socket_path})
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        assert self._server is not None
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self._socket_path):
+            os.unlink(self._socket_path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    header = await read_frame(reader)
+                except asyncio.IncompleteReadError:
+                    break
+                response = await self._dispatch(header, reader)
+                write_frame(writer, response)
+                await writer.drain()
+        except Exception:  # pragma: no cover - connection level failures
+            logger.exception("asr.host.connection_error")
+        finally:
+            writer.close()
+
+    async def _dispatch(self, header: Dict[str, Any], reader: asyncio.StreamReader) -> Dict[str, Any]:
+        op = header.get("op")
+        try:
+            if op == "transcribe":
+                size = int(header.get("size") or 0)
+                shm_name = header.get("shm")
+                if shm_name:
+                    audio = _read_shared_audio(str(shm_name), size)
+                else:
+                    audio = await reader.readexactly(size) if size else b""
+                options = options_from_dict(header.get("options") or {})
+                async with self._semaphore:
+                    result = await self._service.provider.transcribe(audio=audio, options=options)
+                self.requests += 1
+                return {"ok": True, "result": result_to_dict(result)}
+            if op == "warmup":
+                await self._service.warmup()
+                return {"ok": True}
+            if op == "ping":
+                return {"ok": True, "provider": self._service.provider.name, "requests": self.requests}
+            return {"ok": False, "error": f"unknown_op:{op}"}
+        except Exception as exc:
+            logger.exception("asr.host.request_failed", extra={"op": op})
+            return {"ok": False, "error": repr(exc)}
+
+
+def build_host_service(cfg: AsrSettings) -> AsrService:
+    host_cfg = dataclasses.replace(
+        cfg,
+        provider=os.getenv("ASR_HOST_PROVIDER", "whisper"),
+        # Language pinning stays with the callers, which know the session.
+        lang_cache_enabled=False,
+    )
+    return AsrService.from_settings(host_cfg)
+
+
+async def _serve() -> None:
+    cfg = runtime_settings.asr
+    socket_path = os.getenv("ASR_HOST_SOCKET") or (cfg.remote_socket_paths[0] if cfg.remote_socket_paths else "")
+    if not socket_path:
+        raise RuntimeError("ASR_HOST_SOCKET or ASR_REMOTE_SOCKETS must be set")
+    service = build_host_service(cfg)
+    server = AsrHostServer(
+        service=service,
+        socket_path=socket_path,
+        max_concurrency=int(os.getenv("ASR_HOST_CONCURRENCY", "1")),
+    )
+    await service.warmup()
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_serve())
+
+
+__all__ = ["AsrHostServer", "build_host_service", "main"]
+
+
+if __name__ == "__main__":
+    main()
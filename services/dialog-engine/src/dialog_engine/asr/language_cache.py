@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+
+@dataclass(slots=True)
+class _LanguageEntry:
+    lang: str
+    probability: Optional[float]
+    detected_at: float
+    uses: int = 0
+
+
+class LanguageCache:
+    """Remembers the detected spoken language per session.
+
+    Viewers rarely switch language mid-session, so once a detection is
+    confident enough the language is pinned for the following utterances.
+    Detection runs again after ``redetect_interval`` pinned utterances, once
+    the pin is older than ``max_age_seconds``, or when the stored probability
+    falls below ``min_probability``.
+    """
+
+    def __init__(
+        self,
+        *,
+        min_probability: float = 0.8,
+        redetect_interval: int = 20,
+        max_age_seconds: float = 600.0,
+        max_sessions: int = 1024,
+    ) -> None:
+        self._min_probability = max(0.0, min(1.0, min_probability))
+        self._redetect_interval = max(0, redetect_interval)
+        self._max_age = max(0.0, max_age_seconds)
+        self._max_sessions = max(1, max_sessions)
+        self._entries: "OrderedDict[str, _LanguageEntry]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, session_id: Optional[str]) -> Optional[str]:
+        """Return the pinned language for ``session_id`` or ``None`` to detect."""
+
+        if not session_id:
+            return None
+        entry = self._entries.get(session_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        expired = self._max_age and time.monotonic() - entry.detected_at > self._max_age
+        if expired or (self._redetect_interval and entry.uses >= self._redetect_interval):
+            # Interval or age elapsed: drop the pin so the next utterance re-detects.
+            del self._entries[session_id]
+            self.misses += 1
+            return None
+        entry.uses += 1
+        self._entries.move_to_end(session_id)
+        self.hits += 1
+        return entry.lang
+
+    def record(self, session_id: Optional[str], lang: Optional[str], probability: Optional[float]) -> None:
+        """Store a fresh detection result; low-confidence detections are not pinned."""
+
+        if not session_id:
+            return
+        if not lang or (probability is not None and probability < self._min_probability):
+            self._entries.pop(session_id, None)
+            return
+        self._entries[session_id] = _LanguageEntry(
+            lang=lang,
+            probability=probability,
+            detected_at=time.monotonic(),
+        )
+        self._entries.move_to_end(session_id)
+        while len(self._entries) > self._max_sessions:
+            self._entries.popitem(last=False)
+
+    def forget(self, session_id: str) -> None:
+        self._entries.pop(session_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+__all__ = ["LanguageCache"]
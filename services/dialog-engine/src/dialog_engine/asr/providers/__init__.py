@@ -2,6 +2,8 @@
 
 from .base import AsrProvider
 from .mock import MockAsrProvider
+from .remote import RemoteAsrProvider
+from .tiered import AsrTier, TieredAsrProvider
 
 try:
     from .whisper import WhisperAsrProvider
@@ -13,5 +15,8 @@ except Exception:  # pragma: no cover - defensive guard
 __all__ = [
     "AsrProvider",
     "MockAsrProvider",
+    "RemoteAsrProvider",
+    "AsrTier",
+    "TieredAsrProvider",
     "WhisperAsrProvider",
 ]
@@ -21,6 +21,10 @@ class AsrProvider(abc.ABC):
         if not final_emitted:
             yield AsrPartial(text=result.text, is_final=True)
 
+    async def warmup(self) -> None:
+        """Load models and run any first-inference work ahead of real traffic."""
+        return None
+
     @abc.abstractmethod
     async def transcribe(self, *, audio: bytes, options: AsrOptions) -> AsrResult:
         """Produce a transcription for the provided audio."""
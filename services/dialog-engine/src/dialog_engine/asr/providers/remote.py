@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import struct
+from multiprocessing import shared_memory
+from typing import Any, Dict, Optional, Sequence
+
+from ..types import AsrOptions, AsrResult, result_from_dict
+from .base import AsrProvider
+
+# Frames on the ASR host socket are a 4-byte big-endian length followed by a
+# UTF-8 JSON header. With the "socket" transfer the PCM bytes follow the
+# header; with "shm" the header names a shared-memory segment instead.
+_FRAME_HEADER = struct.Struct(">I")
+TRANSFER_SHM = "shm"
+TRANSFER_SOCKET = "socket"
+# Shared-memory segments created (and later unlinked) by this process.
+LOCAL_SEGMENTS: set[str] = set()
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Dict[str, Any]:
+    size_raw = await reader.readexactly(_FRAME_HEADER.size)
+    (size,) = _FRAME_HEADER.unpack(size_raw)
+    return json.loads((await reader.readexactly(size)).decode("utf-8"))
+
+
+def write_frame(writer: asyncio.StreamWriter, payload: Dict[str, Any], body: Optional[bytes] = None) -> None:
+    encoded = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    writer.write(_FRAME_HEADER.pack(len(encoded)) + encoded)
+    if body:
+        writer.write(body)
+
+
+def options_to_dict(options: AsrOptions) -> Dict[str, Any]:
+    return {
+        "lang": options.lang,
+        "enable_timestamps": options.enable_timestamps,
+        "sample_rate": options.sample_rate,
+        "session_id": options.session_id,
+    }
+
+
+def options_from_dict(data: Dict[str, Any]) -> AsrOptions:
+    return AsrOptions(
+        lang=data.get("lang"),
+        enable_timestamps=bool(data.get("enable_timestamps")),
+        sample_rate=data.get("sample_rate"),
+        session_id=data.get("session_id"),
+    )
+
+
+class RemoteAsrProvider(AsrProvider):
+    """Adapter that forwards transcription to an out-of-process ASR host.
+
+    The host (``python -m dialog_engine.asr.host``) owns the model, so several
+    uvicorn workers can share one loaded model and inference never competes
+    with the worker's event loop. Multiple socket paths are used round-robin
+    to spread load over a pool of hosts.
+    """
+
+    name = "remote"
+
+    def __init__(
+        self,
+        *,
+        socket_paths: Sequence[str],
+        transfer: str = TRANSFER_SHM,
+        timeout: float = 60.0,
+    ) -> None:
+        if not socket_paths:
+            raise ValueError("at least one ASR host socket path is required")
+        if transfer not in {TRANSFER_SHM, TRANSFER_SOCKET}:
+            raise ValueError(f"unsupported ASR transfer mode: {transfer}")
+        self._socket_paths = list(socket_paths)
+        self._cycle = itertools.cycle(self._socket_paths)
+        self._transfer = transfer
+        self._timeout = timeout
+
+    async def transcribe(self, *, audio: bytes, options: AsrOptions) -> AsrResult:
+        header: Dict[str, Any] = {"op": "transcribe", "size": len(audio), "options": options_to_dict(options)}
+        if self._transfer == TRANSFER_SOCKET:
+            response = await self._request(header, body=audio)
+        else:
+            segment = shared_memory.SharedMemory(create=True, size=max(1, len(audio)))
+            LOCAL_SEGMENTS.add(segment.name)
+            try:
+                segment.buf[: len(audio)] = audio
+                header["shm"] = segment.name
+                response = await self._request(header)
+            finally:
+                LOCAL_SEGMENTS.discard(segment.name)
+                segment.close()
+                segment.unlink()
+        return result_from_dict(response.get("result") or {})
+
+    async def warmup(self) -> None:
+        for path in self._socket_paths:
+            await self._request({"op": "warmup"}, path=path)
+
+    async def _request(
+        self,
+        header: Dict[str, Any],
+        *,
+        body: Optional[bytes] = None,
+        path: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        target = path or next(self._cycle)
+
+        async def _exchange() -> Dict[str, Any]:
+            reader, writer = await asyncio.open_unix_connection(target)
+            try:
+                write_frame(writer, header, body)
+                await writer.drain()
+                return await read_frame(reader)
+            finally:
+                writer.close()
+                try:
+                    await writer.wait_closed()
+                except Exception:  # pragma: no cover - best effort close
+                    pass
+
+        response = await asyncio.wait_for(_exchange(), timeout=self._timeout)
+        if not response.get("ok"):
+            raise RuntimeError(f"asr_host_error:{response.get('error')}")
+        return response
+
+
+__all__ = [
+    "RemoteAsrProvider",
+    "TRANSFER_SHM",
+    "TRANSFER_SOCKET",
+    "LOCAL_SEGMENTS",
+    "read_frame",
+    "write_frame",
+    "options_to_dict",
+    "options_from_dict",
+]
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+from ..types import AsrOptions, AsrResult
+from .base import AsrProvider
+
+
+@dataclass(slots=True)
+class AsrTierStats:
+    calls: int = 0
+    escalations: int = 0
+    total_latency_ms: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        avg = self.total_latency_ms / self.calls if self.calls else None
+        return {
+            "calls": self.calls,
+            "escalations": self.escalations,
+            "avg_latency_ms": round(avg, 1) if avg is not None else None,
+        }
+
+
+@dataclass(slots=True)
+class AsrTier:
+    """One warm provider instance serving clips up to ``max_duration_seconds``."""
+
+    name: str
+    provider: AsrProvider
+    max_duration_seconds: Optional[float] = None
+    stats: AsrTierStats = field(default_factory=AsrTierStats)
+
+
+class TieredAsrProvider(AsrProvider):
+    """Routes clips to a provider tier by duration and escalates on low confidence.
+
+    Tiers are checked in order; the first tier whose ``max_duration_seconds``
+    covers the clip (or has no limit) handles it. When the averaged segment
+    confidence falls below ``confidence_threshold`` the clip is re-run on the
+    ``escalation`` tier and that result wins.
+    """
+
+    name = "tiered"
+
+    def __init__(
+        self,
+        *,
+        tiers: Sequence[AsrTier],
+        escalation: Optional[AsrTier] = None,
+        confidence_threshold: float = 0.0,
+        default_sample_rate: int = 16000,
+    ) -> None:
+        if not tiers:
+            raise ValueError("at least one ASR tier is required")
+        self._tiers: List[AsrTier] = list(tiers)
+        self._escalation = escalation
+        self._confidence_threshold = max(0.0, min(1.0, confidence_threshold))
+        self._default_sample_rate = default_sample_rate
+
+    async def transcribe(self, *, audio: bytes, options: AsrOptions) -> AsrResult:
+        duration = self._clip_duration(audio, options)
+        tier = self._select_tier(duration)
+        result = await self._run_tier(tier, audio, options)
+
+        escalation = self._escalation
+        if escalation is not None and escalation.provider is not tier.provider:
+            confidence = _mean_confidence(result)
+            if confidence is not None and confidence < self._confidence_threshold:
+                tier.stats.escalations += 1
+                result = await self._run_tier(escalation, audio, options)
+        return result
+
+    async def warmup(self) -> None:
+        warmed: List[AsrProvider] = []
+        for tier in self._all_tiers():
+            if any(tier.provider is provider for provider in warmed):
+                continue
+            await tier.provider.warmup()
+            warmed.append(tier.provider)
+
+    def stats(self) -> Dict[str, Any]:
+        return {tier.name: tier.stats.as_dict() for tier in self._all_tiers()}
+
+    @property
+    def tiers(self) -> List[AsrTier]:
+        return list(self._tiers)
+
+    def _all_tiers(self) -> List[AsrTier]:
+        tiers = list(self._tiers)
+        if self._escalation is not None:
+            tiers.append(self._escalation)
+        return tiers
+
+    async def _run_tier(self, tier: AsrTier, audio: bytes, options: AsrOptions) -> AsrResult:
+        started = time.perf_counter()
+        try:
+            result = await tier.provider.transcribe(audio=audio, options=options)
+        finally:
+            tier.stats.calls += 1
+            tier.stats.total_latency_ms += (time.perf_counter() - started) * 1000.0
+        result.provider = f"{result.provider or tier.provider.name}:{tier.name}"
+        return result
+
+    def _select_tier(self, duration: float) -> AsrTier:
+        for tier in self._tiers:
+            if tier.max_duration_seconds is None or duration <= tier.max_duration_seconds:
+                return tier
+        return self._tiers[-1]
+
+    def _clip_duration(self, audio: bytes, options: AsrOptions) -> float:
+        sample_rate = options.sample_rate or self._default_sample_rate
+        if sample_rate <= 0:
+            return 0.0
+        # Input is 16-bit mono PCM after preprocessing.
+        return len(audio) / float(sample_rate * 2)
+
+
+def _mean_confidence(result: AsrResult) -> Optional[float]:
+    values = [p.confidence for p in (result.partials or []) if p.confidence is not None]
+    if not values:
+        return None
+    return sum(values) / len(values)
+
+
+__all__ = ["AsrTier", "AsrTierStats", "TieredAsrProvider"]
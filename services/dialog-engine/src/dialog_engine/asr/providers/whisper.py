@@ -82,8 +82,16 @@ class WhisperAsrProvider(AsrProvider):
             partials=partials,
             duration_seconds=duration,
             provider=self.name,
+            language=getattr(info, "language", None) or language,
+            language_probability=getattr(info, "language_probability", None) if language is None else None,
         )
 
+    async def warmup(self) -> None:
+        # Load the model and push one second of silence through it so the
+        # first real request does not pay model load and first-inference costs.
+        silence = b"\x00\x00" * self._default_sample_rate
+        await asyncio.to_thread(self._run_transcribe, silence, self._default_sample_rate, None, False)
+
     def _run_transcribe(
         self,
         audio: bytes,
@@ -134,10 +142,11 @@ def _estimate_segment_confidence(segment: object) -> Optional[float]:
     if avg_logprob is None and no_speech_prob is None:
         return None
 
-    confidence = 0.0
+    confidence = 1.0
     if avg_logprob is not None:
-        # avg_logprob typically ranges [-5, 0]; map to [0, 1]
-        confidence = 1.0 - math.exp(min(0.0, avg_logprob))
+        # avg_logprob is the mean token log-probability (<= 0); exp() gives the
+        # geometric-mean token probability: ~0.9 for -0.1, ~0.22 for -1.5.
+        confidence = math.exp(min(0.0, float(avg_logprob)))
     if no_speech_prob is not None:
         confidence *= 1.0 - max(0.0, min(1.0, float(no_speech_prob)))
     return max(0.0, min(1.0, confidence))
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from .types import AsrOptions, AsrResult, result_from_dict, result_to_dict
+
+logger = logging.getLogger(__name__)
+
+
+class AsrResultCache:
+    """Bounded in-memory LRU of transcripts keyed by normalized PCM + options.
+
+    Retries and re-sends of the same clip hash to the same key and are served
+    without touching the ASR provider.
+    """
+
+    def __init__(self, *, ttl_seconds: float = 300.0, max_entries: int = 256) -> None:
+        self._ttl = max(0.0, ttl_seconds)
+        self._max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(pcm: bytes, options: AsrOptions) -> str:
+        digest = hashlib.blake2b(pcm, digest_size=16)
+        # session_id is deliberately excluded: identical audio gives an
+        # identical transcript regardless of who sent it.
+        digest.update(
+            json.dumps(
+                [options.lang, options.sample_rate, options.enable_timestamps],
+                separators=(",", ":"),
+            ).encode("utf-8")
+        )
+        return digest.hexdigest()
+
+    async def get(self, key: str) -> Optional[AsrResult]:
+        data = self._get_local(key)
+        if data is None:
+            data = await self._get_remote(key)
+            if data is not None:
+                self._set_local(key, data)
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        result = result_from_dict(data)
+        result.cached = True
+        return result
+
+    async def set(self, key: str, result: AsrResult) -> None:
+        data = result_to_dict(result)
+        self._set_local(key, data)
+        await self._set_remote(key, data)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else None,
+        }
+
+    def _get_local(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, data = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return data
+
+    def _set_local(self, key: str, data: Dict[str, Any]) -> None:
+        self._entries[key] = (time.monotonic() + self._ttl, data)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    async def _get_remote(self, key: str) -> Optional[Dict[str, Any]]:
+        return None
+
+    async def _set_remote(self, key: str, data: Dict[str, Any]) -> None:
+        return None
+
+
+class RedisAsrResultCache(AsrResultCache):
+    """LRU backed by Redis so replicas share transcripts of re-sent clips.
+
+    The local LRU stays in front of Redis; Redis errors degrade to a miss.
+    """
+
+    def __init__(
+        self,
+        *,
+        redis_client: Any,
+        ttl_seconds: float = 300.0,
+        max_entries: int = 256,
+        key_prefix: str = "asr:result:",
+    ) -> None:
+        super().__init__(ttl_seconds=ttl_seconds, max_entries=max_entries)
+        self._redis = redis_client
+        self._prefix = key_prefix
+
+    async def _get_remote(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            raw = await self._redis.get(self._prefix + key)
+        except Exception as exc:
+            logger.debug("asr.cache.redis_get_failed", extra={"error": repr(exc)})
+            return None
+        if not raw:
+            return None
+        try:
+            return json.loads(raw)
+        except (TypeError, ValueError):
+            return None
+
+    async def _set_remote(self, key: str, data: Dict[str, Any]) -> None:
+        try:
+            await self._redis.set(
+                self._prefix + key,
+                json.dumps(data, ensure_ascii=False),
+                ex=max(1, int(self._ttl)),
+            )
+        except Exception as exc:
+            logger.debug("asr.cache.redis_set_failed", extra={"error": repr(exc)})
+
+
+__all__ = ["AsrResultCache", "RedisAsrResultCache"]
@@ -4,8 +4,12 @@ from typing import Optional
 
 from ..audio import AudioBundle
 from ..settings import AsrSettings
+from .language_cache import LanguageCache
+from .result_cache import AsrResultCache, RedisAsrResultCache
 from .providers.base import AsrProvider
 from .providers.mock import MockAsrProvider
+from .providers.remote import RemoteAsrProvider
+from .providers.tiered import AsrTier, TieredAsrProvider
 
 try:
     from .providers.whisper import WhisperAsrProvider
@@ -19,12 +23,22 @@ from .types import AsrOptions, AsrPartial, AsrResult
 class AsrService:
     """Coordinates ASR provider usage."""
 
-    def __init__(self, *, provider: Optional[AsrProvider] = None) -> None:
+    def __init__(
+        self,
+        *,
+        provider: Optional[AsrProvider] = None,
+        language_cache: Optional[LanguageCache] = None,
+        result_cache: Optional[AsrResultCache] = None,
+    ) -> None:
         self._provider = provider or MockAsrProvider()
+        self._language_cache = language_cache
+        self._result_cache = result_cache
 
     @classmethod
     def from_settings(cls, cfg: AsrSettings | None) -> "AsrService":
         provider: Optional[AsrProvider] = None
+        language_cache: Optional[LanguageCache] = None
+        result_cache: Optional[AsrResultCache] = None
         if cfg is not None:
             provider_name = (cfg.provider or "mock").strip().lower()
             if provider_name in {"mock", "fake"}:
@@ -32,32 +46,128 @@ class AsrService:
             elif provider_name in {"whisper", "faster-whisper"}:
                 if WhisperAsrProvider is None:
                     raise RuntimeError("Whisper provider selected but dependencies missing")
-                provider = WhisperAsrProvider(
-                    model=cfg.whisper_model,
-                    device=cfg.whisper_device,
-                    compute_type=cfg.whisper_compute_type,
-                    beam_size=cfg.whisper_beam_size,
-                    cache_dir=cfg.whisper_cache_dir,
-                    default_sample_rate=cfg.target_sample_rate,
+                if cfg.whisper_tiering_enabled:
+                    provider = cls._build_whisper_tiers(cfg)
+                else:
+                    provider = cls._build_whisper(cfg, cfg.whisper_model)
+            elif provider_name == "remote":
+                provider = RemoteAsrProvider(
+                    socket_paths=cfg.remote_socket_paths,
+                    transfer=cfg.remote_transfer,
+                    timeout=cfg.remote_timeout,
                 )
             else:
                 raise RuntimeError(f"unsupported ASR provider: {cfg.provider}")
-        return cls(provider=provider)
+            if cfg.lang_cache_enabled:
+                language_cache = LanguageCache(
+                    min_probability=cfg.lang_cache_min_probability,
+                    redetect_interval=cfg.lang_cache_redetect_interval,
+                    max_age_seconds=cfg.lang_cache_max_age_seconds,
+                    max_sessions=cfg.lang_cache_max_sessions,
+                )
+            result_cache = cls._build_result_cache(cfg)
+        return cls(provider=provider, language_cache=language_cache, result_cache=result_cache)
+
+    @staticmethod
+    def _build_result_cache(cfg: AsrSettings) -> Optional[AsrResultCache]:
+        mode = (cfg.result_cache or "off").strip().lower()
+        if mode == "memory":
+            return AsrResultCache(
+                ttl_seconds=cfg.result_cache_ttl_seconds,
+                max_entries=cfg.result_cache_max_entries,
+            )
+        if mode == "redis":
+            import redis.asyncio as redis
+
+            return RedisAsrResultCache(
+                redis_client=redis.Redis.from_url(cfg.result_cache_redis_url, decode_responses=True),
+                ttl_seconds=cfg.result_cache_ttl_seconds,
+                max_entries=cfg.result_cache_max_entries,
+            )
+        return None
+
+    @staticmethod
+    def _build_whisper(cfg: AsrSettings, model: str) -> AsrProvider:
+        return WhisperAsrProvider(
+            model=model,
+            device=cfg.whisper_device,
+            compute_type=cfg.whisper_compute_type,
+            beam_size=cfg.whisper_beam_size,
+            cache_dir=cfg.whisper_cache_dir,
+            default_sample_rate=cfg.target_sample_rate,
+        )
+
+    @classmethod
+    def _build_whisper_tiers(cls, cfg: AsrSettings) -> AsrProvider:
+        # One warm model instance per distinct model id; tiers sharing a model share it.
+        instances: dict[str, AsrProvider] = {}
+
+        def _instance(model: str) -> AsrProvider:
+            if model not in instances:
+                instances[model] = cls._build_whisper(cfg, model)
+            return instances[model]
+
+        tiers = [
+            AsrTier(
+                name="short",
+                provider=_instance(cfg.whisper_short_model),
+                max_duration_seconds=cfg.whisper_short_max_seconds,
+            ),
+            AsrTier(name="long", provider=_instance(cfg.whisper_model)),
+        ]
+        escalation = None
+        if cfg.whisper_escalation_model:
+            escalation = AsrTier(name="escalation", provider=_instance(cfg.whisper_escalation_model))
+        return TieredAsrProvider(
+            tiers=tiers,
+            escalation=escalation,
+            confidence_threshold=cfg.whisper_escalation_confidence,
+            default_sample_rate=cfg.target_sample_rate,
+        )
+
+    async def warmup(self) -> None:
+        await self._provider.warmup()
 
     async def transcribe_bundle(self, bundle: AudioBundle, *, options: Optional[AsrOptions] = None) -> AsrResult:
         opts = options or AsrOptions()
         opts.sample_rate = opts.sample_rate or bundle.metadata.sample_rate
+        cache_key: Optional[str] = None
+        if self._result_cache is not None:
+            cache_key = self._result_cache.make_key(bundle.pcm, opts)
+            cached = await self._result_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        cache = self._language_cache
+        detecting = False
+        if cache is not None and not opts.lang and opts.session_id:
+            opts.lang = cache.lookup(opts.session_id)
+            detecting = opts.lang is None
         result = await self._provider.transcribe(audio=bundle.pcm, options=opts)
+        if detecting:
+            cache.record(opts.session_id, result.language, result.language_probability)
         partials = list(result.partials or [])
         if not partials or not partials[-1].is_final:
             partials.append(AsrPartial(text=result.text, is_final=True))
-        return AsrResult(
+        final = AsrResult(
             text=result.text,
             partials=partials,
             duration_seconds=result.duration_seconds,
             provider=result.provider,
+            language=result.language or opts.lang,
+            language_probability=result.language_probability,
         )
+        if cache_key is not None and final.text.strip():
+            await self._result_cache.set(cache_key, final)
+        return final
 
     @property
     def provider(self) -> AsrProvider:
         return self._provider
+
+    @property
+    def language_cache(self) -> Optional[LanguageCache]:
+        return self._language_cache
+
+    @property
+    def result_cache(self) -> Optional[AsrResultCache]:
+        return self._result_cache
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Iterable, Optional
+from typing import Any, Dict, Iterable, Optional
 
 
 @dataclass(slots=True)
@@ -9,6 +9,7 @@ class AsrOptions:
     lang: Optional[str] = None
     enable_timestamps: bool = False
     sample_rate: Optional[int] = None
+    session_id: Optional[str] = None
 
 
 @dataclass(slots=True)
@@ -24,3 +25,35 @@ class AsrResult:
     partials: Iterable[AsrPartial] | None = None
     duration_seconds: Optional[float] = None
     provider: Optional[str] = None
+    language: Optional[str] = None
+    language_probability: Optional[float] = None
+    cached: bool = False
+
+
+def result_to_dict(result: AsrResult) -> Dict[str, Any]:
+    return {
+        "text": result.text,
+        "partials": [
+            {"text": p.text, "confidence": p.confidence, "is_final": p.is_final}
+            for p in (result.partials or [])
+        ],
+        "duration_seconds": result.duration_seconds,
+        "provider": result.provider,
+        "language": result.language,
+        "language_probability": result.language_probability,
+    }
+
+
+def result_from_dict(data: Dict[str, Any]) -> AsrResult:
+    partials = [
+        AsrPartial(text=p.get("text", ""), confidence=p.get("confidence"), is_final=bool(p.get("is_final")))
+        for p in data.get("partials") or []
+    ]
+    return AsrResult(
+        text=data.get("text", ""),
+        partials=partials,
+        duration_seconds=data.get("duration_seconds"),
+        provider=data.get("provider"),
+        language=data.get("language"),
+        language_probability=data.get("language_probability"),
+    )
@@ -3,6 +3,7 @@ from __future__ import annotations
 import asyncio
 import random
 import time
+from collections import OrderedDict
 from collections.abc import AsyncGenerator, Callable
 from typing import Any, Dict, List, Optional
 
@@ -10,6 +11,14 @@ from .llm_client import LLMNotConfiguredError, LLMStreamEmptyError, OpenAIChatCl
 from .ltm_client import LTMInlineClient
 from .memory_store import MemoryTurn, ShortTermMemoryStore
 from .settings import Settings, settings as runtime_settings
+from .model_router import ModelRouter, RoutingDecision
+from .rate_limiter import LLMRateLimiter
+from .semantic_cache import CacheHit, HashingEmbedder, OpenAIEmbedder, SemanticReplyCache
+from .singleflight import SingleFlight, flight_key, normalize_text
+from .summarizer import RollingSummarizer
+from .tokenizer import MESSAGE_OVERHEAD_TOKENS, TokenCounter
+
+_MAX_HISTORY_ANCHORS = 4096
 
 
 class ChatService:
@@ -33,6 +42,34 @@ class ChatService:
         self.last_ttft_ms: Optional[float] = None
         self.last_source: str = "mock"
         self.last_error: Optional[str] = None
+        self.last_usage: Optional[Dict[str, Any]] = None
+        self._token_counter = TokenCounter(
+            encoding=self._settings.llm.tokenizer_encoding,
+            model=self._settings.llm.model,
+        )
+        # session_id -> turn id where the cache-friendly history window starts
+        self._history_anchors: "OrderedDict[str, int]" = OrderedDict()
+        # session_id -> window start last handed to the summarizer
+        self._summary_boundaries: "OrderedDict[str, int]" = OrderedDict()
+        self._summarizer: Optional[RollingSummarizer] = None
+        self._singleflight: Optional[SingleFlight] = (
+            SingleFlight() if self._settings.llm.singleflight_enabled else None
+        )
+        self._semantic_cache = self._build_semantic_cache()
+        self._router = self._build_router()
+        self.last_route: Optional[RoutingDecision] = None
+        self._rate_limiter = self._build_rate_limiter()
+
+    async def warmup(self) -> None:
+        """Load the tokenizer, then create the LLM client and open its pool when LLM is enabled."""
+
+        await self._token_counter.warmup()
+        if not self._settings.llm.enabled:
+            return
+        client = await self._ensure_llm_client()
+        warmup = getattr(client, "warmup", None)
+        if warmup is not None:
+            await warmup()
 
     async def stream_reply(
         self,
@@ -50,12 +87,43 @@ class ChatService:
 
         if self._settings.llm.enabled:
             context_turns = await self._fetch_short_term_context(session_id=session_id)
+            summary = await self._fetch_summary(session_id)
+            # Without history or a summary the prompt is the same for every
+            # viewer, so the reply may be shared through the cache.
+            context_free = not context_turns and not summary
+            decision = self._route(session_id=session_id, user_text=user_text, meta=meta)
+            model = decision.model if decision is not None else self._settings.llm.model
+            cache_scope = self._reply_cache_scope(
+                user_text=user_text,
+                meta=meta,
+                model=model,
+                context_free=context_free,
+            )
+            if cache_scope is not None:
+                hit = await self._lookup_reply_cache(cache_scope, user_text)
+                if hit is not None:
+                    async for delta in self._emit_with_metrics(self._stream_cached(hit.reply), source="cache"):
+                        yield delta
+                    return
+
             ltm_snippets = await self._fetch_ltm_snippets(
                 session_id=session_id,
                 user_text=user_text,
                 meta=meta,
             )
+            context_turns = self._select_history(
+                session_id,
+                context_turns,
+                reserved_tokens=self._reserved_tokens(
+                    user_text=user_text,
+                    meta=meta,
+                    ltm_snippets=ltm_snippets,
+                    summary=summary,
+                ),
+            )
+            self._schedule_summary(session_id, context_turns)
             self._log_context_info(len(context_turns), len(ltm_snippets))
+            reply_parts: List[str] = []
             try:
                 async for delta in self._emit_with_metrics(
                     self._stream_llm(
@@ -64,10 +132,17 @@ class ChatService:
                         meta=meta,
                         context=context_turns,
                         ltm_snippets=ltm_snippets,
+                        summary=summary,
+                        decision=decision,
+                        shareable=context_free and not ltm_snippets,
                     ),
                     source="llm",
                 ):
+                    reply_parts.append(delta)
                     yield delta
+                # Replies shaped by LTM memories are personal; keep them out of the cache.
+                if cache_scope is not None and not ltm_snippets:
+                    await self._store_reply_cache(cache_scope, user_text, "".join(reply_parts))
                 return
             except LLMStreamEmptyError as exc:
                 self.last_error = "llm_empty_stream"
@@ -105,11 +180,23 @@ class ChatService:
 
         if self._settings.llm.enabled:
             context_turns = await self._fetch_short_term_context(session_id=session_id)
+            summary = await self._fetch_summary(session_id)
             ltm_snippets = await self._fetch_ltm_snippets(
                 session_id=session_id,
                 user_text=prompt_text,
                 meta=meta,
             )
+            context_turns = self._select_history(
+                session_id,
+                context_turns,
+                reserved_tokens=self._reserved_tokens(
+                    user_text=prompt_text,
+                    meta=meta,
+                    ltm_snippets=ltm_snippets,
+                    summary=summary,
+                ),
+            )
+            self._schedule_summary(session_id, context_turns)
             self._log_context_info(len(context_turns), len(ltm_snippets))
             try:
                 reply_text = await self._generate_vision_reply(
@@ -120,6 +207,7 @@ class ChatService:
                     meta=meta,
                     context=context_turns,
                     ltm_snippets=ltm_snippets,
+                    summary=summary,
                 )
                 self.last_source = "llm"
                 self.last_error = None
@@ -161,6 +249,9 @@ class ChatService:
         meta: Dict[str, Any],
         context: List[MemoryTurn],
         ltm_snippets: List[str],
+        summary: Optional[str] = None,
+        decision: Optional[RoutingDecision] = None,
+        shareable: bool = False,
     ) -> AsyncGenerator[str, None]:
         client = await self._ensure_llm_client()
         messages = self._compose_messages(
@@ -168,12 +259,147 @@ class ChatService:
             meta=meta,
             context=context,
             ltm_snippets=ltm_snippets,
+            summary=summary,
         )
         extra_options: Dict[str, Any] = {
             "extra_headers": {"x-session-id": session_id},
         }
-        async for delta in client.stream_chat(messages, extra_options=extra_options):
+        usage: Dict[str, Any] = {}
+        model = decision.model if decision is not None else self._settings.llm.model
+
+        def _upstream() -> AsyncGenerator[str, None]:
+            return client.stream_chat(
+                messages,
+                model=model,
+                extra_options=extra_options,
+                usage=usage,
+            )
+
+        if self._singleflight is not None and shareable:
+            # Only context-free turns (no history, summary or LTM snippets) are
+            # coalesced: their prompt is just the persona and the viewer line,
+            # so one reply fits every caller.
+            key = flight_key(user_text, meta.get("system_prompt"), model)
+            deltas = self._singleflight.stream(key, _upstream)
+        else:
+            deltas = _upstream()
+        started = time.perf_counter()
+        first = True
+        async for delta in deltas:
+            if first and decision is not None:
+                self._router.record_ttft(decision, (time.perf_counter() - started) * 1000.0)  # type: ignore[union-attr]
+            first = False
             yield delta
+        if usage:
+            self.last_usage = usage
+            self._log_usage(usage)
+            if usage.get("completion_tokens"):
+                # Prefer the provider's count over the streamed-delta estimate.
+                self.last_token_count = int(usage["completion_tokens"])
+
+    def _build_rate_limiter(self) -> Optional[LLMRateLimiter]:
+        cfg = self._settings.rate_limit
+        if not cfg.enabled or not (cfg.rpm or cfg.tpm):
+            return None
+        import redis.asyncio as redis
+
+        return LLMRateLimiter(
+            redis_client=redis.from_url(cfg.redis_url) if cfg.redis_url else None,
+            key=cfg.key,
+            rpm=cfg.rpm,
+            tpm=cfg.tpm,
+            background_reserve=cfg.background_reserve,
+            interactive_max_wait=cfg.interactive_max_wait,
+            background_max_wait=cfg.background_max_wait,
+        )
+
+    def rate_limit_stats(self) -> Optional[Dict[str, Any]]:
+        return self._rate_limiter.stats() if self._rate_limiter is not None else None
+
+    def _build_router(self) -> Optional[ModelRouter]:
+        cfg = self._settings.llm
+        if not cfg.router_enabled:
+            return None
+        return ModelRouter(
+            fast_model=cfg.router_fast_model or cfg.model,
+            strong_model=cfg.router_strong_model or cfg.model,
+            fast_max_chars=cfg.router_fast_max_chars,
+        )
+
+    @property
+    def router(self) -> Optional[ModelRouter]:
+        return self._router
+
+    def _build_semantic_cache(self) -> Optional[SemanticReplyCache]:
+        cfg = self._settings.semantic_cache
+        if not cfg.enabled:
+            return None
+        if cfg.embedder == "openai":
+            embedder: Any = OpenAIEmbedder(client=self._ensure_llm_client, model=cfg.embedding_model)
+        else:
+            embedder = HashingEmbedder()
+        return SemanticReplyCache(
+            embedder=embedder,
+            threshold=cfg.threshold,
+            ttl_seconds=cfg.ttl_seconds,
+            max_entries=cfg.max_entries,
+        )
+
+    async def _stream_cached(self, reply: str) -> AsyncGenerator[str, None]:
+        yield reply
+
+    def _route(self, *, session_id: str, user_text: str, meta: Dict[str, Any]) -> Optional[RoutingDecision]:
+        decision = self._router.route(session_id=session_id, user_text=user_text, meta=meta) if self._router else None
+        self.last_route = decision
+        return decision
+
+    def _reply_cache_scope(
+        self,
+        *,
+        user_text: str,
+        meta: Dict[str, Any],
+        model: str,
+        context_free: bool,
+    ) -> Optional[str]:
+        """Cache scope for this turn, or ``None`` when the cache must be bypassed.
+
+        Turns that carry session history or a rolling summary are never cached:
+        a follow-up such as "why?" means something different in every session.
+        """
+
+        cache = self._semantic_cache
+        if cache is None:
+            return None
+        personalized = bool(meta.get("personalized")) or meta.get("cache") is False or not context_free
+        normalized = normalize_text(user_text)
+        if personalized or not normalized or len(normalized) > self._settings.semantic_cache.max_query_chars:
+            cache.record_bypass()
+            return None
+        return flight_key("", meta.get("system_prompt"), model, meta.get("lang"))
+
+    async def _lookup_reply_cache(self, scope: str, user_text: str) -> Optional[CacheHit]:
+        try:
+            hit = await self._semantic_cache.lookup(scope, user_text)  # type: ignore[union-attr]
+        except Exception as exc:  # pragma: no cover - best effort log
+            self._log_context_warning("semantic_cache.lookup.error", exc)
+            return None
+        if hit is not None:
+            from logging import getLogger
+
+            getLogger(__name__).info(
+                "semantic_cache.hit",
+                extra={"query": user_text, "matched": hit.query, "similarity": round(hit.similarity, 3)},
+            )
+        return hit
+
+    async def _store_reply_cache(self, scope: str, user_text: str, reply: str) -> None:
+        try:
+            await self._semantic_cache.store(scope, user_text, reply)  # type: ignore[union-attr]
+        except Exception as exc:  # pragma: no cover - best effort log
+            self._log_context_warning("semantic_cache.store.error", exc)
+
+    def semantic_cache_stats(self) -> Optional[Dict[str, Any]]:
+        return self._semantic_cache.stats() if self._semantic_cache is not None else None
 
     async def _stream_mock(
         self,
@@ -196,6 +422,7 @@ class ChatService:
         meta: Dict[str, Any],
         context: List[MemoryTurn],
         ltm_snippets: List[str],
+        summary: Optional[str] = None,
     ) -> str:
         client = await self._ensure_llm_client()
         messages = self._compose_messages(
@@ -203,6 +430,7 @@ class ChatService:
             meta=meta,
             context=context,
             ltm_snippets=ltm_snippets,
+            summary=summary,
         )
         content: list[Dict[str, Any]] = []
         if prompt_text:
@@ -257,10 +485,24 @@ class ChatService:
         if self._llm_client_factory is not None:
             client = self._llm_client_factory()
         else:
-            client = OpenAIChatClient()
+            client = OpenAIChatClient(rate_limiter=self._rate_limiter)
         self._llm_client = client
+        start_keepwarm = getattr(client, "start_keepwarm", None)
+        if start_keepwarm is not None:
+            start_keepwarm()
         return client
 
+    def llm_connection_stats(self) -> Optional[Dict[str, Any]]:
+        stats = getattr(self._llm_client, "connection_stats", None)
+        return stats.as_dict() if stats is not None else None
+
+    def singleflight_stats(self) -> Optional[Dict[str, Any]]:
+        return self._singleflight.stats() if self._singleflight is not None else None
+
+    def llm_hedge_stats(self) -> Optional[Dict[str, Any]]:
+        stats = getattr(self._llm_client, "hedge_stats", None)
+        return stats.as_dict() if stats is not None else None
+
     def _compose_messages(
         self,
         *,
@@ -268,11 +510,18 @@ class ChatService:
         meta: Dict[str, Any],
         context: List[MemoryTurn],
         ltm_snippets: List[str],
+        summary: Optional[str] = None,
     ) -> list[Dict[str, str]]:
+        # Both layouts keep the persona (and the rolling summary, which only
+        # changes when turns leave the window) first and volatile LTM context
+        # right before the user turn; the "cache" layout additionally anchors
+        # the history window (see _select_history) so the prefix stays stable.
         system_prompt = meta.get("system_prompt")
         messages: list[Dict[str, str]] = []
         if system_prompt:
             messages.append({"role": "system", "content": str(system_prompt)})
+        if summary:
+            messages.append({"role": "system", "content": self._format_summary(summary)})
 
         for turn in context:
             role = turn.role if turn.role in {"user", "assistant", "system"} else "assistant"
@@ -284,13 +533,101 @@ class ChatService:
         return messages
 
     def _estimate_tokens(self, chunk: str) -> int:
-        return max(len(chunk.strip().split()), 1) if chunk.strip() else 0
+        return self._token_counter.count(chunk) if chunk.strip() else 0
+
+    def _select_history(
+        self,
+        session_id: str,
+        turns: List[MemoryTurn],
+        *,
+        reserved_tokens: int = 0,
+    ) -> List[MemoryTurn]:
+        """Choose the STM turns that fit the prompt, newest first.
+
+        The window holds at most ``context_turns`` turns and, when
+        ``context_token_budget`` is set, at most the budget minus
+        ``reserved_tokens`` (persona, LTM block and the user turn).
+
+        With the "cache" layout the window start is pinned to a turn and only
+        advances in blocks of ``prompt_history_block_turns`` once the window no
+        longer fits. A plain sliding window drops the oldest turn on every
+        request, which changes the prompt prefix each time and defeats provider
+        prefix caching. The caller fetches one extra block so the pinned turn
+        stays visible.
+        """
+
+        if not turns:
+            return turns
+        limit = self._settings.short_term.context_turns
+        budget = self._settings.short_term.context_token_budget
+        history_budget = max(0, budget - reserved_tokens) if budget > 0 else None
+        suffix_tokens = [0] * (len(turns) + 1)
+        if history_budget is not None:
+            for idx in range(len(turns) - 1, -1, -1):
+                suffix_tokens[idx] = suffix_tokens[idx + 1] + self._turn_tokens(turns[idx])
+
+        def fits(start: int) -> bool:
+            if len(turns) - start > limit:
+                return False
+            return history_budget is None or suffix_tokens[start] <= history_budget
+
+        llm_cfg = self._settings.llm
+        anchored = llm_cfg.prompt_layout == "cache" and all(turn.turn_id is not None for turn in turns)
+        anchor = self._history_anchors.get(session_id) if anchored else None
+        start = next((idx for idx, turn in enumerate(turns) if turn.turn_id == anchor), None)
+        if start is None:
+            start = 0
+            while start < len(turns) and not fits(start):
+                start += 1
+        step = max(1, llm_cfg.prompt_history_block_turns) if anchored else 1
+        while start < len(turns) and not fits(start):
+            start += step
+        if start >= len(turns):
+            self._history_anchors.pop(session_id, None)
+            return []
+
+        if anchored:
+            self._history_anchors[session_id] = turns[start].turn_id  # type: ignore[assignment]
+            self._history_anchors.move_to_end(session_id)
+            while len(self._history_anchors) > _MAX_HISTORY_ANCHORS:
+                self._history_anchors.popitem(last=False)
+        return turns[start:]
+
+    def _turn_tokens(self, turn: MemoryTurn) -> int:
+        tokens = turn.tokens if turn.tokens is not None else self._token_counter.count(turn.content)
+        return tokens + MESSAGE_OVERHEAD_TOKENS
+
+    def _reserved_tokens(
+        self,
+        *,
+        user_text: str,
+        meta: Dict[str, Any],
+        ltm_snippets: List[str],
+        summary: Optional[str] = None,
+    ) -> int:
+        reserved = self._token_counter.count_message(user_text)
+        if summary:
+            reserved += self._token_counter.count_message(self._format_summary(summary))
+        system_prompt = meta.get("system_prompt")
+        if system_prompt:
+            reserved += self._token_counter.count_message(str(system_prompt))
+        if ltm_snippets:
+            reserved += self._token_counter.count_message(self._format_ltm_snippets(ltm_snippets))
+        return reserved
 
     def _reset_metrics(self) -> None:
         self.last_token_count = 0
         self.last_ttft_ms = None
         self.last_source = "mock"
         self.last_error = None
+        self.last_usage = None
+        self.last_route = None
+
+    def _log_usage(self, usage: Dict[str, Any]) -> None:
+        from logging import getLogger
+
+        logger = getLogger(__name__)
+        logger.info("chat.llm.usage", extra=usage)
 
     def _log_llm_fallback(self, *, reason: str) -> None:
         # Deliberately late import to avoid global logging setup requirements.
@@ -304,11 +641,15 @@ class ChatService:
         if not cfg.enabled:
             return []
         store = self._ensure_memory_store()
+        limit = cfg.context_turns
+        if self._settings.llm.prompt_layout == "cache":
+            limit += max(1, self._settings.llm.prompt_history_block_turns)
         try:
-            return await store.fetch_recent(session_id=session_id, limit=cfg.context_turns)
+            turns = await store.fetch_recent(session_id=session_id, limit=limit)
         except Exception as exc:  # pragma: no cover - best effort log
             self._log_context_warning("stm.fetch.error", exc)
             return []
+        return turns
 
     async def _fetch_ltm_snippets(
         self,
@@ -340,6 +681,7 @@ class ChatService:
             self._memory_store = ShortTermMemoryStore(
                 db_path=cfg.db_path,
                 default_limit=cfg.context_turns,
+                token_counter=self._token_counter.count,
             )
         return self._memory_store
 
@@ -354,6 +696,67 @@ class ChatService:
             )
         return self._ltm_client
 
+    def _format_summary(self, summary: str) -> str:
+        return "Conversation so far (summary of earlier turns):\n" + summary
+
+    async def _fetch_summary(self, session_id: str) -> Optional[str]:
+        cfg = self._settings.short_term
+        if not (cfg.enabled and cfg.summary_enabled):
+            return None
+        store = self._ensure_memory_store()
+        fetch_summary = getattr(store, "fetch_summary", None)
+        if fetch_summary is None:
+            return None
+        try:
+            record = await fetch_summary(session_id)
+        except Exception as exc:  # pragma: no cover - best effort log
+            self._log_context_warning("stm.summary.fetch.error", exc)
+            return None
+        return record.summary if record else None
+
+    def _schedule_summary(self, session_id: str, window: List[MemoryTurn]) -> None:
+        """Queue folding of turns older than the prompt window (off the reply path)."""
+
+        summarizer = self._ensure_summarizer()
+        if summarizer is None or not window or window[0].turn_id is None:
+            return
+        boundary = window[0].turn_id
+        if self._summary_boundaries.get(session_id) == boundary:
+            return
+        self._summary_boundaries[session_id] = boundary
+        self._summary_boundaries.move_to_end(session_id)
+        while len(self._summary_boundaries) > _MAX_HISTORY_ANCHORS:
+            self._summary_boundaries.popitem(last=False)
+        summarizer.schedule(session_id, boundary)
+
+    def _ensure_summarizer(self) -> Optional[RollingSummarizer]:
+        cfg = self._settings.short_term
+        if not (cfg.enabled and cfg.summary_enabled):
+            return None
+        if self._summarizer is None:
+            store = self._ensure_memory_store()
+            if not hasattr(store, "fetch_turns_between"):
+                return None
+            self._summarizer = RollingSummarizer(
+                store=store,
+                llm_client=self._ensure_llm_client,
+                min_turns=cfg.summary_min_turns,
+                max_chars=cfg.summary_max_chars,
+                model=cfg.summary_model,
+            )
+        return self._summarizer
+
+    @property
+    def summarizer(self) -> Optional[RollingSummarizer]:
+        return self._summarizer
+
+    async def shutdown(self) -> None:
+        stop_keepwarm = getattr(self._llm_client, "stop_keepwarm", None)
+        if stop_keepwarm is not None:
+            await stop_keepwarm()
+        if self._summarizer is not None:
+            await self._summarizer.shutdown()
+
     def _format_ltm_snippets(self, snippets: List[str]) -> str:
         numbered = [f"{idx + 1}. {snippet}" for idx, snippet in enumerate(snippets)]
         return "Relevant memories:\n" + "\n".join(numbered)
@@ -0,0 +1,245 @@
+"""
+服务间调用共享的 HTTP 连接池
+
+每个上游（dialog_engine、ltm、output_handler 等）只持有一个长期存活的 httpx 客户端，
+保持 keep-alive，内部调用不再为每个请求重新建立 TCP 连接。客户端在首次使用时创建，
+由所属服务的 lifespan 在关闭时调用 `HttpClientPool.aclose()` 释放。
+
+连接数上限与超时从环境变量读取，优先级：
+
+`HTTP_POOL_<上游名>_<字段>` > `HTTP_POOL_<字段>` > 调用方默认值
+
+字段为 TIMEOUT、CONNECT_TIMEOUT、MAX_CONNECTIONS、MAX_KEEPALIVE、KEEPALIVE_EXPIRY、HTTP2。
+
+各服务独立构建镜像，因此 gateway、input-handler、dialog-engine 各保存一份本模块，
+内容必须逐字节一致；dialog-engine 的单元测试会比对三份副本。
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Union
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+_TRUE_VALUES = {"1", "true", "yes", "on"}
+
+
+def _env(name: str, field: str) -> Optional[str]:
+    key = re.sub(r"[^A-Z0-9]+", "_", name.upper())
+    for candidate in (f"HTTP_POOL_{key}_{field}", f"HTTP_POOL_{field}"):
+        value = os.getenv(candidate)
+        if value is not None and value.strip():
+            return value.strip()
+    return None
+
+
+@dataclass
+class UpstreamConfig:
+    name: str
+    base_url: str = ""
+    timeout: float = 30.0
+    connect_timeout: float = 5.0
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    http2: bool = False
+
+    @classmethod
+    def from_env(cls, name: str, **defaults: Any) -> "UpstreamConfig":
+        config = cls(name=name, **defaults)
+        for field, attr, cast in (
+            ("TIMEOUT", "timeout", float),
+            ("CONNECT_TIMEOUT", "connect_timeout", float),
+            ("MAX_CONNECTIONS", "max_connections", int),
+            ("MAX_KEEPALIVE", "max_keepalive_connections", int),
+            ("KEEPALIVE_EXPIRY", "keepalive_expiry", float),
+        ):
+            raw = _env(name, field)
+            if raw is None:
+                continue
+            try:
+                setattr(config, attr, cast(raw))
+            except ValueError:
+                logger.warning("http_pool.invalid_env", extra={"upstream": name, "field": field, "value": raw})
+        raw_http2 = _env(name, "HTTP2")
+        if raw_http2 is not None:
+            config.http2 = raw_http2.lower() in _TRUE_VALUES
+        return config
+
+    def client_kwargs(self) -> Dict[str, Any]:
+        http2 = self.http2
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("http_pool.http2_unavailable", extra={"upstream": self.name})
+            http2 = False
+        kwargs: Dict[str, Any] = {
+            "timeout": httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            "limits": httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            "http2": http2,
+        }
+        if self.base_url:
+            kwargs["base_url"] = self.base_url.rstrip("/")
+        return kwargs
+
+
+@dataclass
+class PoolStats:
+    """每个上游的请求数与新建连接数统计"""
+
+    requests: int = 0
+    connections_opened: int = 0
+    server_errors: int = 0
+
+    def as_dict(self, config: UpstreamConfig) -> Dict[str, Any]:
+        reuse = 1.0 - (self.connections_opened / self.requests) if self.requests else None
+        return {
+            "base_url": config.base_url or None,
+            "max_connections": config.max_connections,
+            "max_keepalive_connections": config.max_keepalive_connections,
+            "timeout": config.timeout,
+            "http2": config.http2,
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "server_errors": self.server_errors,
+            "reuse_ratio": round(max(0.0, reuse), 3) if reuse is not None else None,
+        }
+
+    def on_request(self, request: httpx.Request) -> None:
+        self.requests += 1
+        request.extensions["trace"] = self._on_trace_async
+
+    def on_request_sync(self, request: httpx.Request) -> None:
+        self.requests += 1
+        request.extensions["trace"] = self._on_trace
+
+    def on_response(self, response: httpx.Response) -> None:
+        if response.status_code >= 500:
+            self.server_errors += 1
+
+    def _on_trace(self, event: str, info: Dict[str, Any]) -> None:
+        if event == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+
+    async def _on_trace_async(self, event: str, info: Dict[str, Any]) -> None:
+        self._on_trace(event, info)
+
+
+class HttpClientPool:
+    """按上游名缓存、延迟创建的长连接客户端"""
+
+    def __init__(self) -> None:
+        self._configs: Dict[str, UpstreamConfig] = {}
+        self._transports: Dict[str, Any] = {}
+        self._stats: Dict[str, PoolStats] = {}
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._sync_clients: Dict[str, httpx.Client] = {}
+        self._retired: List[Union[httpx.AsyncClient, httpx.Client]] = []
+        self._lock = threading.Lock()
+
+    def register(
+        self,
+        config: UpstreamConfig,
+        *,
+        transport: Optional[Union[httpx.AsyncBaseTransport, httpx.BaseTransport]] = None,
+    ) -> UpstreamConfig:
+        """注册或替换上游配置；已有客户端会在下一次 aclose 时关闭"""
+        with self._lock:
+            if self._configs.get(config.name) == config and transport is None:
+                return self._configs[config.name]
+            self._configs[config.name] = config
+            self._transports[config.name] = transport
+            self._stats.setdefault(config.name, PoolStats())
+            for clients in (self._clients, self._sync_clients):
+                previous = clients.pop(config.name, None)
+                if previous is not None:
+                    self._retired.append(previous)
+        return config
+
+    def configure(self, name: str, **defaults: Any) -> UpstreamConfig:
+        """上游未注册时按环境变量注册，已注册则直接返回"""
+        config = self._configs.get(name)
+        if config is None:
+            config = self.register(UpstreamConfig.from_env(name, **defaults))
+        return config
+
+    def client(self, name: str) -> httpx.AsyncClient:
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            with self._lock:
+                config, stats = self._config(name)
+                client = httpx.AsyncClient(
+                    transport=self._transports.get(name),
+                    event_hooks={
+                        "request": [self._async_hook(stats.on_request)],
+                        "response": [self._async_hook(stats.on_response)],
+                    },
+                    **config.client_kwargs(),
+                )
+                self._clients[name] = client
+        return client
+
+    def sync_client(self, name: str) -> httpx.Client:
+        """供无法 await 的 WSGI 处理函数使用的同步客户端（线程安全）"""
+        client = self._sync_clients.get(name)
+        if client is None or client.is_closed:
+            with self._lock:
+                config, stats = self._config(name)
+                client = httpx.Client(
+                    transport=self._transports.get(name),
+                    event_hooks={"request": [stats.on_request_sync], "response": [stats.on_response]},
+                    **config.client_kwargs(),
+                )
+                self._sync_clients[name] = client
+        return client
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: self._stats[name].as_dict(config) for name, config in self._configs.items()}
+
+    async def aclose(self) -> None:
+        with self._lock:
+            clients: List[Union[httpx.AsyncClient, httpx.Client]] = [
+                *self._retired,
+                *self._clients.values(),
+                *self._sync_clients.values(),
+            ]
+            self._retired.clear()
+            self._clients.clear()
+            self._sync_clients.clear()
+        for client in clients:
+            try:
+                if isinstance(client, httpx.AsyncClient):
+                    await client.aclose()
+                else:
+                    client.close()
+            except Exception as exc:  # pragma: no cover - 尽力清理
+                logger.warning("http_pool.close_failed", extra={"error": repr(exc)})
+
+    def _config(self, name: str) -> tuple[UpstreamConfig, PoolStats]:
+        config = self._configs.get(name)
+        if config is None:
+            raise KeyError(f"unknown upstream: {name}")
+        return config, self._stats[name]
+
+    @staticmethod
+    def _async_hook(hook):
+        async def _run(arg):
+            hook(arg)
+
+        return _run
+
+
+shared_pool = HttpClientPool()
+
+
+__all__ = ["HttpClientPool", "PoolStats", "UpstreamConfig", "shared_pool"]
@@ -3,13 +3,19 @@ from __future__ import annotations
 """LLM streaming client wrappers for dialog-engine."""
 
 import asyncio
+import importlib.util
 import logging
 from collections.abc import AsyncGenerator, Sequence
+from dataclasses import dataclass
 from typing import Any, Dict, Optional
 
+import httpx
 from openai import AsyncOpenAI
 
+from .llm_sse import ChatDelta, RawChatStreamer, normalize_usage
+from .rate_limiter import LANE_INTERACTIVE, LLMRateLimiter
 from .settings import LLMSettings, OpenAISettings, settings
+from .tokenizer import MESSAGE_OVERHEAD_TOKENS, estimate_tokens
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +34,121 @@ class LLMStreamEmptyError(RuntimeError):
         self.tool_calls = tool_calls or []
 
 
+@dataclass
+class ConnectionStats:
+    """Counts requests against freshly opened connections to gauge reuse."""
+
+    requests: int = 0
+    connections_opened: int = 0
+    tls_handshakes: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        reuse = 1.0 - (self.connections_opened / self.requests) if self.requests else None
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "tls_handshakes": self.tls_handshakes,
+            "reuse_ratio": round(max(0.0, reuse), 3) if reuse is not None else None,
+        }
+
+    async def on_request(self, request: httpx.Request) -> None:
+        self.requests += 1
+        request.extensions["trace"] = self.on_trace
+
+    async def on_trace(self, event: str, info: Dict[str, Any]) -> None:
+        if event == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+        elif event == "connection.start_tls.complete":
+            self.tls_handshakes += 1
+
+
+@dataclass
+class HedgeStats:
+    requests: int = 0
+    hedged: int = 0
+    backup_wins: int = 0
+    budget_denied: int = 0
+    quota_denied: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "backup_wins": self.backup_wins,
+            "budget_denied": self.budget_denied,
+            "quota_denied": self.quota_denied,
+        }
+
+
+class HedgeBudget:
+    """Caps hedged requests to a fraction of primary traffic.
+
+    Every primary request deposits ``ratio`` credits (up to ``burst``) and a
+    hedge spends one, so sustained hedging never exceeds ``ratio`` of the
+    request volume while short bursts of slow responses can still be hedged.
+    """
+
+    def __init__(self, *, ratio: float, burst: float) -> None:
+        self._ratio = max(0.0, ratio)
+        self._burst = max(1.0, burst)
+        self._credits = self._burst
+
+    def deposit(self) -> None:
+        self._credits = min(self._burst, self._credits + self._ratio)
+
+    def withdraw(self) -> bool:
+        if self._credits < 1.0:
+            return False
+        self._credits -= 1.0
+        return True
+
+    def refund(self) -> None:
+        self._credits = min(self._burst, self._credits + 1.0)
+
+    @property
+    def credits(self) -> float:
+        return self._credits
+
+
+async def _next_delta(stream: AsyncGenerator[str, None]) -> str:
+    return await stream.__anext__()
+
+
+def build_http_client(cfg: OpenAISettings, *, timeout: float, stats: ConnectionStats) -> httpx.AsyncClient:
+    """Pooled transport for the provider with keep-alive and optional HTTP/2."""
+
+    http2 = cfg.http2
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("llm.http2.unavailable", extra={"reason": "h2 package not installed"})
+        http2 = False
+    return httpx.AsyncClient(
+        timeout=timeout,
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=cfg.http_max_connections,
+            max_keepalive_connections=cfg.http_max_keepalive_connections,
+            keepalive_expiry=cfg.http_keepalive_expiry,
+        ),
+        event_hooks={"request": [stats.on_request]},
+    )
+
+
+def _estimate_request_tokens(params: Dict[str, Any]) -> int:
+    """Prompt estimate plus the completion budget, charged before a call."""
+
+    total = int(params.get("max_tokens") or 0)
+    for message in params.get("messages") or ():
+        content = message.get("content") if isinstance(message, dict) else None
+        if isinstance(content, str):
+            total += estimate_tokens(content)
+        elif isinstance(content, list):
+            total += sum(
+                estimate_tokens(part.get("text") or "") for part in content if isinstance(part, dict)
+            )
+        total += MESSAGE_OVERHEAD_TOKENS
+    return total
+
+
 class OpenAIChatClient:
     """Thin wrapper around AsyncOpenAI with retry-aware streaming."""
 
@@ -37,27 +158,124 @@ class OpenAIChatClient:
         llm_cfg: Optional[LLMSettings] = None,
         *,
         client: Optional[AsyncOpenAI] = None,
+        hedge_client: Optional[AsyncOpenAI] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        rate_limiter: Optional[LLMRateLimiter] = None,
     ) -> None:
         self._openai_cfg = openai_cfg or settings.openai
         self._llm_cfg = llm_cfg or settings.llm
+        self.rate_limiter = rate_limiter
+        self.connection_stats = ConnectionStats()
+        self.hedge_stats = HedgeStats()
+        self.hedge_budget = HedgeBudget(
+            ratio=self._llm_cfg.hedge_budget_ratio,
+            burst=self._llm_cfg.hedge_budget_burst,
+        )
+        self._keepwarm_task: Optional[asyncio.Task] = None
         api_key = self._openai_cfg.api_key
         if client is None:
             if not api_key:
                 raise LLMNotConfiguredError("OPENAI_API_KEY is required for real LLM usage")
+            primary_http = http_client or build_http_client(
+                self._openai_cfg,
+                timeout=self._llm_cfg.timeout,
+                stats=self.connection_stats,
+            )
             self._client = AsyncOpenAI(
                 api_key=api_key,
                 base_url=self._openai_cfg.base_url,
                 organization=self._openai_cfg.organization,
+                http_client=primary_http,
             )
             self._owns_client = True
         else:
             self._client = client
             self._owns_client = False
 
+        # Hedged requests go to a backup endpoint when one is configured,
+        # otherwise to the primary client (optionally with a backup model).
+        self._owns_hedge_client = False
+        if hedge_client is not None:
+            self._hedge_client = hedge_client
+        elif self._llm_cfg.hedge_enabled and self._llm_cfg.hedge_base_url and client is None:
+            hedge_http = build_http_client(
+                self._openai_cfg,
+                timeout=self._llm_cfg.timeout,
+                stats=self.connection_stats,
+            )
+            self._hedge_client = AsyncOpenAI(
+                api_key=self._llm_cfg.hedge_api_key or api_key,
+                base_url=self._llm_cfg.hedge_base_url,
+                organization=self._openai_cfg.organization,
+                http_client=hedge_http,
+            )
+            self._owns_hedge_client = True
+        else:
+            self._hedge_client = self._client
+
+        # The raw SSE transport reuses each client's pooled httpx transport but
+        # skips the SDK's per-chunk model construction.
+        self._raw_streamers: Dict[int, RawChatStreamer] = {}
+        if self._llm_cfg.stream_transport == "raw" and client is None:
+            self._raw_streamers[id(self._client)] = RawChatStreamer(
+                http_client=primary_http,
+                api_key=api_key,
+                base_url=self._openai_cfg.base_url,
+                organization=self._openai_cfg.organization,
+            )
+            if self._owns_hedge_client:
+                self._raw_streamers[id(self._hedge_client)] = RawChatStreamer(
+                    http_client=hedge_http,
+                    api_key=self._llm_cfg.hedge_api_key or api_key,
+                    base_url=self._llm_cfg.hedge_base_url,
+                    organization=self._openai_cfg.organization,
+                )
+
     async def close(self) -> None:
+        await self.stop_keepwarm()
+        if self._owns_hedge_client:
+            await self._hedge_client.close()
         if self._owns_client:
             await self._client.close()
 
+    def start_keepwarm(self) -> None:
+        """Keep at least one pooled connection alive between turns."""
+
+        interval = self._openai_cfg.keepwarm_interval_seconds
+        if interval <= 0 or self._keepwarm_task is not None:
+            return
+        self._keepwarm_task = asyncio.create_task(self._keepwarm_loop(interval))
+
+    async def stop_keepwarm(self) -> None:
+        task, self._keepwarm_task = self._keepwarm_task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _keepwarm_loop(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self._ping()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.debug("llm.keepwarm.error", extra={"error": repr(exc)})
+
+    async def _ping(self) -> None:
+        client = self._client.with_options(max_retries=0, timeout=self._llm_cfg.timeout)
+        await client.models.list()
+
+    async def warmup(self) -> None:
+        """Open a pooled HTTP connection to the provider ahead of the first turn."""
+
+        await self._ping()
+        logger.info("llm.warmup.complete", extra={"base_url": self._openai_cfg.base_url})
+
     async def stream_chat(
         self,
         messages: Sequence[ChatMessage],
@@ -68,8 +286,15 @@ class OpenAIChatClient:
         top_p: Optional[float] = None,
         timeout: Optional[float] = None,
         extra_options: Optional[Dict[str, Any]] = None,
+        usage: Optional[Dict[str, Any]] = None,
+        lane: str = LANE_INTERACTIVE,
     ) -> AsyncGenerator[str, None]:
-        """Stream chat completion deltas with retry and logging."""
+        """Stream chat completion deltas with retry and logging.
+
+        When ``usage`` is given it receives the provider's token usage
+        (including cached prompt tokens) once the stream reports it. ``lane``
+        selects the rate-limiter priority (``interactive`` or ``background``).
+        """
 
         cfg = self._llm_cfg
         params: Dict[str, Any] = {
@@ -85,55 +310,25 @@ class OpenAIChatClient:
         }
         if extra_options:
             params.update(extra_options)
+        if usage is not None and cfg.stream_include_usage:
+            extra_body = dict(params.get("extra_body") or {})
+            extra_body.setdefault("stream_options", {"include_usage": True})
+            params["extra_body"] = extra_body
 
         attempt = 0
         last_error: Exception | None = None
         total_attempts = cfg.retry_limit + 1
         while attempt < total_attempts:
             attempt += 1
-            stream = None
+            estimated = await self._acquire_quota(params, lane)
+            if cfg.hedge_enabled:
+                deltas = self._hedged_stream(params, attempt=attempt, usage=usage, lane=lane)
+            else:
+                deltas = self._stream_once(self._client, params, attempt=attempt, usage=usage)
             try:
-                stream = await self._client.chat.completions.create(**params)
-                logger.info(
-                    "llm.stream.start",
-                    extra={
-                        "model": params["model"],
-                        "temperature": params.get("temperature"),
-                        "attempt": attempt,
-                        "max_tokens": params.get("max_tokens"),
-                    },
-                )
-                has_content = False
-                collected_tool_calls: list[Any] = []
-                async for chunk in stream:
-                    for choice in chunk.choices:
-                        delta = choice.delta
-                        if delta is None:
-                            continue
-                        text_delta = getattr(delta, "content", None)
-                        if text_delta:
-                            has_content = True
-                            yield text_delta
-                        tool_calls = getattr(delta, "tool_calls", None)
-                        if tool_calls:
-                            collected_tool_calls.extend(tool_calls)
-                if not has_content:
-                    logger.warning(
-                        "llm.stream.empty",
-                        extra={
-                            "model": params.get("model"),
-                            "tool_calls": collected_tool_calls,
-                            "attempt": attempt,
-                        },
-                    )
-                    raise LLMStreamEmptyError(
-                        "LLM stream produced no text delta",
-                        tool_calls=collected_tool_calls,
-                    )
-                logger.info(
-                    "llm.stream.complete",
-                    extra={"model": params["model"], "attempt": attempt},
-                )
+                async for text_delta in deltas:
+                    yield text_delta
+                await self._settle_quota(estimated, usage)
                 return
             except Exception as exc:  # pragma: no cover - defensive catch
                 last_error = exc
@@ -145,14 +340,206 @@ class OpenAIChatClient:
                     break
                 await asyncio.sleep(cfg.retry_backoff_seconds * attempt)
             finally:
-                if stream is not None:
-                    try:
-                        await stream.aclose()
-                    except Exception:  # pragma: no cover - best effort cleanup
-                        logger.debug("llm.stream.close_failed", exc_info=True)
+                await deltas.aclose()
 
         raise RuntimeError("LLM streaming failed after retries") from last_error
 
+    async def _acquire_quota(self, params: Dict[str, Any], lane: str) -> int:
+        if self.rate_limiter is None:
+            return 0
+        estimated = _estimate_request_tokens(params)
+        await self.rate_limiter.acquire(lane=lane, tokens=estimated)
+        return estimated
+
+    async def _settle_quota(self, estimated: int, usage: Optional[Dict[str, Any]]) -> None:
+        if self.rate_limiter is None or not usage:
+            return
+        prompt = usage.get("prompt_tokens")
+        completion = usage.get("completion_tokens")
+        if prompt is None or completion is None:
+            return
+        await self.rate_limiter.settle(estimated=estimated, actual=prompt + completion)
+
+    async def _stream_once(
+        self,
+        client: AsyncOpenAI,
+        params: Dict[str, Any],
+        *,
+        attempt: int,
+        usage: Optional[Dict[str, Any]] = None,
+    ) -> AsyncGenerator[str, None]:
+        raw = self._raw_streamers.get(id(client))
+        deltas = raw.stream(params, usage) if raw is not None else self._sdk_deltas(client, params, usage)
+        try:
+            logger.info(
+                "llm.stream.start",
+                extra={
+                    "model": params["model"],
+                    "temperature": params.get("temperature"),
+                    "attempt": attempt,
+                    "max_tokens": params.get("max_tokens"),
+                    "transport": "raw" if raw is not None else "sdk",
+                },
+            )
+            has_content = False
+            collected_tool_calls: list[Any] = []
+            async for text_delta, tool_calls in deltas:
+                if text_delta:
+                    has_content = True
+                    yield text_delta
+                if tool_calls:
+                    collected_tool_calls.extend(tool_calls)
+            if not has_content:
+                logger.warning(
+                    "llm.stream.empty",
+                    extra={
+                        "model": params.get("model"),
+                        "tool_calls": collected_tool_calls,
+                        "attempt": attempt,
+                    },
+                )
+                raise LLMStreamEmptyError(
+                    "LLM stream produced no text delta",
+                    tool_calls=collected_tool_calls,
+                )
+            logger.info(
+                "llm.stream.complete",
+                extra={"model": params["model"], "attempt": attempt},
+            )
+        finally:
+            await deltas.aclose()
+
+    async def _sdk_deltas(
+        self,
+        client: AsyncOpenAI,
+        params: Dict[str, Any],
+        usage: Optional[Dict[str, Any]] = None,
+    ) -> AsyncGenerator[ChatDelta, None]:
+        stream = await client.chat.completions.create(**params)
+        try:
+            async for chunk in stream:
+                chunk_usage = getattr(chunk, "usage", None)
+                if usage is not None and chunk_usage:
+                    usage.update(normalize_usage(chunk_usage) or {})
+                for choice in chunk.choices:
+                    delta = choice.delta
+                    if delta is None:
+                        continue
+                    yield getattr(delta, "content", None), getattr(delta, "tool_calls", None)
+        finally:
+            try:
+                await stream.aclose()
+            except Exception:  # pragma: no cover - best effort cleanup
+                logger.debug("llm.stream.close_failed", exc_info=True)
+
+    async def _hedged_stream(
+        self,
+        params: Dict[str, Any],
+        *,
+        attempt: int,
+        usage: Optional[Dict[str, Any]] = None,
+        lane: str = LANE_INTERACTIVE,
+    ) -> AsyncGenerator[str, None]:
+        """Race a backup request against a primary that is slow to its first token.
+
+        The backup only starts after ``hedge_delay_seconds`` without a token,
+        only when the hedge budget allows it and only when the rate limiter can
+        charge it on ``lane`` without waiting. Whichever stream yields a token
+        first is kept; the other one is cancelled and closed. Both requests keep
+        their estimated charge; the caller settles it against the usage the
+        winning stream reports.
+        """
+
+        cfg = self._llm_cfg
+        streams: Dict[str, AsyncGenerator[str, None]] = {
+            "primary": self._stream_once(self._client, params, attempt=attempt, usage=usage)
+        }
+        pending: Dict[asyncio.Task, str] = {
+            asyncio.ensure_future(_next_delta(streams["primary"])): "primary",
+        }
+        self.hedge_stats.requests += 1
+        self.hedge_budget.deposit()
+
+        winner: Optional[str] = None
+        first_token = ""
+        last_error: BaseException | None = None
+        hedge_deadline: Optional[float] = cfg.hedge_delay_seconds
+        try:
+            while pending and winner is None:
+                done, _ = await asyncio.wait(
+                    pending.keys(),
+                    timeout=hedge_deadline,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    # No first token within the hedge delay: fire the backup once.
+                    hedge_deadline = None
+                    if not self.hedge_budget.withdraw():
+                        self.hedge_stats.budget_denied += 1
+                        continue
+                    backup_params = dict(params)
+                    if cfg.hedge_model:
+                        backup_params["model"] = cfg.hedge_model
+                    if self.rate_limiter is not None and not await self.rate_limiter.try_acquire(
+                        lane=lane, tokens=_estimate_request_tokens(backup_params)
+                    ):
+                        # A hedge is optional: skip it rather than queue for quota.
+                        self.hedge_budget.refund()
+                        self.hedge_stats.quota_denied += 1
+                        continue
+                    self.hedge_stats.hedged += 1
+                    logger.info(
+                        "llm.hedge.start",
+                        extra={"model": backup_params["model"], "delay": cfg.hedge_delay_seconds},
+                    )
+                    streams["backup"] = self._stream_once(
+                        self._hedge_client, backup_params, attempt=attempt, usage=usage
+                    )
+                    pending[asyncio.ensure_future(_next_delta(streams["backup"]))] = "backup"
+                    continue
+                for task in done:
+                    name = pending.pop(task)
+                    exc = task.exception()
+                    if exc is None and winner is None:
+                        winner, first_token = name, task.result()
+                    elif exc is not None:
+                        last_error = exc
+                        if hedge_deadline is not None and name == "primary":
+                            # Primary failed before the delay elapsed: nothing to race against.
+                            hedge_deadline = None
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending.keys(), return_exceptions=True)
+            for name, stream in streams.items():
+                if name != winner:
+                    await stream.aclose()
+
+        if winner is None:
+            if last_error is not None:
+                raise last_error
+            raise LLMStreamEmptyError("LLM stream produced no text delta")
+        if winner == "backup":
+            self.hedge_stats.backup_wins += 1
+        logger.info("llm.hedge.winner", extra={"winner": winner, "hedged": "backup" in streams})
+
+        stream = streams[winner]
+        try:
+            yield first_token
+            async for text_delta in stream:
+                yield text_delta
+        finally:
+            await stream.aclose()
+
+    async def embed(self, text: str, *, model: str) -> list[float]:
+        """Return the embedding vector for ``text``."""
+
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire(lane=LANE_INTERACTIVE, tokens=estimate_tokens(text))
+        response = await self._client.embeddings.create(model=model, input=text, timeout=self._llm_cfg.timeout)
+        return list(response.data[0].embedding)
+
     async def generate_vision_reply(
         self,
         messages: Sequence[ChatMessage],
@@ -186,6 +573,7 @@ class OpenAIChatClient:
 
         while attempt < total_attempts:
             attempt += 1
+            await self._acquire_quota(params, LANE_INTERACTIVE)
             try:
                 resp = await self._client.chat.completions.create(**params)
                 logger.info(
@@ -222,4 +610,13 @@ class OpenAIChatClient:
         raise RuntimeError("LLM vision completion failed after retries") from last_error
 
 
-__all__ = ["OpenAIChatClient", "LLMNotConfiguredError", "LLMStreamEmptyError", "ChatMessage"]
+__all__ = [
+    "OpenAIChatClient",
+    "ConnectionStats",
+    "HedgeBudget",
+    "HedgeStats",
+    "LLMNotConfiguredError",
+    "LLMStreamEmptyError",
+    "ChatMessage",
+    "build_http_client",
+]
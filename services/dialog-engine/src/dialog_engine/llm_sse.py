@@ -0,0 +1,165 @@
+"""Raw SSE transport for OpenAI-compatible chat completion streams.
+
+The openai SDK builds a pydantic model for every streamed chunk. For plain
+text streaming we only need ``choices[].delta.content`` (and tool-call
+deltas), so this transport posts the request with the shared httpx client,
+splits the ``data:`` lines itself and decodes them with orjson when present.
+"""
+
+from __future__ import annotations
+
+import json
+from collections.abc import AsyncGenerator, AsyncIterator
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+try:  # pragma: no cover - optional dependency
+    import orjson
+
+    _loads = orjson.loads
+except Exception:  # pragma: no cover - fall back to the stdlib parser
+    orjson = None  # type: ignore[assignment]
+    _loads = json.loads
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+# (text delta, tool-call deltas) extracted from one SSE event.
+ChatDelta = Tuple[Optional[str], Optional[List[Dict[str, Any]]]]
+
+# SDK-only keyword arguments that must not be sent in the request body.
+_SDK_ONLY_KEYS = {"timeout", "extra_headers", "extra_query", "extra_body"}
+
+
+class RawStreamError(RuntimeError):
+    """Raised when the endpoint rejects the request or reports an in-stream error."""
+
+    def __init__(self, message: str, *, status_code: Optional[int] = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
+async def iter_sse_data(chunks: AsyncIterator[bytes]) -> AsyncGenerator[bytes, None]:
+    """Yield the payload of every ``data:`` line from a byte stream."""
+
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.startswith(b"data:"):
+                yield line[5:].strip()
+    if buffer.startswith(b"data:"):
+        yield buffer[5:].strip()
+
+
+def normalize_usage(usage: Any) -> Optional[Dict[str, Any]]:
+    """Flatten provider usage into prompt/completion/cached token counts.
+
+    Cached prompt tokens are reported as ``prompt_tokens_details.cached_tokens``
+    by OpenAI-style endpoints and as ``prompt_cache_hit_tokens`` by DeepSeek.
+    """
+
+    if usage is None:
+        return None
+    if not isinstance(usage, dict):
+        usage = usage.model_dump() if hasattr(usage, "model_dump") else dict(usage)
+    details = usage.get("prompt_tokens_details") or {}
+    cached = details.get("cached_tokens") if isinstance(details, dict) else None
+    if cached is None:
+        cached = usage.get("prompt_cache_hit_tokens")
+    return {
+        "prompt_tokens": usage.get("prompt_tokens"),
+        "completion_tokens": usage.get("completion_tokens"),
+        "cached_tokens": cached or 0,
+    }
+
+
+def parse_chat_event(payload: bytes, usage: Optional[Dict[str, Any]] = None) -> List[ChatDelta]:
+    """Decode one ``data:`` payload into per-choice deltas.
+
+    When ``usage`` is given it is updated in place from a usage-bearing event.
+    """
+
+    event = _loads(payload)
+    error = event.get("error")
+    if error:
+        message = error.get("message") if isinstance(error, dict) else str(error)
+        raise RawStreamError(f"llm_stream_error:{message}")
+    if usage is not None and event.get("usage"):
+        usage.update(normalize_usage(event["usage"]) or {})
+    deltas: List[ChatDelta] = []
+    for choice in event.get("choices") or ():
+        delta = choice.get("delta")
+        if not delta:
+            continue
+        deltas.append((delta.get("content"), delta.get("tool_calls")))
+    return deltas
+
+
+class RawChatStreamer:
+    """Streams chat completion deltas straight from the SSE wire format."""
+
+    def __init__(
+        self,
+        *,
+        http_client: httpx.AsyncClient,
+        api_key: Optional[str],
+        base_url: Optional[str] = None,
+        organization: Optional[str] = None,
+    ) -> None:
+        self._http_client = http_client
+        self._url = (base_url or DEFAULT_BASE_URL).rstrip("/") + "/chat/completions"
+        self._headers = {"Accept": "text/event-stream", "Content-Type": "application/json"}
+        if api_key:
+            self._headers["Authorization"] = f"Bearer {api_key}"
+        if organization:
+            self._headers["OpenAI-Organization"] = organization
+
+    async def stream(
+        self,
+        params: Dict[str, Any],
+        usage: Optional[Dict[str, Any]] = None,
+    ) -> AsyncGenerator[ChatDelta, None]:
+        body = {key: value for key, value in params.items() if key not in _SDK_ONLY_KEYS}
+        body.update(params.get("extra_body") or {})
+        body["stream"] = True
+        headers = dict(self._headers)
+        headers.update(params.get("extra_headers") or {})
+
+        async with self._http_client.stream(
+            "POST",
+            self._url,
+            content=_dumps(body),
+            headers=headers,
+            timeout=params.get("timeout", httpx.USE_CLIENT_DEFAULT),
+        ) as response:
+            if response.status_code >= 400:
+                detail = (await response.aread()).decode("utf-8", "replace")[:500]
+                raise RawStreamError(
+                    f"llm_http_{response.status_code}:{detail}",
+                    status_code=response.status_code,
+                )
+            async for payload in iter_sse_data(response.aiter_bytes()):
+                if not payload:
+                    continue
+                if payload == b"[DONE]":
+                    return
+                for delta in parse_chat_event(payload, usage):
+                    yield delta
+
+
+def _dumps(body: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(body)
+    return json.dumps(body, ensure_ascii=False).encode("utf-8")
+
+
+__all__ = [
+    "ChatDelta",
+    "RawChatStreamer",
+    "RawStreamError",
+    "iter_sse_data",
+    "normalize_usage",
+    "parse_chat_event",
+]
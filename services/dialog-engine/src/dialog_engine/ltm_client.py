@@ -5,7 +5,7 @@ from __future__ import annotations
 import logging
 from typing import Any, Dict, List, Optional
 
-import httpx
+from .http_pool import HttpClientPool, UpstreamConfig, shared_pool
 
 logger = logging.getLogger(__name__)
 
@@ -18,11 +18,15 @@ class LTMInlineClient:
         retrieve_path: str,
         timeout: float,
         max_snippets: int,
+        pool: Optional[HttpClientPool] = None,
     ) -> None:
         self._base_url = base_url.rstrip("/") if base_url else None
         self._path = retrieve_path or "/v1/memory/retrieve"
         self._timeout = timeout
         self._max_snippets = max_snippets
+        self._pool = pool or shared_pool
+        if self._base_url:
+            self._pool.register(UpstreamConfig.from_env("ltm", base_url=self._base_url, timeout=timeout))
 
     def is_configured(self) -> bool:
         return bool(self._base_url)
@@ -50,10 +54,9 @@ class LTMInlineClient:
         }
 
         try:
-            async with httpx.AsyncClient(base_url=self._base_url, timeout=self._timeout) as client:
-                response = await client.post(self._path, json=payload)
-                response.raise_for_status()
-                data = response.json()
+            response = await self._pool.client("ltm").post(self._path, json=payload)
+            response.raise_for_status()
+            data = response.json()
         except Exception as exc:  # pragma: no cover - best effort logging
             logger.warning("ltm.retrieve.error", extra={"error": repr(exc)})
             return []
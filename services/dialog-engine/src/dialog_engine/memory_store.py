@@ -7,7 +7,7 @@ import os
 import sqlite3
 import time
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Callable, List, Optional
 
 import logging
 
@@ -18,14 +18,56 @@ logger = logging.getLogger(__name__)
 class MemoryTurn:
     role: str
     content: str
+    turn_id: Optional[int] = None
+    tokens: Optional[int] = None
 
 
-class ShortTermMemoryStore:
-    """SQLite-backed store for recent dialog turns."""
+@dataclass
+class SessionSummary:
+    session_id: str
+    summary: str
+    last_turn_id: int
+
+
+def _ensure_tokens_column(conn: sqlite3.Connection) -> None:
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(turns)")}
+    if columns and "tokens" not in columns:
+        conn.execute("ALTER TABLE turns ADD COLUMN tokens INTEGER")
+        conn.commit()
+
+
+def _ensure_summary_table(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS session_summaries (
+            session_id TEXT PRIMARY KEY,
+            summary TEXT NOT NULL,
+            last_turn_id INTEGER NOT NULL,
+            updated_at INTEGER NOT NULL
+        )
+        """
+    )
+
 
-    def __init__(self, *, db_path: str, default_limit: int = 20) -> None:
+class ShortTermMemoryStore:
+    """SQLite-backed store for recent dialog turns.
+
+    Each turn carries a cached token count so context building never has to
+    re-tokenize history; rows written before the column existed are counted
+    on first read and backfilled when ``token_counter`` is set.
+    """
+
+    def __init__(
+        self,
+        *,
+        db_path: str,
+        default_limit: int = 20,
+        token_counter: Optional[Callable[[str], int]] = None,
+    ) -> None:
         self._db_path = db_path
         self._default_limit = default_limit
+        self._token_counter = token_counter
+        self._schema_checked = False
 
     async def fetch_recent(self, session_id: str, limit: Optional[int] = None) -> List[MemoryTurn]:
         if not self._db_path or not os.path.exists(self._db_path):
@@ -43,9 +85,10 @@ class ShortTermMemoryStore:
                 raise RuntimeError("failed to open memory database") from exc
 
             try:
+                self._check_schema(conn)
                 rows = conn.execute(
                     """
-                    SELECT role, text
+                    SELECT id, role, text, tokens
                     FROM turns
                     WHERE session_id = ?
                     ORDER BY id DESC
@@ -53,17 +96,24 @@ class ShortTermMemoryStore:
                     """,
                     (session_id, query_limit),
                 ).fetchall()
+                turns: List[MemoryTurn] = []
+                backfill: List[tuple[int, int]] = []
+                for row in reversed(rows):
+                    role = row["role"] if row["role"] in {"user", "assistant", "system"} else "assistant"
+                    content = row["text"] or ""
+                    tokens = row["tokens"]
+                    if tokens is None and self._token_counter is not None:
+                        tokens = self._token_counter(content)
+                        backfill.append((tokens, row["id"]))
+                    turns.append(MemoryTurn(role=role, content=content, turn_id=row["id"], tokens=tokens))
+                if backfill:
+                    conn.executemany("UPDATE turns SET tokens = ? WHERE id = ?", backfill)
+                    conn.commit()
             except Exception as exc:
                 logger.debug("stm.query.error", exc_info=True)
                 raise RuntimeError("failed to query memory database") from exc
             finally:
                 conn.close()
-
-            turns: List[MemoryTurn] = []
-            for row in reversed(rows):
-                role = row["role"] if row["role"] in {"user", "assistant", "system"} else "assistant"
-                content = row["text"] or ""
-                turns.append(MemoryTurn(role=role, content=content))
             return turns
 
         try:
@@ -76,6 +126,7 @@ class ShortTermMemoryStore:
     async def append_turn(self, *, session_id: str, role: str, content: str) -> None:
         if not self._db_path or not content.strip():
             return
+        tokens = self._token_counter(content) if self._token_counter is not None else None
 
         def _insert() -> None:
             os.makedirs(os.path.dirname(self._db_path) or ".", exist_ok=True)
@@ -89,13 +140,15 @@ class ShortTermMemoryStore:
                         session_id TEXT NOT NULL,
                         role TEXT NOT NULL,
                         text TEXT NOT NULL,
-                        created_at INTEGER NOT NULL
+                        created_at INTEGER NOT NULL,
+                        tokens INTEGER
                     )
                     """,
                 )
+                self._check_schema(conn)
                 cur.execute(
-                    "INSERT INTO turns(session_id, role, text, created_at) VALUES(?,?,?,?)",
-                    (session_id, role, content, int(time.time())),
+                    "INSERT INTO turns(session_id, role, text, created_at, tokens) VALUES(?,?,?,?,?)",
+                    (session_id, role, content, int(time.time()), tokens),
                 )
                 conn.commit()
             finally:
@@ -103,5 +156,98 @@ class ShortTermMemoryStore:
 
         await asyncio.to_thread(_insert)
 
+    async def fetch_turns_between(
+        self,
+        session_id: str,
+        *,
+        after_id: int,
+        before_id: int,
+        limit: int,
+    ) -> List[MemoryTurn]:
+        """Return turns with ``after_id < id < before_id`` in chronological order."""
+
+        if not self._db_path or not os.path.exists(self._db_path) or limit <= 0:
+            return []
+
+        def _query() -> List[MemoryTurn]:
+            conn = sqlite3.connect(self._db_path)
+            conn.row_factory = sqlite3.Row
+            try:
+                rows = conn.execute(
+                    """
+                    SELECT id, role, text
+                    FROM turns
+                    WHERE session_id = ? AND id > ? AND id < ?
+                    ORDER BY id ASC
+                    LIMIT ?
+                    """,
+                    (session_id, after_id, before_id, limit),
+                ).fetchall()
+            finally:
+                conn.close()
+            return [MemoryTurn(role=row["role"], content=row["text"] or "", turn_id=row["id"]) for row in rows]
+
+        try:
+            return await asyncio.to_thread(_query)
+        except sqlite3.Error:
+            logger.debug("stm.query.error", exc_info=True)
+            return []
+
+    async def fetch_summary(self, session_id: str) -> Optional[SessionSummary]:
+        if not self._db_path or not os.path.exists(self._db_path):
+            return None
+
+        def _query() -> Optional[SessionSummary]:
+            conn = sqlite3.connect(self._db_path)
+            try:
+                _ensure_summary_table(conn)
+                row = conn.execute(
+                    "SELECT summary, last_turn_id FROM session_summaries WHERE session_id = ?",
+                    (session_id,),
+                ).fetchone()
+            finally:
+                conn.close()
+            if row is None:
+                return None
+            return SessionSummary(session_id=session_id, summary=row[0], last_turn_id=row[1])
+
+        try:
+            return await asyncio.to_thread(_query)
+        except sqlite3.Error:
+            logger.debug("stm.summary.query.error", exc_info=True)
+            return None
+
+    async def save_summary(self, session_id: str, *, summary: str, last_turn_id: int) -> None:
+        if not self._db_path:
+            return
+
+        def _upsert() -> None:
+            os.makedirs(os.path.dirname(self._db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self._db_path)
+            try:
+                _ensure_summary_table(conn)
+                conn.execute(
+                    """
+                    INSERT INTO session_summaries(session_id, summary, last_turn_id, updated_at)
+                    VALUES(?,?,?,?)
+                    ON CONFLICT(session_id) DO UPDATE SET
+                        summary = excluded.summary,
+                        last_turn_id = excluded.last_turn_id,
+                        updated_at = excluded.updated_at
+                    """,
+                    (session_id, summary, last_turn_id, int(time.time())),
+                )
+                conn.commit()
+            finally:
+                conn.close()
+
+        await asyncio.to_thread(_upsert)
+
+    def _check_schema(self, conn: sqlite3.Connection) -> None:
+        if self._schema_checked:
+            return
+        _ensure_tokens_column(conn)
+        self._schema_checked = True
+
 
-__all__ = ["ShortTermMemoryStore", "MemoryTurn"]
+__all__ = ["ShortTermMemoryStore", "MemoryTurn", "SessionSummary"]
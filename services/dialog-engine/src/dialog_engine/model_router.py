@@ -0,0 +1,128 @@
+"""Per-turn model tier routing for dialog-engine, based on keyword and length rules."""
+
+from __future__ import annotations
+
+import logging
+import re
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+from .singleflight import normalize_text
+
+logger = logging.getLogger(__name__)
+
+TIER_FAST = "fast"
+TIER_STRONG = "strong"
+
+# Markers of a real question or request that deserves the strong tier.
+_QUESTION_RE = re.compile(
+    r"[?？]|为什么|为啥|怎么|如何|什么|哪|吗|能不能|可以.*吗|解释|推荐|建议|"
+    r"\b(why|how|what|which|when|where|who|explain|recommend|should|could|can you)\b"
+)
+# Reactions that are mostly repeated characters, laughter or numbers ("666", "哈哈哈", "wwww").
+_REACTION_RE = re.compile(r"^(.)\1{2,}$|^[\d\s]+$|^(哈|呵|嘿|w|草|lol|lmao|gg|xd|[!！~～])+$")
+
+
+@dataclass(slots=True)
+class TierStats:
+    calls: int = 0
+    total_ttft_ms: float = 0.0
+    ttft_samples: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        avg = self.total_ttft_ms / self.ttft_samples if self.ttft_samples else None
+        return {"calls": self.calls, "avg_ttft_ms": round(avg, 1) if avg is not None else None}
+
+
+@dataclass(slots=True)
+class RoutingDecision:
+    tier: str
+    model: str
+    reason: str
+    session_id: str = ""
+    text_preview: str = ""
+    decided_at: float = field(default_factory=time.time)
+    ttft_ms: Optional[float] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "tier": self.tier,
+            "model": self.model,
+            "reason": self.reason,
+            "sessionId": self.session_id,
+            "text": self.text_preview,
+            "decidedAt": self.decided_at,
+            "ttftMs": round(self.ttft_ms, 1) if self.ttft_ms is not None else None,
+        }
+
+
+class ModelRouter:
+    """Cheap heuristic classifier that picks the fast or strong model per turn.
+
+    Each line is judged on its own, with no conversation history: a forced
+    ``meta["model_tier"]`` wins, reactions ("666", laughter, emotes) go to the
+    fast tier, question or request keywords go to the strong tier, and
+    everything else is split on ``fast_max_chars`` of normalized text.
+    Recent decisions are kept in a bounded audit log.
+    """
+
+    def __init__(
+        self,
+        *,
+        fast_model: str,
+        strong_model: str,
+        fast_max_chars: int = 20,
+        audit_size: int = 200,
+    ) -> None:
+        self._models = {TIER_FAST: fast_model, TIER_STRONG: strong_model}
+        self._fast_max_chars = max(1, fast_max_chars)
+        self._stats: Dict[str, TierStats] = {TIER_FAST: TierStats(), TIER_STRONG: TierStats()}
+        self._audit: Deque[RoutingDecision] = deque(maxlen=max(1, audit_size))
+
+    def route(self, *, session_id: str, user_text: str, meta: Dict[str, Any]) -> RoutingDecision:
+        tier, reason = self._classify(user_text, meta)
+        decision = RoutingDecision(
+            tier=tier,
+            model=self._models[tier],
+            reason=reason,
+            session_id=session_id,
+            text_preview=user_text[:40],
+        )
+        self._stats[tier].calls += 1
+        self._audit.append(decision)
+        logger.info("llm.route", extra={"tier": tier, "model": decision.model, "reason": reason})
+        return decision
+
+    def record_ttft(self, decision: RoutingDecision, ttft_ms: float) -> None:
+        decision.ttft_ms = ttft_ms
+        stats = self._stats[decision.tier]
+        stats.total_ttft_ms += ttft_ms
+        stats.ttft_samples += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            tier: {"model": self._models[tier], **stats.as_dict()} for tier, stats in self._stats.items()
+        }
+
+    def recent_decisions(self, limit: int = 50) -> List[Dict[str, Any]]:
+        return [decision.as_dict() for decision in list(self._audit)[-limit:]]
+
+    def _classify(self, user_text: str, meta: Dict[str, Any]) -> tuple[str, str]:
+        forced = meta.get("model_tier")
+        if forced in self._models:
+            return forced, "forced"
+        text = normalize_text(user_text)
+        if not text:
+            return TIER_FAST, "empty"
+        if _REACTION_RE.match(text.replace(" ", "")):
+            return TIER_FAST, "reaction"
+        if _QUESTION_RE.search(text):
+            return TIER_STRONG, "question"
+        if len(text) > self._fast_max_chars:
+            return TIER_STRONG, "long"
+        return TIER_FAST, "short"
+
+
+__all__ = ["ModelRouter", "RoutingDecision", "TIER_FAST", "TIER_STRONG"]
@@ -0,0 +1,184 @@
+"""Semantic reply cache for recurring viewer questions."""
+
+from __future__ import annotations
+
+import logging
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .singleflight import normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+def _compact(text: str) -> str:
+    """Normalized text without punctuation, symbols or whitespace."""
+
+    return "".join(
+        ch for ch in normalize_text(text) if not unicodedata.category(ch).startswith(("P", "S", "Z"))
+    )
+
+
+class HashingEmbedder:
+    """Dependency-free embedder over hashed character n-grams.
+
+    Character uni- and bigrams work for Chinese and Japanese, where word
+    boundaries are not marked, and word tokens add signal for Latin text.
+    Good enough to match paraphrases that share most of their characters;
+    use ``OpenAIEmbedder`` for real semantic similarity.
+    """
+
+    name = "hash"
+
+    def __init__(self, *, dim: int = 1024) -> None:
+        self._dim = dim
+
+    async def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self._dim, dtype=np.float32)
+        compact = _compact(text)
+        features: List[Tuple[str, float]] = [(ch, 0.5) for ch in compact]
+        features.extend((compact[i : i + 2], 1.0) for i in range(len(compact) - 1))
+        features.extend((f"w:{word}", 1.0) for word in normalize_text(text).split() if len(word) > 1)
+        for feature, weight in features:
+            vector[zlib.crc32(feature.encode("utf-8")) % self._dim] += weight
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+
+class OpenAIEmbedder:
+    """Embeds queries with an OpenAI-compatible ``/embeddings`` endpoint."""
+
+    name = "openai"
+
+    def __init__(self, *, client: Callable[[], Awaitable[Any]], model: str) -> None:
+        self._client = client
+        self._model = model
+
+    async def embed(self, text: str) -> np.ndarray:
+        client = await self._client()
+        values = await client.embed(text, model=self._model)
+        vector = np.asarray(values, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+
+@dataclass
+class _Entry:
+    query: str
+    reply: str
+    vector: np.ndarray
+    created_at: float
+
+
+@dataclass
+class CacheHit:
+    query: str
+    reply: str
+    similarity: float
+
+
+class SemanticReplyCache:
+    """Nearest-neighbour cache of recent (query, reply) pairs, scoped by persona.
+
+    Lookups are brute-force cosine similarity over the entries of one scope,
+    which is cheap at the few hundred entries a livestream accumulates.
+    Entries expire after ``ttl_seconds``; beyond ``max_entries`` the least
+    recently used entry across all scopes is evicted.
+    """
+
+    def __init__(
+        self,
+        *,
+        embedder: Any,
+        threshold: float = 0.9,
+        ttl_seconds: float = 600.0,
+        max_entries: int = 512,
+    ) -> None:
+        self._embedder = embedder
+        self._threshold = threshold
+        self._ttl = ttl_seconds
+        self._max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._matrices: Dict[str, Tuple[List[Tuple[str, str]], np.ndarray]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    async def lookup(self, scope: str, query: str) -> Optional[CacheHit]:
+        key = (scope, _compact(query))
+        self._expire()
+        exact = self._entries.get(key)
+        if exact is not None:
+            return self._hit(key, exact, 1.0)
+
+        keys, matrix = self._scope_matrix(scope)
+        if not keys:
+            self.misses += 1
+            return None
+        vector = await self._embedder.embed(query)
+        scores = matrix @ vector
+        best = int(np.argmax(scores))
+        similarity = float(scores[best])
+        entry = self._entries.get(keys[best])
+        if entry is None or similarity < self._threshold:
+            self.misses += 1
+            return None
+        return self._hit(keys[best], entry, similarity)
+
+    async def store(self, scope: str, query: str, reply: str) -> None:
+        if not reply.strip():
+            return
+        key = (scope, _compact(query))
+        vector = await self._embedder.embed(query)
+        self._entries[key] = _Entry(query=query, reply=reply, vector=vector, created_at=time.monotonic())
+        self._entries.move_to_end(key)
+        self._matrices.pop(scope, None)
+        while len(self._entries) > self._max_entries:
+            (evicted_scope, _), _ = self._entries.popitem(last=False)
+            self._matrices.pop(evicted_scope, None)
+
+    def record_bypass(self) -> None:
+        self.bypassed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": round(self.hits / total, 3) if total else None,
+        }
+
+    def _hit(self, key: Tuple[str, str], entry: _Entry, similarity: float) -> CacheHit:
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return CacheHit(query=entry.query, reply=entry.reply, similarity=similarity)
+
+    def _scope_matrix(self, scope: str) -> Tuple[List[Tuple[str, str]], np.ndarray]:
+        cached = self._matrices.get(scope)
+        if cached is not None:
+            return cached
+        keys = [key for key in self._entries if key[0] == scope]
+        matrix = np.stack([self._entries[key].vector for key in keys]) if keys else np.zeros((0, 0), dtype=np.float32)
+        self._matrices[scope] = (keys, matrix)
+        return keys, matrix
+
+    def _expire(self) -> None:
+        if self._ttl <= 0:
+            return
+        cutoff = time.monotonic() - self._ttl
+        expired = [key for key, entry in self._entries.items() if entry.created_at < cutoff]
+        for key in expired:
+            del self._entries[key]
+            self._matrices.pop(key[0], None)
+
+
+__all__ = ["CacheHit", "HashingEmbedder", "OpenAIEmbedder", "SemanticReplyCache"]
@@ -3,7 +3,7 @@ from __future__ import annotations
 """Runtime configuration helpers for dialog-engine."""
 
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 _BOOL_TRUTHY = {"1", "true", "yes", "on"}
 
@@ -35,11 +35,23 @@ def _env_float(name: str, default: float) -> float:
         return default
 
 
+def _env_list(name: str, default: tuple[str, ...]) -> tuple[str, ...]:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return tuple(item.strip() for item in value.split(",") if item.strip())
+
+
 @dataclass(frozen=True)
 class OpenAISettings:
     api_key: str | None
     organization: str | None
     base_url: str | None
+    http_max_connections: int = 20
+    http_max_keepalive_connections: int = 10
+    http_keepalive_expiry: float = 60.0
+    http2: bool = False
+    keepwarm_interval_seconds: float = 30.0
 
 
 @dataclass(frozen=True)
@@ -54,6 +66,23 @@ class LLMSettings:
     timeout: float
     retry_limit: int
     retry_backoff_seconds: float
+    hedge_enabled: bool = False
+    hedge_delay_seconds: float = 1.0
+    hedge_model: str | None = None
+    hedge_base_url: str | None = None
+    hedge_api_key: str | None = None
+    hedge_budget_ratio: float = 0.1
+    hedge_budget_burst: float = 5.0
+    stream_transport: str = "sdk"
+    stream_include_usage: bool = False
+    prompt_layout: str = "default"
+    prompt_history_block_turns: int = 8
+    tokenizer_encoding: str | None = None
+    singleflight_enabled: bool = False
+    router_enabled: bool = False
+    router_fast_model: str | None = None
+    router_strong_model: str | None = None
+    router_fast_max_chars: int = 20
 
 
 @dataclass(frozen=True)
@@ -61,6 +90,11 @@ class ShortTermMemorySettings:
     enabled: bool
     db_path: str
     context_turns: int
+    context_token_budget: int = 0
+    summary_enabled: bool = False
+    summary_min_turns: int = 4
+    summary_max_chars: int = 800
+    summary_model: str | None = None
 
 
 @dataclass(frozen=True)
@@ -86,6 +120,46 @@ class AsrSettings:
     whisper_compute_type: str
     whisper_beam_size: int
     whisper_cache_dir: str | None
+    lang_cache_enabled: bool = True
+    lang_cache_min_probability: float = 0.8
+    lang_cache_redetect_interval: int = 20
+    lang_cache_max_age_seconds: float = 600.0
+    lang_cache_max_sessions: int = 1024
+    whisper_tiering_enabled: bool = False
+    whisper_short_model: str = "tiny"
+    whisper_short_max_seconds: float = 3.0
+    whisper_escalation_model: str | None = None
+    whisper_escalation_confidence: float = 0.4
+    remote_socket_paths: tuple[str, ...] = ("/tmp/dialog-engine-asr.sock",)
+    remote_transfer: str = "shm"
+    remote_timeout: float = 60.0
+    result_cache: str = "memory"
+    result_cache_ttl_seconds: float = 300.0
+    result_cache_max_entries: int = 256
+    result_cache_redis_url: str | None = None
+
+
+@dataclass(frozen=True)
+class SemanticCacheSettings:
+    enabled: bool = False
+    threshold: float = 0.9
+    ttl_seconds: float = 600.0
+    max_entries: int = 512
+    embedder: str = "hash"
+    embedding_model: str = "text-embedding-3-small"
+    max_query_chars: int = 80
+
+
+@dataclass(frozen=True)
+class RateLimitSettings:
+    enabled: bool = False
+    redis_url: str | None = None
+    key: str = "llm:ratelimit"
+    rpm: int = 0
+    tpm: int = 0
+    background_reserve: float = 0.3
+    interactive_max_wait: float = 2.0
+    background_max_wait: float = 30.0
 
 
 @dataclass(frozen=True)
@@ -95,6 +169,8 @@ class Settings:
     short_term: ShortTermMemorySettings
     ltm_inline: LTMInlineSettings
     asr: AsrSettings
+    semantic_cache: SemanticCacheSettings = field(default_factory=SemanticCacheSettings)
+    rate_limit: RateLimitSettings = field(default_factory=RateLimitSettings)
 
 
 def load_settings() -> Settings:
@@ -111,18 +187,45 @@ def load_settings() -> Settings:
         timeout=_env_float("LLM_REQUEST_TIMEOUT", 30.0),
         retry_limit=_env_int("LLM_RETRY_LIMIT", 2),
         retry_backoff_seconds=_env_float("LLM_RETRY_BACKOFF_SECONDS", 0.5),
+        hedge_enabled=_env_bool("LLM_HEDGE_ENABLED", False),
+        hedge_delay_seconds=_env_float("LLM_HEDGE_DELAY_SECONDS", 1.0),
+        hedge_model=os.getenv("LLM_HEDGE_MODEL") or None,
+        hedge_base_url=os.getenv("LLM_HEDGE_BASE_URL") or None,
+        hedge_api_key=os.getenv("LLM_HEDGE_API_KEY") or None,
+        hedge_budget_ratio=_env_float("LLM_HEDGE_BUDGET_RATIO", 0.1),
+        hedge_budget_burst=_env_float("LLM_HEDGE_BUDGET_BURST", 5.0),
+        stream_transport=os.getenv("LLM_STREAM_TRANSPORT", "sdk").strip().lower(),
+        stream_include_usage=_env_bool("LLM_STREAM_INCLUDE_USAGE", False),
+        prompt_layout=os.getenv("LLM_PROMPT_LAYOUT", "default").strip().lower(),
+        prompt_history_block_turns=_env_int("LLM_PROMPT_HISTORY_BLOCK_TURNS", 8),
+        tokenizer_encoding=os.getenv("LLM_TOKENIZER_ENCODING") or None,
+        singleflight_enabled=_env_bool("LLM_SINGLEFLIGHT_ENABLED", False),
+        router_enabled=_env_bool("LLM_ROUTER_ENABLED", False),
+        router_fast_model=os.getenv("LLM_ROUTER_FAST_MODEL") or None,
+        router_strong_model=os.getenv("LLM_ROUTER_STRONG_MODEL") or None,
+        router_fast_max_chars=_env_int("LLM_ROUTER_FAST_MAX_CHARS", 20),
     )
 
     openai_settings = OpenAISettings(
         api_key=os.getenv("OPENAI_API_KEY"),
         organization=os.getenv("OPENAI_ORG_ID"),
         base_url=os.getenv("OPENAI_BASE_URL"),
+        http_max_connections=_env_int("LLM_HTTP_MAX_CONNECTIONS", 20),
+        http_max_keepalive_connections=_env_int("LLM_HTTP_MAX_KEEPALIVE", 10),
+        http_keepalive_expiry=_env_float("LLM_HTTP_KEEPALIVE_EXPIRY", 60.0),
+        http2=_env_bool("LLM_HTTP2", False),
+        keepwarm_interval_seconds=_env_float("LLM_KEEPWARM_INTERVAL_SECONDS", 30.0),
     )
 
     short_term_settings = ShortTermMemorySettings(
         enabled=_env_bool("ENABLE_SHORT_TERM_MEMORY", True),
         db_path=os.getenv("STM_DB_PATH", "/app/data/dialog_memory.sqlite"),
         context_turns=_env_int("STM_CONTEXT_TURNS", 20),
+        context_token_budget=_env_int("STM_CONTEXT_TOKEN_BUDGET", 0),
+        summary_enabled=_env_bool("STM_SUMMARY_ENABLED", False),
+        summary_min_turns=_env_int("STM_SUMMARY_MIN_TURNS", 4),
+        summary_max_chars=_env_int("STM_SUMMARY_MAX_CHARS", 800),
+        summary_model=os.getenv("STM_SUMMARY_MODEL") or None,
     )
 
     ltm_inline_settings = LTMInlineSettings(
@@ -146,6 +249,46 @@ def load_settings() -> Settings:
         whisper_compute_type=os.getenv("ASR_WHISPER_COMPUTE_TYPE", "int8"),
         whisper_beam_size=_env_int("ASR_WHISPER_BEAM_SIZE", 1),
         whisper_cache_dir=os.getenv("ASR_WHISPER_CACHE_DIR"),
+        lang_cache_enabled=_env_bool("ASR_LANG_CACHE_ENABLED", True),
+        lang_cache_min_probability=_env_float("ASR_LANG_CACHE_MIN_PROBABILITY", 0.8),
+        lang_cache_redetect_interval=_env_int("ASR_LANG_CACHE_REDETECT_INTERVAL", 20),
+        lang_cache_max_age_seconds=_env_float("ASR_LANG_CACHE_MAX_AGE_SECONDS", 600.0),
+        lang_cache_max_sessions=_env_int("ASR_LANG_CACHE_MAX_SESSIONS", 1024),
+        whisper_tiering_enabled=_env_bool("ASR_WHISPER_TIERING", False),
+        whisper_short_model=os.getenv("ASR_WHISPER_SHORT_MODEL", "tiny"),
+        whisper_short_max_seconds=_env_float("ASR_WHISPER_SHORT_MAX_SECONDS", 3.0),
+        whisper_escalation_model=os.getenv("ASR_WHISPER_ESCALATION_MODEL") or None,
+        whisper_escalation_confidence=_env_float("ASR_WHISPER_ESCALATION_CONFIDENCE", 0.4),
+        remote_socket_paths=_env_list("ASR_REMOTE_SOCKETS", ("/tmp/dialog-engine-asr.sock",)),
+        remote_transfer=os.getenv("ASR_REMOTE_TRANSFER", "shm").strip().lower(),
+        remote_timeout=_env_float("ASR_REMOTE_TIMEOUT", 60.0),
+        result_cache=os.getenv("ASR_RESULT_CACHE", "memory").strip().lower(),
+        result_cache_ttl_seconds=_env_float("ASR_RESULT_CACHE_TTL_SECONDS", 300.0),
+        result_cache_max_entries=_env_int("ASR_RESULT_CACHE_MAX_ENTRIES", 256),
+        result_cache_redis_url=os.getenv("ASR_RESULT_CACHE_REDIS_URL")
+        or f"redis://{os.getenv('REDIS_HOST', 'localhost')}:{os.getenv('REDIS_PORT', '6379')}/0",
+    )
+
+    semantic_cache_settings = SemanticCacheSettings(
+        enabled=_env_bool("SEMANTIC_CACHE_ENABLED", False),
+        threshold=_env_float("SEMANTIC_CACHE_THRESHOLD", 0.9),
+        ttl_seconds=_env_float("SEMANTIC_CACHE_TTL_SECONDS", 600.0),
+        max_entries=_env_int("SEMANTIC_CACHE_MAX_ENTRIES", 512),
+        embedder=os.getenv("SEMANTIC_CACHE_EMBEDDER", "hash").strip().lower(),
+        embedding_model=os.getenv("SEMANTIC_CACHE_EMBEDDING_MODEL", "text-embedding-3-small"),
+        max_query_chars=_env_int("SEMANTIC_CACHE_MAX_QUERY_CHARS", 80),
+    )
+
+    rate_limit_settings = RateLimitSettings(
+        enabled=_env_bool("LLM_RATE_LIMIT_ENABLED", False),
+        redis_url=os.getenv("LLM_RATE_LIMIT_REDIS_URL")
+        or f"redis://{os.getenv('REDIS_HOST', 'localhost')}:{os.getenv('REDIS_PORT', '6379')}/0",
+        key=os.getenv("LLM_RATE_LIMIT_KEY", "llm:ratelimit"),
+        rpm=_env_int("LLM_RATE_LIMIT_RPM", 0),
+        tpm=_env_int("LLM_RATE_LIMIT_TPM", 0),
+        background_reserve=_env_float("LLM_RATE_LIMIT_BACKGROUND_RESERVE", 0.3),
+        interactive_max_wait=_env_float("LLM_RATE_LIMIT_INTERACTIVE_MAX_WAIT", 2.0),
+        background_max_wait=_env_float("LLM_RATE_LIMIT_BACKGROUND_MAX_WAIT", 30.0),
     )
 
     return Settings(
@@ -154,6 +297,8 @@ def load_settings() -> Settings:
         short_term=short_term_settings,
         ltm_inline=ltm_inline_settings,
         asr=asr_settings,
+        semantic_cache=semantic_cache_settings,
+        rate_limit=rate_limit_settings,
     )
 
 
@@ -166,6 +311,8 @@ __all__ = [
     "ShortTermMemorySettings",
     "LTMInlineSettings",
     "AsrSettings",
+    "SemanticCacheSettings",
+    "RateLimitSettings",
     "settings",
     "load_settings",
 ]
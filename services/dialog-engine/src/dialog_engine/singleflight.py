@@ -0,0 +1,120 @@
+"""Coalesce identical in-flight LLM streams into one upstream request."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import unicodedata
+from collections.abc import AsyncGenerator, Callable
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """Fold width, case and whitespace so trivially different lines match."""
+
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+def flight_key(user_text: str, *shared_context: Any) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in shared_context:
+        digest.update(repr(part).encode("utf-8"))
+        digest.update(b"\x1f")
+    return f"{normalize_text(user_text)}|{digest.hexdigest()}"
+
+
+class _Flight:
+    def __init__(self) -> None:
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.changed = asyncio.Condition()
+        self.task: Optional[asyncio.Task] = None
+
+
+class SingleFlight:
+    """Fans one upstream delta stream out to every concurrent identical request.
+
+    The first caller for a key starts the upstream stream; callers arriving
+    while it is still running attach to it, replay the deltas produced so far
+    and then follow live. Each subscriber can stop independently; the
+    upstream request is cancelled only when the last subscriber leaves.
+    Finished flights are dropped immediately, so nothing is cached.
+    """
+
+    def __init__(self) -> None:
+        self._flights: Dict[str, _Flight] = {}
+        self.flights = 0
+        self.coalesced = 0
+
+    async def stream(
+        self,
+        key: str,
+        factory: Callable[[], AsyncGenerator[str, None]],
+    ) -> AsyncGenerator[str, None]:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight()
+            self._flights[key] = flight
+            flight.task = asyncio.create_task(self._produce(key, flight, factory))
+            self.flights += 1
+        else:
+            self.coalesced += 1
+            logger.info("llm.singleflight.attach", extra={"subscribers": flight.subscribers + 1})
+
+        flight.subscribers += 1
+        index = 0
+        try:
+            while True:
+                async with flight.changed:
+                    await flight.changed.wait_for(lambda: index < len(flight.chunks) or flight.done)
+                    pending = flight.chunks[index:]
+                    finished = flight.done
+                index += len(pending)
+                for chunk in pending:
+                    yield chunk
+                if finished and index >= len(flight.chunks):
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done and flight.task is not None:
+                # Detach first so a request arriving now starts a fresh flight.
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"flights": self.flights, "coalesced": self.coalesced, "in_flight": len(self._flights)}
+
+    async def _produce(
+        self,
+        key: str,
+        flight: _Flight,
+        factory: Callable[[], AsyncGenerator[str, None]],
+    ) -> None:
+        stream = factory()
+        try:
+            async for chunk in stream:
+                async with flight.changed:
+                    flight.chunks.append(chunk)
+                    flight.changed.notify_all()
+        except asyncio.CancelledError:
+            flight.error = RuntimeError("llm_singleflight_cancelled")
+        except Exception as exc:
+            flight.error = exc
+        finally:
+            await stream.aclose()
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            async with flight.changed:
+                flight.done = True
+                flight.changed.notify_all()
+
+
+__all__ = ["SingleFlight", "flight_key", "normalize_text"]
@@ -0,0 +1,141 @@
+"""Rolling per-session summary of turns that left the STM window."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any, Dict, List, Optional
+
+from .memory_store import MemoryTurn, SessionSummary, ShortTermMemoryStore
+from .rate_limiter import LANE_BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+_SUMMARY_INSTRUCTIONS = (
+    "You maintain a running summary of a livestream conversation between a "
+    "virtual streamer (assistant) and viewers (user). Merge the new turns into "
+    "the existing summary. Keep names, preferences, promises and open topics; "
+    "drop greetings and filler. Reply with the updated summary only, in the "
+    "conversation's language, at most {max_chars} characters."
+)
+
+
+class RollingSummarizer:
+    """Folds turns evicted from the STM window into a stored rolling summary.
+
+    ``schedule`` is called on the reply path with the id of the oldest turn
+    still in the prompt window; folding runs in a background task per
+    session, so the reply never waits for the summarizer LLM call. Turns are
+    folded in batches of at least ``min_turns`` to keep the call rate low.
+    """
+
+    def __init__(
+        self,
+        *,
+        store: ShortTermMemoryStore,
+        llm_client: Callable[[], Awaitable[Any]],
+        min_turns: int = 4,
+        max_turns_per_fold: int = 40,
+        max_chars: int = 800,
+        model: Optional[str] = None,
+    ) -> None:
+        self._store = store
+        self._llm_client = llm_client
+        self._min_turns = max(1, min_turns)
+        self._max_turns_per_fold = max(self._min_turns, max_turns_per_fold)
+        self._max_chars = max(100, max_chars)
+        self._model = model
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # session_id -> newest window boundary requested while a fold was running
+        self._pending: Dict[str, int] = {}
+        self.folds = 0
+        self.errors = 0
+
+    def schedule(self, session_id: str, window_start_turn_id: int) -> None:
+        """Fold turns older than ``window_start_turn_id`` in the background."""
+
+        task = self._tasks.get(session_id)
+        if task is not None and not task.done():
+            self._pending[session_id] = max(window_start_turn_id, self._pending.get(session_id, 0))
+            return
+        self._tasks[session_id] = asyncio.create_task(self._run(session_id, window_start_turn_id))
+
+    async def wait_idle(self) -> None:
+        while self._tasks:
+            tasks = list(self._tasks.values())
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for key, task in list(self._tasks.items()):
+                if task.done():
+                    self._tasks.pop(key, None)
+
+    async def shutdown(self) -> None:
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+        self._pending.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"folds": self.folds, "errors": self.errors, "running": len(self._tasks)}
+
+    async def _run(self, session_id: str, boundary: int) -> None:
+        try:
+            while True:
+                await self._fold(session_id, boundary)
+                next_boundary = self._pending.pop(session_id, None)
+                if next_boundary is None or next_boundary <= boundary:
+                    return
+                boundary = next_boundary
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            self.errors += 1
+            logger.warning("stm.summary.error", extra={"session_id": session_id, "error": repr(exc)})
+        finally:
+            if self._tasks.get(session_id) is asyncio.current_task():
+                self._tasks.pop(session_id, None)
+
+    async def _fold(self, session_id: str, boundary: int) -> None:
+        current = await self._store.fetch_summary(session_id)
+        after_id = current.last_turn_id if current else 0
+        while True:
+            evicted = await self._store.fetch_turns_between(
+                session_id,
+                after_id=after_id,
+                before_id=boundary,
+                limit=self._max_turns_per_fold,
+            )
+            if len(evicted) < self._min_turns:
+                return
+            summary = await self._summarize(current, evicted)
+            last_turn_id = evicted[-1].turn_id or after_id
+            await self._store.save_summary(session_id, summary=summary, last_turn_id=last_turn_id)
+            self.folds += 1
+            logger.info(
+                "stm.summary.folded",
+                extra={"session_id": session_id, "turns": len(evicted), "last_turn_id": last_turn_id},
+            )
+            current = SessionSummary(session_id=session_id, summary=summary, last_turn_id=last_turn_id)
+            after_id = last_turn_id
+
+    async def _summarize(self, current: Optional[SessionSummary], turns: List[MemoryTurn]) -> str:
+        client = await self._llm_client()
+        transcript = "\n".join(f"{turn.role}: {turn.content}" for turn in turns)
+        existing = current.summary if current else "(empty)"
+        messages = [
+            {"role": "system", "content": _SUMMARY_INSTRUCTIONS.format(max_chars=self._max_chars)},
+            {"role": "user", "content": f"Existing summary:\n{existing}\n\nNew turns:\n{transcript}"},
+        ]
+        parts: List[str] = []
+        async for delta in client.stream_chat(
+            messages, model=self._model, temperature=0.0, lane=LANE_BACKGROUND
+        ):
+            parts.append(delta)
+        summary = "".join(parts).strip()
+        if not summary:
+            raise RuntimeError("summary_empty")
+        return summary[: self._max_chars]
+
+
+__all__ = ["RollingSummarizer"]
@@ -0,0 +1,96 @@
+"""Token counting for prompt budgeting and stream metrics."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import re
+from functools import lru_cache
+from typing import Optional
+
+try:  # pragma: no cover - optional dependency
+    import tiktoken
+except Exception:  # pragma: no cover - guard for environments without tiktoken
+    tiktoken = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+# Chat formats add a few framing tokens per message (role, separators).
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# CJK ideographs, kana and hangul are roughly one token per character for
+# BPE vocabularies; everything else averages about four characters per token.
+_CJK_CLASS = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"
+_CJK_RE = re.compile(f"[{_CJK_CLASS}]")
+_WORD_RE = re.compile(f"[^\\s{_CJK_CLASS}]+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Tokenizer-free estimate that does not collapse CJK sentences to one token."""
+
+    if not text or not text.strip():
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    other = sum(math.ceil(len(word) / 4) for word in _WORD_RE.findall(text))
+    return max(1, cjk + other)
+
+
+class TokenCounter:
+    """Counts tokens with tiktoken when available, else with ``estimate_tokens``.
+
+    The encoding is loaded on first use rather than at construction, since
+    loading may read or download BPE files; call :meth:`warmup` to load it
+    off the event loop ahead of the first request.
+    """
+
+    def __init__(self, *, encoding: Optional[str] = None, model: Optional[str] = None) -> None:
+        self._encoding_name = encoding
+        self._model = model
+        self._encoding = None
+        self._loaded = False
+
+    @property
+    def exact(self) -> bool:
+        return self._load() is not None
+
+    async def warmup(self) -> None:
+        if not self._loaded:
+            await asyncio.to_thread(self._load)
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self._load() is None:
+            return estimate_tokens(text)
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    def count_message(self, content: str) -> int:
+        return self.count(content) + MESSAGE_OVERHEAD_TOKENS
+
+    def _load(self):
+        if not self._loaded:
+            self._encoding = _load_encoding(self._encoding_name, self._model)
+            self._loaded = True
+        return self._encoding
+
+
+@lru_cache(maxsize=8)
+def _load_encoding(encoding: Optional[str], model: Optional[str]):
+    if tiktoken is None:
+        return None
+    try:
+        if encoding:
+            return tiktoken.get_encoding(encoding)
+        if model:
+            try:
+                return tiktoken.encoding_for_model(model)
+            except KeyError:
+                pass
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as exc:  # pragma: no cover - e.g. encoding files unavailable offline
+        logger.warning("tokenizer.load.error", extra={"encoding": encoding, "model": model, "error": repr(exc)})
+        return None
+
+
+__all__ = ["MESSAGE_OVERHEAD_TOKENS", "TokenCounter", "estimate_tokens"]
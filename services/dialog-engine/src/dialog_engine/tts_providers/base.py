@@ -23,6 +23,10 @@ class TtsProvider(abc.ABC):
     ) -> AsyncGenerator[bytes, None]:
         """Yield PCM chunks for the given text until stop_event is set."""
 
+    async def warmup(self) -> None:
+        """Prime network connections or caches before the first utterance."""
+        return None
+
     async def shutdown(self) -> None:
         """Allow provider to cleanup resources if needed."""
         return None
@@ -28,6 +28,10 @@ class EdgeTtsProvider(TtsProvider):
         self._volume = volume
         self._output_format = output_format or "riff-24khz-16bit-mono-pcm"
 
+    async def warmup(self) -> None:
+        # Resolves DNS and opens a TLS session to the edge-tts service.
+        await edge_tts.list_voices()
+
     async def stream(
         self,
         *,
@@ -29,6 +29,9 @@ EDGE_TTS_RATE = os.getenv("EDGE_TTS_RATE", "+0%")
 EDGE_TTS_VOLUME = os.getenv("EDGE_TTS_VOLUME", "+0%")
 EDGE_TTS_OUTPUT_FORMAT = os.getenv("EDGE_TTS_OUTPUT_FORMAT", "riff-24khz-16bit-mono-pcm")
 
+# Provider primed by warmup(); reused by every stream that does not override its settings.
+_warm_provider: Optional[TtsProvider] = None
+
 
 def _build_provider(
     *,
@@ -51,6 +54,38 @@ def _build_provider(
     return MockTtsProvider(chunk_delay_ms=effective_delay, chunk_count=effective_count)
 
 
+async def warmup() -> None:
+    """Build and prime the configured provider, keeping it for later streams."""
+
+    global _warm_provider
+    provider = _build_provider(provider_name=PROVIDER_NAME, chunk_count=None, delay_ms=None)
+    try:
+        await provider.warmup()
+    except BaseException:
+        await provider.shutdown()
+        raise
+    previous, _warm_provider = _warm_provider, provider
+    if previous is not None:
+        await previous.shutdown()
+
+
+async def shutdown() -> None:
+    """Release the provider kept by warmup()."""
+
+    global _warm_provider
+    provider, _warm_provider = _warm_provider, None
+    if provider is not None:
+        await provider.shutdown()
+
+
+def _acquire_provider(chunk_count: Optional[int], delay_ms: Optional[int]) -> tuple[TtsProvider, bool]:
+    """Return ``(provider, owned)``; owned providers are shut down after the stream."""
+
+    if _warm_provider is not None and chunk_count is None and delay_ms is None:
+        return _warm_provider, False
+    return _build_provider(provider_name=PROVIDER_NAME, chunk_count=chunk_count, delay_ms=delay_ms), True
+
+
 async def stream_text(
     session_id: str,
     text: str,
@@ -65,11 +100,7 @@ async def stream_text(
     """
 
     url = os.getenv("OUTPUT_INGEST_WS_URL", OUTPUT_INGEST_WS_URL)
-    provider = _build_provider(
-        provider_name=PROVIDER_NAME,
-        chunk_count=chunk_count,
-        delay_ms=delay_ms,
-    )
+    provider, owned = _acquire_provider(chunk_count, delay_ms)
 
     stop_event = asyncio.Event()
     first_chunk_ms: Optional[float] = None
@@ -106,7 +137,8 @@ async def stream_text(
                         )
                     except Exception:
                         pass
-                await provider.shutdown()
+                if owned:
+                    await provider.shutdown()
 
         async def receiver() -> None:
             try:
@@ -116,6 +148,9 @@ async def stream_text(
                     except Exception:
                         continue
                     if data.get("type") == "CONTROL" and str(data.get("action")).upper() == "STOP":
+                        # STOP is routed per session; ignore one addressed to another session
+                        if data.get("sessionId") not in (None, "", session_id):
+                            continue
                         stop_event.set()
                         await ws.send(
                             json.dumps({"type": "CONTROL", "action": "STOP_ACK", "sessionId": session_id})
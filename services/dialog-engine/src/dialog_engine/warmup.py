@@ -0,0 +1,68 @@
+"""Startup warm-up and readiness tracking for dialog-engine."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+WarmupStep = Callable[[], Awaitable[None]]
+
+
+class WarmupState:
+    """Tracks per-component warm-up progress and overall readiness."""
+
+    def __init__(self) -> None:
+        self.ready = False
+        self.components: Dict[str, str] = {}
+        self.started_at: Optional[float] = None
+        self.duration_ms: Optional[float] = None
+
+    def mark_ready(self) -> None:
+        self.ready = True
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "components": dict(self.components),
+            "duration_ms": round(self.duration_ms, 1) if self.duration_ms is not None else None,
+        }
+
+
+async def run_warmup(
+    state: WarmupState,
+    steps: Dict[str, WarmupStep],
+    *,
+    timeout: float,
+) -> None:
+    """Run warm-up steps concurrently, then flag the instance as ready.
+
+    A failing or slow step is recorded but never keeps the instance out of
+    rotation forever: every request path still works cold, it is just slower.
+    """
+
+    state.started_at = time.perf_counter()
+    for name in steps:
+        state.components[name] = "pending"
+
+    async def _run(name: str, step: WarmupStep) -> None:
+        try:
+            await asyncio.wait_for(step(), timeout=timeout)
+            state.components[name] = "ok"
+        except asyncio.TimeoutError:
+            state.components[name] = "timeout"
+            logger.warning("warmup.step.timeout", extra={"component": name})
+        except Exception as exc:
+            state.components[name] = "error"
+            logger.warning("warmup.step.error", extra={"component": name, "error": repr(exc)})
+
+    await asyncio.gather(*(_run(name, step) for name, step in steps.items()))
+    state.duration_ms = (time.perf_counter() - state.started_at) * 1000.0
+    state.mark_ready()
+    logger.info("warmup.complete", extra={"components": dict(state.components), "duration_ms": state.duration_ms})
+
+
+__all__ = ["WarmupState", "run_warmup"]
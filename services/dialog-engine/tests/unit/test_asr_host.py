@@ -0,0 +1,67 @@
+import pytest
+import pytest_asyncio
+
+from dialog_engine.asr.host import AsrHostServer
+from dialog_engine.asr.providers.base import AsrProvider
+from dialog_engine.asr.providers.remote import RemoteAsrProvider
+from dialog_engine.asr.service import AsrService
+from dialog_engine.asr.types import AsrOptions, AsrPartial, AsrResult
+
+
+class _EchoProvider(AsrProvider):
+    name = "echo"
+
+    def __init__(self) -> None:
+        self.received: list[tuple[bytes, AsrOptions]] = []
+
+    async def transcribe(self, *, audio: bytes, options: AsrOptions) -> AsrResult:
+        self.received.append((audio, options))
+        text = f"{len(audio)} bytes"
+        return AsrResult(
+            text=text,
+            partials=[AsrPartial(text=text, confidence=0.9, is_final=True)],
+            duration_seconds=1.5,
+            provider=self.name,
+            language="zh",
+        )
+
+
+@pytest_asyncio.fixture
+async def host(tmp_path):
+    provider = _EchoProvider()
+    server = AsrHostServer(service=AsrService(provider=provider), socket_path=str(tmp_path / "asr.sock"))
+    await server.start()
+    yield server, provider, str(tmp_path / "asr.sock")
+    await server.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("transfer", ["shm", "socket"])
+async def test_remote_provider_round_trip(host, transfer):
+    server, provider, socket_path = host
+    remote = RemoteAsrProvider(socket_paths=[socket_path], transfer=transfer, timeout=5.0)
+    audio = b"\x01\x02" * 4000
+
+    result = await remote.transcribe(audio=audio, options=AsrOptions(lang="zh", sample_rate=16000, session_id="s"))
+
+    assert result.text == "8000 bytes"
+    assert result.provider == "echo"
+    assert result.language == "zh"
+    assert list(result.partials)[0].confidence == 0.9
+    assert provider.received[0][0] == audio
+    assert provider.received[0][1].session_id == "s"
+    assert server.requests == 1
+
+
+@pytest.mark.asyncio
+async def test_remote_provider_raises_on_host_error(host):
+    _, provider, socket_path = host
+
+    async def _fail(**kwargs):
+        raise RuntimeError("model crashed")
+
+    provider.transcribe = _fail  # type: ignore[assignment]
+    remote = RemoteAsrProvider(socket_paths=[socket_path], timeout=5.0)
+
+    with pytest.raises(RuntimeError, match="asr_host_error"):
+        await remote.transcribe(audio=b"\x00\x00", options=AsrOptions())
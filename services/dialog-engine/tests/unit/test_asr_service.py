@@ -1,9 +1,16 @@
 import dataclasses
+import time
 
 import pytest
 
+from dialog_engine.asr.language_cache import LanguageCache
+from dialog_engine.asr.providers.base import AsrProvider
 from dialog_engine.asr.providers.mock import MockAsrProvider
+from dialog_engine.asr.providers.tiered import AsrTier, TieredAsrProvider
+from dialog_engine.asr.result_cache import AsrResultCache, RedisAsrResultCache
 from dialog_engine.asr.service import AsrService
+from dialog_engine.asr.types import AsrOptions, AsrPartial, AsrResult
+from dialog_engine.audio.types import AudioBundle, AudioMetadata
 from dialog_engine.settings import AsrSettings
 
 
@@ -35,3 +42,203 @@ def test_asr_service_from_settings_unknown_provider():
 
     with pytest.raises(RuntimeError):
         AsrService.from_settings(cfg)
+
+
+class _DetectingProvider(AsrProvider):
+    name = "detecting"
+
+    def __init__(self, *, probability: float) -> None:
+        self.probability = probability
+        self.langs: list[str | None] = []
+
+    async def transcribe(self, *, audio: bytes, options: AsrOptions) -> AsrResult:
+        self.langs.append(options.lang)
+        if options.lang:
+            return AsrResult(text="ok", language=options.lang)
+        return AsrResult(text="ok", language="en", language_probability=self.probability)
+
+
+def _bundle(pcm: bytes = b"") -> AudioBundle:
+    return AudioBundle(
+        pcm=pcm,
+        metadata=AudioMetadata(sample_rate=16000, channels=1, duration_seconds=0.5, format="audio/wav"),
+    )
+
+
+@pytest.mark.asyncio
+async def test_language_cache_pins_detected_language_per_session():
+    provider = _DetectingProvider(probability=0.95)
+    service = AsrService(provider=provider, language_cache=LanguageCache(redetect_interval=2))
+
+    for _ in range(4):
+        await service.transcribe_bundle(_bundle(), options=AsrOptions(session_id="sess"))
+    await service.transcribe_bundle(_bundle(), options=AsrOptions(session_id="other"))
+
+    assert provider.langs == [None, "en", "en", None, None]
+
+
+def test_language_cache_redetects_after_max_age(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("dialog_engine.asr.language_cache.time.monotonic", lambda: now[0])
+    cache = LanguageCache(redetect_interval=0, max_age_seconds=60)
+    cache.record("sess", "ja", 0.95)
+
+    now[0] += 59
+    assert cache.lookup("sess") == "ja"
+    now[0] += 2
+    assert cache.lookup("sess") is None
+    assert cache.stats()["sessions"] == 0
+
+
+@pytest.mark.asyncio
+async def test_language_cache_skips_low_confidence_detection():
+    provider = _DetectingProvider(probability=0.3)
+    service = AsrService(provider=provider, language_cache=LanguageCache(min_probability=0.8))
+
+    await service.transcribe_bundle(_bundle(), options=AsrOptions(session_id="sess"))
+    result = await service.transcribe_bundle(_bundle(), options=AsrOptions(session_id="sess"))
+
+    assert provider.langs == [None, None]
+    assert result.language == "en"
+
+
+@pytest.mark.asyncio
+async def test_language_cache_respects_explicit_lang():
+    provider = _DetectingProvider(probability=0.95)
+    service = AsrService(provider=provider, language_cache=LanguageCache())
+
+    await service.transcribe_bundle(_bundle(), options=AsrOptions(lang="zh", session_id="sess"))
+    await service.transcribe_bundle(_bundle(), options=AsrOptions(session_id="sess"))
+
+    assert provider.langs == ["zh", None]
+
+
+class _FixedProvider(AsrProvider):
+    def __init__(self, name: str, confidence: float | None) -> None:
+        self.name = name
+        self.confidence = confidence
+        self.calls = 0
+
+    async def transcribe(self, *, audio: bytes, options: AsrOptions) -> AsrResult:
+        self.calls += 1
+        return AsrResult(
+            text=self.name,
+            partials=[AsrPartial(text=self.name, confidence=self.confidence)],
+            provider="stub",
+        )
+
+
+@pytest.mark.asyncio
+async def test_tiered_provider_routes_by_clip_duration():
+    short, long = _FixedProvider("short", 0.9), _FixedProvider("long", 0.9)
+    provider = TieredAsrProvider(
+        tiers=[AsrTier(name="short", provider=short, max_duration_seconds=1.0), AsrTier(name="long", provider=long)],
+    )
+    one_second = b"\x00\x00" * 16000
+
+    short_result = await provider.transcribe(audio=one_second, options=AsrOptions(sample_rate=16000))
+    long_result = await provider.transcribe(audio=one_second * 3, options=AsrOptions(sample_rate=16000))
+
+    assert (short_result.text, long_result.text) == ("short", "long")
+    assert short_result.provider == "stub:short"
+    assert provider.stats()["short"]["calls"] == 1
+
+
+@pytest.mark.asyncio
+async def test_tiered_provider_escalates_on_low_confidence():
+    short, strong = _FixedProvider("short", 0.1), _FixedProvider("strong", 0.9)
+    provider = TieredAsrProvider(
+        tiers=[AsrTier(name="short", provider=short)],
+        escalation=AsrTier(name="escalation", provider=strong),
+        confidence_threshold=0.5,
+    )
+
+    result = await provider.transcribe(audio=b"\x00\x00", options=AsrOptions(sample_rate=16000))
+
+    assert result.text == "strong"
+    assert provider.stats()["short"]["escalations"] == 1
+    assert strong.calls == 1
+
+
+def test_whisper_segment_confidence_follows_avg_logprob():
+    from types import SimpleNamespace
+
+    from dialog_engine.asr.providers.whisper import _estimate_segment_confidence
+
+    confident = _estimate_segment_confidence(SimpleNamespace(avg_logprob=-0.1, no_speech_prob=0.02))
+    poor = _estimate_segment_confidence(SimpleNamespace(avg_logprob=-1.5, no_speech_prob=0.02))
+
+    assert confident > 0.85 and poor < 0.25
+    assert _estimate_segment_confidence(SimpleNamespace(avg_logprob=-0.1, no_speech_prob=0.9)) < 0.1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("avg_logprob, escalated", [(-0.1, False), (-1.5, True)])
+async def test_tiered_provider_escalation_uses_whisper_confidence(avg_logprob, escalated):
+    from types import SimpleNamespace
+
+    from dialog_engine.asr.providers.whisper import _estimate_segment_confidence
+
+    segment = SimpleNamespace(avg_logprob=avg_logprob, no_speech_prob=0.01)
+    short = _FixedProvider("short", _estimate_segment_confidence(segment))
+    strong = _FixedProvider("strong", 0.9)
+    provider = TieredAsrProvider(
+        tiers=[AsrTier(name="short", provider=short)],
+        escalation=AsrTier(name="escalation", provider=strong),
+        confidence_threshold=0.5,
+    )
+
+    result = await provider.transcribe(audio=b"\x00\x00", options=AsrOptions(sample_rate=16000))
+
+    assert (result.text == "strong") is escalated
+    assert strong.calls == int(escalated)
+
+
+@pytest.mark.asyncio
+async def test_result_cache_serves_duplicate_audio():
+    provider = _DetectingProvider(probability=0.95)
+    cache = AsrResultCache(ttl_seconds=60, max_entries=4)
+    service = AsrService(provider=provider, result_cache=cache)
+
+    first = await service.transcribe_bundle(_bundle(b"abc"), options=AsrOptions(session_id="a"))
+    second = await service.transcribe_bundle(_bundle(b"abc"), options=AsrOptions(session_id="b"))
+    await service.transcribe_bundle(_bundle(b"abc"), options=AsrOptions(lang="zh", session_id="b"))
+    await service.transcribe_bundle(_bundle(b"xyz"), options=AsrOptions(session_id="b"))
+
+    assert len(provider.langs) == 3
+    assert first.cached is False
+    assert second.cached is True and second.text == first.text
+    assert cache.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_result_cache_expires_entries(monkeypatch):
+    cache = AsrResultCache(ttl_seconds=10, max_entries=4)
+    await cache.set("k", AsrResult(text="hi"))
+    now = time.monotonic()
+    monkeypatch.setattr("dialog_engine.asr.result_cache.time.monotonic", lambda: now + 11)
+
+    assert await cache.get("k") is None
+
+
+class _DictRedis:
+    def __init__(self) -> None:
+        self.store: dict[str, str] = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.store[key] = value
+
+
+@pytest.mark.asyncio
+async def test_redis_result_cache_shared_between_replicas():
+    backend = _DictRedis()
+    replica_a = RedisAsrResultCache(redis_client=backend)
+    replica_b = RedisAsrResultCache(redis_client=backend)
+
+    await replica_a.set("k", AsrResult(text="shared", partials=[AsrPartial(text="shared", is_final=True)]))
+    result = await replica_b.get("k")
+
+    assert result is not None and result.text == "shared" and result.cached
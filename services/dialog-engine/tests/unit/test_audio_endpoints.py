@@ -209,3 +209,57 @@ def test_chat_vision_handles_image_only(monkeypatch, client):
     assert recorded[0] == ("user", "[图片输入]")
     assert recorded[1] == ("assistant", "默认描述")
     assert resp.json()["prompt"] == "请描述这张图片。"
+
+
+def test_chat_audio_accepts_streamed_binary_body(monkeypatch, client):
+    bodies: list[dict] = []
+
+    async def fake_prepare(body):  # noqa: ANN001
+        bodies.append(body)
+        return ("sess-bin", _fake_bundle(), None, body.get("meta", {}))
+
+    async def fake_transcribe(bundle, options=None):  # noqa: ANN001
+        return _fake_asr_result()
+
+    async def fake_stream_reply(*, session_id: str, user_text: str, meta: dict):
+        yield "hi"
+
+    async def fake_remember(session_id: str, *, role: str, content: str) -> None:
+        return None
+
+    monkeypatch.setattr(dialog_app, "_prepare_audio_request", fake_prepare)
+    monkeypatch.setattr(dialog_app.asr_service, "transcribe_bundle", fake_transcribe)
+    monkeypatch.setattr(dialog_app.chat_service, "stream_reply", fake_stream_reply)
+    monkeypatch.setattr(dialog_app.chat_service, "remember_turn", fake_remember)
+    monkeypatch.setattr(dialog_app, "_emit_async_events", lambda **_: None)
+
+    def chunks():
+        yield b"\x1aE\xdf\xa3"
+        yield b"opus-frames"
+
+    resp = client.post(
+        "/chat/audio",
+        params={"sessionId": "sess-bin", "meta": '{"source": "input-handler"}'},
+        headers={"Content-Type": "audio/webm"},
+        content=chunks(),
+    )
+
+    assert resp.status_code == 200
+    assert bodies[0]["audio"] == b"\x1aE\xdf\xa3opus-frames"
+    assert bodies[0]["contentType"] == "audio/webm"
+    assert bodies[0]["sessionId"] == "sess-bin"
+    assert bodies[0]["meta"] == {"source": "input-handler"}
+
+
+def test_chat_vision_rejects_oversized_binary_body(monkeypatch, client):
+    monkeypatch.setattr(dialog_app, "VISION_MAX_BYTES", 4)
+
+    resp = client.post(
+        "/chat/vision",
+        params={"sessionId": "s"},
+        headers={"Content-Type": "image/png"},
+        content=b"too-many-bytes",
+    )
+
+    assert resp.status_code == 413
+    assert resp.json()["detail"] == "image payload too large"
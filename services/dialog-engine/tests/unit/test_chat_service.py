@@ -6,12 +6,13 @@ import pytest
 
 from dialog_engine.chat_service import ChatService
 from dialog_engine.llm_client import LLMStreamEmptyError
-from dialog_engine.memory_store import MemoryTurn
+from dialog_engine.memory_store import MemoryTurn, ShortTermMemoryStore
 from dialog_engine.settings import (
     AsrSettings,
     LLMSettings,
     LTMInlineSettings,
     OpenAISettings,
+    SemanticCacheSettings,
     Settings,
     ShortTermMemorySettings,
 )
@@ -23,6 +24,12 @@ def _make_settings(
     stm_enabled: bool = False,
     ltm_enabled: bool = False,
     base_url: Optional[str] = None,
+    prompt_layout: str = "default",
+    context_token_budget: int = 0,
+    summary_enabled: bool = False,
+    singleflight_enabled: bool = False,
+    semantic_cache_enabled: bool = False,
+    router_enabled: bool = False,
 ) -> Settings:
     return Settings(
         openai=OpenAISettings(api_key=None, organization=None, base_url=None),
@@ -37,11 +44,19 @@ def _make_settings(
             timeout=1.0,
             retry_limit=0,
             retry_backoff_seconds=0.0,
+            prompt_layout=prompt_layout,
+            prompt_history_block_turns=2,
+            singleflight_enabled=singleflight_enabled,
+            router_enabled=router_enabled,
+            router_fast_model="dummy-fast",
+            router_strong_model="dummy-strong",
         ),
         short_term=ShortTermMemorySettings(
             enabled=stm_enabled,
             db_path=":memory:",
             context_turns=5,
+            context_token_budget=context_token_budget,
+            summary_enabled=summary_enabled,
         ),
         ltm_inline=LTMInlineSettings(
             enabled=ltm_enabled,
@@ -64,6 +79,7 @@ def _make_settings(
             whisper_beam_size=1,
             whisper_cache_dir=None,
         ),
+        semantic_cache=SemanticCacheSettings(enabled=semantic_cache_enabled, threshold=0.8),
     )
 
 
@@ -71,11 +87,13 @@ class _StubLLMClient:
     def __init__(self, responses: Iterable[str], *, vision_reply: str = "Vision response") -> None:
         self._responses = list(responses)
         self.calls: List[list[dict[str, str]]] = []
+        self.models: List[Optional[str]] = []
         self.vision_calls: List[list[dict[str, object]]] = []
         self._vision_reply = vision_reply
 
     async def stream_chat(self, messages, **kwargs):
         self.calls.append(list(messages))
+        self.models.append(kwargs.get("model"))
         for token in self._responses:
             await asyncio.sleep(0)
             yield token
@@ -116,6 +134,21 @@ class _StubMemoryStore:
         return list(self.turns)
 
 
+class _SlidingMemoryStore:
+    """Returns the most recent ``limit`` turns of a growing history."""
+
+    def __init__(self) -> None:
+        self.turns: List[MemoryTurn] = []
+
+    def add_exchange(self) -> None:
+        for role in ("user", "assistant"):
+            turn_id = len(self.turns) + 1
+            self.turns.append(MemoryTurn(role=role, content=f"turn-{turn_id}", turn_id=turn_id))
+
+    async def fetch_recent(self, session_id: str, limit: Optional[int] = None):
+        return list(self.turns[-(limit or 0):])
+
+
 class _StubLTMClient:
     def __init__(self, snippets: Iterable[str]) -> None:
         self.snippets = list(snippets)
@@ -145,6 +178,25 @@ async def test_stream_reply_mock_path():
     assert service.last_error is None
 
 
+@pytest.mark.asyncio
+async def test_shutdown_stops_llm_keepwarm():
+    stub = _StubLLMClient(["ok"])
+    events: List[str] = []
+    stub.start_keepwarm = lambda: events.append("start")
+
+    async def _stop_keepwarm() -> None:
+        events.append("stop")
+
+    stub.stop_keepwarm = _stop_keepwarm
+    service = ChatService(settings=_make_settings(enabled=True), llm_client_factory=lambda: stub)
+
+    async for _ in service.stream_reply("live-1", "hello", meta={}):
+        pass
+    await service.shutdown()
+
+    assert events == ["start", "stop"]
+
+
 @pytest.mark.asyncio
 async def test_stream_reply_llm_path():
     stub = _StubLLMClient(["Hello", " world"])
@@ -221,6 +273,253 @@ async def test_stream_reply_llm_includes_short_term_context():
     assert any(msg["content"] == "之前的回答" for msg in sent_messages)
 
 
+@pytest.mark.asyncio
+async def test_cache_layout_keeps_history_prefix_append_only():
+    stub_llm = _StubLLMClient(["ok"])
+    memory_store = _SlidingMemoryStore()
+    service = ChatService(
+        settings=_make_settings(enabled=True, stm_enabled=True, prompt_layout="cache"),
+        llm_client_factory=lambda: stub_llm,
+        memory_store=memory_store,
+    )
+
+    histories: List[List[str]] = []
+    for _ in range(6):
+        async for _ in service.stream_reply("sess-cache", "hi", meta={}):
+            pass
+        histories.append([msg["content"] for msg in stub_llm.calls[-1][:-1]])
+        memory_store.add_exchange()
+
+    resets = 0
+    for previous, current in zip(histories, histories[1:]):
+        assert len(current) <= 5
+        if current[: len(previous)] != previous:
+            resets += 1
+            # The window only moves forward in whole blocks of two turns.
+            assert current[0] == previous[2]
+    assert resets < len(histories) - 1
+
+
+@pytest.mark.asyncio
+async def test_default_layout_slides_window_each_turn():
+    stub_llm = _StubLLMClient(["ok"])
+    memory_store = _SlidingMemoryStore()
+    service = ChatService(
+        settings=_make_settings(enabled=True, stm_enabled=True),
+        llm_client_factory=lambda: stub_llm,
+        memory_store=memory_store,
+    )
+    for _ in range(4):
+        memory_store.add_exchange()
+
+    async for _ in service.stream_reply("sess-default", "hi", meta={}):
+        pass
+
+    history = [msg["content"] for msg in stub_llm.calls[-1][:-1]]
+    assert history == ["turn-4", "turn-5", "turn-6", "turn-7", "turn-8"]
+
+
+@pytest.mark.asyncio
+async def test_token_budget_keeps_newest_turns_that_fit():
+    stub_llm = _StubLLMClient(["ok"])
+    memory_store = _StubMemoryStore(
+        [
+            MemoryTurn(role="user", content="old", tokens=30),
+            MemoryTurn(role="assistant", content="middle", tokens=10),
+            MemoryTurn(role="user", content="newest", tokens=10),
+        ]
+    )
+    service = ChatService(
+        settings=_make_settings(enabled=True, stm_enabled=True, context_token_budget=50),
+        llm_client_factory=lambda: stub_llm,
+        memory_store=memory_store,
+    )
+
+    async for _ in service.stream_reply("sess-budget", "hi", meta={}):
+        pass
+
+    history = [msg["content"] for msg in stub_llm.calls[-1][:-1]]
+    assert history == ["middle", "newest"]
+
+
+@pytest.mark.asyncio
+async def test_rolling_summary_folds_evicted_turns_and_is_injected(tmp_path):
+    stub_llm = _StubLLMClient(["summary text"])
+    store = ShortTermMemoryStore(db_path=str(tmp_path / "stm.sqlite"), default_limit=5)
+    for idx in range(10):
+        await store.append_turn(session_id="sess-sum", role="user" if idx % 2 == 0 else "assistant", content=f"t{idx}")
+    service = ChatService(
+        settings=_make_settings(enabled=True, stm_enabled=True, summary_enabled=True),
+        llm_client_factory=lambda: stub_llm,
+        memory_store=store,
+    )
+
+    async for _ in service.stream_reply("sess-sum", "first", meta={}):
+        pass
+    first_prompt = stub_llm.calls[0]
+    assert not any("summary of earlier turns" in msg["content"] for msg in first_prompt)
+
+    await service.summarizer.wait_idle()
+    record = await store.fetch_summary("sess-sum")
+    assert record is not None
+    assert record.summary == "summary text"
+    assert record.last_turn_id == 5
+
+    async for _ in service.stream_reply("sess-sum", "second", meta={}):
+        pass
+    last_prompt = stub_llm.calls[-1]
+    assert "summary of earlier turns" in last_prompt[0]["content"]
+    assert "summary text" in last_prompt[0]["content"]
+
+
+@pytest.mark.asyncio
+async def test_singleflight_coalesces_identical_viewer_lines():
+    stub_llm = _StubLLMClient(["same", " reply"])
+    service = ChatService(
+        settings=_make_settings(enabled=True, singleflight_enabled=True),
+        llm_client_factory=lambda: stub_llm,
+    )
+
+    async def _reply(session_id: str, text: str) -> str:
+        return "".join([chunk async for chunk in service.stream_reply(session_id, text, meta={})])
+
+    replies = await asyncio.gather(_reply("viewer-1", "草草草"), _reply("viewer-2", " 草草草 "))
+
+    assert replies == ["same reply", "same reply"]
+    assert len(stub_llm.calls) == 1
+    assert service.singleflight_stats()["coalesced"] == 1
+
+
+@pytest.mark.asyncio
+async def test_singleflight_coalesces_fresh_sessions_with_memory_enabled():
+    stub_llm = _StubLLMClient(["same", " reply"])
+    service = ChatService(
+        settings=_make_settings(enabled=True, stm_enabled=True, singleflight_enabled=True),
+        llm_client_factory=lambda: stub_llm,
+        memory_store=_StubMemoryStore([]),
+    )
+
+    async def _reply(session_id: str, text: str) -> str:
+        return "".join([chunk async for chunk in service.stream_reply(session_id, text, meta={})])
+
+    replies = await asyncio.gather(_reply("viewer-1", "what game is this?"), _reply("viewer-2", "What game is this?"))
+
+    assert replies == ["same reply", "same reply"]
+    assert len(stub_llm.calls) == 1
+    assert service.singleflight_stats()["coalesced"] == 1
+
+
+@pytest.mark.asyncio
+async def test_singleflight_does_not_share_replies_across_private_context():
+    class _PerSessionStore:
+        async def fetch_recent(self, session_id: str, limit: Optional[int] = None):
+            if session_id == "viewer-1":
+                return [MemoryTurn(role="user", content="my name is Alice")]
+            return []
+
+    stub_llm = _StubLLMClient(["reply"])
+    service = ChatService(
+        settings=_make_settings(enabled=True, stm_enabled=True, singleflight_enabled=True),
+        llm_client_factory=lambda: stub_llm,
+        memory_store=_PerSessionStore(),
+    )
+
+    async def _reply(session_id: str, text: str) -> str:
+        return "".join([chunk async for chunk in service.stream_reply(session_id, text, meta={})])
+
+    await asyncio.gather(_reply("viewer-1", "who am I?"), _reply("viewer-2", "who am I?"))
+
+    assert len(stub_llm.calls) == 2
+    assert service.singleflight_stats()["coalesced"] == 0
+
+
+@pytest.mark.asyncio
+async def test_semantic_cache_serves_recurring_question():
+    stub_llm = _StubLLMClient(["Elden", " Ring"])
+    service = ChatService(
+        settings=_make_settings(enabled=True, semantic_cache_enabled=True),
+        llm_client_factory=lambda: stub_llm,
+    )
+
+    first = "".join([chunk async for chunk in service.stream_reply("viewer-1", "What game is this?", meta={})])
+    second = "".join([chunk async for chunk in service.stream_reply("viewer-2", "what game is this", meta={})])
+
+    assert first == second == "Elden Ring"
+    assert len(stub_llm.calls) == 1
+    assert service.last_source == "cache"
+
+
+@pytest.mark.asyncio
+async def test_semantic_cache_not_shared_across_session_history():
+    class _PerSessionStore:
+        async def fetch_recent(self, session_id: str, limit: Optional[int] = None):
+            topic = "the boss fight" if session_id == "viewer-1" else "the soundtrack"
+            return [MemoryTurn(role="user", content=f"I love {topic}")]
+
+    stub_llm = _StubLLMClient(["because"])
+    service = ChatService(
+        settings=_make_settings(enabled=True, stm_enabled=True, semantic_cache_enabled=True),
+        llm_client_factory=lambda: stub_llm,
+        memory_store=_PerSessionStore(),
+    )
+
+    for session_id in ("viewer-1", "viewer-2"):
+        async for _ in service.stream_reply(session_id, "为什么？", meta={}):
+            pass
+
+    assert len(stub_llm.calls) == 2
+    assert service.last_source == "llm"
+    assert service.semantic_cache_stats()["bypassed"] == 2
+
+
+@pytest.mark.asyncio
+async def test_semantic_cache_scoped_by_routed_model():
+    stub_llm = _StubLLMClient(["Elden Ring"])
+    service = ChatService(
+        settings=_make_settings(enabled=True, semantic_cache_enabled=True, router_enabled=True),
+        llm_client_factory=lambda: stub_llm,
+    )
+
+    for tier in ("fast", "strong"):
+        async for _ in service.stream_reply("viewer-1", "what game is this", meta={"model_tier": tier}):
+            pass
+
+    assert stub_llm.models == ["dummy-fast", "dummy-strong"]
+
+
+@pytest.mark.asyncio
+async def test_semantic_cache_bypassed_for_personalized_turns():
+    stub_llm = _StubLLMClient(["hi"])
+    service = ChatService(
+        settings=_make_settings(enabled=True, semantic_cache_enabled=True),
+        llm_client_factory=lambda: stub_llm,
+    )
+
+    for _ in range(2):
+        async for _ in service.stream_reply("viewer-1", "remember me?", meta={"personalized": True}):
+            pass
+
+    assert len(stub_llm.calls) == 2
+    assert service.semantic_cache_stats()["bypassed"] == 2
+
+
+@pytest.mark.asyncio
+async def test_router_sends_reactions_to_fast_model_and_questions_to_strong():
+    stub_llm = _StubLLMClient(["ok"])
+    service = ChatService(
+        settings=_make_settings(enabled=True, router_enabled=True),
+        llm_client_factory=lambda: stub_llm,
+    )
+
+    for text in ("666", "这个游戏怎么玩？"):
+        async for _ in service.stream_reply("viewer-1", text, meta={}):
+            pass
+
+    assert stub_llm.models == ["dummy-fast", "dummy-strong"]
+    assert service.last_route.tier == "strong"
+    assert service.router.stats()["fast"]["calls"] == 1
+
+
 @pytest.mark.asyncio
 async def test_stream_reply_llm_includes_ltm_snippets():
     stub_llm = _StubLLMClient(["Done"])
@@ -0,0 +1,59 @@
+from pathlib import Path
+
+import httpx
+import pytest
+
+from dialog_engine.http_pool import HttpClientPool, UpstreamConfig
+
+
+def test_upstream_config_prefers_per_upstream_env(monkeypatch):
+    monkeypatch.setenv("HTTP_POOL_MAX_CONNECTIONS", "50")
+    monkeypatch.setenv("HTTP_POOL_LTM_MAX_CONNECTIONS", "8")
+    monkeypatch.setenv("HTTP_POOL_LTM_TIMEOUT", "2.5")
+
+    ltm = UpstreamConfig.from_env("ltm", base_url="http://ltm:8000", timeout=10.0)
+    other = UpstreamConfig.from_env("dialog_engine")
+
+    assert (ltm.max_connections, ltm.timeout) == (8, 2.5)
+    assert (other.max_connections, other.timeout) == (50, 30.0)
+
+
+@pytest.mark.asyncio
+async def test_pool_reuses_one_client_per_upstream_and_counts_requests():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(503 if request.url.path == "/down" else 200, json={})
+
+    pool = HttpClientPool()
+    pool.register(UpstreamConfig(name="ltm", base_url="http://ltm:8000"), transport=httpx.MockTransport(handler))
+
+    client = pool.client("ltm")
+    assert pool.client("ltm") is client
+    await client.post("/v1/memory/retrieve", json={})
+    await client.get("/down")
+
+    stats = pool.stats()["ltm"]
+    assert stats["requests"] == 2
+    assert stats["server_errors"] == 1
+
+    await pool.aclose()
+    assert client.is_closed
+    assert pool.client("ltm") is not client
+    await pool.aclose()
+
+
+def test_unknown_upstream_raises():
+    with pytest.raises(KeyError):
+        HttpClientPool().client("missing")
+
+
+def test_http_pool_copies_are_identical():
+    services = Path(__file__).resolve().parents[3]
+    own_copy = services / "dialog-engine" / "src" / "dialog_engine" / "http_pool.py"
+    other_copies = [
+        services / "gateway-python" / "src" / "core" / "http_pool.py",
+        services / "input-handler-python" / "src" / "services" / "http_pool.py",
+    ]
+    if not all(path.exists() for path in other_copies):
+        pytest.skip("sibling services are not checked out next to dialog-engine")
+    for path in other_copies:
+        assert path.read_bytes() == own_copy.read_bytes(), f"{path} drifted from the dialog-engine copy"
@@ -0,0 +1,416 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from dialog_engine.llm_client import (
+    ConnectionStats,
+    HedgeBudget,
+    LLMStreamEmptyError,
+    OpenAIChatClient,
+    build_http_client,
+)
+from dialog_engine.llm_sse import RawStreamError, iter_sse_data, parse_chat_event
+from dialog_engine.settings import LLMSettings, OpenAISettings
+
+
+def _llm_settings(**overrides) -> LLMSettings:
+    return LLMSettings(
+        enabled=True,
+        model="dummy",
+        temperature=0.0,
+        max_tokens=16,
+        top_p=1.0,
+        frequency_penalty=0.0,
+        presence_penalty=0.0,
+        timeout=1.0,
+        retry_limit=0,
+        retry_backoff_seconds=0.0,
+        **overrides,
+    )
+
+
+class _StubModels:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def list(self):
+        self.calls += 1
+        return []
+
+
+class _StubOpenAI:
+    def __init__(self) -> None:
+        self.models = _StubModels()
+
+    def with_options(self, **kwargs):
+        return self
+
+
+@pytest.mark.asyncio
+async def test_connection_stats_track_reuse_from_trace_events():
+    stats = ConnectionStats()
+    for _ in range(4):
+        request = httpx.Request("GET", "https://example.invalid/v1/models")
+        await stats.on_request(request)
+        assert request.extensions["trace"] == stats.on_trace
+    await stats.on_trace("connection.connect_tcp.complete", {})
+    await stats.on_trace("connection.start_tls.complete", {})
+    await stats.on_trace("http11.send_request_headers.complete", {})
+
+    data = stats.as_dict()
+    assert data["requests"] == 4
+    assert data["connections_opened"] == 1
+    assert data["tls_handshakes"] == 1
+    assert data["reuse_ratio"] == 0.75
+
+
+@pytest.mark.asyncio
+async def test_build_http_client_applies_pool_limits():
+    cfg = OpenAISettings(
+        api_key="key",
+        organization=None,
+        base_url=None,
+        http_max_connections=5,
+        http_max_keepalive_connections=2,
+        http_keepalive_expiry=12.0,
+    )
+    client = build_http_client(cfg, timeout=3.0, stats=ConnectionStats())
+    try:
+        pool = client._transport._pool
+        assert pool._max_connections == 5
+        assert pool._max_keepalive_connections == 2
+        assert pool._keepalive_expiry == 12.0
+    finally:
+        await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_keepwarm_pings_provider_until_closed():
+    stub = _StubOpenAI()
+    cfg = OpenAISettings(api_key=None, organization=None, base_url=None, keepwarm_interval_seconds=0.01)
+    client = OpenAIChatClient(cfg, _llm_settings(), client=stub)
+
+    client.start_keepwarm()
+    await asyncio.sleep(0.05)
+    await client.close()
+    pings = stub.models.calls
+    await asyncio.sleep(0.03)
+
+    assert pings >= 2
+    assert stub.models.calls == pings
+
+
+@pytest.mark.asyncio
+async def test_keepwarm_disabled_with_zero_interval():
+    stub = _StubOpenAI()
+    cfg = OpenAISettings(api_key=None, organization=None, base_url=None, keepwarm_interval_seconds=0)
+    client = OpenAIChatClient(cfg, _llm_settings(), client=stub)
+
+    client.start_keepwarm()
+    await asyncio.sleep(0.02)
+    await client.close()
+
+    assert stub.models.calls == 0
+
+
+class _StubStream:
+    def __init__(self, tokens, *, first_delay: float) -> None:
+        self._tokens = list(tokens)
+        self._first_delay = first_delay
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        await asyncio.sleep(self._first_delay)
+        for token in self._tokens:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token, tool_calls=None))])
+
+    async def aclose(self) -> None:
+        self.closed = True
+
+
+class _StubCompletions:
+    def __init__(self, tokens, *, first_delay: float) -> None:
+        self._tokens = tokens
+        self._first_delay = first_delay
+        self.streams: list[_StubStream] = []
+        self.models: list[str] = []
+
+    async def create(self, **params):
+        self.models.append(params["model"])
+        stream = _StubStream(self._tokens, first_delay=self._first_delay)
+        self.streams.append(stream)
+        return stream
+
+
+def _chat_client(tokens, *, first_delay: float):
+    completions = _StubCompletions(tokens, first_delay=first_delay)
+    return SimpleNamespace(chat=SimpleNamespace(completions=completions)), completions
+
+
+async def _collect(client: OpenAIChatClient) -> str:
+    parts = []
+    async for token in client.stream_chat([{"role": "user", "content": "hi"}]):
+        parts.append(token)
+    return "".join(parts)
+
+
+def _openai_settings() -> OpenAISettings:
+    return OpenAISettings(api_key=None, organization=None, base_url=None)
+
+
+@pytest.mark.asyncio
+async def test_hedge_backup_wins_when_primary_is_slow():
+    primary, primary_completions = _chat_client(["slow"], first_delay=1.0)
+    backup, backup_completions = _chat_client(["fa", "st"], first_delay=0.0)
+    llm_cfg = _llm_settings(hedge_enabled=True, hedge_delay_seconds=0.02, hedge_model="backup-model")
+    client = OpenAIChatClient(_openai_settings(), llm_cfg, client=primary, hedge_client=backup)
+
+    assert await _collect(client) == "fast"
+    assert backup_completions.models == ["backup-model"]
+    assert primary_completions.streams[0].closed
+    stats = client.hedge_stats.as_dict()
+    assert stats["hedged"] == 1
+    assert stats["backup_wins"] == 1
+
+
+@pytest.mark.asyncio
+async def test_hedge_not_fired_when_primary_is_fast():
+    primary, _ = _chat_client(["hello"], first_delay=0.0)
+    backup, backup_completions = _chat_client(["backup"], first_delay=0.0)
+    llm_cfg = _llm_settings(hedge_enabled=True, hedge_delay_seconds=0.5)
+    client = OpenAIChatClient(_openai_settings(), llm_cfg, client=primary, hedge_client=backup)
+
+    assert await _collect(client) == "hello"
+    assert backup_completions.streams == []
+    assert client.hedge_stats.hedged == 0
+
+
+@pytest.mark.asyncio
+async def test_hedge_budget_caps_backup_requests():
+    primary, _ = _chat_client(["slow"], first_delay=0.05)
+    backup, backup_completions = _chat_client(["backup"], first_delay=0.0)
+    llm_cfg = _llm_settings(
+        hedge_enabled=True,
+        hedge_delay_seconds=0.01,
+        hedge_budget_ratio=0.0,
+        hedge_budget_burst=1.0,
+    )
+    client = OpenAIChatClient(_openai_settings(), llm_cfg, client=primary, hedge_client=backup)
+
+    assert await _collect(client) == "backup"
+    assert await _collect(client) == "slow"
+    assert len(backup_completions.streams) == 1
+    assert client.hedge_stats.budget_denied == 1
+
+
+class _HedgeLimiter:
+    def __init__(self, *, grant_hedge: bool):
+        self.grant_hedge = grant_hedge
+        self.acquired = []
+        self.tried = []
+
+    async def acquire(self, *, lane, tokens):
+        self.acquired.append(lane)
+
+    async def try_acquire(self, *, lane, tokens):
+        self.tried.append(lane)
+        return self.grant_hedge
+
+    async def settle(self, *, estimated, actual):
+        return None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("grant_hedge", [True, False])
+async def test_hedge_backup_is_charged_to_rate_limiter(grant_hedge):
+    primary, _ = _chat_client(["slow"], first_delay=0.05)
+    backup, backup_completions = _chat_client(["backup"], first_delay=0.0)
+    llm_cfg = _llm_settings(hedge_enabled=True, hedge_delay_seconds=0.01)
+    limiter = _HedgeLimiter(grant_hedge=grant_hedge)
+    client = OpenAIChatClient(_openai_settings(), llm_cfg, client=primary, hedge_client=backup, rate_limiter=limiter)
+
+    assert await _collect(client) == ("backup" if grant_hedge else "slow")
+    assert limiter.acquired == ["interactive"]
+    assert limiter.tried == ["interactive"]
+    assert len(backup_completions.streams) == (1 if grant_hedge else 0)
+    assert client.hedge_stats.quota_denied == (0 if grant_hedge else 1)
+    # A denied hedge hands its budget credit back.
+    assert client.hedge_budget.credits == (4.0 if grant_hedge else 5.0)
+
+
+def test_hedge_budget_refills_by_ratio():
+    budget = HedgeBudget(ratio=0.5, burst=1.0)
+    assert budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    budget.deposit()
+    assert budget.withdraw()
+
+
+def _sse_body(*events) -> bytes:
+    lines = [b"data: " + json.dumps(event).encode() + b"\n\n" for event in events]
+    return b"".join(lines) + b"data: [DONE]\n\n"
+
+
+def _text_event(text: str) -> dict:
+    return {"id": "c1", "object": "chat.completion.chunk", "created": 0, "model": "dummy",
+            "choices": [{"index": 0, "delta": {"content": text}, "finish_reason": None}]}
+
+
+def _mock_http(body: bytes, *, status_code: int = 200) -> httpx.AsyncClient:
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.path.endswith("/chat/completions")
+        return httpx.Response(status_code, content=body, headers={"content-type": "text/event-stream"})
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("transport", ["sdk", "raw"])
+async def test_stream_transports_yield_same_text(transport):
+    body = _sse_body(_text_event("Hel"), _text_event("lo"))
+    cfg = OpenAISettings(api_key="key", organization=None, base_url="http://llm.test/v1")
+    client = OpenAIChatClient(cfg, _llm_settings(stream_transport=transport), http_client=_mock_http(body))
+    try:
+        assert await _collect(client) == "Hello"
+    finally:
+        await client.close()
+
+
+@pytest.mark.asyncio
+async def test_raw_transport_reports_tool_calls_on_empty_stream():
+    tool_event = {"choices": [{"index": 0, "delta": {"tool_calls": [{"index": 0, "id": "t1"}]}}]}
+    cfg = OpenAISettings(api_key="key", organization=None, base_url="http://llm.test/v1")
+    client = OpenAIChatClient(
+        cfg,
+        _llm_settings(stream_transport="raw"),
+        http_client=_mock_http(_sse_body(tool_event)),
+    )
+    try:
+        with pytest.raises(RuntimeError) as excinfo:
+            await _collect(client)
+    finally:
+        await client.close()
+    cause = excinfo.value.__cause__
+    assert isinstance(cause, LLMStreamEmptyError)
+    assert cause.tool_calls == [{"index": 0, "id": "t1"}]
+
+
+@pytest.mark.asyncio
+async def test_iter_sse_data_handles_split_chunks():
+    async def chunks():
+        yield b"data: {\"a\""
+        yield b": 1}\n\n: keep-alive\n"
+        yield b"data: [DONE]"
+
+    payloads = [payload async for payload in iter_sse_data(chunks())]
+    assert payloads == [b'{"a": 1}', b"[DONE]"]
+
+
+def test_parse_chat_event_raises_on_error_payload():
+    with pytest.raises(RawStreamError):
+        parse_chat_event(b'{"error": {"message": "overloaded"}}')
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("transport", ["sdk", "raw"])
+async def test_stream_reports_cached_prompt_tokens(transport):
+    usage_event = {
+        "id": "c1",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "dummy",
+        "choices": [],
+        "usage": {
+            "prompt_tokens": 120,
+            "completion_tokens": 2,
+            "total_tokens": 122,
+            "prompt_tokens_details": {"cached_tokens": 96},
+        },
+    }
+    seen = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen["body"] = json.loads(request.content)
+        body = _sse_body(_text_event("hi"), usage_event)
+        return httpx.Response(200, content=body, headers={"content-type": "text/event-stream"})
+
+    cfg = OpenAISettings(api_key="key", organization=None, base_url="http://llm.test/v1")
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client = OpenAIChatClient(
+        cfg,
+        _llm_settings(stream_transport=transport, stream_include_usage=True),
+        http_client=http_client,
+    )
+    usage: dict = {}
+    try:
+        async for _ in client.stream_chat([{"role": "user", "content": "hi"}], usage=usage):
+            pass
+    finally:
+        await client.close()
+
+    assert seen["body"]["stream_options"] == {"include_usage": True}
+    assert usage == {"prompt_tokens": 120, "completion_tokens": 2, "cached_tokens": 96}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("transport", ["sdk", "raw"])
+async def test_stream_omits_stream_options_by_default(transport):
+    seen = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen["body"] = json.loads(request.content)
+        body = _sse_body(_text_event("hi"))
+        return httpx.Response(200, content=body, headers={"content-type": "text/event-stream"})
+
+    cfg = OpenAISettings(api_key="key", organization=None, base_url="http://llm.test/v1")
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client = OpenAIChatClient(cfg, _llm_settings(stream_transport=transport), http_client=http_client)
+    try:
+        async for _ in client.stream_chat([{"role": "user", "content": "hi"}], usage={}):
+            pass
+    finally:
+        await client.close()
+
+    assert "stream_options" not in seen["body"]
+
+
+class _RecordingLimiter:
+    def __init__(self):
+        self.acquired = []
+        self.settled = []
+
+    async def acquire(self, *, lane, tokens):
+        self.acquired.append((lane, tokens))
+
+    async def settle(self, *, estimated, actual):
+        self.settled.append((estimated, actual))
+
+
+@pytest.mark.asyncio
+async def test_stream_charges_rate_limiter_and_settles_real_usage():
+    usage_event = {"choices": [], "usage": {"prompt_tokens": 10, "completion_tokens": 2}}
+    cfg = OpenAISettings(api_key="key", organization=None, base_url="http://llm.test/v1")
+    limiter = _RecordingLimiter()
+    client = OpenAIChatClient(
+        cfg,
+        _llm_settings(stream_transport="raw"),
+        http_client=_mock_http(_sse_body(_text_event("hi"), usage_event)),
+        rate_limiter=limiter,
+    )
+    try:
+        async for _ in client.stream_chat([{"role": "user", "content": "hi"}], usage={}, lane="background"):
+            pass
+    finally:
+        await client.close()
+
+    [(lane, estimated)] = limiter.acquired
+    assert lane == "background"
+    assert estimated > 16  # completion budget plus prompt estimate
+    assert limiter.settled == [(estimated, 12)]
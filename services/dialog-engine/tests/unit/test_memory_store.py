@@ -58,3 +58,34 @@ async def test_append_turn_creates_db(tmp_path: Path):
     turns = await store.fetch_recent("sess")
 
     assert turns and turns[-1].content == "hello"
+
+
+@pytest.mark.asyncio
+async def test_append_turn_caches_token_count(tmp_path: Path):
+    db_path = tmp_path / "memory.sqlite"
+    store = ShortTermMemoryStore(db_path=str(db_path), default_limit=5, token_counter=len)
+
+    await store.append_turn(session_id="sess", role="user", content="hello")
+
+    turns = await store.fetch_recent("sess")
+    assert turns[-1].tokens == 5
+
+
+@pytest.mark.asyncio
+async def test_fetch_recent_backfills_tokens_for_legacy_rows(tmp_path: Path):
+    db_path = tmp_path / "memory.sqlite"
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TABLE turns (id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT, role TEXT, text TEXT)"
+    )
+    conn.execute("INSERT INTO turns(session_id, role, text) VALUES ('sess', 'user', 'abc')")
+    conn.commit()
+    conn.close()
+
+    store = ShortTermMemoryStore(db_path=str(db_path), default_limit=5, token_counter=len)
+    turns = await store.fetch_recent("sess")
+
+    assert turns[0].tokens == 3
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT tokens FROM turns").fetchone() == (3,)
+    conn.close()
@@ -0,0 +1,49 @@
+import pytest
+
+from dialog_engine.model_router import TIER_FAST, TIER_STRONG, ModelRouter
+
+
+@pytest.fixture
+def router() -> ModelRouter:
+    return ModelRouter(fast_model="small", strong_model="large", fast_max_chars=20, audit_size=3)
+
+
+@pytest.mark.parametrize(
+    "text, tier, reason",
+    [
+        ("666", TIER_FAST, "reaction"),
+        ("哈哈哈哈", TIER_FAST, "reaction"),
+        ("wwwww", TIER_FAST, "reaction"),
+        ("晚上好", TIER_FAST, "short"),
+        ("为什么这个boss这么难打", TIER_STRONG, "question"),
+        ("how do you beat this boss?", TIER_STRONG, "question"),
+        ("今天我去公园散步然后看到了一只特别可爱的小猫咪在晒太阳", TIER_STRONG, "long"),
+    ],
+)
+def test_route_classifies_turns(router, text, tier, reason):
+    decision = router.route(session_id="s", user_text=text, meta={})
+
+    assert decision.tier == tier
+    assert decision.reason == reason
+    assert decision.model == ("small" if tier == TIER_FAST else "large")
+
+
+def test_meta_can_force_tier(router):
+    decision = router.route(session_id="s", user_text="666", meta={"model_tier": "strong"})
+
+    assert decision.tier == TIER_STRONG
+    assert decision.reason == "forced"
+
+
+def test_stats_and_bounded_audit_log(router):
+    for text in ("666", "hi", "why?", "ok"):
+        decision = router.route(session_id="s", user_text=text, meta={})
+        router.record_ttft(decision, 100.0)
+
+    stats = router.stats()
+    assert stats["fast"]["calls"] == 3
+    assert stats["strong"]["calls"] == 1
+    assert stats["fast"]["avg_ttft_ms"] == 100.0
+    decisions = router.recent_decisions()
+    assert len(decisions) == 3
+    assert decisions[-1]["text"] == "ok"
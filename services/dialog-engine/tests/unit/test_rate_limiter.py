@@ -0,0 +1,87 @@
+import pytest
+
+from dialog_engine.rate_limiter import (
+    LANE_BACKGROUND,
+    LANE_INTERACTIVE,
+    LLMRateLimiter,
+    RateLimitShedError,
+)
+
+
+class _BrokenRedis:
+    def register_script(self, script):
+        async def _call(keys, args):
+            raise ConnectionError("redis down")
+
+        return _call
+
+
+@pytest.mark.asyncio
+async def test_disabled_limiter_never_waits():
+    limiter = LLMRateLimiter()
+
+    for _ in range(100):
+        await limiter.acquire(lane=LANE_BACKGROUND, tokens=10_000)
+
+    assert limiter.enabled is False
+
+
+@pytest.mark.asyncio
+async def test_background_leaves_reserve_for_interactive():
+    limiter = LLMRateLimiter(rpm=10, background_reserve=0.5, background_max_wait=0.0)
+
+    for _ in range(5):
+        await limiter.acquire(lane=LANE_BACKGROUND)
+    with pytest.raises(RateLimitShedError):
+        await limiter.acquire(lane=LANE_BACKGROUND)
+    for _ in range(5):
+        await limiter.acquire(lane=LANE_INTERACTIVE)
+
+    stats = limiter.stats()
+    assert stats["background"]["granted"] == 5
+    assert stats["background"]["shed"] == 1
+    assert stats["interactive"]["granted"] == 5
+    assert stats["interactive"]["overdrafts"] == 0
+
+
+@pytest.mark.asyncio
+async def test_interactive_overdrafts_instead_of_blocking():
+    limiter = LLMRateLimiter(tpm=100, interactive_max_wait=0.0)
+
+    await limiter.acquire(lane=LANE_INTERACTIVE, tokens=100)
+    await limiter.acquire(lane=LANE_INTERACTIVE, tokens=100)
+
+    assert limiter.stats()["interactive"]["overdrafts"] == 1
+
+
+@pytest.mark.asyncio
+async def test_try_acquire_never_waits_or_overdrafts():
+    limiter = LLMRateLimiter(rpm=1, interactive_max_wait=5.0)
+
+    assert await limiter.try_acquire(lane=LANE_INTERACTIVE, tokens=10) is True
+    assert await limiter.try_acquire(lane=LANE_INTERACTIVE, tokens=10) is False
+    assert limiter.stats()["interactive"]["overdrafts"] == 0
+
+
+@pytest.mark.asyncio
+async def test_settle_refunds_overestimated_tokens():
+    limiter = LLMRateLimiter(tpm=1000, background_reserve=0.0, background_max_wait=0.0)
+
+    await limiter.acquire(lane=LANE_BACKGROUND, tokens=900)
+    with pytest.raises(RateLimitShedError):
+        await limiter.acquire(lane=LANE_BACKGROUND, tokens=500)
+    await limiter.settle(estimated=900, actual=100)
+    await limiter.acquire(lane=LANE_BACKGROUND, tokens=500)
+
+
+@pytest.mark.asyncio
+async def test_redis_errors_fall_back_to_local_buckets():
+    limiter = LLMRateLimiter(redis_client=_BrokenRedis(), rpm=1, background_reserve=0.0, background_max_wait=0.0)
+
+    await limiter.acquire(lane=LANE_BACKGROUND)
+    with pytest.raises(RateLimitShedError):
+        await limiter.acquire(lane=LANE_BACKGROUND)
+
+    stats = limiter.stats()
+    assert stats["backend"] == "redis"
+    assert stats["background"]["backend_errors"] == 2
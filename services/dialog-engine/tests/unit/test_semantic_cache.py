@@ -0,0 +1,67 @@
+import pytest
+
+from dialog_engine.semantic_cache import HashingEmbedder, SemanticReplyCache
+
+
+def _cache(**kwargs) -> SemanticReplyCache:
+    params = {"embedder": HashingEmbedder(), "threshold": 0.8, "ttl_seconds": 600, "max_entries": 8}
+    params.update(kwargs)
+    return SemanticReplyCache(**params)
+
+
+@pytest.mark.asyncio
+async def test_paraphrase_hits_and_unrelated_question_misses():
+    cache = _cache()
+    await cache.store("persona", "这是什么游戏？", "这是艾尔登法环！")
+
+    hit = await cache.lookup("persona", "这是什么游戏啊")
+    assert hit is not None
+    assert hit.reply == "这是艾尔登法环！"
+    assert hit.similarity >= 0.8
+
+    assert await cache.lookup("persona", "你今年多大了") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_punctuation_and_case_variants_match_exactly():
+    cache = _cache(threshold=0.99)
+    await cache.store("persona", "What game is this?", "Elden Ring!")
+
+    hit = await cache.lookup("persona", "what GAME is this")
+    assert hit is not None and hit.similarity == 1.0
+
+
+@pytest.mark.asyncio
+async def test_scopes_are_isolated():
+    cache = _cache()
+    await cache.store("persona-a", "how old are you", "17 forever")
+
+    assert await cache.lookup("persona-b", "how old are you") is None
+
+
+@pytest.mark.asyncio
+async def test_ttl_expiry(monkeypatch):
+    cache = _cache(ttl_seconds=10)
+    clock = [1000.0]
+    monkeypatch.setattr("dialog_engine.semantic_cache.time.monotonic", lambda: clock[0])
+    await cache.store("persona", "how old are you", "17 forever")
+
+    clock[0] += 11
+    assert await cache.lookup("persona", "how old are you") is None
+    assert cache.stats()["entries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction_bounds_entries():
+    cache = _cache(max_entries=2)
+    await cache.store("persona", "first question", "one")
+    await cache.store("persona", "second question", "two")
+    assert await cache.lookup("persona", "first question") is not None
+    await cache.store("persona", "third question", "three")
+
+    assert cache.stats()["entries"] == 2
+    assert (await cache.lookup("persona", "first question")).reply == "one"
+    hit = await cache.lookup("persona", "second question")
+    assert hit is None or hit.reply != "two"
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from dialog_engine.singleflight import SingleFlight, flight_key
+
+
+class _Upstream:
+    def __init__(self, tokens, *, delay: float = 0.01, fail: bool = False) -> None:
+        self.tokens = list(tokens)
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self.closed = False
+
+    async def stream(self):
+        self.calls += 1
+        try:
+            for token in self.tokens:
+                await asyncio.sleep(self.delay)
+                yield token
+            if self.fail:
+                raise RuntimeError("upstream failed")
+        finally:
+            self.closed = True
+
+
+async def _collect(agen, limit=None):
+    out = []
+    async for token in agen:
+        out.append(token)
+        if limit is not None and len(out) >= limit:
+            break
+    await agen.aclose()
+    return out
+
+
+def test_flight_key_normalizes_input():
+    assert flight_key("  ＨＥＬＬＯ   World ", "persona") == flight_key("hello world", "persona")
+    assert flight_key("hello", "persona-a") != flight_key("hello", "persona-b")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_requests_share_one_upstream():
+    upstream = _Upstream(["a", "b", "c"])
+    flights = SingleFlight()
+
+    results = await asyncio.gather(
+        _collect(flights.stream("k", upstream.stream)),
+        _collect(flights.stream("k", upstream.stream)),
+        _collect(flights.stream("k", upstream.stream)),
+    )
+
+    assert results == [["a", "b", "c"]] * 3
+    assert upstream.calls == 1
+    assert flights.stats() == {"flights": 1, "coalesced": 2, "in_flight": 0}
+
+
+@pytest.mark.asyncio
+async def test_late_subscriber_replays_buffered_deltas():
+    upstream = _Upstream(["a", "b", "c"], delay=0.02)
+    flights = SingleFlight()
+
+    first = asyncio.create_task(_collect(flights.stream("k", upstream.stream)))
+    await asyncio.sleep(0.03)
+    second = await _collect(flights.stream("k", upstream.stream))
+
+    assert await first == ["a", "b", "c"]
+    assert second == ["a", "b", "c"]
+    assert upstream.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_subscriber_cancellation_is_independent():
+    upstream = _Upstream(["a", "b", "c"])
+    flights = SingleFlight()
+
+    early, full = await asyncio.gather(
+        _collect(flights.stream("k", upstream.stream), limit=1),
+        _collect(flights.stream("k", upstream.stream)),
+    )
+
+    assert early == ["a"]
+    assert full == ["a", "b", "c"]
+
+
+@pytest.mark.asyncio
+async def test_upstream_cancelled_when_all_subscribers_leave():
+    upstream = _Upstream(["a", "b", "c", "d"], delay=0.02)
+    flights = SingleFlight()
+
+    assert await _collect(flights.stream("k", upstream.stream), limit=1) == ["a"]
+    await asyncio.sleep(0.01)
+
+    assert upstream.closed
+    assert flights.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_upstream_error_reaches_every_subscriber():
+    upstream = _Upstream(["a"], fail=True)
+    flights = SingleFlight()
+
+    results = await asyncio.gather(
+        _collect(flights.stream("k", upstream.stream)),
+        _collect(flights.stream("k", upstream.stream)),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from dialog_engine.memory_store import ShortTermMemoryStore
+from dialog_engine.summarizer import RollingSummarizer
+
+
+class _RecordingLLM:
+    def __init__(self) -> None:
+        self.calls = []
+
+    async def stream_chat(self, messages, **kwargs):
+        self.calls.append(list(messages))
+        await asyncio.sleep(0)
+        yield f"summary-{len(self.calls)}"
+
+
+async def _store_with_turns(tmp_path, count: int) -> ShortTermMemoryStore:
+    store = ShortTermMemoryStore(db_path=str(tmp_path / "stm.sqlite"), default_limit=20)
+    for idx in range(count):
+        await store.append_turn(session_id="sess", role="user", content=f"turn {idx + 1}")
+    return store
+
+
+@pytest.mark.asyncio
+async def test_summarizer_waits_for_min_batch(tmp_path):
+    store = await _store_with_turns(tmp_path, 6)
+    llm = _RecordingLLM()
+
+    async def client():
+        return llm
+
+    summarizer = RollingSummarizer(store=store, llm_client=client, min_turns=4)
+    summarizer.schedule("sess", 4)  # only turns 1-3 evicted
+    await summarizer.wait_idle()
+    assert llm.calls == []
+    assert await store.fetch_summary("sess") is None
+
+    summarizer.schedule("sess", 6)  # turns 1-5 evicted
+    await summarizer.wait_idle()
+    record = await store.fetch_summary("sess")
+    assert record.summary == "summary-1"
+    assert record.last_turn_id == 5
+
+
+@pytest.mark.asyncio
+async def test_summarizer_folds_incrementally(tmp_path):
+    store = await _store_with_turns(tmp_path, 12)
+    llm = _RecordingLLM()
+
+    async def client():
+        return llm
+
+    summarizer = RollingSummarizer(store=store, llm_client=client, min_turns=2)
+    summarizer.schedule("sess", 5)
+    await summarizer.wait_idle()
+    summarizer.schedule("sess", 9)
+    await summarizer.wait_idle()
+
+    record = await store.fetch_summary("sess")
+    assert record.last_turn_id == 8
+    assert summarizer.folds == 2
+    second_prompt = llm.calls[1][1]["content"]
+    assert "summary-1" in second_prompt
+    assert "turn 5" in second_prompt and "turn 4" not in second_prompt
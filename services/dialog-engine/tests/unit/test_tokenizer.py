@@ -0,0 +1,39 @@
+import pytest
+
+from dialog_engine import tokenizer
+from dialog_engine.tokenizer import MESSAGE_OVERHEAD_TOKENS, TokenCounter, estimate_tokens
+
+
+def test_estimate_tokens_counts_cjk_characters():
+    assert estimate_tokens("你好呀") == 3
+    assert estimate_tokens("今天天气很好") > estimate_tokens("今天")
+
+
+def test_estimate_tokens_latin_words():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("   ") == 0
+    assert estimate_tokens("hi") == 1
+    assert estimate_tokens("interesting words") == 5
+
+
+def test_token_counter_message_overhead():
+    counter = TokenCounter()
+    assert counter.count_message("hello") == counter.count("hello") + MESSAGE_OVERHEAD_TOKENS
+
+
+@pytest.mark.asyncio
+async def test_token_counter_loads_encoding_lazily(monkeypatch):
+    loads = []
+
+    def _fake_load(encoding, model):
+        loads.append((encoding, model))
+        return None
+
+    monkeypatch.setattr(tokenizer, "_load_encoding", _fake_load)
+    counter = TokenCounter(model="dummy")
+    assert loads == []
+
+    await counter.warmup()
+    assert counter.count("hello world") == estimate_tokens("hello world")
+    assert counter.exact is False
+    assert loads == [(None, "dummy")]
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from dialog_engine import app as dialog_app
+from dialog_engine import tts_streamer
+from dialog_engine.warmup import WarmupState, run_warmup
+
+
+@pytest.mark.asyncio
+async def test_run_warmup_marks_ready_and_records_components():
+    state = WarmupState()
+    calls: list[str] = []
+
+    async def ok_step() -> None:
+        calls.append("ok")
+
+    async def failing_step() -> None:
+        raise RuntimeError("boom")
+
+    async def slow_step() -> None:
+        await asyncio.sleep(1)
+
+    await run_warmup(state, {"asr": ok_step, "llm": failing_step, "tts": slow_step}, timeout=0.05)
+
+    assert state.ready is True
+    assert calls == ["ok"]
+    assert state.components == {"asr": "ok", "llm": "error", "tts": "timeout"}
+    assert state.as_dict()["duration_ms"] is not None
+
+
+@pytest.mark.asyncio
+async def test_tts_warmup_keeps_provider_for_streams(monkeypatch):
+    built: list = []
+
+    class _Provider:
+        def __init__(self) -> None:
+            self.warmed = False
+            self.closed = False
+
+        async def warmup(self) -> None:
+            self.warmed = True
+
+        async def shutdown(self) -> None:
+            self.closed = True
+
+    def _build(**_kwargs):
+        built.append(_Provider())
+        return built[-1]
+
+    monkeypatch.setattr(tts_streamer, "_build_provider", _build)
+    monkeypatch.setattr(tts_streamer, "_warm_provider", None)
+
+    await tts_streamer.warmup()
+    provider, owned = tts_streamer._acquire_provider(None, None)
+
+    assert provider is built[0] and provider.warmed and not provider.closed
+    assert owned is False
+
+    override, owned = tts_streamer._acquire_provider(3, None)
+    assert override is built[1] and owned is True
+
+    await tts_streamer.shutdown()
+    assert built[0].closed is True
+    assert tts_streamer._warm_provider is None
+
+
+def test_ready_endpoint_reflects_warmup_state(monkeypatch):
+    state = WarmupState()
+    monkeypatch.setattr(dialog_app, "warmup_state", state)
+    client = TestClient(dialog_app.app)
+
+    assert client.get("/ready").status_code == 503
+    assert client.get("/health").json()["ready"] is False
+
+    state.mark_ready()
+
+    assert client.get("/ready").status_code == 200
+    assert client.get("/health").json()["ready"] is True
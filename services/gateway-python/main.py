@@ -1,16 +1,18 @@
 import asyncio
 import logging
 import os
-from contextlib import asynccontextmanager
-from typing import Dict
+import uuid
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, Dict, List, Optional, Sequence, Union
 
 import websockets
 import httpx
 from urllib.parse import urlparse, urlunparse
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
-from src.services.asr_routes import bp_asr as _flask_bp  # type: ignore
-from fastapi.middleware.wsgi import WSGIMiddleware
-from flask import Flask as _Flask  # shim for mounting Flask blueprint
+from src.services.asr_routes import router as asr_router
+from src.core.hash_ring import HashRing, parse_nodes
+from src.core.http_pool import shared_pool as http_pool
+from src.core.ws_mux import FRAME_TEXT, MuxChannel, MuxClientPool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse, JSONResponse
 import uvicorn
@@ -22,11 +24,34 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# 后端服务配置
+# 后端服务配置（逗号分隔可配置多个副本，按会话一致性哈希路由）
 BACKEND_SERVICES = {
     "input": os.getenv("INPUT_HANDLER_URL", "ws://localhost:8001"),
     "output": os.getenv("OUTPUT_HANDLER_URL", "ws://localhost:8002")
 }
+_backend_rings: Dict[str, HashRing] = {}
+
+
+def backend_ring(backend: str) -> HashRing:
+    """返回后端的一致性哈希环；BACKEND_SERVICES 变化后自动重建"""
+    value = BACKEND_SERVICES[backend]
+    ring = _backend_rings.get(value)
+    if ring is None:
+        ring = HashRing(parse_nodes(value))
+        if len(_backend_rings) > 16:
+            _backend_rings.clear()
+        _backend_rings[value] = ring
+    return ring
+
+
+def backend_candidates(backend: str, route_key: str) -> List[str]:
+    """会话所属副本在前，其余副本按环上顺序作为故障时的备选"""
+    return list(backend_ring(backend).iter_nodes(route_key))
+
+# WebSocket 多路复用：到每个后端只保持少量常驻连接，前端会话在其上复用（后端需提供 /ws/mux）
+GATEWAY_WS_MUX_ENABLED = os.getenv("GATEWAY_WS_MUX_ENABLED", "false").strip().lower() in {"1", "true", "yes", "on"}
+GATEWAY_WS_MUX_POOL_SIZE = int(os.getenv("GATEWAY_WS_MUX_POOL_SIZE", "4"))
+GATEWAY_WS_MUX_MAX_INBOX = int(os.getenv("GATEWAY_WS_MUX_MAX_INBOX", "256"))
 
 # 活跃连接跟踪
 active_connections: Dict[str, WebSocket] = {}
@@ -38,14 +63,13 @@ async def lifespan(app: FastAPI):
     logger.info(f"Routing to: {BACKEND_SERVICES}")
     yield
     # 关闭时执行
+    await proxy.close()
+    await http_pool.aclose()
     logger.info("API Gateway shutdown")
 
 app = FastAPI(lifespan=lifespan)
-# 将 Flask Blueprint 包装为一个最小 Flask 应用并挂载到 FastAPI
-_flask_app = _Flask("gateway_asr_mount")
-_flask_app.register_blueprint(_flask_bp)
-# 挂载到 /api 前缀（最终路由为 /api/asr）
-app.mount("/api", WSGIMiddleware(_flask_app))
+# ASR 兼容路由（最终路由为 /api/asr），原生异步处理，不再经过 WSGI 线程池
+app.include_router(asr_router, prefix="/api")
 
 # 配置CORS
 origins = [
@@ -63,13 +87,113 @@ app.add_middleware(
 )
 
 class WebSocketProxy:
-    def __init__(self):
+    def __init__(self, mux_enabled: bool = GATEWAY_WS_MUX_ENABLED, mux_pool_size: int = GATEWAY_WS_MUX_POOL_SIZE):
         self.connection_id = 0
+        self.mux_enabled = mux_enabled
+        self.mux_pool_size = mux_pool_size
+        self.mux_pools: Dict[str, MuxClientPool] = {}
+
+    def mux_pool(self, base_url: str) -> MuxClientPool:
+        """每个后端副本一个载体连接池，按副本地址区分"""
+        pool = self.mux_pools.get(base_url)
+        if pool is None:
+            pool = MuxClientPool(f"{base_url}/ws/mux", size=self.mux_pool_size, max_inbox=GATEWAY_WS_MUX_MAX_INBOX)
+            self.mux_pools[base_url] = pool
+        return pool
+
+    def mux_stats(self) -> Dict[str, Any]:
+        return {backend: pool.stats() for backend, pool in self.mux_pools.items()}
+
+    async def close(self):
+        pools, self.mux_pools = self.mux_pools, {}
+        for pool in pools.values():
+            await pool.close()
+
+    async def proxy_multiplexed(
+        self,
+        client_ws: WebSocket,
+        backend: str,
+        path: str,
+        endpoint_type: str,
+        route_key: Optional[str] = None,
+    ):
+        """通过常驻的多路复用连接代理前端会话；route_key 决定会话落在哪个副本"""
+        self.connection_id += 1
+        conn_id = f"{endpoint_type}_{self.connection_id}"
+        channel: Optional[MuxChannel] = None
+
+        try:
+            await client_ws.accept()
+            active_connections[conn_id] = client_ws
+            channel = await self._open_channel(backend_candidates(backend, route_key or conn_id), path)
+            logger.info(f"Client connected to {endpoint_type} (ID: {conn_id}, mux session {channel.session_id})")
+
+            client_to_backend = asyncio.create_task(self._forward_to_channel(client_ws, channel, conn_id))
+            backend_to_client = asyncio.create_task(self._forward_from_channel(channel, client_ws, conn_id))
+            done, pending = await asyncio.wait(
+                [client_to_backend, backend_to_client],
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in pending:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+
+            # 后端结束会话时，把关闭码（如 4004 无效 task_id）转给前端
+            if backend_to_client in done and channel.close_code is not None:
+                try:
+                    await client_ws.close(code=channel.close_code, reason=channel.close_reason)
+                except Exception:
+                    pass
+        except Exception as e:
+            logger.error(f"Error in mux proxy for {conn_id}: {e}")
+            try:
+                await client_ws.close(code=1011, reason=f"Proxy error: {str(e)}")
+            except Exception:
+                pass
+        finally:
+            if channel is not None:
+                await channel.close()
+            if conn_id in active_connections:
+                del active_connections[conn_id]
+            logger.info(f"Connection {conn_id} cleaned up")
+
+    async def _open_channel(self, base_urls: Sequence[str], path: str) -> MuxChannel:
+        last_error: Optional[Exception] = None
+        for base_url in base_urls:
+            try:
+                return await self.mux_pool(base_url).open(path)
+            except Exception as e:
+                logger.warning(f"Mux backend {base_url} unavailable for {path}: {e}")
+                last_error = e
+        raise last_error or ConnectionError("no backend available")
+
+    async def _forward_to_channel(self, client_ws: WebSocket, channel: MuxChannel, conn_id: str):
+        while True:
+            message = await client_ws.receive()
+            if message["type"] == "websocket.disconnect":
+                logger.info(f"WebSocket disconnect: {conn_id} -> backend")
+                break
+            if message.get("text") is not None:
+                await channel.send_text(message["text"])
+            elif message.get("bytes") is not None:
+                await channel.send_bytes(message["bytes"])
+
+    async def _forward_from_channel(self, channel: MuxChannel, client_ws: WebSocket, conn_id: str):
+        async for kind, payload in channel:
+            if kind == FRAME_TEXT:
+                await client_ws.send_text(payload.decode("utf-8"))
+            else:
+                await client_ws.send_bytes(payload)
+        logger.info(f"Backend closed mux session for {conn_id}")
     
-    async def proxy_websocket(self, client_ws: WebSocket, backend_url: str, endpoint_type: str):
-        """代理WebSocket连接到后端服务"""
+    async def proxy_websocket(self, client_ws: WebSocket, backend_url: Union[str, Sequence[str]], endpoint_type: str):
+        """代理WebSocket连接到后端服务；传入多个地址时依次尝试，首个可用者胜出"""
         self.connection_id += 1
         conn_id = f"{endpoint_type}_{self.connection_id}"
+        backend_urls = [backend_url] if isinstance(backend_url, str) else list(backend_url)
         
         try:
             # 接受客户端连接
@@ -78,8 +202,8 @@ class WebSocketProxy:
             logger.info(f"Client connected to {endpoint_type} (ID: {conn_id})")
             
             # 连接到后端服务
-            async with websockets.connect(backend_url) as backend_ws:
-                logger.info(f"Connected to backend: {backend_url}")
+            async with AsyncExitStack() as stack:
+                backend_ws = await self._connect_backend(stack, backend_urls)
                 
                 # 创建双向代理任务
                 client_to_backend = asyncio.create_task(
@@ -116,6 +240,19 @@ class WebSocketProxy:
                 del active_connections[conn_id]
             logger.info(f"Connection {conn_id} cleaned up")
     
+    async def _connect_backend(self, stack: AsyncExitStack, backend_urls: Sequence[str]):
+        last_error: Optional[Exception] = None
+        for url in backend_urls:
+            try:
+                backend_ws = await stack.enter_async_context(websockets.connect(url))
+                logger.info(f"Connected to backend: {url}")
+                return backend_ws
+            except Exception as e:
+                if len(backend_urls) > 1:
+                    logger.warning(f"Backend {url} unavailable: {e}")
+                last_error = e
+        raise last_error or ConnectionError("no backend available")
+
     async def _forward_messages(self, source, destination, direction: str):
         """转发消息从source到destination"""
         try:
@@ -153,28 +290,47 @@ proxy = WebSocketProxy()
 @app.websocket("/ws/input")
 async def proxy_input(websocket: WebSocket):
     """代理输入WebSocket连接到input-handler服务"""
-    backend_url = f"{BACKEND_SERVICES['input']}/ws/input"
-    await proxy.proxy_websocket(websocket, backend_url, "input")
+    # 输入端会话在连接后才由 input-handler 分配 task_id，这里按连接散列即可
+    route_key = uuid.uuid4().hex
+    if proxy.mux_enabled:
+        await proxy.proxy_multiplexed(websocket, "input", "/ws/input", "input", route_key=route_key)
+        return
+    backend_urls = [f"{base}/ws/input" for base in backend_candidates("input", route_key)]
+    await proxy.proxy_websocket(websocket, backend_urls, "input")
 
 @app.websocket("/ws/output/{task_id}")
 async def proxy_output(websocket: WebSocket, task_id: str):
     """代理输出WebSocket连接到output-handler服务"""
-    backend_url = f"{BACKEND_SERVICES['output']}/ws/output/{task_id}"
-    await proxy.proxy_websocket(websocket, backend_url, "output")
+    if proxy.mux_enabled:
+        await proxy.proxy_multiplexed(websocket, "output", f"/ws/output/{task_id}", "output", route_key=task_id)
+        return
+    backend_urls = [f"{base}/ws/output/{task_id}" for base in backend_candidates("output", task_id)]
+    await proxy.proxy_websocket(websocket, backend_urls, "output")
 
 
-def _output_http_base() -> str:
+def _output_http_base(session_id: Optional[str] = None) -> str:
     """Derive HTTP base URL for output-handler from WS URL env.
 
     Converts ws://host:port -> http://host:port, wss:// -> https://
+    With several replicas, picks the one owning ``session_id`` (first replica otherwise).
     """
-    ws_url = BACKEND_SERVICES.get("output", "ws://localhost:8002")
+    ring = backend_ring("output")
+    ws_url = ring.get(session_id) if session_id else ring.nodes[0]
     parsed = urlparse(ws_url)
     scheme = "https" if parsed.scheme == "wss" else "http"
     http_parsed = parsed._replace(scheme=scheme, path="", params="", query="", fragment="")
     return urlunparse(http_parsed).rstrip("/")
 
 
+def _output_client() -> httpx.AsyncClient:
+    """output-handler 的共享长连接客户端（可用 HTTP_POOL_OUTPUT_HANDLER_* 覆盖超时与连接数）
+
+    多副本时请求使用绝对地址，各副本的连接共用同一个池。
+    """
+    http_pool.configure("output_handler", timeout=5.0)
+    return http_pool.client("output_handler")
+
+
 @app.post("/control/stop")
 async def control_stop_proxy(payload: Dict[str, str]):
     """Proxy STOP control to output-handler's /control/stop.
@@ -185,21 +341,21 @@ async def control_stop_proxy(payload: Dict[str, str]):
     if not session_id:
         raise HTTPException(status_code=400, detail="sessionId required")
 
-    target = f"{_output_http_base()}/control/stop"
-    async with httpx.AsyncClient(timeout=5.0) as client:
+    try:
+        resp = await _output_client().post(
+            f"{_output_http_base(session_id)}/control/stop", json={"sessionId": session_id}
+        )
+        resp.raise_for_status()
+    except httpx.HTTPStatusError as exc:
         try:
-            resp = await client.post(target, json={"sessionId": session_id})
-            resp.raise_for_status()
-        except httpx.HTTPStatusError as exc:
-            try:
-                detail = exc.response.json()
-            except ValueError:
-                detail = exc.response.text or "output handler error"
-            raise HTTPException(status_code=exc.response.status_code, detail=detail)
-        except httpx.RequestError as exc:
-            raise HTTPException(status_code=502, detail=f"proxy error: {exc}")
-        except Exception as exc:
-            raise HTTPException(status_code=502, detail=f"proxy error: {exc}")
+            detail = exc.response.json()
+        except ValueError:
+            detail = exc.response.text or "output handler error"
+        raise HTTPException(status_code=exc.response.status_code, detail=detail)
+    except httpx.RequestError as exc:
+        raise HTTPException(status_code=502, detail=f"proxy error: {exc}")
+    except Exception as exc:
+        raise HTTPException(status_code=502, detail=f"proxy error: {exc}")
 
     try:
         return resp.json()
@@ -210,19 +366,16 @@ async def control_stop_proxy(payload: Dict[str, str]):
 @app.get("/internal/output/health")
 async def output_health_proxy():
     """Proxy Output Handler's /health for diagnostics via the gateway."""
-    target = f"{_output_http_base()}/health"
-    async with httpx.AsyncClient(timeout=5.0) as client:
+    try:
+        resp = await _output_client().get(f"{_output_http_base()}/health")
+        # Try parse JSON; fallback to text
         try:
-            resp = await client.get(target)
-            # Try parse JSON; fallback to text
-            try:
-                data = resp.json()
-            except ValueError:
-                data = {"status_code": resp.status_code, "body": resp.text}
-            return JSONResponse(status_code=resp.status_code, content=data)
-        except Exception as e:
-            from fastapi import HTTPException
-            raise HTTPException(status_code=502, detail=f"proxy error: {e}")
+            data = resp.json()
+        except ValueError:
+            data = {"status_code": resp.status_code, "body": resp.text}
+        return JSONResponse(status_code=resp.status_code, content=data)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"proxy error: {e}")
 
 @app.get("/")
 async def get():
@@ -272,7 +425,10 @@ async def health_check():
         "status": "ok",
         "gateway": "running",
         "active_connections": len(active_connections),
-        "backend_services": BACKEND_SERVICES
+        "backend_services": BACKEND_SERVICES,
+        "backend_replicas": {backend: backend_ring(backend).nodes for backend in BACKEND_SERVICES},
+        "http_pools": http_pool.stats(),
+        "ws_mux": proxy.mux_stats() if proxy.mux_enabled else None,
     }
 
 @app.get("/connections")
@@ -0,0 +1,73 @@
+"""
+一致性哈希环
+
+网关按会话（task_id / sessionId）把前端连接固定到某个后端副本上。副本增减时只有
+落在变化区间内的会话会换节点，其余会话的归属保持不变。
+
+后端地址沿用原有环境变量，用逗号分隔即可声明多个副本::
+
+    OUTPUT_HANDLER_URL=ws://output-handler-0:8002,ws://output-handler-1:8002
+"""
+import bisect
+import hashlib
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+
+def parse_nodes(value: str) -> List[str]:
+    """拆分逗号分隔的后端地址，去掉空白、末尾斜杠与重复项"""
+    nodes: List[str] = []
+    for item in (value or "").split(","):
+        node = item.strip().rstrip("/")
+        if node and node not in nodes:
+            nodes.append(node)
+    return nodes
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    """带虚拟节点的一致性哈希环"""
+
+    def __init__(self, nodes: Iterable[str], *, vnodes: int = 160) -> None:
+        self.nodes: List[str] = list(nodes)
+        if not self.nodes:
+            raise ValueError("hash ring requires at least one node")
+        self.vnodes = max(1, vnodes)
+        points: List[Tuple[int, str]] = []
+        for node in self.nodes:
+            for index in range(self.vnodes):
+                points.append((_hash(f"{node}#{index}"), node))
+        points.sort()
+        self._keys = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+
+    def get(self, key: str) -> str:
+        """返回 key 所属的节点"""
+        if len(self.nodes) == 1:
+            return self.nodes[0]
+        index = bisect.bisect(self._keys, _hash(key)) % len(self._keys)
+        return self._owners[index]
+
+    def iter_nodes(self, key: str) -> Iterator[str]:
+        """按环上顺时针顺序依次给出不同节点，首个即 ``get(key)``，用于故障时顺延"""
+        seen = set()
+        start = bisect.bisect(self._keys, _hash(key))
+        for offset in range(len(self._keys)):
+            node = self._owners[(start + offset) % len(self._keys)]
+            if node not in seen:
+                seen.add(node)
+                yield node
+                if len(seen) == len(self.nodes):
+                    return
+
+    def distribution(self, keys: Iterable[str]) -> Dict[str, int]:
+        """统计一批 key 在各节点上的分布（诊断用）"""
+        counts = {node: 0 for node in self.nodes}
+        for key in keys:
+            counts[self.get(key)] += 1
+        return counts
+
+
+__all__ = ["HashRing", "parse_nodes"]
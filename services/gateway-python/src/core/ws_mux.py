@@ -0,0 +1,249 @@
+"""
+WebSocket 多路复用：网关客户端一侧
+
+网关为每个前端连接单独建立一条后端 WebSocket 时，每个新会话都要等待一次后端握手，
+文件描述符数量也是前端连接数的两倍。多路复用模式下，网关到每个后端只保持少量常驻连接
+（载体连接，后端 ``/ws/mux``），前端会话以轻量帧头在载体连接上复用（帧格式见 ``mux_protocol``）。
+
+每个会话的接收队列有上限（``max_inbox`` 条消息）。载体连接的读循环只负责入队，不等待处理；
+某个会话消费过慢、队列写满时，只关闭这一个会话（关闭码 1013），同一载体上的其他会话不受影响。
+"""
+import asyncio
+import itertools
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .mux_protocol import (
+    CLOSE_BACKEND_UNAVAILABLE,
+    CLOSE_NORMAL,
+    CLOSE_SLOW_CONSUMER,
+    DEFAULT_MAX_INBOX,
+    FRAME_BINARY,
+    FRAME_CLOSE,
+    FRAME_OPEN,
+    FRAME_TEXT,
+    Carrier,
+    MuxProtocolError,
+    decode_close,
+    decode_frame,
+    encode_close,
+    encode_frame,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _drain(queue: "asyncio.Queue[Any]") -> None:
+    while not queue.empty():
+        queue.get_nowait()
+
+
+class MuxChannel:
+    """网关侧的一个复用会话"""
+
+    def __init__(self, connection: "MuxConnection", session_id: int, *, max_inbox: int = DEFAULT_MAX_INBOX) -> None:
+        self.session_id = session_id
+        self.close_code: Optional[int] = None
+        self.close_reason = ""
+        self._connection = connection
+        self._inbox: "asyncio.Queue[Tuple[int, bytes]]" = asyncio.Queue()
+        self._max_inbox = max(1, max_inbox)
+        self._closed = False
+
+    async def send_text(self, data: str) -> None:
+        await self._connection.send(encode_frame(FRAME_TEXT, self.session_id, data.encode("utf-8")))
+
+    async def send_bytes(self, data: bytes) -> None:
+        await self._connection.send(encode_frame(FRAME_BINARY, self.session_id, data))
+
+    async def close(self, code: int = CLOSE_NORMAL, reason: str = "") -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._connection.release(self.session_id)
+        try:
+            await self._connection.send(encode_frame(FRAME_CLOSE, self.session_id, encode_close(code, reason)))
+        except Exception:
+            pass
+
+    async def __aiter__(self) -> AsyncIterator[Tuple[int, bytes]]:
+        """依次产出 (FRAME_TEXT/FRAME_BINARY, 负载)，后端关闭会话时结束"""
+        while True:
+            kind, payload = await self._inbox.get()
+            if kind == FRAME_CLOSE:
+                self.close_code, self.close_reason = decode_close(payload)
+                self._closed = True
+                return
+            yield kind, payload
+
+    def _feed(self, kind: int, payload: bytes) -> bool:
+        """入队一条后端消息；队列已满时以 1013 关闭本会话并返回 False"""
+        if kind == FRAME_CLOSE:
+            self._inbox.put_nowait((kind, payload))
+            return True
+        if self._closed:
+            return False
+        if self._inbox.qsize() >= self._max_inbox:
+            logger.warning(f"Mux channel {self.session_id} inbox full; closing slow consumer")
+            self._closed = True
+            self._connection.release(self.session_id)
+            _drain(self._inbox)
+            self._inbox.put_nowait((FRAME_CLOSE, encode_close(CLOSE_SLOW_CONSUMER, "slow_consumer")))
+            asyncio.ensure_future(self._send_close(CLOSE_SLOW_CONSUMER, "slow_consumer"))
+            return False
+        self._inbox.put_nowait((kind, payload))
+        return True
+
+    async def _send_close(self, code: int, reason: str) -> None:
+        try:
+            await self._connection.send(encode_frame(FRAME_CLOSE, self.session_id, encode_close(code, reason)))
+        except Exception:
+            pass
+
+
+class MuxConnection:
+    """一条到后端 /ws/mux 的常驻载体连接"""
+
+    def __init__(self, websocket: Any, *, max_inbox: int = DEFAULT_MAX_INBOX) -> None:
+        self._ws = websocket
+        self._carrier = Carrier(websocket.send)
+        self._ids = itertools.count(1)
+        self.max_inbox = max_inbox
+        self.channels: Dict[int, MuxChannel] = {}
+        self.overflows = 0
+        self._reader = asyncio.create_task(self._read())
+
+    @property
+    def closed(self) -> bool:
+        return self._carrier.closed
+
+    async def open(self, path: str) -> MuxChannel:
+        session_id = next(self._ids) & 0xFFFFFFFF
+        channel = MuxChannel(self, session_id, max_inbox=self.max_inbox)
+        self.channels[session_id] = channel
+        try:
+            await self.send(encode_frame(FRAME_OPEN, session_id, path.encode("utf-8")))
+        except Exception:
+            self.channels.pop(session_id, None)
+            raise
+        return channel
+
+    async def send(self, frame: bytes) -> None:
+        await self._carrier.send(frame)
+
+    def release(self, session_id: int) -> None:
+        self.channels.pop(session_id, None)
+
+    async def close(self) -> None:
+        self._carrier.closed = True
+        self._reader.cancel()
+        try:
+            await self._ws.close()
+        except Exception:
+            pass
+        await asyncio.gather(self._reader, return_exceptions=True)
+
+    async def _read(self) -> None:
+        try:
+            async for message in self._ws:
+                if isinstance(message, str):
+                    continue
+                try:
+                    kind, session_id, payload = decode_frame(message)
+                except MuxProtocolError as exc:
+                    logger.warning(f"Dropped invalid mux frame from backend: {exc}")
+                    continue
+                channel = self.channels.get(session_id)
+                if channel is None:
+                    continue
+                if kind == FRAME_CLOSE:
+                    self.channels.pop(session_id, None)
+                if not channel._feed(kind, payload):
+                    self.overflows += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning(f"Mux carrier connection lost: {exc}")
+        finally:
+            self._carrier.closed = True
+            closing = encode_close(CLOSE_BACKEND_UNAVAILABLE, "backend_unavailable")
+            for channel in list(self.channels.values()):
+                channel._feed(FRAME_CLOSE, closing)
+            self.channels.clear()
+
+
+class MuxClientPool:
+    """网关到单个后端的载体连接池：最多 ``size`` 条连接，新会话分配到负载最小的连接"""
+
+    def __init__(
+        self,
+        url: str,
+        *,
+        size: int = 4,
+        max_inbox: int = DEFAULT_MAX_INBOX,
+        connect: Optional[Callable[[str], Awaitable[Any]]] = None,
+    ) -> None:
+        self.url = url
+        self.size = max(1, size)
+        self.max_inbox = max(1, max_inbox)
+        self._connect = connect or self._default_connect
+        self._connections: List[MuxConnection] = []
+        self._lock = asyncio.Lock()
+        self.connects = 0
+        self.sessions_total = 0
+
+    async def open(self, path: str) -> MuxChannel:
+        connection = await self._pick()
+        channel = await connection.open(path)
+        self.sessions_total += 1
+        return channel
+
+    async def close(self) -> None:
+        connections, self._connections = self._connections, []
+        await asyncio.gather(*(conn.close() for conn in connections), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        live = [conn for conn in self._connections if not conn.closed]
+        return {
+            "url": self.url,
+            "size": self.size,
+            "connections": len(live),
+            "sessions": sum(len(conn.channels) for conn in live),
+            "sessions_total": self.sessions_total,
+            "connects": self.connects,
+            "overflows": sum(conn.overflows for conn in self._connections),
+        }
+
+    async def _pick(self) -> MuxConnection:
+        async with self._lock:
+            self._connections = [conn for conn in self._connections if not conn.closed]
+            idle = [conn for conn in self._connections if not conn.channels]
+            if idle:
+                return idle[0]
+            if len(self._connections) < self.size:
+                websocket = await self._connect(self.url)
+                self.connects += 1
+                connection = MuxConnection(websocket, max_inbox=self.max_inbox)
+                self._connections.append(connection)
+                return connection
+            return min(self._connections, key=lambda conn: len(conn.channels))
+
+    @staticmethod
+    async def _default_connect(url: str) -> Any:
+        import websockets
+
+        return await websockets.connect(url)
+
+
+__all__ = [
+    "CLOSE_BACKEND_UNAVAILABLE",
+    "CLOSE_NORMAL",
+    "CLOSE_SLOW_CONSUMER",
+    "FRAME_BINARY",
+    "FRAME_CLOSE",
+    "FRAME_OPEN",
+    "FRAME_TEXT",
+    "MuxChannel",
+    "MuxClientPool",
+    "MuxConnection",
+]
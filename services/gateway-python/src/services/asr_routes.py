@@ -1,16 +1,24 @@
-import asyncio
-import base64
+import json
 import os
 import uuid
-from typing import Any, Dict
+from typing import Any, AsyncIterator, Dict, Optional
 
-import httpx
-from flask import Blueprint, jsonify, request
+import anyio
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 
-bp_asr = Blueprint("dialog", __name__)
+from src.core.http_pool import shared_pool as http_pool
+
+router = APIRouter()
 
 DIALOG_ENGINE_URL = os.environ.get("DIALOG_ENGINE_URL", "http://dialog-engine:8100")
-HTTP_TIMEOUT = httpx.Timeout(60.0, connect=5.0, read=60.0, write=10.0)
+DIALOG_ENGINE_UPSTREAM = "dialog_engine"
+http_pool.configure(DIALOG_ENGINE_UPSTREAM, base_url=DIALOG_ENGINE_URL, timeout=60.0, connect_timeout=5.0)
+
+AUDIO_ENDPOINT = "/chat/audio"
+AUDIO_STREAM_ENDPOINT = "/chat/audio/stream"
+FILE_CHUNK_SIZE = 64 * 1024
+_TRUE_VALUES = {"1", "true", "yes", "on"}
 
 
 def _build_url(path: str) -> str:
@@ -33,61 +41,148 @@ def _guess_content_type(provided: str | None, filename: str | None) -> str:
     return mapping.get(suffix, "audio/wav")
 
 
-async def _invoke_dialog_engine(payload: Dict[str, Any]) -> Dict[str, Any]:
-    async with httpx.AsyncClient(timeout=HTTP_TIMEOUT) as client:
-        resp = await client.post(_build_url("/chat/audio"), json=payload)
-        resp.raise_for_status()
-        return resp.json()
+def _error(status_code: int, error: str, detail: Any = None) -> JSONResponse:
+    content: Dict[str, Any] = {"error": error}
+    if detail is not None:
+        content["detail"] = detail
+    return JSONResponse(status_code=status_code, content=content)
+
+
+def _wants_stream(request: Request, data: Dict[str, Any]) -> bool:
+    flag = data.get("stream", request.query_params.get("stream"))
+    if isinstance(flag, str):
+        return flag.strip().lower() in _TRUE_VALUES
+    if flag is not None:
+        return bool(flag)
+    return "text/event-stream" in request.headers.get("accept", "").lower()
+
+
+async def _iter_file(path: str) -> AsyncIterator[bytes]:
+    async with await anyio.open_file(path, "rb") as fh:
+        while True:
+            chunk = await fh.read(FILE_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+async def _forward(
+    *,
+    stream: bool,
+    json_body: Optional[Dict[str, Any]] = None,
+    content: Optional[AsyncIterator[bytes]] = None,
+    content_type: Optional[str] = None,
+    params: Optional[Dict[str, Any]] = None,
+):
+    """Send the audio to dialog-engine; relay its SSE stream or JSON reply as-is."""
+    client = http_pool.client(DIALOG_ENGINE_UPSTREAM)
+    path = AUDIO_STREAM_ENDPOINT if stream else AUDIO_ENDPOINT
+    headers = {"Content-Type": content_type} if content is not None and content_type else {}
+    if stream:
+        headers["Accept"] = "text/event-stream"
+    upstream = client.build_request(
+        "POST",
+        _build_url(path),
+        json=json_body if content is None else None,
+        content=content,
+        params=params,
+        headers=headers,
+    )
+    try:
+        resp = await client.send(upstream, stream=True)
+    except Exception as exc:  # pragma: no cover - defensive fallback
+        return _error(502, "dialog_engine_unavailable", str(exc))
+
+    if resp.status_code >= 400:
+        await resp.aread()
+        await resp.aclose()
+        try:
+            detail = resp.json()
+        except ValueError:
+            detail = resp.text or resp.reason_phrase
+        return _error(resp.status_code, "dialog_engine_error", detail)
+
+    if not stream:
+        try:
+            await resp.aread()
+        finally:
+            await resp.aclose()
+        return JSONResponse(status_code=resp.status_code, content=resp.json())
 
+    async def relay() -> AsyncIterator[bytes]:
+        try:
+            async for chunk in resp.aiter_raw():
+                yield chunk
+        finally:
+            await resp.aclose()
+
+    return StreamingResponse(
+        relay(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/asr")
+async def proxy_audio_chat(request: Request):
+    """Compatibility endpoint: forward legacy /asr requests to dialog-engine.
+
+    Accepts the legacy JSON body (``audio`` base64 or an absolute ``path``) or
+    a raw ``audio/*`` body with ``sessionId``/``lang``/``meta`` as query
+    parameters. Files and raw bodies are streamed to dialog-engine without
+    base64; ``stream=true`` (or ``Accept: text/event-stream``) relays the
+    ``/chat/audio/stream`` SSE events back to the caller.
+    """
+    request_content_type = request.headers.get("content-type", "").lower()
+    if request_content_type.startswith(("audio/", "application/octet-stream")):
+        params = {key: value for key, value in request.query_params.items() if key != "stream"}
+        params.setdefault("sessionId", str(uuid.uuid4()))
+        return await _forward(
+            stream=_wants_stream(request, {}),
+            content=request.stream(),
+            content_type=request_content_type.split(";", 1)[0].strip(),
+            params=params,
+        )
 
-@bp_asr.route("/asr", methods=["POST"])
-def proxy_audio_chat():
-    """Compatibility endpoint: forward legacy /asr requests to dialog-engine."""
     try:
-        data: Dict[str, Any] = request.get_json(force=True, silent=False) or {}
+        data = await request.json()
     except Exception:
-        return jsonify({"error": "invalid_json"}), 400
+        return _error(400, "invalid_json")
+    if not isinstance(data, dict):
+        return _error(400, "invalid_json")
 
     session_id = str(data.get("sessionId") or uuid.uuid4())
     audio_b64 = data.get("audio")
     source_path = data.get("path")
-
-    if not audio_b64:
-        if not source_path or not isinstance(source_path, str):
-            return jsonify({"error": "audio_or_path_required"}), 400
-        if not os.path.isabs(source_path):
-            return jsonify({"error": "path_must_be_absolute"}), 400
-        try:
-            with open(source_path, "rb") as fh:
-                audio_b64 = base64.b64encode(fh.read()).decode("ascii")
-        except FileNotFoundError:
-            return jsonify({"error": "file_not_found"}), 404
-        except Exception as exc:
-            return jsonify({"error": f"read_failed:{exc}"}), 500
-
     content_type = _guess_content_type(data.get("contentType"), source_path)
-    payload: Dict[str, Any] = {
-        "sessionId": session_id,
-        "audio": audio_b64,
-        "contentType": content_type,
-    }
-
     lang = data.get("lang") or (data.get("options") or {}).get("lang")
-    if lang:
-        payload["lang"] = lang
     meta = data.get("meta") or {}
+    stream = _wants_stream(request, data)
+
+    if audio_b64:
+        payload: Dict[str, Any] = {
+            "sessionId": session_id,
+            "audio": audio_b64,
+            "contentType": content_type,
+        }
+        if lang:
+            payload["lang"] = lang
+        if meta:
+            payload["meta"] = meta
+        return await _forward(stream=stream, json_body=payload)
+
+    if not source_path or not isinstance(source_path, str):
+        return _error(400, "audio_or_path_required")
+    if not os.path.isabs(source_path):
+        return _error(400, "path_must_be_absolute")
+    if not os.path.isfile(source_path):
+        return _error(404, "file_not_found")
+    if not os.access(source_path, os.R_OK):
+        return _error(500, "read_failed:permission_denied")
+
+    params: Dict[str, Any] = {"sessionId": session_id}
+    if lang:
+        params["lang"] = lang
     if meta:
-        payload["meta"] = meta
-
-    try:
-        result = asyncio.run(_invoke_dialog_engine(payload))
-    except httpx.HTTPStatusError as exc:
-        try:
-            detail = exc.response.json()
-        except ValueError:
-            detail = exc.response.text or exc.response.reason_phrase
-        return jsonify({"error": "dialog_engine_error", "detail": detail}), exc.response.status_code
-    except Exception as exc:  # pragma: no cover - defensive fallback
-        return jsonify({"error": "dialog_engine_unavailable", "detail": str(exc)}), 502
-
-    return jsonify(result)
+        params["meta"] = json.dumps(meta, ensure_ascii=False)
+    return await _forward(stream=stream, content=_iter_file(source_path), content_type=content_type, params=params)
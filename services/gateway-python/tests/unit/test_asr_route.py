@@ -1,16 +1,17 @@
 # 注意：测试在模块目录下运行：cd services/gateway-python && pytest
 import importlib
 import json
-import os
-import types
 
+import httpx
 import pytest
 from fastapi.testclient import TestClient
 
+from src.core.http_pool import HttpClientPool, UpstreamConfig
+
 
 @pytest.fixture()
 def app():
-    # 动态导入 main.py 内的 FastAPI app（已挂载 /api）
+    # 动态导入 main.py 内的 FastAPI app（/api/asr 为原生异步路由）
     main = importlib.import_module("main")
     return main.app
 
@@ -21,40 +22,70 @@ def client(app):
         yield c
 
 
-def test_asr_route_requires_absolute_path(client, monkeypatch):
+@pytest.fixture()
+def dialog_engine(monkeypatch):
+    """把 dialog-engine 替换为 MockTransport，记录收到的请求"""
+    asr_routes = importlib.import_module("src.services.asr_routes")
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        calls.append(
+            {"path": request.url.path, "headers": request.headers, "params": dict(request.url.params), "body": body}
+        )
+        if request.url.path == "/chat/audio/stream":
+
+            async def events():
+                yield b'event: asr-final\ndata: {"transcript": "hi"}\n\n'
+                yield b"event: done\ndata: {}\n\n"
+
+            return httpx.Response(200, content=events(), headers={"Content-Type": "text/event-stream"})
+        return httpx.Response(200, json={"sessionId": "s", "transcript": "hi", "reply": "hello"})
+
+    pool = HttpClientPool()
+    pool.register(
+        UpstreamConfig(name=asr_routes.DIALOG_ENGINE_UPSTREAM, base_url=asr_routes.DIALOG_ENGINE_URL),
+        transport=httpx.MockTransport(handler),
+    )
+    monkeypatch.setattr(asr_routes, "http_pool", pool)
+    return calls
+
+
+def test_asr_route_requires_absolute_path(client):
     # 传递相对路径应报 400
     resp = client.post("/api/asr", json={"path": "relative.wav"})
     assert resp.status_code == 400
-    data = resp.json()
-    assert "path must be absolute" in data.get("error", "")
+    assert resp.json()["error"] == "path_must_be_absolute"
 
 
-def test_asr_route_pushes_to_redis_list(client, monkeypatch):
-    # 准备一个假的 Redis 客户端来捕获 lpush 调用
-    pushed = []
+def test_asr_route_streams_file_as_binary_body(client, dialog_engine, tmp_path):
+    audio = tmp_path / "clip.webm"
+    audio.write_bytes(b"\x1aE\xdf\xa3" * 50000)
 
-    class DummyRedis:
-        async def lpush(self, queue, message):
-            pushed.append((queue, message))
+    resp = client.post("/api/asr", json={"path": str(audio), "sessionId": "s1", "options": {"lang": "zh"}})
+
+    assert resp.status_code == 200
+    assert resp.json()["reply"] == "hello"
+    call = dialog_engine[0]
+    assert call["path"] == "/chat/audio"
+    assert call["headers"]["content-type"] == "audio/webm"
+    assert call["params"] == {"sessionId": "s1", "lang": "zh"}
+    assert call["body"] == audio.read_bytes()
 
-    # 替换 asr_routes.get_redis 返回 DummyRedis
-    asr_routes = importlib.import_module("src.services.asr_routes")
-    monkeypatch.setattr(asr_routes, "get_redis", lambda: DummyRedis())
 
-    abs_path = "/tmp/file.wav"
-    resp = client.post("/api/asr", json={"path": abs_path, "options": {"lang": "zh"}})
+def test_asr_route_relays_dialog_engine_sse(client, dialog_engine):
+    resp = client.post("/api/asr", json={"audio": "AAAA", "sessionId": "s2", "stream": True})
+
     assert resp.status_code == 200
-    data = resp.json()
-    assert "task_id" in data
-
-    # 验证写入了正确的队列与消息格式
-    assert len(pushed) == 1
-    queue, message = pushed[0]
-    assert queue == os.environ.get("ASR_TASKS_QUEUE", "asr_tasks")
-
-    msg = json.loads(message)
-    assert msg["audio"]["type"] == "file"
-    assert msg["audio"]["path"] == abs_path
-    assert msg["audio"]["format"] == "wav"
-    assert msg["options"]["lang"] == "zh"
-    assert msg["meta"]["source"] == "gateway"
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    assert "event: asr-final" in resp.text
+    assert dialog_engine[0]["path"] == "/chat/audio/stream"
+    assert json.loads(dialog_engine[0]["body"])["audio"] == "AAAA"
+
+
+def test_asr_route_reports_missing_file(client, dialog_engine):
+    resp = client.post("/api/asr", json={"path": "/nonexistent/clip.wav"})
+
+    assert resp.status_code == 404
+    assert resp.json()["error"] == "file_not_found"
+    assert dialog_engine == []
@@ -0,0 +1,43 @@
+import uuid
+
+import pytest
+
+import main
+from src.core.hash_ring import HashRing, parse_nodes
+
+
+def test_parse_nodes_splits_and_dedupes():
+    assert parse_nodes(" ws://a:8002/, ws://b:8002 ,,ws://a:8002") == ["ws://a:8002", "ws://b:8002"]
+    with pytest.raises(ValueError):
+        HashRing(parse_nodes(""))
+
+
+def test_ring_spreads_keys_and_moves_few_on_resize():
+    keys = [str(uuid.uuid4()) for _ in range(3000)]
+    three = HashRing(["ws://a", "ws://b", "ws://c"])
+    four = HashRing(["ws://a", "ws://b", "ws://c", "ws://d"])
+
+    counts = three.distribution(keys)
+    assert min(counts.values()) > 700
+    moved = [key for key in keys if three.get(key) != four.get(key)]
+    # 新增一个副本时只应迁移约 1/4 的会话，且都迁到新副本上
+    assert len(moved) < len(keys) * 0.35
+    assert {four.get(key) for key in moved} == {"ws://d"}
+
+
+def test_iter_nodes_starts_with_owner_and_visits_each_once():
+    ring = HashRing(["ws://a", "ws://b", "ws://c"])
+    order = list(ring.iter_nodes("task-1"))
+    assert order[0] == ring.get("task-1")
+    assert sorted(order) == ["ws://a", "ws://b", "ws://c"]
+
+
+def test_gateway_routes_output_sessions_to_owning_replica(monkeypatch):
+    monkeypatch.setitem(main.BACKEND_SERVICES, "output", "ws://out-0:8002,ws://out-1:8002")
+    ring = main.backend_ring("output")
+    task_id = str(uuid.uuid4())
+    owner = ring.get(task_id)
+
+    assert main.backend_candidates("output", task_id)[0] == owner
+    assert main._output_http_base(task_id) == owner.replace("ws://", "http://")
+    assert main._output_http_base() == "http://out-0:8002"
@@ -47,3 +47,31 @@ def test_cors_headers(client):
     response = client.get("/", headers={"Origin": "http://localhost:3000"})
     assert response.status_code == 200
     assert "access-control-allow-origin" in response.headers
+
+
+def test_control_stop_reuses_pooled_output_client(client, monkeypatch):
+    """测试 /control/stop 通过共享连接池转发到 output-handler"""
+    import httpx
+
+    import main
+    from src.core.http_pool import HttpClientPool, UpstreamConfig
+
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append((request.method, request.url.path))
+        return httpx.Response(200, json={"status": "stopped"})
+
+    pool = HttpClientPool()
+    pool.register(
+        UpstreamConfig(name="output_handler", base_url=main._output_http_base(), timeout=5.0),
+        transport=httpx.MockTransport(handler),
+    )
+    monkeypatch.setattr(main, "http_pool", pool)
+
+    first = client.post("/control/stop", json={"sessionId": "s1"})
+    second = client.post("/control/stop", json={"sessionId": "s2"})
+
+    assert first.json() == second.json() == {"status": "stopped"}
+    assert seen == [("POST", "/control/stop"), ("POST", "/control/stop")]
+    assert client.get("/health").json()["http_pools"]["output_handler"]["requests"] == 2
@@ -137,3 +137,23 @@ async def test_forward_messages_general_exception():
     # 调用转发方法，应该抛出异常
     with pytest.raises(Exception, match="General error"):
         await proxy._forward_messages(mock_source, mock_destination, "test_direction")
+
+
+@pytest.mark.asyncio
+async def test_proxy_websocket_fails_over_to_next_replica(mock_websocket, mock_websocket_connection):
+    """测试会话所属副本不可用时顺延到下一个副本"""
+    proxy = WebSocketProxy()
+    urls = []
+
+    def connect(url):
+        urls.append(url)
+        if len(urls) == 1:
+            raise OSError("connection refused")
+        return mock_websocket_connection
+
+    with patch("websockets.connect", side_effect=connect):
+        with patch.object(proxy, "_forward_messages", new_callable=AsyncMock):
+            await proxy.proxy_websocket(mock_websocket, ["ws://a/ws/input", "ws://b/ws/input"], "input")
+
+    assert urls == ["ws://a/ws/input", "ws://b/ws/input"]
+    mock_websocket.close.assert_not_called()
@@ -0,0 +1,158 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from src.core.mux_protocol import FRAME_CLOSE, FRAME_OPEN, decode_frame, encode_close, encode_frame
+from src.core.ws_mux import CLOSE_BACKEND_UNAVAILABLE, CLOSE_SLOW_CONSUMER, FRAME_TEXT, MuxClientPool
+
+SERVICES_DIR = Path(__file__).resolve().parents[3]
+
+
+class InMemoryBackend:
+    """内存中的后端 /ws/mux（websockets 客户端接口），每个会话由 ``script`` 协程模拟"""
+
+    def __init__(self, script):
+        self._script = script
+        self._to_gateway: asyncio.Queue = asyncio.Queue()
+        self._inboxes = {}
+        self._tasks = []
+
+    async def emit(self, kind, session_id, payload=b""):
+        await self._to_gateway.put(encode_frame(kind, session_id, payload))
+
+    async def send(self, data):
+        kind, session_id, payload = decode_frame(data)
+        if kind == FRAME_OPEN:
+            inbox = self._inboxes[session_id] = asyncio.Queue()
+            self._tasks.append(asyncio.create_task(self._script(self, session_id, payload.decode(), inbox)))
+        elif session_id in self._inboxes:
+            await self._inboxes[session_id].put((kind, payload))
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await self._to_gateway.put(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        item = await self._to_gateway.get()
+        if item is None:
+            raise StopAsyncIteration
+        return item
+
+
+async def _echo(backend, session_id, path, inbox):
+    await backend.emit(FRAME_TEXT, session_id, f"hello {path}".encode())
+    _, payload = await inbox.get()
+    await backend.emit(FRAME_TEXT, session_id, payload.upper())
+    await backend.emit(FRAME_CLOSE, session_id, encode_close(4004, "done"))
+
+
+def test_mux_protocol_copies_are_identical():
+    gateway_copy = SERVICES_DIR / "gateway-python" / "src" / "core" / "mux_protocol.py"
+    backend_copies = [
+        SERVICES_DIR / "input-handler-python" / "src" / "services" / "mux_protocol.py",
+        SERVICES_DIR / "output-handler-python" / "src" / "services" / "mux_protocol.py",
+    ]
+    if not all(path.exists() for path in backend_copies):
+        pytest.skip("backend services are not checked out next to the gateway")
+    for path in backend_copies:
+        assert path.read_bytes() == gateway_copy.read_bytes(), f"{path} drifted from the gateway copy"
+
+
+@pytest.mark.asyncio
+async def test_pool_multiplexes_sessions_over_one_connection():
+    backends = []
+
+    async def connect(url):
+        backends.append(InMemoryBackend(_echo))
+        return backends[-1]
+
+    pool = MuxClientPool("ws://input/ws/mux", size=1, connect=connect)
+    first = await pool.open("/ws/input")
+    second = await pool.open("/ws/output/abc")
+
+    for channel, name in ((first, "a"), (second, "b")):
+        await channel.send_text(name)
+    received = {}
+    for channel in (first, second):
+        received[channel.session_id] = [payload.decode() async for kind, payload in channel if kind == FRAME_TEXT]
+
+    assert received[first.session_id] == ["hello /ws/input", "A"]
+    assert received[second.session_id] == ["hello /ws/output/abc", "B"]
+    assert (first.close_code, first.close_reason) == (4004, "done")
+    assert pool.stats()["connects"] == 1
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_carrier_loss_closes_open_sessions():
+    backends = []
+
+    async def connect(url):
+        backends.append(InMemoryBackend(_echo))
+        return backends[-1]
+
+    pool = MuxClientPool("ws://input/ws/mux", size=2, connect=connect)
+    channel = await pool.open("/ws/input")
+    await backends[0].close()
+
+    frames = [payload async for _, payload in channel]
+
+    assert frames == [] or frames[0] == b"hello /ws/input"
+    assert channel.close_code == CLOSE_BACKEND_UNAVAILABLE
+    await pool.open("/ws/input")
+    assert pool.stats()["connects"] == 2
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_gateway_channel_overflow_closes_session():
+    async def chatty(backend, session_id, path, inbox):
+        for index in range(5):
+            await backend.emit(FRAME_TEXT, session_id, str(index).encode())
+        await inbox.get()
+
+    backends = []
+
+    async def connect(url):
+        backends.append(InMemoryBackend(chatty))
+        return backends[-1]
+
+    pool = MuxClientPool("ws://input/ws/mux", size=1, max_inbox=2, connect=connect)
+    channel = await pool.open("/ws/output/abc")
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+    assert [payload async for _, payload in channel] == []
+    assert channel.close_code == CLOSE_SLOW_CONSUMER
+    assert pool.stats()["overflows"] == 1
+    assert pool.stats()["sessions"] == 0
+    await pool.close()
+
+
+def test_gateway_proxies_client_sessions_through_mux(monkeypatch):
+    connects = []
+
+    async def connect(url):
+        connects.append(url)
+        return InMemoryBackend(_echo)
+
+    proxy = main.WebSocketProxy(mux_enabled=True, mux_pool_size=1)
+    proxy.mux_pools["ws://input"] = MuxClientPool("ws://input/ws/mux", size=1, connect=connect)
+    monkeypatch.setitem(main.BACKEND_SERVICES, "input", "ws://input")
+    monkeypatch.setattr(main, "proxy", proxy)
+
+    with TestClient(main.app) as client:
+        for name in ("one", "two"):
+            with client.websocket_connect("/ws/input") as ws:
+                assert ws.receive_text() == "hello /ws/input"
+                ws.send_text(name)
+                assert ws.receive_text() == name.upper()
+
+    assert connects == ["ws://input/ws/mux"]
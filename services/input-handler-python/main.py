@@ -1,4 +1,3 @@
-import asyncio
 import base64
 import json
 import logging
@@ -6,7 +5,7 @@ import os
 import uuid
 from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 
 import httpx
 import redis.asyncio as redis
@@ -14,6 +13,20 @@ import uvicorn
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.responses import HTMLResponse
 
+from src.services.http_pool import shared_pool as http_pool
+from src.services.danmaku_aggregator import DanmakuAggregator, DanmakuBatch, DanmakuMessage
+from src.services.upload_protocol import PROTOCOL_WINDOWED, UploadProtocolError, WindowedUpload
+from src.services.upload_spool import UploadSpool
+from src.services.ws_mux import MuxServer
+from src.services.task_scheduler import (
+    PRIORITY_CHAT,
+    PRIORITY_IMAGE,
+    PRIORITY_OWNER_VOICE,
+    PRIORITY_PAID,
+    SHED_QUEUE_FULL,
+    TaskScheduler,
+)
+
 # 配置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -29,11 +42,42 @@ DIALOG_ENGINE_URL = os.getenv("DIALOG_ENGINE_URL", "http://localhost:8100")
 TEXT_STREAM_ENDPOINT = "/chat/stream"
 AUDIO_ENDPOINT = "/chat/audio"
 VISION_ENDPOINT = "/chat/vision"
-HTTP_TIMEOUT = httpx.Timeout(60.0, connect=5.0, read=60.0, write=10.0)
+DIALOG_ENGINE_UPSTREAM = "dialog_engine"
+# 对 dialog-engine 的调用共用一个 keep-alive 连接池（可用 HTTP_POOL_DIALOG_ENGINE_* 覆盖）
+http_pool.configure(DIALOG_ENGINE_UPSTREAM, base_url=DIALOG_ENGINE_URL, timeout=60.0, connect_timeout=5.0)
+
+# 弹幕聚合：窗口内的直播弹幕合并为一次 dialog-engine 调用
+DANMAKU_AGGREGATION_ENABLED = os.getenv("DANMAKU_AGGREGATION_ENABLED", "false").strip().lower() in {"1", "true", "yes", "on"}
+DANMAKU_WINDOW_SECONDS = float(os.getenv("DANMAKU_WINDOW_SECONDS", "3"))
+DANMAKU_MAX_BUFFER = int(os.getenv("DANMAKU_MAX_BUFFER", "500"))
+DANMAKU_MAX_ITEMS = int(os.getenv("DANMAKU_MAX_ITEMS", "8"))
+DANMAKU_SIMILARITY = float(os.getenv("DANMAKU_SIMILARITY", "0.6"))
+DANMAKU_MENTION_KEYWORDS = [k.strip() for k in os.getenv("DANMAKU_MENTION_KEYWORDS", "").split(",") if k.strip()]
+DANMAKU_SOURCES = {"danmaku", "live_chat"}
+
+# 调度器：按任务类型限制并发调用 dialog-engine，排队任务按优先级出队
+INPUT_MAX_CONCURRENT_TEXT = int(os.getenv("INPUT_MAX_CONCURRENT_TEXT", "8"))
+INPUT_MAX_CONCURRENT_AUDIO = int(os.getenv("INPUT_MAX_CONCURRENT_AUDIO", "4"))
+INPUT_MAX_CONCURRENT_IMAGE = int(os.getenv("INPUT_MAX_CONCURRENT_IMAGE", "2"))
+INPUT_MAX_QUEUE = int(os.getenv("INPUT_MAX_QUEUE", "200"))
+INPUT_MAX_QUEUE_WAIT_SECONDS = float(os.getenv("INPUT_MAX_QUEUE_WAIT_SECONDS", "30"))
+
+# 窗口化分块上传：客户端连续发送带序号的二进制帧，服务端按窗口累计确认
+INPUT_UPLOAD_WINDOW = int(os.getenv("INPUT_UPLOAD_WINDOW", "64"))
+INPUT_UPLOAD_ACK_EVERY = int(os.getenv("INPUT_UPLOAD_ACK_EVERY", "16"))
+INPUT_UPLOAD_ACK_BYTES = int(os.getenv("INPUT_UPLOAD_ACK_BYTES", str(1024 * 1024)))
+INPUT_MAX_UPLOAD_BYTES = int(os.getenv("INPUT_MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+
+# 转发方式：stream 直接把分块作为二进制请求体流式转发；json 为旧的 base64 JSON 方式
+INPUT_FORWARD_MODE = os.getenv("INPUT_FORWARD_MODE", "stream").strip().lower()
+
+# 可选的上传落盘存储（默认关闭，不写磁盘），按容量上限和 TTL 回收
+INPUT_SPOOL_ENABLED = os.getenv("INPUT_SPOOL_ENABLED", "false").strip().lower() in {"1", "true", "yes", "on"}
+INPUT_SPOOL_MAX_BYTES = int(os.getenv("INPUT_SPOOL_MAX_BYTES", str(512 * 1024 * 1024)))
+INPUT_SPOOL_TTL_SECONDS = float(os.getenv("INPUT_SPOOL_TTL_SECONDS", "3600"))
 
 # 临时文件存储目录
-TEMP_DIR = Path("/tmp/aivtuber_tasks")
-TEMP_DIR.mkdir(exist_ok=True)
+TEMP_DIR = Path(os.getenv("INPUT_SPOOL_DIR", "/tmp/aivtuber_tasks"))
 
 async def init_redis():
     global redis_client
@@ -56,9 +100,15 @@ async def cleanup_redis():
 async def lifespan(app: FastAPI):
     # 启动时执行
     await init_redis()
+    # 回收旧版本遗留或已过期的任务目录
+    input_handler.spool.gc()
     logger.info("Input Handler started - ready to receive user inputs")
     yield
     # 关闭时执行
+    if input_handler.danmaku is not None:
+        await input_handler.danmaku.close()
+    await input_handler.scheduler.close()
+    await http_pool.aclose()
     await cleanup_redis()
 
 app = FastAPI(lifespan=lifespan)
@@ -67,6 +117,32 @@ class InputHandler:
     def __init__(self):
         self.chunks: Dict[str, Dict[int, bytes]] = {}
         self.metadata: Dict[str, dict] = {}
+        self.uploads: Dict[str, WindowedUpload] = {}
+        self.spool = UploadSpool(
+            TEMP_DIR,
+            enabled=INPUT_SPOOL_ENABLED,
+            max_bytes=INPUT_SPOOL_MAX_BYTES,
+            ttl_seconds=INPUT_SPOOL_TTL_SECONDS,
+        )
+        self.scheduler = TaskScheduler(
+            limits={
+                "text": INPUT_MAX_CONCURRENT_TEXT,
+                "audio": INPUT_MAX_CONCURRENT_AUDIO,
+                "image": INPUT_MAX_CONCURRENT_IMAGE,
+            },
+            max_queue=INPUT_MAX_QUEUE,
+            max_wait_seconds=INPUT_MAX_QUEUE_WAIT_SECONDS,
+        )
+        self.danmaku: Optional[DanmakuAggregator] = None
+        if DANMAKU_AGGREGATION_ENABLED:
+            self.danmaku = DanmakuAggregator(
+                dispatch=self._dispatch_danmaku_batch,
+                window_seconds=DANMAKU_WINDOW_SECONDS,
+                max_buffer=DANMAKU_MAX_BUFFER,
+                max_items=DANMAKU_MAX_ITEMS,
+                similarity=DANMAKU_SIMILARITY,
+                mention_keywords=DANMAKU_MENTION_KEYWORDS,
+            )
         
     async def handle_connection(self, websocket: WebSocket):
         await websocket.accept()
@@ -113,8 +189,20 @@ class InputHandler:
                 if "text" in message:
                     # JSON 消息
                     data = json.loads(message["text"])
+
+                    if data.get("action") == "upload_start" and data.get("protocol") == PROTOCOL_WINDOWED:
+                        upload = WindowedUpload(
+                            data,
+                            window=INPUT_UPLOAD_WINDOW,
+                            ack_every=INPUT_UPLOAD_ACK_EVERY,
+                            ack_bytes=INPUT_UPLOAD_ACK_BYTES,
+                            max_bytes=INPUT_MAX_UPLOAD_BYTES,
+                        )
+                        self.uploads[task_id] = upload
+                        self.metadata[task_id] = upload.metadata
+                        await websocket.send_text(json.dumps(upload.ready_message(task_id)))
                     
-                    if data.get("action") == "data_chunk":
+                    elif data.get("action") == "data_chunk":
                         # 元数据消息，记录类型信息
                         self.metadata[task_id] = dict(data)
                         if data["chunk_id"] != expected_chunk_id:
@@ -124,12 +212,33 @@ class InputHandler:
                             continue
                         
                     elif data.get("action") == "upload_complete":
+                        upload = self.uploads.get(task_id)
+                        if upload is not None:
+                            try:
+                                self.chunks[task_id] = upload.finish(data)
+                            except UploadProtocolError as exc:
+                                await websocket.send_text(json.dumps(self._upload_error(task_id, str(exc), upload)))
+                                # 缺块时客户端可以补发后再次提交 upload_complete
+                                if str(exc).startswith("missing_chunks"):
+                                    continue
+                                break
                         # 上传完成，处理数据
                         await self._process_upload(websocket, task_id)
                         break
                         
                 elif "bytes" in message:
-                    # 二进制数据
+                    upload = self.uploads.get(task_id)
+                    if upload is not None:
+                        try:
+                            ack = upload.receive(message["bytes"])
+                        except UploadProtocolError as exc:
+                            await websocket.send_text(json.dumps(self._upload_error(task_id, str(exc), upload)))
+                            break
+                        if ack is not None:
+                            await websocket.send_text(json.dumps(ack))
+                        continue
+
+                    # 二进制数据（旧协议）
                     if task_id not in self.metadata:
                         await websocket.send_text("Error: No metadata received before binary data")
                         continue
@@ -156,31 +265,24 @@ class InputHandler:
             # 支持内联文本（无需二进制块）
             inline_text = self._extract_inline_text(metadata)
 
-            # 按chunk_id排序并合并数据
-            combined_data = b"".join([chunks[i] for i in sorted(chunks.keys())])
-            
-            # 保存到临时文件
-            task_dir = TEMP_DIR / task_id
-            task_dir.mkdir(exist_ok=True)
+            # 按chunk_id排序，保留分块列表直接转发，不拼接、不落盘
+            parts = [chunks[i] for i in sorted(chunks.keys())]
+            size = sum(len(part) for part in parts)
             
             content = None
             if data_type == "text":
-                if combined_data:
-                    content = combined_data.decode('utf-8')
+                if size:
+                    content = b"".join(parts).decode('utf-8')
                 elif inline_text is not None:
                     content = inline_text
                 else:
                     raise ValueError("text_payload_empty")
-                input_file = task_dir / "input.txt"
-                with open(input_file, "w", encoding="utf-8") as f:
-                    f.write(content)
-                logger.info(f"Saved text input for task {task_id}: {content[:100]}...")
+                self.spool.save(task_id, "input.txt", [content.encode("utf-8")])
+                logger.info(f"Received text input for task {task_id}: {content[:100]}...")
 
             elif data_type == "audio":
-                input_file = task_dir / "input.webm"
-                with open(input_file, "wb") as f:
-                    f.write(combined_data)
-                logger.info(f"Saved audio input for task {task_id}, size: {len(combined_data)} bytes")
+                self.spool.save(task_id, "input.webm", parts)
+                logger.info(f"Received audio input for task {task_id}, size: {size} bytes")
 
             elif data_type == "image":
                 meta = metadata
@@ -188,47 +290,73 @@ class InputHandler:
                     mime_type = meta.get("mime_type") or meta.get("content_type")
                 else:
                     mime_type = None
-                file_suffix = self._infer_image_suffix(mime_type)
-                input_file = task_dir / f"input{file_suffix}"
-                with open(input_file, "wb") as f:
-                    f.write(combined_data)
+                self.spool.save(task_id, f"input{self._infer_image_suffix(mime_type)}", parts)
                 logger.info(
-                    "Saved image input for task %s, size: %d bytes, mime: %s",
+                    "Received image input for task %s, size: %d bytes, mime: %s",
                     task_id,
-                    len(combined_data),
+                    size,
                     mime_type or "unknown",
                 )
 
-            # 发送处理确认
-            await websocket.send_text(json.dumps({
-                "type": "system",
-                "action": "upload_processed",
-                "status": "queued",
-                "task_id": task_id
-            }))
-            
-            if data_type == "text":
-                asyncio.create_task(self._handle_text_task(task_id, content or ""))
+            danmaku = self._extract_danmaku(task_id, metadata, content) if data_type == "text" else None
+            meta = metadata if isinstance(metadata, dict) else {}
+
+            accepted = True
+            if danmaku is not None:
+                # 弹幕进入聚合窗口，回复在窗口汇总后统一发布
+                self.danmaku.submit(danmaku)
+            elif data_type == "text":
+                accepted = self._schedule(
+                    "text",
+                    task_id,
+                    lambda: self._handle_text_task(task_id, content or ""),
+                    priority=self._task_priority(data_type, meta),
+                )
             elif data_type == "audio":
-                asyncio.create_task(self._handle_audio_task(task_id, input_file))
+                accepted = self._schedule(
+                    "audio",
+                    task_id,
+                    lambda: self._handle_audio_task(task_id, parts, "audio/webm"),
+                    priority=self._task_priority(data_type, meta),
+                )
             elif data_type == "image":
-                meta = metadata if isinstance(metadata, dict) else {}
                 prompt = self._extract_prompt(meta, inline_text)
-                extra_meta = meta.get("meta") if isinstance(meta, dict) else None
-                mime_type = (
-                    meta.get("mime_type") or meta.get("content_type")
-                ) if isinstance(meta, dict) else None
-                asyncio.create_task(
-                    self._handle_image_task(
+                extra_meta = meta.get("meta")
+                mime_type = meta.get("mime_type") or meta.get("content_type")
+                accepted = self._schedule(
+                    "image",
+                    task_id,
+                    lambda: self._handle_image_task(
                         task_id,
-                        input_file,
+                        parts,
                         prompt,
                         mime_type,
                         extra_meta if isinstance(extra_meta, dict) else None,
-                    )
+                    ),
+                    priority=PRIORITY_IMAGE,
                 )
             else:
                 logger.warning(f"Unsupported data type '{data_type}' for task {task_id}")
+
+            # 发送处理确认
+            if accepted:
+                ack = {
+                    "type": "system",
+                    "action": "upload_processed",
+                    "status": "queued",
+                    "task_id": task_id
+                }
+                if danmaku is not None:
+                    ack["aggregated"] = True
+            else:
+                ack = {
+                    "type": "system",
+                    "action": "upload_processed",
+                    "status": "error",
+                    "task_id": task_id,
+                    "error": SHED_QUEUE_FULL,
+                }
+            await websocket.send_text(json.dumps(ack))
                 
         except Exception as e:
             logger.error(f"Error processing upload for task {task_id}: {e}")
@@ -239,6 +367,45 @@ class InputHandler:
                 "error": str(e)
             }))
     
+    @staticmethod
+    def _upload_error(task_id: str, error: str, upload: WindowedUpload) -> Dict[str, Any]:
+        return {
+            "type": "system",
+            "action": "upload_processed",
+            "status": "error",
+            "task_id": task_id,
+            "error": error,
+            "ack": upload.next_seq,
+        }
+
+    def _schedule(
+        self,
+        kind: str,
+        task_id: str,
+        factory: Callable[[], Awaitable[None]],
+        *,
+        priority: int,
+    ) -> bool:
+        async def on_shed(reason: str) -> None:
+            await self._publish_error(task_id, f"overloaded:{reason}")
+
+        return self.scheduler.submit(kind, factory, priority=priority, label=task_id, on_shed=on_shed)
+
+    @staticmethod
+    def _task_priority(data_type: str, metadata: Dict[str, Any]) -> int:
+        """主播本人语音 > 付费消息 > 普通聊天 > 图片"""
+        meta = metadata.get("meta") if isinstance(metadata.get("meta"), dict) else {}
+        if data_type == "image":
+            return PRIORITY_IMAGE
+        owner = metadata.get("owner") or meta.get("owner") or meta.get("role") == "owner"
+        if data_type == "audio" and owner:
+            return PRIORITY_OWNER_VOICE
+        try:
+            paid = float(meta.get("paid") or meta.get("superchat") or 0)
+        except (TypeError, ValueError):
+            paid = 0.0
+        return PRIORITY_PAID if paid > 0 else PRIORITY_CHAT
+
     async def _handle_text_task(self, task_id: str, content: str) -> None:
         try:
             reply, stats = await self._stream_dialog_engine(task_id, content)
@@ -256,9 +423,57 @@ class InputHandler:
             logger.error(f"Dialog-engine text handling failed for task {task_id}: {exc}")
             await self._publish_error(task_id, str(exc) or "dialog_engine_failed")
 
-    async def _handle_audio_task(self, task_id: str, audio_file: Path) -> None:
+    def _extract_danmaku(self, task_id: str, metadata: Any, content: Optional[str]) -> Optional[DanmakuMessage]:
+        """识别直播弹幕（source 为 danmaku/live_chat 的文本），未启用聚合时返回 None"""
+        if self.danmaku is None or not isinstance(metadata, dict) or not content:
+            return None
+        meta = metadata.get("meta") if isinstance(metadata.get("meta"), dict) else {}
+        source = metadata.get("source") or meta.get("source")
+        if not isinstance(source, str) or source.strip().lower() not in DANMAKU_SOURCES:
+            return None
+        try:
+            paid = float(meta.get("paid") or meta.get("superchat") or 0)
+        except (TypeError, ValueError):
+            paid = 0.0
+        user = meta.get("user") or meta.get("username")
+        return DanmakuMessage(
+            task_id=task_id,
+            text=content.strip(),
+            user=user if isinstance(user, str) else None,
+            room=str(meta.get("room") or "default"),
+            paid=max(0.0, paid),
+            gift=bool(meta.get("gift")),
+        )
+
+    async def _dispatch_danmaku_batch(self, batch: DanmakuBatch) -> None:
+        session_id = f"danmaku:{batch.room}"
+        summary = batch.summary()
         try:
-            result = await self._invoke_dialog_engine_audio(task_id, audio_file)
+            reply, stats = await self._stream_dialog_engine(
+                session_id,
+                batch.to_prompt(),
+                meta={"lang": "zh", "source": "danmaku", "personalized": True},
+            )
+        except Exception as exc:
+            logger.error(f"Dialog-engine danmaku handling failed for room {batch.room}: {exc}")
+            for task_id in batch.task_ids:
+                await self._publish_error(task_id, str(exc) or "dialog_engine_failed")
+            return
+        for task_id in batch.task_ids:
+            payload = {
+                "status": "success",
+                "sessionId": session_id,
+                "text": reply,
+                "stats": stats,
+                "source": "dialog-engine",
+                "input_mode": "danmaku",
+                "aggregated": summary,
+            }
+            await self._publish_response(task_id, payload)
+
+    async def _handle_audio_task(self, task_id: str, parts: List[bytes], content_type: str) -> None:
+        try:
+            result = await self._invoke_dialog_engine_audio(task_id, parts, content_type)
             payload = {
                 "status": "success",
                 "sessionId": task_id,
@@ -279,7 +494,7 @@ class InputHandler:
     async def _handle_image_task(
         self,
         task_id: str,
-        image_file: Path,
+        parts: List[bytes],
         prompt: Optional[str],
         mime_type: Optional[str],
         meta: Optional[Dict[str, Any]],
@@ -287,7 +502,7 @@ class InputHandler:
         try:
             result = await self._invoke_dialog_engine_image(
                 task_id,
-                image_file,
+                parts,
                 prompt=prompt,
                 mime_type=mime_type,
                 meta=meta,
@@ -328,53 +543,58 @@ class InputHandler:
         }
         await self._publish_response(task_id, payload)
 
-    async def _stream_dialog_engine(self, task_id: str, content: str) -> Tuple[str, Dict[str, Any]]:
+    async def _stream_dialog_engine(
+        self,
+        task_id: str,
+        content: str,
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[str, Dict[str, Any]]:
         url = f"{DIALOG_ENGINE_URL.rstrip('/')}{TEXT_STREAM_ENDPOINT}"
         payload = {
             "sessionId": task_id,
             "turn": 0,
             "type": "TEXT",
             "content": content,
-            "meta": {"lang": "zh"},
+            "meta": meta or {"lang": "zh"},
         }
         deltas: list[str] = []
         stats: Dict[str, Any] = {}
         current_event = "message"
         try:
-            async with httpx.AsyncClient(timeout=HTTP_TIMEOUT) as client:
-                async with client.stream(
-                    "POST",
-                    url,
-                    json=payload,
-                    headers={"Accept": "text/event-stream"},
-                ) as resp:
-                    resp.raise_for_status()
-                    async for line in resp.aiter_lines():
-                        if line == "":
-                            current_event = "message"
-                            continue
-                        if line.startswith(":"):
+            client = http_pool.client(DIALOG_ENGINE_UPSTREAM)
+            async with client.stream(
+                "POST",
+                url,
+                json=payload,
+                headers={"Accept": "text/event-stream"},
+            ) as resp:
+                resp.raise_for_status()
+                async for line in resp.aiter_lines():
+                    if line == "":
+                        current_event = "message"
+                        continue
+                    if line.startswith(":"):
+                        continue
+                    if line.lower().startswith("event:"):
+                        current_event = line.split(":", 1)[1].strip() or "message"
+                        continue
+                    if line.lower().startswith("data:"):
+                        data_raw = line.split(":", 1)[1].strip()
+                        if not data_raw:
                             continue
-                        if line.lower().startswith("event:"):
-                            current_event = line.split(":", 1)[1].strip() or "message"
+                        try:
+                            data_obj = json.loads(data_raw)
+                        except json.JSONDecodeError:
+                            logger.debug(f"Non-JSON SSE data ignored: {data_raw[:50]}")
                             continue
-                        if line.lower().startswith("data:"):
-                            data_raw = line.split(":", 1)[1].strip()
-                            if not data_raw:
-                                continue
-                            try:
-                                data_obj = json.loads(data_raw)
-                            except json.JSONDecodeError:
-                                logger.debug(f"Non-JSON SSE data ignored: {data_raw[:50]}")
-                                continue
-                            if current_event == "text-delta":
-                                delta = data_obj.get("content")
-                                if isinstance(delta, str):
-                                    deltas.append(delta)
-                            elif current_event == "done":
-                                stats = data_obj.get("stats") or {}
-                            elif current_event == "error":
-                                raise RuntimeError(data_obj.get("message", "dialog_engine_error"))
+                        if current_event == "text-delta":
+                            delta = data_obj.get("content")
+                            if isinstance(delta, str):
+                                deltas.append(delta)
+                        elif current_event == "done":
+                            stats = data_obj.get("stats") or {}
+                        elif current_event == "error":
+                            raise RuntimeError(data_obj.get("message", "dialog_engine_error"))
             logger.info(f"Dialog-engine SSE completed for task {task_id}")
         except httpx.HTTPStatusError as exc:
             detail = exc.response.text
@@ -384,27 +604,22 @@ class InputHandler:
         reply_text = "".join(deltas)
         return reply_text, stats
 
-    async def _invoke_dialog_engine_audio(self, task_id: str, audio_file: Path) -> Dict[str, Any]:
+    async def _invoke_dialog_engine_audio(self, task_id: str, parts: List[bytes], content_type: str) -> Dict[str, Any]:
         url = f"{DIALOG_ENGINE_URL.rstrip('/')}{AUDIO_ENDPOINT}"
-        try:
-            audio_bytes = audio_file.read_bytes()
-        except Exception as exc:
-            raise RuntimeError(f"read_audio_failed:{exc}") from exc
-        if not audio_bytes:
+        if not any(parts):
             raise RuntimeError("audio_payload_empty")
-        audio_b64 = base64.b64encode(audio_bytes).decode("ascii")
-        content_type = self._infer_content_type(audio_file.suffix.lower())
-        body = {
-            "sessionId": task_id,
-            "audio": audio_b64,
-            "contentType": content_type,
-            "meta": {"source": "input-handler"},
-        }
+        meta = {"source": "input-handler"}
         try:
-            async with httpx.AsyncClient(timeout=HTTP_TIMEOUT) as client:
-                resp = await client.post(url, json=body)
-                resp.raise_for_status()
-                return resp.json()
+            if INPUT_FORWARD_MODE == "json":
+                body = {
+                    "sessionId": task_id,
+                    "audio": base64.b64encode(b"".join(parts)).decode("ascii"),
+                    "contentType": content_type,
+                    "meta": meta,
+                }
+                return await self._post_json(url, body)
+            params = {"sessionId": task_id, "meta": json.dumps(meta)}
+            return await self._post_stream(url, parts, content_type=content_type, params=params)
         except httpx.HTTPStatusError as exc:
             try:
                 detail = exc.response.json()
@@ -415,35 +630,29 @@ class InputHandler:
     async def _invoke_dialog_engine_image(
         self,
         task_id: str,
-        image_file: Path,
+        parts: List[bytes],
         *,
         prompt: Optional[str],
         mime_type: Optional[str],
         meta: Optional[Dict[str, Any]],
     ) -> Dict[str, Any]:
         url = f"{DIALOG_ENGINE_URL.rstrip('/')}{VISION_ENDPOINT}"
-        try:
-            image_bytes = image_file.read_bytes()
-        except Exception as exc:
-            raise RuntimeError(f"read_image_failed:{exc}") from exc
-        if not image_bytes:
+        if not any(parts):
             raise RuntimeError("image_payload_empty")
-        image_b64 = base64.b64encode(image_bytes).decode("ascii")
-        body: Dict[str, Any] = {
-            "sessionId": task_id,
-            "image": image_b64,
-        }
+        body: Dict[str, Any] = {"sessionId": task_id}
         if prompt:
             body["prompt"] = prompt
         if mime_type:
             body["mimeType"] = mime_type
-        if meta:
-            body["meta"] = meta
         try:
-            async with httpx.AsyncClient(timeout=HTTP_TIMEOUT) as client:
-                resp = await client.post(url, json=body)
-                resp.raise_for_status()
-                return resp.json()
+            if INPUT_FORWARD_MODE == "json":
+                body["image"] = base64.b64encode(b"".join(parts)).decode("ascii")
+                if meta:
+                    body["meta"] = meta
+                return await self._post_json(url, body)
+            if meta:
+                body["meta"] = json.dumps(meta, ensure_ascii=False)
+            return await self._post_stream(url, parts, content_type=mime_type or "image/png", params=body)
         except httpx.HTTPStatusError as exc:
             try:
                 detail = exc.response.json()
@@ -452,14 +661,29 @@ class InputHandler:
             raise RuntimeError(f"dialog_engine_image_failed:{detail}") from exc
 
     @staticmethod
-    def _infer_content_type(suffix: str) -> str:
-        mapping = {
-            ".webm": "audio/webm",
-            ".mp3": "audio/mpeg",
-            ".wav": "audio/wav",
-            ".m4a": "audio/mp4",
-        }
-        return mapping.get(suffix, "audio/wav")
+    async def _post_json(url: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        resp = await http_pool.client(DIALOG_ENGINE_UPSTREAM).post(url, json=body)
+        resp.raise_for_status()
+        return resp.json()
+
+    @staticmethod
+    async def _post_stream(
+        url: str,
+        parts: List[bytes],
+        *,
+        content_type: str,
+        params: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """以分块传输编码逐块发送二进制请求体，元数据放在查询参数中"""
+
+        async def body() -> AsyncIterator[bytes]:
+            for part in parts:
+                yield part
+
+        client = http_pool.client(DIALOG_ENGINE_UPSTREAM)
+        resp = await client.post(url, content=body(), params=params, headers={"Content-Type": content_type})
+        resp.raise_for_status()
+        return resp.json()
 
     @staticmethod
     def _infer_image_suffix(mime_type: Optional[str]) -> str:
@@ -506,6 +730,7 @@ class InputHandler:
             del self.chunks[task_id]
         if task_id in self.metadata:
             del self.metadata[task_id]
+        self.uploads.pop(task_id, None)
 
 # 初始化处理器
 input_handler = InputHandler()
@@ -514,6 +739,36 @@ input_handler = InputHandler()
 async def websocket_input_endpoint(websocket: WebSocket):
     await input_handler.handle_connection(websocket)
 
+def _mux_route(path: str):
+    if path == "/ws/input":
+        return input_handler.handle_connection
+    return None
+
+# 网关多路复用入口：一条常驻连接承载多个 /ws/input 会话
+mux_server = MuxServer(_mux_route, max_inbox=int(os.getenv("GATEWAY_WS_MUX_MAX_INBOX", "256")))
+
+@app.websocket("/ws/mux")
+async def websocket_mux_endpoint(websocket: WebSocket):
+    await mux_server.serve(websocket)
+
+@app.get("/mux/stats")
+async def mux_stats():
+    return mux_server.stats()
+
+@app.get("/scheduler/stats")
+async def scheduler_stats():
+    return input_handler.scheduler.snapshot()
+
+@app.get("/http/stats")
+async def http_stats():
+    return http_pool.stats()
+
+@app.get("/danmaku/stats")
+async def danmaku_stats():
+    if input_handler.danmaku is None:
+        return {"enabled": False}
+    return {"enabled": True, **input_handler.danmaku.snapshot()}
+
 @app.get("/")
 async def get():
     return HTMLResponse("""
@@ -0,0 +1,319 @@
+"""
+弹幕聚合与采样
+
+直播高峰期每分钟可能有上百条弹幕，如果每条都触发一次 dialog-engine 对话，
+LLM 调用量与弹幕数线性增长，主播的回复也会排队滞后。聚合器把同一直播间
+在一个短窗口内的弹幕缓冲起来，去重、合并近似重复、打分排序，最后只向
+dialog-engine 发送一条汇总后的对话轮次。
+"""
+import asyncio
+import logging
+import math
+import time
+import unicodedata
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, FrozenSet, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """统一全半角、大小写与空白，去掉标点和表情符号"""
+    folded = unicodedata.normalize("NFKC", text).casefold()
+    return "".join(ch for ch in folded if not unicodedata.category(ch).startswith(("P", "S", "Z", "C")))
+
+
+def _shingles(text: str) -> FrozenSet[str]:
+    if len(text) < 2:
+        return frozenset([text]) if text else frozenset()
+    return frozenset(text[i : i + 2] for i in range(len(text) - 1))
+
+
+def _jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+@dataclass
+class DanmakuMessage:
+    """单条弹幕"""
+
+    task_id: str
+    text: str
+    user: Optional[str] = None
+    room: str = "default"
+    paid: float = 0.0
+    gift: bool = False
+    received_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class DanmakuCluster:
+    """一组内容相同或近似的弹幕，以第一条为代表"""
+
+    key: str
+    shingles: FrozenSet[str]
+    members: List[DanmakuMessage]
+    score: float = 0.0
+
+    @property
+    def representative(self) -> DanmakuMessage:
+        paid = [m for m in self.members if m.paid > 0]
+        return max(paid, key=lambda m: m.paid) if paid else self.members[0]
+
+    @property
+    def paid_total(self) -> float:
+        return sum(m.paid for m in self.members)
+
+
+@dataclass
+class DanmakuBatch:
+    """一个窗口的聚合结果，对应一次 dialog-engine 调用"""
+
+    room: str
+    received: int
+    window_seconds: float
+    selected: List[DanmakuCluster]
+    dropped: List[DanmakuCluster]
+
+    @property
+    def task_ids(self) -> List[str]:
+        return [m.task_id for cluster in self.selected + self.dropped for m in cluster.members]
+
+    def to_prompt(self) -> str:
+        lines = [f"[直播弹幕汇总] 过去{self.window_seconds:.0f}秒收到{self.received}条弹幕，代表性内容如下："]
+        for index, cluster in enumerate(self.selected, start=1):
+            rep = cluster.representative
+            tags = []
+            if cluster.paid_total > 0:
+                tags.append(f"SC ¥{cluster.paid_total:g}")
+            if any(m.gift for m in cluster.members):
+                tags.append("礼物")
+            prefix = f"[{' '.join(tags)}] " if tags else ""
+            speaker = f"{rep.user}：" if rep.user else ""
+            count = f"（×{len(cluster.members)}）" if len(cluster.members) > 1 else ""
+            lines.append(f"{index}. {prefix}{speaker}{rep.text}{count}")
+        lines.append("请优先感谢付费和礼物，再挑选最值得回应的一两条，用一段自然的话回复观众。")
+        return "\n".join(lines)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "room": self.room,
+            "received": self.received,
+            "clusters": len(self.selected) + len(self.dropped),
+            "selected": len(self.selected),
+        }
+
+
+@dataclass
+class FloodStats:
+    received: int = 0
+    windows: int = 0
+    duplicates: int = 0
+    clustered: int = 0
+    dropped_clusters: int = 0
+    overflow: int = 0
+    dispatch_errors: int = 0
+    peak_window_messages: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "received": self.received,
+            "windows": self.windows,
+            "duplicates": self.duplicates,
+            "clustered": self.clustered,
+            "dropped_clusters": self.dropped_clusters,
+            "overflow": self.overflow,
+            "dispatch_errors": self.dispatch_errors,
+            "peak_window_messages": self.peak_window_messages,
+            "messages_per_turn": round(self.received / self.windows, 2) if self.windows else None,
+        }
+
+
+class _RoomState:
+    def __init__(self) -> None:
+        self.buffer: List[DanmakuMessage] = []
+        self.timer: Optional[asyncio.Task] = None
+
+
+def build_clusters(
+    messages: Sequence[DanmakuMessage],
+    *,
+    similarity: float,
+    stats: Optional[FloodStats] = None,
+) -> List[DanmakuCluster]:
+    """先按规范化文本精确去重，再按字符二元组 Jaccard 相似度贪心合并"""
+    exact: Dict[str, DanmakuCluster] = {}
+    clusters: List[DanmakuCluster] = []
+    for message in messages:
+        key = normalize_text(message.text)
+        if not key:
+            key = message.text.strip()
+        cluster = exact.get(key)
+        if cluster is not None:
+            cluster.members.append(message)
+            if stats is not None:
+                stats.duplicates += 1
+            continue
+        shingles = _shingles(key)
+        for candidate in clusters:
+            if _jaccard(shingles, candidate.shingles) >= similarity:
+                candidate.members.append(message)
+                exact[key] = candidate
+                if stats is not None:
+                    stats.clustered += 1
+                break
+        else:
+            cluster = DanmakuCluster(key=key, shingles=shingles, members=[message])
+            exact[key] = cluster
+            clusters.append(cluster)
+    return clusters
+
+
+class DanmakuAggregator:
+    """按直播间缓冲弹幕，每个窗口向 dialog-engine 发送一条汇总轮次
+
+    - 每个直播间同一时刻最多一个汇总请求在途；请求未完成时新弹幕继续累积，
+      自然形成背压，LLM 调用数随窗口数而不是弹幕数增长
+    - 缓冲区有上限，溢出时丢弃最早的非付费弹幕；缓冲区内全是付费或礼物弹幕时丢弃最早的一条
+    - 付费（SC）和礼物弹幕一定入选；其余按提及、提问、重复次数和新鲜度打分
+    """
+
+    def __init__(
+        self,
+        *,
+        dispatch: Callable[[DanmakuBatch], Awaitable[None]],
+        window_seconds: float = 3.0,
+        max_buffer: int = 500,
+        max_items: int = 8,
+        similarity: float = 0.6,
+        mention_keywords: Sequence[str] = (),
+        novelty_memory: int = 200,
+    ) -> None:
+        self._dispatch = dispatch
+        self._window = max(0.1, window_seconds)
+        self._max_buffer = max(1, max_buffer)
+        self._max_items = max(1, max_items)
+        self._similarity = similarity
+        self._mentions = [normalize_text(k) for k in mention_keywords if normalize_text(k)]
+        self._recent_keys: Deque[str] = deque(maxlen=max(1, novelty_memory))
+        self._rooms: Dict[str, _RoomState] = {}
+        self.stats = FloodStats()
+
+    def submit(self, message: DanmakuMessage) -> None:
+        """登记一条弹幕，不阻塞调用方"""
+        room = self._rooms.setdefault(message.room, _RoomState())
+        self.stats.received += 1
+        room.buffer.append(message)
+        if len(room.buffer) > self._max_buffer:
+            self._evict(room)
+        if room.timer is None:
+            room.timer = asyncio.create_task(self._flush_after(message.room, self._window))
+
+    def buffered(self) -> int:
+        return sum(len(room.buffer) for room in self._rooms.values())
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {**self.stats.as_dict(), "buffered": self.buffered(), "rooms": len(self._rooms)}
+
+    async def flush(self, room_id: str) -> Optional[DanmakuBatch]:
+        """立即汇总并发送某个直播间当前缓冲的弹幕"""
+        room = self._rooms.get(room_id)
+        if room is None or not room.buffer:
+            return None
+        messages, room.buffer = room.buffer, []
+        window = max(self._window, messages[-1].received_at - messages[0].received_at)
+        batch = self._build_batch(room_id, messages, window)
+        try:
+            await self._dispatch(batch)
+        except Exception as exc:
+            self.stats.dispatch_errors += 1
+            logger.error(f"Danmaku batch dispatch failed for room {room_id}: {exc}")
+        return batch
+
+    async def close(self) -> None:
+        for room in self._rooms.values():
+            if room.timer is not None:
+                room.timer.cancel()
+        timers = [room.timer for room in self._rooms.values() if room.timer is not None]
+        await asyncio.gather(*timers, return_exceptions=True)
+        self._rooms.clear()
+
+    async def _flush_after(self, room_id: str, delay: float) -> None:
+        room = self._rooms.get(room_id)
+        try:
+            while room is not None:
+                await asyncio.sleep(delay)
+                await self.flush(room_id)
+                # 在途期间到达的弹幕在下一个窗口处理
+                if not room.buffer:
+                    break
+                delay = 0.0 if len(room.buffer) >= self._max_buffer else self._window
+        finally:
+            if room is not None and room.timer is asyncio.current_task():
+                room.timer = None
+            if room is not None and not room.buffer and self._rooms.get(room_id) is room:
+                del self._rooms[room_id]
+
+    def _evict(self, room: _RoomState) -> None:
+        victim = next(
+            (index for index, message in enumerate(room.buffer) if message.paid <= 0 and not message.gift),
+            0,
+        )
+        del room.buffer[victim]
+        self.stats.overflow += 1
+
+    def _build_batch(self, room_id: str, messages: List[DanmakuMessage], window: float) -> DanmakuBatch:
+        clusters = build_clusters(messages, similarity=self._similarity, stats=self.stats)
+        for cluster in clusters:
+            cluster.score = self._score(cluster)
+        clusters.sort(key=lambda c: c.score, reverse=True)
+
+        priority = [c for c in clusters if c.paid_total > 0 or any(m.gift for m in c.members)]
+        others = [c for c in clusters if c not in priority]
+        room_left = max(0, self._max_items - len(priority))
+        selected = priority + others[:room_left]
+        dropped = others[room_left:]
+
+        for cluster in clusters:
+            self._recent_keys.append(cluster.key)
+        self.stats.windows += 1
+        self.stats.dropped_clusters += len(dropped)
+        self.stats.peak_window_messages = max(self.stats.peak_window_messages, len(messages))
+        logger.info(
+            f"Danmaku window for room {room_id}: {len(messages)} messages, "
+            f"{len(clusters)} clusters, {len(selected)} selected"
+        )
+        return DanmakuBatch(
+            room=room_id,
+            received=len(messages),
+            window_seconds=window,
+            selected=selected,
+            dropped=dropped,
+        )
+
+    def _score(self, cluster: DanmakuCluster) -> float:
+        score = 2.0 * math.log2(1 + len(cluster.members))
+        if cluster.paid_total > 0:
+            score += 100.0 + cluster.paid_total
+        if any(m.gift for m in cluster.members):
+            score += 50.0
+        if any(keyword in cluster.key for keyword in self._mentions):
+            score += 3.0
+        if any(ch in cluster.representative.text for ch in "?？") or "吗" in cluster.key:
+            score += 1.5
+        score += -2.0 if cluster.key in self._recent_keys else 2.0
+        return score
+
+
+__all__ = [
+    "DanmakuAggregator",
+    "DanmakuBatch",
+    "DanmakuCluster",
+    "DanmakuMessage",
+    "FloodStats",
+    "build_clusters",
+    "normalize_text",
+]
@@ -0,0 +1,209 @@
+"""
+有界优先级任务调度器
+
+替代 `_process_upload` 中裸的 `asyncio.create_task`：每种任务类型（文本/音频/图片）
+有独立的并发上限，排队任务按优先级出队，队列总长度有上限，超限或等待过久的
+任务按明确的策略丢弃，并通知调用方。
+"""
+import asyncio
+import bisect
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# 数值越小优先级越高
+PRIORITY_OWNER_VOICE = 0
+PRIORITY_PAID = 1
+PRIORITY_CHAT = 2
+PRIORITY_IMAGE = 3
+
+PRIORITY_NAMES = {
+    PRIORITY_OWNER_VOICE: "owner_voice",
+    PRIORITY_PAID: "paid",
+    PRIORITY_CHAT: "chat",
+    PRIORITY_IMAGE: "image",
+}
+
+SHED_QUEUE_FULL = "queue_full"
+SHED_EVICTED = "evicted"
+SHED_STALE = "stale"
+
+
+@dataclass(order=True)
+class _Job:
+    priority: int
+    seq: int
+    kind: str = field(compare=False)
+    label: str = field(compare=False)
+    factory: Callable[[], Awaitable[Any]] = field(compare=False)
+    on_shed: Optional[Callable[[str], Awaitable[Any]]] = field(compare=False, default=None)
+    enqueued_at: float = field(compare=False, default_factory=time.monotonic)
+
+
+@dataclass
+class KindStats:
+    running: int = 0
+    queued: int = 0
+    started: int = 0
+    completed: int = 0
+    failed: int = 0
+    shed: int = 0
+    total_wait_ms: float = 0.0
+    max_wait_ms: float = 0.0
+
+    def as_dict(self, limit: int) -> Dict[str, Any]:
+        return {
+            "limit": limit,
+            "running": self.running,
+            "queued": self.queued,
+            "started": self.started,
+            "completed": self.completed,
+            "failed": self.failed,
+            "shed": self.shed,
+            "avg_wait_ms": round(self.total_wait_ms / self.started, 1) if self.started else None,
+            "max_wait_ms": round(self.max_wait_ms, 1),
+        }
+
+
+class TaskScheduler:
+    """按任务类型限流、按优先级出队的有界调度器
+
+    丢弃策略：
+    - 队列已满时，新任务优先级高于队尾最低优先级任务则挤掉后者（evicted），否则拒绝新任务（queue_full）
+    - 出队时等待超过 ``max_wait_seconds`` 的任务直接丢弃（stale），避免回复已过时的消息
+    被丢弃的任务会调用其 ``on_shed(reason)`` 回调。
+    """
+
+    def __init__(
+        self,
+        *,
+        limits: Dict[str, int],
+        max_queue: int = 200,
+        max_wait_seconds: float = 30.0,
+    ) -> None:
+        self._limits = {kind: max(1, limit) for kind, limit in limits.items()}
+        self._max_queue = max(1, max_queue)
+        self._max_wait = max_wait_seconds
+        self._queue: List[_Job] = []
+        self._seq = itertools.count()
+        self._tasks: Set[asyncio.Task] = set()
+        self._stats: Dict[str, KindStats] = {kind: KindStats() for kind in self._limits}
+
+    def submit(
+        self,
+        kind: str,
+        factory: Callable[[], Awaitable[Any]],
+        *,
+        priority: int = PRIORITY_CHAT,
+        label: str = "",
+        on_shed: Optional[Callable[[str], Awaitable[Any]]] = None,
+    ) -> bool:
+        """提交任务；返回 False 表示任务被立即拒绝（此时不会调用 on_shed）"""
+        if kind not in self._limits:
+            raise ValueError(f"unknown_task_kind:{kind}")
+        job = _Job(priority=priority, seq=next(self._seq), kind=kind, label=label, factory=factory, on_shed=on_shed)
+
+        if len(self._queue) >= self._max_queue and not self._has_free_slot(kind):
+            worst = self._queue[-1]
+            if worst.priority <= priority:
+                self._stats[kind].shed += 1
+                logger.warning(f"Scheduler queue full, rejected {kind} task {label}")
+                return False
+            self._queue.pop()
+            self._stats[worst.kind].queued -= 1
+            self._shed(worst, SHED_EVICTED)
+
+        bisect.insort(self._queue, job)
+        self._stats[kind].queued += 1
+        self._pump()
+        return True
+
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def snapshot(self) -> Dict[str, Any]:
+        by_priority: Dict[str, int] = {}
+        for job in self._queue:
+            name = PRIORITY_NAMES.get(job.priority, str(job.priority))
+            by_priority[name] = by_priority.get(name, 0) + 1
+        return {
+            "queue_depth": len(self._queue),
+            "max_queue": self._max_queue,
+            "queued_by_priority": by_priority,
+            "kinds": {kind: stats.as_dict(self._limits[kind]) for kind, stats in self._stats.items()},
+        }
+
+    async def close(self) -> None:
+        queued, self._queue = self._queue, []
+        for job in queued:
+            self._stats[job.kind].queued -= 1
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _has_free_slot(self, kind: str) -> bool:
+        return self._stats[kind].running < self._limits[kind]
+
+    def _pump(self) -> None:
+        now = time.monotonic()
+        index = 0
+        while index < len(self._queue):
+            job = self._queue[index]
+            waited = now - job.enqueued_at
+            if self._max_wait > 0 and waited > self._max_wait:
+                del self._queue[index]
+                self._stats[job.kind].queued -= 1
+                self._shed(job, SHED_STALE)
+                continue
+            if not self._has_free_slot(job.kind):
+                index += 1
+                continue
+            del self._queue[index]
+            stats = self._stats[job.kind]
+            stats.queued -= 1
+            stats.running += 1
+            stats.started += 1
+            stats.total_wait_ms += waited * 1000.0
+            stats.max_wait_ms = max(stats.max_wait_ms, waited * 1000.0)
+            task = asyncio.create_task(self._run(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, job: _Job) -> None:
+        stats = self._stats[job.kind]
+        try:
+            await job.factory()
+            stats.completed += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            stats.failed += 1
+            logger.error(f"Scheduled {job.kind} task {job.label} failed: {exc}")
+        finally:
+            stats.running -= 1
+            self._pump()
+
+    def _shed(self, job: _Job, reason: str) -> None:
+        self._stats[job.kind].shed += 1
+        logger.warning(f"Scheduler shed {job.kind} task {job.label}: {reason}")
+        if job.on_shed is not None:
+            task = asyncio.create_task(job.on_shed(reason))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+
+__all__ = [
+    "PRIORITY_CHAT",
+    "PRIORITY_IMAGE",
+    "PRIORITY_NAMES",
+    "PRIORITY_OWNER_VOICE",
+    "PRIORITY_PAID",
+    "SHED_EVICTED",
+    "SHED_QUEUE_FULL",
+    "SHED_STALE",
+    "TaskScheduler",
+]
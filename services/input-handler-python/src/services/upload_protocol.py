@@ -0,0 +1,172 @@
+"""
+窗口化分块上传协议
+
+旧协议每个二进制块前都要先发一条 `data_chunk` JSON，服务端对每块回复
+"File chunk received"，客户端实际上是停等式发送，每 64KB 一个往返。
+窗口化协议：
+
+1. 客户端发送 `{"action": "upload_start", "protocol": "windowed", "type": ..., "total_size": N,
+   "checksum": "sha256:<hex>"}`（以及旧协议 `data_chunk` 中的其他元数据字段）
+2. 服务端回复 `upload_ready`，告知窗口大小与确认间隔
+3. 客户端连续发送二进制帧：4 字节大端序号 + 数据，无需等待逐块确认，
+   未确认的块不超过窗口大小即可
+4. 服务端每收到 `ack_every` 块或 `ack_bytes` 字节回复一次累计确认 `chunk_ack`
+   （`ack` 为下一个期望的序号）
+5. 客户端发送 `upload_complete`（可再次携带 total_size / checksum），服务端校验
+   大小、序号连续性与校验和后进入正常处理流程
+"""
+import hashlib
+import struct
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+SEQ_HEADER = struct.Struct(">I")
+PROTOCOL_WINDOWED = "windowed"
+
+
+class UploadProtocolError(ValueError):
+    """窗口化上传协议错误（序号越界、超出大小、校验失败等）"""
+
+
+def parse_frame(frame: bytes) -> Tuple[int, bytes]:
+    if len(frame) < SEQ_HEADER.size:
+        raise UploadProtocolError("frame_too_short")
+    (seq,) = SEQ_HEADER.unpack_from(frame)
+    return seq, frame[SEQ_HEADER.size :]
+
+
+def build_frame(seq: int, payload: bytes) -> bytes:
+    return SEQ_HEADER.pack(seq) + payload
+
+
+def _parse_checksum(value: Any) -> Optional[Tuple[str, str]]:
+    if not isinstance(value, str) or not value.strip():
+        return None
+    algo, sep, digest = value.strip().partition(":")
+    if not sep:
+        algo, digest = "sha256", algo
+    algo = algo.lower()
+    if algo not in {"sha256", "crc32"}:
+        raise UploadProtocolError(f"unsupported_checksum:{algo}")
+    return algo, digest.lower()
+
+
+class WindowedUpload:
+    """单个任务的窗口化上传状态"""
+
+    def __init__(
+        self,
+        start: Dict[str, Any],
+        *,
+        window: int = 64,
+        ack_every: int = 16,
+        ack_bytes: int = 1024 * 1024,
+        max_bytes: int = 50 * 1024 * 1024,
+    ) -> None:
+        self.metadata = {k: v for k, v in start.items() if k not in {"action", "protocol"}}
+        self.window = max(1, window)
+        self.ack_every = max(1, min(int(start.get("ack_every") or ack_every), self.window))
+        self.ack_bytes = max(1, ack_bytes)
+        self.max_bytes = max_bytes
+        self.total_size = self._parse_size(start.get("total_size"))
+        self.checksum = _parse_checksum(start.get("checksum"))
+        self.chunks: Dict[int, bytes] = {}
+        self.next_seq = 0
+        self.received_bytes = 0
+        self.duplicates = 0
+        self._unacked_chunks = 0
+        self._unacked_bytes = 0
+        self._sha256 = hashlib.sha256()
+        self._crc32 = 0
+
+    def ready_message(self, task_id: str) -> Dict[str, Any]:
+        return {
+            "type": "system",
+            "action": "upload_ready",
+            "task_id": task_id,
+            "protocol": PROTOCOL_WINDOWED,
+            "window": self.window,
+            "ack_every": self.ack_every,
+            "ack_bytes": self.ack_bytes,
+        }
+
+    def ack_message(self) -> Dict[str, Any]:
+        self._unacked_chunks = 0
+        self._unacked_bytes = 0
+        return {"type": "system", "action": "chunk_ack", "ack": self.next_seq, "bytes": self.received_bytes}
+
+    def receive(self, frame: bytes) -> Optional[Dict[str, Any]]:
+        """登记一个二进制帧；需要发送累计确认时返回确认消息"""
+        seq, payload = parse_frame(frame)
+        if seq < self.next_seq or seq in self.chunks:
+            # 重传的块：立即确认，帮助客户端尽快推进窗口
+            self.duplicates += 1
+            return self.ack_message()
+        if seq >= self.next_seq + self.window:
+            raise UploadProtocolError(f"seq_outside_window:{seq}")
+        if self.received_bytes + len(payload) > self._size_limit():
+            raise UploadProtocolError("upload_too_large")
+        self.chunks[seq] = payload
+        self.received_bytes += len(payload)
+        self._unacked_chunks += 1
+        self._unacked_bytes += len(payload)
+        while self.next_seq in self.chunks:
+            data = self.chunks[self.next_seq]
+            self._sha256.update(data)
+            self._crc32 = zlib.crc32(data, self._crc32)
+            self.next_seq += 1
+        if self._unacked_chunks >= self.ack_every or self._unacked_bytes >= self.ack_bytes:
+            return self.ack_message()
+        return None
+
+    def finish(self, complete: Dict[str, Any]) -> Dict[int, bytes]:
+        """校验上传完整性，返回按序号排列的数据块"""
+        total_size = self._parse_size(complete.get("total_size"))
+        if total_size is not None:
+            self.total_size = total_size
+        checksum = _parse_checksum(complete.get("checksum"))
+        if checksum is not None:
+            self.checksum = checksum
+        missing = self.missing()
+        if missing:
+            raise UploadProtocolError(f"missing_chunks:{','.join(str(s) for s in missing[:20])}")
+        if self.total_size is not None and self.received_bytes != self.total_size:
+            raise UploadProtocolError(f"size_mismatch:{self.received_bytes}!={self.total_size}")
+        if self.checksum is not None:
+            algo, expected = self.checksum
+            actual = self._sha256.hexdigest() if algo == "sha256" else f"{self._crc32 & 0xFFFFFFFF:08x}"
+            if actual != expected:
+                raise UploadProtocolError("checksum_mismatch")
+        return self.chunks
+
+    def missing(self) -> List[int]:
+        if not self.chunks:
+            return []
+        highest = max(self.chunks)
+        return [seq for seq in range(self.next_seq, highest + 1) if seq not in self.chunks]
+
+    def _size_limit(self) -> int:
+        if self.total_size is not None:
+            return min(self.total_size, self.max_bytes)
+        return self.max_bytes
+
+    def _parse_size(self, value: Any) -> Optional[int]:
+        if value is None:
+            return None
+        try:
+            size = int(value)
+        except (TypeError, ValueError):
+            raise UploadProtocolError("invalid_total_size")
+        if size < 0 or size > self.max_bytes:
+            raise UploadProtocolError("upload_too_large")
+        return size
+
+
+__all__ = [
+    "PROTOCOL_WINDOWED",
+    "SEQ_HEADER",
+    "UploadProtocolError",
+    "WindowedUpload",
+    "build_frame",
+    "parse_frame",
+]
@@ -0,0 +1,142 @@
+"""
+可选的上传落盘存储
+
+默认情况下上传数据不再写入磁盘：分块列表直接作为流式请求体转发给 dialog-engine。
+需要保留原始输入（排查问题、回放）时可启用本存储，它会：
+
+- 按任务写入 ``<root>/<task_id>/<filename>``，逐块写入，不做整体拼接
+- 总占用超过 ``max_bytes`` 时从最旧的任务目录开始淘汰
+- 删除修改时间超过 ``ttl_seconds`` 的任务目录（包括旧版本遗留的目录）
+
+各任务目录的大小与修改时间记录在内存索引中：只有 :meth:`UploadSpool.gc`（启动时调用）
+会遍历目录树，每次写入只按索引增量统计与回收，不再扫描整个临时目录。
+"""
+import logging
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class UploadSpool:
+    """有容量上限、带 TTL 回收的任务临时目录"""
+
+    def __init__(
+        self,
+        root: Path,
+        *,
+        enabled: bool = False,
+        max_bytes: int = 512 * 1024 * 1024,
+        ttl_seconds: float = 3600.0,
+    ) -> None:
+        self.root = Path(root)
+        self.enabled = enabled
+        self.max_bytes = max(0, max_bytes)
+        self.ttl_seconds = max(0.0, ttl_seconds)
+        self.saved = 0
+        self.skipped = 0
+        self.evicted = 0
+        self.expired = 0
+        # 任务目录 -> (修改时间, 字节数)；None 表示尚未扫描
+        self._index: Optional[Dict[Path, Tuple[float, int]]] = None
+
+    def save(self, task_id: str, filename: str, chunks: Iterable[bytes]) -> Optional[Path]:
+        """写入任务数据；未启用或单个文件超过容量上限时返回 None"""
+        if not self.enabled:
+            return None
+        chunks = list(chunks)
+        size = sum(len(chunk) for chunk in chunks)
+        if size > self.max_bytes:
+            self.skipped += 1
+            logger.warning(f"Upload for task {task_id} exceeds spool capacity ({size} bytes), not spooled")
+            return None
+        index = self._entries()
+        task_dir = self.root / task_id
+        path = task_dir / filename
+        self._reclaim(index, reserve=size)
+        task_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            replaced = path.stat().st_size if path.exists() else 0
+            with open(path, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+        except OSError as exc:
+            logger.error(f"Failed to spool upload for task {task_id}: {exc}")
+            shutil.rmtree(task_dir, ignore_errors=True)
+            index.pop(task_dir, None)
+            return None
+        _, previous = index.get(task_dir, (0.0, 0))
+        index[task_dir] = (time.time(), previous - replaced + size)
+        self.saved += 1
+        return path
+
+    def gc(self, *, reserve: int = 0) -> None:
+        """重新扫描目录树，删除过期目录，并淘汰最旧的目录直到总占用加上 ``reserve`` 不超过上限"""
+        self._index = {path: (mtime, size) for mtime, size, path in self._scan()}
+        self._reclaim(self._index, reserve=reserve)
+
+    def stats(self) -> Dict[str, Any]:
+        index = self._entries()
+        return {
+            "enabled": self.enabled,
+            "root": str(self.root),
+            "tasks": len(index),
+            "bytes": sum(size for _, size in index.values()),
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "saved": self.saved,
+            "skipped": self.skipped,
+            "evicted": self.evicted,
+            "expired": self.expired,
+        }
+
+    def _entries(self) -> Dict[Path, Tuple[float, int]]:
+        if self._index is None:
+            self._index = {path: (mtime, size) for mtime, size, path in self._scan()}
+        return self._index
+
+    def _reclaim(self, index: Dict[Path, Tuple[float, int]], *, reserve: int) -> None:
+        now = time.time()
+        for path, (mtime, _) in list(index.items()):
+            if self.ttl_seconds and now - mtime > self.ttl_seconds:
+                self._remove(path)
+                del index[path]
+                self.expired += 1
+        total = sum(size for _, size in index.values())
+        for path, (_, size) in sorted(index.items(), key=lambda item: item[1][0]):
+            if total + reserve <= self.max_bytes:
+                break
+            self._remove(path)
+            del index[path]
+            self.evicted += 1
+            total -= size
+
+    def _scan(self) -> List[Tuple[float, int, Path]]:
+        if not self.root.is_dir():
+            return []
+        entries = []
+        for path in self.root.iterdir():
+            try:
+                if path.is_dir():
+                    files = [p for p in path.rglob("*") if p.is_file()]
+                    size = sum(p.stat().st_size for p in files)
+                    mtime = max([p.stat().st_mtime for p in files] or [path.stat().st_mtime])
+                else:
+                    stat = path.stat()
+                    size, mtime = stat.st_size, stat.st_mtime
+            except OSError:
+                continue
+            entries.append((mtime, size, path))
+        return entries
+
+    @staticmethod
+    def _remove(path: Path) -> None:
+        if path.is_dir():
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            path.unlink(missing_ok=True)
+
+
+__all__ = ["UploadSpool"]
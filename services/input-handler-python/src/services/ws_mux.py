@@ -0,0 +1,254 @@
+"""
+WebSocket 多路复用：后端 ``/ws/mux`` 服务端一侧
+
+网关开启多路复用后，只与本服务保持少量常驻连接（载体连接），多个前端会话复用其上
+（帧格式见 ``mux_protocol``）。``MuxServer`` 按 OPEN 帧中的路径把会话分发给现有连接处理
+函数，并把每个会话包装成与 FastAPI WebSocket 接口兼容的 ``MuxSession``，处理函数无需修改。
+
+每个会话的接收队列有上限（``max_inbox`` 条消息）。载体连接的读循环只负责入队，不等待处理；
+某个会话消费过慢、队列写满时，只关闭这一个会话（关闭码 1013），同一载体上的其他会话不受影响。
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from starlette.websockets import WebSocketDisconnect
+
+from .mux_protocol import (
+    CLOSE_BACKEND_UNAVAILABLE,
+    CLOSE_NORMAL,
+    CLOSE_SLOW_CONSUMER,
+    CLOSE_UNKNOWN_PATH,
+    DEFAULT_MAX_INBOX,
+    FRAME_BINARY,
+    FRAME_CLOSE,
+    FRAME_OPEN,
+    FRAME_TEXT,
+    Carrier,
+    MuxProtocolError,
+    decode_close,
+    decode_frame,
+    encode_close,
+    encode_frame,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class MuxSession:
+    """载体连接上的一个会话，提供 FastAPI WebSocket 的常用接口"""
+
+    def __init__(self, carrier: Carrier, session_id: int, path: str, *, max_inbox: int = DEFAULT_MAX_INBOX) -> None:
+        self.session_id = session_id
+        self.path = path
+        self.close_code: Optional[int] = None
+        self._carrier = carrier
+        self._inbox: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue()
+        self._max_inbox = max(1, max_inbox)
+        self._closed = False
+
+    async def accept(self, *args: Any, **kwargs: Any) -> None:
+        # OPEN 帧即表示网关已接受前端连接
+        return None
+
+    async def receive(self) -> Dict[str, Any]:
+        return await self._inbox.get()
+
+    async def receive_text(self) -> str:
+        message = await self.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", CLOSE_NORMAL))
+        if "text" not in message:
+            raise RuntimeError("expected text frame")
+        return message["text"]
+
+    async def receive_bytes(self) -> bytes:
+        message = await self.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", CLOSE_NORMAL))
+        if "bytes" not in message:
+            raise RuntimeError("expected binary frame")
+        return message["bytes"]
+
+    async def send_text(self, data: str) -> None:
+        await self._send(FRAME_TEXT, data.encode("utf-8"))
+
+    async def send_bytes(self, data: bytes) -> None:
+        await self._send(FRAME_BINARY, data)
+
+    async def close(self, code: int = CLOSE_NORMAL, reason: Optional[str] = None) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self.close_code = code
+        try:
+            await self._carrier.send(encode_frame(FRAME_CLOSE, self.session_id, encode_close(code, reason or "")))
+        except Exception:
+            pass
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    async def _send(self, kind: int, payload: bytes) -> None:
+        if self._closed:
+            raise WebSocketDisconnect(self.close_code or CLOSE_NORMAL)
+        try:
+            await self._carrier.send(encode_frame(kind, self.session_id, payload))
+        except ConnectionError:
+            self._closed = True
+            raise WebSocketDisconnect(CLOSE_BACKEND_UNAVAILABLE)
+
+    def _feed(self, kind: int, payload: bytes) -> bool:
+        """入队一条前端消息；队列已满时以 1013 关闭本会话并返回 False"""
+        if self._inbox.qsize() >= self._max_inbox:
+            logger.warning(f"Mux session {self.session_id} ({self.path}) inbox full; closing slow consumer")
+            _drain(self._inbox)
+            self._disconnect(CLOSE_SLOW_CONSUMER)
+            asyncio.ensure_future(self._send_close(CLOSE_SLOW_CONSUMER, "slow_consumer"))
+            return False
+        if kind == FRAME_TEXT:
+            self._inbox.put_nowait({"type": "websocket.receive", "text": payload.decode("utf-8")})
+        elif kind == FRAME_BINARY:
+            self._inbox.put_nowait({"type": "websocket.receive", "bytes": payload})
+        return True
+
+    def _disconnect(self, code: int) -> None:
+        # 前端断开：之后的发送直接失败，接收方收到 disconnect 消息
+        self._closed = True
+        self.close_code = code
+        self._inbox.put_nowait({"type": "websocket.disconnect", "code": code})
+
+    async def _send_close(self, code: int, reason: str) -> None:
+        try:
+            await self._carrier.send(encode_frame(FRAME_CLOSE, self.session_id, encode_close(code, reason)))
+        except Exception:
+            pass
+
+
+def _drain(queue: "asyncio.Queue[Any]") -> None:
+    while not queue.empty():
+        queue.get_nowait()
+
+
+SessionHandler = Callable[[MuxSession], Awaitable[None]]
+
+
+class MuxServer:
+    """后端 /ws/mux 端点：按 OPEN 帧中的路径把会话分发给现有连接处理函数"""
+
+    def __init__(
+        self,
+        route: Callable[[str], Optional[SessionHandler]],
+        *,
+        max_inbox: int = DEFAULT_MAX_INBOX,
+    ) -> None:
+        self._route = route
+        self.max_inbox = max(1, max_inbox)
+        self.carriers = 0
+        self.sessions = 0
+        self.sessions_total = 0
+        self.rejected = 0
+        self.overflows = 0
+
+    async def serve(self, websocket: Any) -> None:
+        await websocket.accept()
+        carrier = Carrier(websocket.send_bytes)
+        sessions: Dict[int, MuxSession] = {}
+        tasks: Dict[int, asyncio.Task] = {}
+        self.carriers += 1
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                frame = message.get("bytes")
+                if frame is None:
+                    continue
+                try:
+                    kind, session_id, payload = decode_frame(frame)
+                except MuxProtocolError as exc:
+                    logger.warning(f"Dropped invalid mux frame: {exc}")
+                    continue
+                if kind == FRAME_OPEN:
+                    path = payload.decode("utf-8", errors="replace")
+                    handler = self._route(path)
+                    if handler is None:
+                        self.rejected += 1
+                        await carrier.send(
+                            encode_frame(FRAME_CLOSE, session_id, encode_close(CLOSE_UNKNOWN_PATH, "unknown_path"))
+                        )
+                        continue
+                    session = MuxSession(carrier, session_id, path, max_inbox=self.max_inbox)
+                    sessions[session_id] = session
+                    tasks[session_id] = asyncio.create_task(self._run(session, handler, sessions, tasks))
+                    continue
+                session = sessions.get(session_id)
+                if session is None:
+                    continue
+                if kind == FRAME_CLOSE:
+                    code, _ = decode_close(payload)
+                    session._disconnect(code)
+                    sessions.pop(session_id, None)
+                elif not session._feed(kind, payload):
+                    self.overflows += 1
+                    sessions.pop(session_id, None)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            carrier.closed = True
+            self.carriers -= 1
+            for session in list(sessions.values()):
+                session._disconnect(CLOSE_BACKEND_UNAVAILABLE)
+            pending = list(tasks.values())
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "carriers": self.carriers,
+            "sessions": self.sessions,
+            "sessions_total": self.sessions_total,
+            "rejected": self.rejected,
+            "overflows": self.overflows,
+        }
+
+    async def _run(
+        self,
+        session: MuxSession,
+        handler: SessionHandler,
+        sessions: Dict[int, MuxSession],
+        tasks: Dict[int, asyncio.Task],
+    ) -> None:
+        self.sessions += 1
+        self.sessions_total += 1
+        try:
+            await handler(session)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.error(f"Mux session {session.session_id} ({session.path}) failed: {exc}")
+        finally:
+            self.sessions -= 1
+            await session.close()
+            sessions.pop(session.session_id, None)
+            tasks.pop(session.session_id, None)
+
+
+__all__ = [
+    "CLOSE_BACKEND_UNAVAILABLE",
+    "CLOSE_NORMAL",
+    "CLOSE_SLOW_CONSUMER",
+    "CLOSE_UNKNOWN_PATH",
+    "FRAME_BINARY",
+    "FRAME_CLOSE",
+    "FRAME_OPEN",
+    "FRAME_TEXT",
+    "MuxServer",
+    "MuxSession",
+    "decode_close",
+    "decode_frame",
+    "encode_close",
+    "encode_frame",
+]
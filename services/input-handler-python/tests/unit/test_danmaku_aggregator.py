@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from src.services.danmaku_aggregator import DanmakuAggregator, DanmakuMessage, build_clusters
+
+
+def _msg(task_id, text, **kwargs):
+    return DanmakuMessage(task_id=task_id, text=text, **kwargs)
+
+
+def test_build_clusters_dedups_and_merges_near_duplicates():
+    messages = [
+        _msg("1", "666"),
+        _msg("2", "６６６！"),
+        _msg("3", "主播唱首歌吧"),
+        _msg("4", "主播唱首歌吧～～"),
+        _msg("5", "主播唱首歌吧求求"),
+        _msg("6", "今天玩什么游戏"),
+    ]
+
+    clusters = build_clusters(messages, similarity=0.6)
+
+    assert [len(c.members) for c in clusters] == [2, 3, 1]
+
+
+@pytest.mark.asyncio
+async def test_window_sends_one_consolidated_turn():
+    batches = []
+
+    async def dispatch(batch):
+        batches.append(batch)
+
+    aggregator = DanmakuAggregator(dispatch=dispatch, window_seconds=0.1, max_items=2)
+    for i in range(20):
+        aggregator.submit(_msg(f"t{i}", "哈哈哈哈"))
+    aggregator.submit(_msg("q", "主播今天玩什么？"))
+    aggregator.submit(_msg("other", "晚饭吃了吗"))
+    aggregator.submit(_msg("sc", "加油", user="小明", paid=30))
+
+    await asyncio.sleep(0.3)
+
+    assert len(batches) == 1
+    batch = batches[0]
+    assert batch.received == 23
+    assert len(batch.task_ids) == 23
+    assert batch.selected[0].representative.task_id == "sc"
+    prompt = batch.to_prompt()
+    assert "[SC ¥30] 小明：加油" in prompt
+    stats = aggregator.snapshot()
+    assert stats["windows"] == 1
+    assert stats["duplicates"] == 19
+    assert stats["buffered"] == 0
+    await aggregator.close()
+
+
+@pytest.mark.asyncio
+async def test_messages_during_dispatch_go_to_next_window():
+    release = asyncio.Event()
+    batches = []
+
+    async def dispatch(batch):
+        batches.append(batch)
+        await release.wait()
+
+    aggregator = DanmakuAggregator(dispatch=dispatch, window_seconds=0.1)
+    aggregator.submit(_msg("a", "first"))
+    await asyncio.sleep(0.15)
+    aggregator.submit(_msg("b", "second"))
+    aggregator.submit(_msg("c", "third"))
+    await asyncio.sleep(0.15)
+    assert len(batches) == 1
+    release.set()
+    await asyncio.sleep(0.25)
+
+    assert [b.received for b in batches] == [1, 2]
+    await aggregator.close()
+
+
+@pytest.mark.asyncio
+async def test_buffer_overflow_evicts_oldest_unpaid_message():
+    async def dispatch(batch):
+        return None
+
+    aggregator = DanmakuAggregator(dispatch=dispatch, window_seconds=10, max_buffer=2)
+    aggregator.submit(_msg("paid", "sc", paid=5))
+    aggregator.submit(_msg("a", "a"))
+    aggregator.submit(_msg("b", "b"))
+
+    assert aggregator.snapshot()["overflow"] == 1
+    batch = await aggregator.flush("default")
+    assert sorted(batch.task_ids) == ["b", "paid"]
+    await aggregator.close()
+
+
+@pytest.mark.asyncio
+async def test_buffer_overflow_of_paid_messages_evicts_oldest():
+    async def dispatch(batch):
+        return None
+
+    aggregator = DanmakuAggregator(dispatch=dispatch, window_seconds=10, max_buffer=2)
+    aggregator.submit(_msg("sc1", "first", paid=5))
+    aggregator.submit(_msg("gift", "thanks", gift=True))
+    aggregator.submit(_msg("sc2", "second", paid=30))
+
+    assert aggregator.buffered() == 2
+    assert aggregator.snapshot()["overflow"] == 1
+    batch = await aggregator.flush("default")
+    assert sorted(batch.task_ids) == ["gift", "sc2"]
+    await aggregator.close()
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+import main as main_module
+from src.services.task_scheduler import (
+    PRIORITY_CHAT,
+    PRIORITY_IMAGE,
+    PRIORITY_OWNER_VOICE,
+    PRIORITY_PAID,
+    TaskScheduler,
+)
+
+
+def _job(order, name, gate):
+    async def run():
+        order.append(name)
+        await gate.wait()
+
+    return run
+
+
+@pytest.mark.asyncio
+async def test_per_kind_limit_and_priority_order():
+    order = []
+    gate = asyncio.Event()
+    scheduler = TaskScheduler(limits={"text": 1, "image": 1}, max_queue=10)
+
+    scheduler.submit("text", _job(order, "first", gate))
+    scheduler.submit("text", _job(order, "chat", gate), priority=PRIORITY_CHAT)
+    scheduler.submit("text", _job(order, "paid", gate), priority=PRIORITY_PAID)
+    scheduler.submit("image", _job(order, "image", gate), priority=PRIORITY_IMAGE)
+    await asyncio.sleep(0)
+
+    snapshot = scheduler.snapshot()
+    assert snapshot["kinds"]["text"]["running"] == 1
+    assert snapshot["kinds"]["text"]["queued"] == 2
+    assert snapshot["kinds"]["image"]["running"] == 1
+
+    gate.set()
+    await asyncio.sleep(0.01)
+    assert order == ["first", "image", "paid", "chat"]
+    assert scheduler.snapshot()["kinds"]["text"]["completed"] == 3
+    await scheduler.close()
+
+
+@pytest.mark.asyncio
+async def test_full_queue_evicts_lower_priority_or_rejects():
+    gate = asyncio.Event()
+    shed = []
+    scheduler = TaskScheduler(limits={"text": 1}, max_queue=1)
+
+    async def on_shed(reason):
+        shed.append(reason)
+
+    assert scheduler.submit("text", _job([], "running", gate))
+    assert scheduler.submit("text", _job([], "chat", gate), priority=PRIORITY_CHAT, on_shed=on_shed)
+    assert not scheduler.submit("text", _job([], "chat2", gate), priority=PRIORITY_CHAT)
+    assert scheduler.submit("text", _job([], "owner", gate), priority=PRIORITY_OWNER_VOICE)
+    await asyncio.sleep(0)
+
+    assert shed == ["evicted"]
+    assert scheduler.snapshot()["queued_by_priority"] == {"owner_voice": 1}
+    assert scheduler.snapshot()["kinds"]["text"]["shed"] == 2
+    gate.set()
+    await scheduler.close()
+
+
+@pytest.mark.asyncio
+async def test_stale_jobs_are_shed_instead_of_run():
+    order = []
+    gate = asyncio.Event()
+    shed = []
+    scheduler = TaskScheduler(limits={"text": 1}, max_wait_seconds=0.01)
+
+    async def on_shed(reason):
+        shed.append(reason)
+
+    scheduler.submit("text", _job(order, "slow", gate))
+    scheduler.submit("text", _job(order, "late", gate), on_shed=on_shed)
+    await asyncio.sleep(0.05)
+    gate.set()
+    await asyncio.sleep(0.01)
+
+    assert order == ["slow"]
+    assert shed == ["stale"]
+    await scheduler.close()
+
+
+def test_task_priority_classes():
+    priority = main_module.InputHandler._task_priority
+
+    assert priority("audio", {"meta": {"role": "owner"}}) == PRIORITY_OWNER_VOICE
+    assert priority("text", {"meta": {"paid": 30}}) == PRIORITY_PAID
+    assert priority("audio", {}) == PRIORITY_CHAT
+    assert priority("image", {"meta": {"paid": 30}}) == PRIORITY_IMAGE
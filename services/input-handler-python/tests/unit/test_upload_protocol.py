@@ -0,0 +1,91 @@
+import asyncio
+import hashlib
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main as main_module
+from src.services.upload_protocol import UploadProtocolError, WindowedUpload, build_frame
+
+
+def _start(payload: bytes, **extra):
+    return {
+        "action": "upload_start",
+        "protocol": "windowed",
+        "type": "audio",
+        "total_size": len(payload),
+        "checksum": "sha256:" + hashlib.sha256(payload).hexdigest(),
+        **extra,
+    }
+
+
+def test_windowed_upload_acks_cumulatively_and_verifies():
+    payload = bytes(range(256)) * 40
+    chunks = [payload[i : i + 1024] for i in range(0, len(payload), 1024)]
+    upload = WindowedUpload(_start(payload), ack_every=4)
+
+    acks = [upload.receive(build_frame(seq, chunk)) for seq, chunk in enumerate(chunks)]
+
+    assert [a["ack"] for a in acks if a] == [4, 8]
+    assert b"".join(upload.finish({}).values()) == payload
+
+
+def test_windowed_upload_reports_gaps_and_bad_checksum():
+    payload = b"x" * 3000
+    upload = WindowedUpload(_start(payload), ack_every=16)
+    upload.receive(build_frame(0, payload[:1000]))
+    upload.receive(build_frame(2, payload[2000:]))
+
+    with pytest.raises(UploadProtocolError, match="missing_chunks:1"):
+        upload.finish({})
+    upload.receive(build_frame(1, b"y" * 1000))
+    with pytest.raises(UploadProtocolError, match="checksum_mismatch"):
+        upload.finish({})
+
+
+def test_windowed_upload_rejects_oversize_and_out_of_window_frames():
+    upload = WindowedUpload({"total_size": 10}, window=2)
+
+    with pytest.raises(UploadProtocolError, match="upload_too_large"):
+        upload.receive(build_frame(0, b"x" * 11))
+    with pytest.raises(UploadProtocolError, match="seq_outside_window"):
+        upload.receive(build_frame(5, b"x"))
+
+
+def test_ws_input_windowed_protocol_end_to_end(monkeypatch):
+    submitted = []
+    forwarded = []
+
+    async def fake_invoke(task_id, parts, content_type):
+        forwarded.append((parts, content_type))
+        return {}
+
+    monkeypatch.setattr(main_module.input_handler, "_invoke_dialog_engine_audio", fake_invoke)
+    monkeypatch.setattr(
+        main_module.input_handler.scheduler,
+        "submit",
+        lambda kind, factory, **kwargs: submitted.append(factory) or True,
+    )
+    payload = b"\x1aE\xdf\xa3" * 5000
+    chunks = [payload[i : i + 4096] for i in range(0, len(payload), 4096)]
+
+    with TestClient(main_module.app) as client:
+        with client.websocket_connect("/ws/input") as ws:
+            task_id = json.loads(ws.receive_text())["task_id"]
+            ws.send_text(json.dumps(_start(payload, ack_every=2)))
+            ready = json.loads(ws.receive_text())
+            assert ready["action"] == "upload_ready"
+            for seq, chunk in enumerate(chunks):
+                ws.send_bytes(build_frame(seq, chunk))
+            acks = [json.loads(ws.receive_text()) for _ in range(len(chunks) // 2)]
+            ws.send_text(json.dumps({"action": "upload_complete"}))
+            done = json.loads(ws.receive_text())
+
+    assert acks[-1] == {"type": "system", "action": "chunk_ack", "ack": 4, "bytes": 16384}
+    assert done["status"] == "queued" and done["task_id"] == task_id
+    assert len(submitted) == 1
+    asyncio.run(submitted[0]())
+    parts, content_type = forwarded[0]
+    assert b"".join(parts) == payload and content_type == "audio/webm"
+    assert not (main_module.TEMP_DIR / task_id).exists()
@@ -0,0 +1,89 @@
+import asyncio
+import json
+import os
+import time
+
+import httpx
+
+import main as main_module
+from src.services.http_pool import HttpClientPool, UpstreamConfig
+from src.services.upload_spool import UploadSpool
+
+
+def test_spool_disabled_writes_nothing(tmp_path):
+    spool = UploadSpool(tmp_path, enabled=False)
+
+    assert spool.save("t1", "input.webm", [b"abc"]) is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_spool_evicts_oldest_and_expires_by_ttl(tmp_path):
+    spool = UploadSpool(tmp_path, enabled=True, max_bytes=10, ttl_seconds=60)
+    first = spool.save("old", "input.webm", [b"12345", b"678"])
+    stale = time.time() - 30
+    os.utime(first, (stale, stale))
+
+    assert first.read_bytes() == b"12345678"
+    spool.save("new", "input.webm", [b"abcd"])
+    assert not first.exists()
+    assert spool.stats()["evicted"] == 1
+
+    (tmp_path / "legacy").mkdir()
+    legacy = tmp_path / "legacy" / "input.txt"
+    legacy.write_text("x")
+    expired = time.time() - 120
+    os.utime(legacy, (expired, expired))
+    spool.gc()
+    assert not legacy.exists()
+    assert spool.stats()["tasks"] == 1
+    assert spool.save("huge", "input.webm", [b"x" * 11]) is None
+
+
+def test_spool_save_tracks_size_without_rescanning(tmp_path, monkeypatch):
+    spool = UploadSpool(tmp_path, enabled=True, max_bytes=10, ttl_seconds=60)
+    spool.gc()
+    scans = []
+    original_scan = spool._scan
+    monkeypatch.setattr(spool, "_scan", lambda: scans.append(1) or original_scan())
+
+    for index in range(4):
+        spool.save(f"t{index}", "input.webm", [b"abcd"])
+    spool.save("t3", "input.webm", [b"abcdef"])
+
+    assert scans == []
+    assert spool.stats()["bytes"] == 6
+    assert [path.name for path in tmp_path.iterdir()] == ["t3"]
+
+
+def test_audio_is_streamed_as_binary_body(monkeypatch):
+    captured = {}
+
+    async def handler(request):
+        if "body" in captured:
+            return httpx.Response(200, json={})
+        captured["body"] = await request.aread()
+        captured["content_type"] = request.headers["content-type"]
+        captured["params"] = dict(request.url.params)
+        return httpx.Response(200, json={"reply": "ok", "transcript": "hi"})
+
+    pool = HttpClientPool()
+    pool.register(
+        UpstreamConfig(name=main_module.DIALOG_ENGINE_UPSTREAM, base_url=main_module.DIALOG_ENGINE_URL),
+        transport=httpx.MockTransport(handler),
+    )
+    monkeypatch.setattr(main_module, "http_pool", pool)
+
+    async def invoke_twice():
+        first = await main_module.input_handler._invoke_dialog_engine_audio("task-1", [b"ab", b"cd"], "audio/webm")
+        await main_module.input_handler._invoke_dialog_engine_audio("task-2", [b"ef"], "audio/webm")
+        await pool.aclose()
+        return first
+
+    result = asyncio.run(invoke_twice())
+
+    assert result["reply"] == "ok"
+    assert captured["body"] == b"abcd"
+    assert captured["content_type"] == "audio/webm"
+    assert captured["params"]["sessionId"] == "task-1"
+    assert json.loads(captured["params"]["meta"]) == {"source": "input-handler"}
+    assert pool.stats()[main_module.DIALOG_ENGINE_UPSTREAM]["requests"] == 2
@@ -0,0 +1,109 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main as main_module
+from src.services.ws_mux import (
+    CLOSE_SLOW_CONSUMER,
+    CLOSE_UNKNOWN_PATH,
+    FRAME_BINARY,
+    FRAME_CLOSE,
+    FRAME_OPEN,
+    FRAME_TEXT,
+    MuxServer,
+    decode_close,
+    decode_frame,
+    encode_close,
+    encode_frame,
+)
+
+
+def test_frame_round_trip():
+    frame = encode_frame(FRAME_BINARY, 7, b"\x00payload")
+
+    assert decode_frame(frame) == (FRAME_BINARY, 7, b"\x00payload")
+    assert decode_close(encode_close(4004, "Invalid task_id")) == (4004, "Invalid task_id")
+
+
+def test_ws_mux_runs_input_sessions_over_one_connection(monkeypatch):
+    monkeypatch.setattr(main_module.input_handler.scheduler, "submit", lambda kind, factory, **kwargs: True)
+
+    with TestClient(main_module.app) as client:
+        with client.websocket_connect("/ws/mux") as ws:
+            ws.send_bytes(encode_frame(FRAME_OPEN, 1, b"/ws/input"))
+            ws.send_bytes(encode_frame(FRAME_OPEN, 2, b"/ws/input"))
+            assigned = {}
+            for _ in range(2):
+                kind, session_id, payload = decode_frame(ws.receive_bytes())
+                assert kind == FRAME_TEXT
+                assigned[session_id] = json.loads(payload)["task_id"]
+
+            ws.send_bytes(encode_frame(FRAME_CLOSE, 2, encode_close(1000)))
+            upload = {"action": "data_chunk", "type": "text", "chunk_id": 0, "text": "你好"}
+            ws.send_bytes(encode_frame(FRAME_TEXT, 1, json.dumps(upload).encode()))
+            ws.send_bytes(encode_frame(FRAME_TEXT, 1, json.dumps({"action": "upload_complete"}).encode()))
+            kind, session_id, payload = decode_frame(ws.receive_bytes())
+            ack = json.loads(payload)
+            kind_close, closed_id, close_payload = decode_frame(ws.receive_bytes())
+
+            ws.send_bytes(encode_frame(FRAME_OPEN, 3, b"/ws/unknown"))
+            _, rejected_id, rejected = decode_frame(ws.receive_bytes())
+
+    assert len(set(assigned.values())) == 2
+    assert (kind, session_id) == (FRAME_TEXT, 1)
+    assert ack["status"] == "queued" and ack["task_id"] == assigned[1]
+    assert (kind_close, closed_id) == (FRAME_CLOSE, 1)
+    assert decode_close(close_payload)[0] == 1000
+    assert rejected_id == 3 and decode_close(rejected)[0] == CLOSE_UNKNOWN_PATH
+
+
+class _Carrier:
+    """内存中的载体连接：一端交给 MuxServer，另一端由测试收发帧"""
+
+    def __init__(self):
+        self.inbound: asyncio.Queue = asyncio.Queue()
+        self.outbound: asyncio.Queue = asyncio.Queue()
+
+    async def accept(self):
+        return None
+
+    async def receive(self):
+        return await self.inbound.get()
+
+    async def send_bytes(self, data):
+        await self.outbound.put(decode_frame(data))
+
+    async def push(self, kind, session_id, payload=b""):
+        await self.inbound.put({"type": "websocket.receive", "bytes": encode_frame(kind, session_id, payload)})
+
+
+@pytest.mark.asyncio
+async def test_mux_server_closes_only_the_slow_session():
+    release = asyncio.Event()
+
+    async def handler(session):
+        if session.path == "/ws/slow":
+            await release.wait()
+            return
+        await session.send_text((await session.receive_text()).upper())
+
+    server = MuxServer(lambda path: handler, max_inbox=2)
+    carrier = _Carrier()
+    serving = asyncio.create_task(server.serve(carrier))
+
+    await carrier.push(FRAME_OPEN, 1, b"/ws/slow")
+    for index in range(3):
+        await carrier.push(FRAME_TEXT, 1, str(index).encode())
+    kind, session_id, payload = await asyncio.wait_for(carrier.outbound.get(), 1)
+    assert (kind, session_id, decode_close(payload)[0]) == (FRAME_CLOSE, 1, CLOSE_SLOW_CONSUMER)
+
+    await carrier.push(FRAME_OPEN, 2, b"/ws/input")
+    await carrier.push(FRAME_TEXT, 2, b"still here")
+    assert await asyncio.wait_for(carrier.outbound.get(), 1) == (FRAME_TEXT, 2, b"STILL HERE")
+    assert server.stats()["overflows"] == 1
+
+    release.set()
+    await carrier.inbound.put({"type": "websocket.disconnect"})
+    await serving
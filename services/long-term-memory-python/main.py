@@ -8,8 +8,10 @@ import logging
 import os
 import signal
 import sys
+import time
+import uuid
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 import redis.asyncio as redis
 
@@ -17,7 +19,18 @@ import redis.asyncio as redis
 sys.path.insert(0, str(Path(__file__).parent / "src"))
 
 from src.utils.config_loader import config_loader
-from src.core.mem0_client import Mem0Service
+from src.core.llm_rate_limiter import LLMRateLimiter
+from src.core.mem0_client import Mem0QuotaExceeded, Mem0Service
+
+# 后台写入（add）在独立的有界队列中由少量 worker 执行，交互式 search 不再排在等待配额的写入之后
+BACKGROUND_REQUEST_TYPES = {"add"}
+LTM_BACKGROUND_CONCURRENCY = max(1, int(os.getenv("LTM_BACKGROUND_CONCURRENCY", "2")))
+LTM_BACKGROUND_QUEUE_SIZE = max(1, int(os.getenv("LTM_BACKGROUND_QUEUE_SIZE", "256")))
+
+# 因配额不足被放弃的记忆更新写入 Redis 有序集合（score 为下次重试时间），到期后重试
+MEMORY_RETRY_KEY = os.getenv("LTM_MEMORY_RETRY_KEY", "ltm:memory_retry")
+LTM_MEMORY_RETRY_DELAY_SECONDS = float(os.getenv("LTM_MEMORY_RETRY_DELAY_SECONDS", "30"))
+LTM_MEMORY_RETRY_MAX_ATTEMPTS = int(os.getenv("LTM_MEMORY_RETRY_MAX_ATTEMPTS", "5"))
 
 
 async def _init_redis() -> redis.Redis:
@@ -32,6 +45,59 @@ async def _init_redis() -> redis.Redis:
     return client
 
 
+def _build_rate_limiter(redis_client: redis.Redis) -> Optional[LLMRateLimiter]:
+    conf = config_loader.get_llm_rate_limit_config()
+    if not conf.get("enabled") or not (conf.get("rpm") or conf.get("tpm")):
+        return None
+    return LLMRateLimiter(
+        redis_client=redis_client,
+        key=conf.get("key", "llm:ratelimit"),
+        rpm=int(conf.get("rpm", 0)),
+        tpm=int(conf.get("tpm", 0)),
+        background_reserve=float(conf.get("background_reserve", 0.3)),
+        interactive_max_wait=float(conf.get("interactive_max_wait", 2.0)),
+        background_max_wait=float(conf.get("background_max_wait", 30.0)),
+    )
+
+
+async def _schedule_memory_retry(redis_client: redis.Redis, memory: Dict[str, Any], attempt: int) -> bool:
+    """把被限流放弃的记忆写入放回重试集合（指数退避）；超过最大次数时放弃并返回 False"""
+    logger = logging.getLogger(__name__)
+    if attempt > LTM_MEMORY_RETRY_MAX_ATTEMPTS:
+        logger.warning(f"Memory update for {memory.get('user_id')} dropped after {attempt - 1} retries")
+        return False
+    due = time.time() + LTM_MEMORY_RETRY_DELAY_SECONDS * (2 ** (attempt - 1))
+    entry = json.dumps({"id": uuid.uuid4().hex, "attempt": attempt, "memory": memory}, ensure_ascii=False)
+    await redis_client.zadd(MEMORY_RETRY_KEY, {entry: due})
+    logger.info(f"Memory update for {memory.get('user_id')} shed by rate limiter; retry #{attempt} scheduled")
+    return True
+
+
+async def _retry_memory_updates(redis_client: redis.Redis, mem0: Mem0Service, interval: float = 1.0):
+    """取出到期的重试项再次写入；ZREM 成功者才处理，多实例不会重复写入"""
+    logger = logging.getLogger(__name__)
+    try:
+        while True:
+            try:
+                entries = await redis_client.zrangebyscore(MEMORY_RETRY_KEY, 0, time.time(), start=0, num=10)
+                for raw in entries or []:
+                    if not await redis_client.zrem(MEMORY_RETRY_KEY, raw):
+                        continue
+                    entry = json.loads(raw)
+                    try:
+                        await mem0.add_memory(entry["memory"])
+                    except Mem0QuotaExceeded:
+                        await _schedule_memory_retry(redis_client, entry["memory"], int(entry.get("attempt", 1)) + 1)
+                    except Exception as e:
+                        logger.error(f"Retried memory update failed: {e}")
+            except Exception as e:
+                logger.error(f"Memory retry loop error: {e}")
+            await asyncio.sleep(interval)
+    except asyncio.CancelledError:
+        logger.info("_retry_memory_updates cancelled")
+        raise
+
+
 async def _handle_memory_updates(redis_client: redis.Redis, mem0: Mem0Service, channel_name: str):
     logger = logging.getLogger(__name__)
     pubsub = redis_client.pubsub()
@@ -52,7 +118,11 @@ async def _handle_memory_updates(redis_client: redis.Redis, mem0: Mem0Service, c
                     "timestamp": data.get("timestamp"),
                     "session_id": (data.get("meta") or {}).get("session_id") if isinstance(data.get("meta"), dict) else None,
                 }
-                await mem0.add_memory({"user_id": user_id, "content": content, "metadata": metadata})
+                memory = {"user_id": user_id, "content": content, "metadata": metadata}
+                try:
+                    await mem0.add_memory(memory)
+                except Mem0QuotaExceeded:
+                    await _schedule_memory_retry(redis_client, memory, 1)
             except Exception as e:
                 logger.error(f"Failed to index memory update: {e}")
     except asyncio.CancelledError:
@@ -69,9 +139,58 @@ async def _handle_memory_updates(redis_client: redis.Redis, mem0: Mem0Service, c
             pass
 
 
+async def _process_ltm_request(redis_client: redis.Redis, mem0: Mem0Service, req: Dict[str, Any], resp_channel: str):
+    request_id = req.get("request_id")
+    user_id = req.get("user_id")
+    rtype = req.get("type")
+    data = req.get("data") or {}
+
+    resp: Dict[str, Any] = {"request_id": request_id, "user_id": user_id, "success": True}
+    try:
+        if rtype == "search":
+            query = data.get("query", "")
+            limit = int((data.get("limit") or 5))
+            memories = await mem0.search(query=query, user_id=user_id, limit=limit)
+            resp["memories"] = memories
+        elif rtype == "add":
+            content = data.get("content", "")
+            metadata = data.get("metadata") or {}
+            mid = await mem0.add_memory({"user_id": user_id, "content": content, "metadata": metadata})
+            resp["memories"] = [{"id": mid, "content": content}]
+        elif rtype == "profile_get":
+            # Placeholder: return empty profile until implemented
+            resp["user_profile"] = {}
+        elif rtype == "profile_update":
+            resp["user_profile"] = data.get("updates") or {}
+        else:
+            resp.update({"success": False, "error": f"unknown_request_type:{rtype}"})
+    except Exception as e:
+        resp.update({"success": False, "error": str(e)})
+
+    # publish response
+    await redis_client.publish(resp_channel, json.dumps(resp, ensure_ascii=False))
+
+
+async def _background_worker(redis_client: redis.Redis, mem0: Mem0Service, queue: asyncio.Queue, resp_channel: str):
+    logger = logging.getLogger(__name__)
+    while True:
+        req = await queue.get()
+        try:
+            await _process_ltm_request(redis_client, mem0, req, resp_channel)
+        except Exception as e:
+            logger.error(f"LTM background request failed: {e}")
+        finally:
+            queue.task_done()
+
+
 async def _handle_ltm_requests(redis_client: redis.Redis, mem0: Mem0Service, queue_name: str, resp_channel: str):
     logger = logging.getLogger(__name__)
     logger.info(f"LTM consuming queue: {queue_name}, responding on: {resp_channel}")
+    background: asyncio.Queue = asyncio.Queue(maxsize=LTM_BACKGROUND_QUEUE_SIZE)
+    workers = [
+        asyncio.create_task(_background_worker(redis_client, mem0, background, resp_channel))
+        for _ in range(LTM_BACKGROUND_CONCURRENCY)
+    ]
     try:
         while True:
             try:
@@ -85,41 +204,33 @@ async def _handle_ltm_requests(redis_client: redis.Redis, mem0: Mem0Service, que
                     logger.warning("Invalid JSON in ltm_requests, skipping")
                     continue
 
-                request_id = req.get("request_id")
-                user_id = req.get("user_id")
-                rtype = req.get("type")
-                data = req.get("data") or {}
+                if req.get("type") in BACKGROUND_REQUEST_TYPES:
+                    try:
+                        background.put_nowait(req)
+                    except asyncio.QueueFull:
+                        # 后台积压已满时立即拒绝，不阻塞交互式请求
+                        resp = {
+                            "request_id": req.get("request_id"),
+                            "user_id": req.get("user_id"),
+                            "success": False,
+                            "error": "background_queue_full",
+                        }
+                        await redis_client.publish(resp_channel, json.dumps(resp, ensure_ascii=False))
+                    continue
 
-                resp: Dict[str, Any] = {"request_id": request_id, "user_id": user_id, "success": True}
-                try:
-                    if rtype == "search":
-                        query = data.get("query", "")
-                        limit = int((data.get("limit") or 5))
-                        memories = await mem0.search(query=query, user_id=user_id, limit=limit)
-                        resp["memories"] = memories
-                    elif rtype == "add":
-                        content = data.get("content", "")
-                        metadata = data.get("metadata") or {}
-                        mid = await mem0.add_memory({"user_id": user_id, "content": content, "metadata": metadata})
-                        resp["memories"] = [{"id": mid, "content": content}]
-                    elif rtype == "profile_get":
-                        # Placeholder: return empty profile until implemented
-                        resp["user_profile"] = {}
-                    elif rtype == "profile_update":
-                        resp["user_profile"] = data.get("updates") or {}
-                    else:
-                        resp.update({"success": False, "error": f"unknown_request_type:{rtype}"})
-                except Exception as e:
-                    resp.update({"success": False, "error": str(e)})
-
-                # publish response
-                await redis_client.publish(resp_channel, json.dumps(resp, ensure_ascii=False))
+                await _process_ltm_request(redis_client, mem0, req, resp_channel)
             except Exception as e:
                 logger.error(f"LTM request loop error: {e}")
                 await asyncio.sleep(0.1)
     except asyncio.CancelledError:
         logger.info("_handle_ltm_requests cancelled")
         raise
+    finally:
+        for worker in workers:
+            worker.cancel()
+        for worker in workers:
+            with contextlib.suppress(asyncio.CancelledError, Exception):
+                await worker
 
 
 async def main():
@@ -136,7 +247,10 @@ async def main():
     try:
         # 初始化组件
         redis_client = await _init_redis()
-        mem0 = Mem0Service(config_loader.get_mem0_config())
+        mem0 = Mem0Service(
+            config_loader.get_mem0_config(),
+            rate_limiter=_build_rate_limiter(redis_client),
+        )
 
         channels = config_loader.get_channels_config()
         queues = config_loader.get_queues_config()
@@ -148,17 +262,17 @@ async def main():
 
         task_updates = asyncio.create_task(_handle_memory_updates(redis_client, mem0, memory_updates_ch))
         task_requests = asyncio.create_task(_handle_ltm_requests(redis_client, mem0, ltm_requests_q, ltm_responses_ch))
+        task_retries = asyncio.create_task(_retry_memory_updates(redis_client, mem0))
 
         try:
-            await asyncio.gather(task_updates, task_requests)
+            await asyncio.gather(task_updates, task_requests, task_retries)
         except asyncio.CancelledError:
             logger.info("Main cancelled; propagating to workers")
-            task_updates.cancel()
-            task_requests.cancel()
-            with contextlib.suppress(Exception):
-                await task_updates
-            with contextlib.suppress(Exception):
-                await task_requests
+            for task in (task_updates, task_requests, task_retries):
+                task.cancel()
+            for task in (task_updates, task_requests, task_retries):
+                with contextlib.suppress(Exception):
+                    await task
             raise
             
     except KeyboardInterrupt:
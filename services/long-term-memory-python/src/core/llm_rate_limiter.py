@@ -0,0 +1,249 @@
+"""Distributed LLM rate limiter with priority lanes.
+
+Every service that calls the LLM provider (dialog-engine, memory-python,
+long-term-memory-python) shares one pair of Redis token buckets: requests per
+minute and tokens per minute. Interactive calls may drain the buckets; background
+calls must leave ``background_reserve`` of each bucket untouched, so a burst of
+summaries or memory extraction never eats the headroom live viewers need.
+
+Each service ships its own copy of this module (they build from separate
+contexts); keep the copies in sync.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LANE_INTERACTIVE = "interactive"
+LANE_BACKGROUND = "background"
+
+_KEY_TTL_MS = 120_000
+
+# KEYS: request bucket, token bucket
+# ARGV: rpm, tpm, token cost, reserve ratio
+# Returns 0 when both buckets were charged, otherwise the milliseconds to wait.
+_ACQUIRE_SCRIPT = """
+if redis.replicate_commands then redis.replicate_commands() end
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+local caps = {tonumber(ARGV[1]), tonumber(ARGV[2])}
+local costs = {1, tonumber(ARGV[3])}
+local reserve = tonumber(ARGV[4])
+local levels = {}
+local wait = 0
+for i = 1, 2 do
+  local cap = caps[i]
+  if cap > 0 then
+    local state = redis.call('HMGET', KEYS[i], 'level', 'ts')
+    local level = tonumber(state[1]) or cap
+    local ts = tonumber(state[2]) or now
+    level = math.min(cap, level + math.max(0, now - ts) * cap / 60000)
+    levels[i] = level
+    local need = math.min(costs[i], cap) + cap * reserve
+    if level < need then
+      wait = math.max(wait, (need - level) * 60000 / cap)
+    end
+  end
+end
+if wait > 0 then
+  return math.ceil(wait)
+end
+for i = 1, 2 do
+  if caps[i] > 0 then
+    redis.call('HSET', KEYS[i], 'level', levels[i] - costs[i], 'ts', now)
+    redis.call('PEXPIRE', KEYS[i], %d)
+  end
+end
+return 0
+""" % _KEY_TTL_MS
+
+# KEYS: token bucket; ARGV: tpm, refund (negative to charge more)
+_SETTLE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+  return 0
+end
+local level = tonumber(redis.call('HGET', KEYS[1], 'level')) + tonumber(ARGV[2])
+redis.call('HSET', KEYS[1], 'level', math.min(tonumber(ARGV[1]), level))
+return 0
+"""
+
+
+class RateLimitShedError(RuntimeError):
+    """Raised when a background LLM call gave up waiting for quota."""
+
+
+@dataclass
+class RateLimitStats:
+    granted: int = 0
+    waited: int = 0
+    overdrafts: int = 0
+    shed: int = 0
+    backend_errors: int = 0
+    total_wait_ms: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "granted": self.granted,
+            "waited": self.waited,
+            "overdrafts": self.overdrafts,
+            "shed": self.shed,
+            "backend_errors": self.backend_errors,
+            "avg_wait_ms": round(self.total_wait_ms / self.waited, 1) if self.waited else None,
+        }
+
+
+class _LocalBuckets:
+    """In-process mirror of the Redis scripts, used when Redis is unavailable."""
+
+    def __init__(self) -> None:
+        self._levels: Dict[int, Tuple[float, float]] = {}
+
+    def acquire(self, caps: Tuple[int, int], costs: Tuple[int, int], reserve: float) -> int:
+        now = time.monotonic() * 1000.0
+        levels = {}
+        wait = 0.0
+        for i, cap in enumerate(caps):
+            if cap <= 0:
+                continue
+            level, ts = self._levels.get(i, (float(cap), now))
+            level = min(cap, level + max(0.0, now - ts) * cap / 60000.0)
+            levels[i] = level
+            need = min(costs[i], cap) + cap * reserve
+            if level < need:
+                wait = max(wait, (need - level) * 60000.0 / cap)
+        if wait > 0:
+            return max(1, int(wait + 0.999))
+        for i, level in levels.items():
+            self._levels[i] = (level - costs[i], now)
+        return 0
+
+    def settle(self, tpm: int, refund: int) -> None:
+        state = self._levels.get(1)
+        if state is not None:
+            self._levels[1] = (min(tpm, state[0] + refund), state[1])
+
+
+class LLMRateLimiter:
+    """Token-bucket limiter over requests and tokens per minute.
+
+    ``acquire`` charges one request plus the estimated tokens. Interactive
+    calls wait at most ``interactive_max_wait`` seconds and then proceed
+    anyway (an overdraft), so the limiter never stalls a viewer for long.
+    Background calls wait up to ``background_max_wait`` seconds and are then
+    shed with ``RateLimitShedError``; callers retry them later. ``settle``
+    corrects the token bucket once the real usage is known.
+    """
+
+    def __init__(
+        self,
+        *,
+        redis_client: Any = None,
+        key: str = "llm:ratelimit",
+        rpm: int = 0,
+        tpm: int = 0,
+        background_reserve: float = 0.3,
+        interactive_max_wait: float = 2.0,
+        background_max_wait: float = 30.0,
+    ) -> None:
+        self._keys = (f"{key}:requests", f"{key}:tokens")
+        self._caps = (max(0, rpm), max(0, tpm))
+        self._reserve = min(max(background_reserve, 0.0), 0.9)
+        self._max_wait = {
+            LANE_INTERACTIVE: max(0.0, interactive_max_wait),
+            LANE_BACKGROUND: max(0.0, background_max_wait),
+        }
+        self._local = _LocalBuckets()
+        self._acquire_script = redis_client.register_script(_ACQUIRE_SCRIPT) if redis_client is not None else None
+        self._settle_script = redis_client.register_script(_SETTLE_SCRIPT) if redis_client is not None else None
+        self._stats = {LANE_INTERACTIVE: RateLimitStats(), LANE_BACKGROUND: RateLimitStats()}
+
+    @property
+    def enabled(self) -> bool:
+        return any(self._caps)
+
+    async def acquire(self, *, lane: str = LANE_INTERACTIVE, tokens: int = 0) -> None:
+        if not self.enabled:
+            return
+        lane = lane if lane in self._stats else LANE_BACKGROUND
+        stats = self._stats[lane]
+        reserve = 0.0 if lane == LANE_INTERACTIVE else self._reserve
+        started = time.monotonic()
+        deadline = started + self._max_wait[lane]
+        slept = False
+        while True:
+            wait_ms = await self._try_acquire(max(0, int(tokens)), reserve, stats)
+            now = time.monotonic()
+            if wait_ms <= 0:
+                stats.granted += 1
+                if slept:
+                    stats.waited += 1
+                    stats.total_wait_ms += (now - started) * 1000.0
+                return
+            remaining = deadline - now
+            if remaining <= 0:
+                if lane == LANE_INTERACTIVE:
+                    stats.overdrafts += 1
+                    logger.warning("llm.ratelimit.overdraft", extra={"tokens": tokens})
+                    # Still charge the tokens so background work backs off.
+                    await self.settle(estimated=0, actual=tokens)
+                    return
+                stats.shed += 1
+                logger.info("llm.ratelimit.shed", extra={"tokens": tokens})
+                raise RateLimitShedError("llm_rate_limited")
+            # Jitter spreads out waiters that were refused at the same moment.
+            await asyncio.sleep(min(wait_ms / 1000.0 * random.uniform(1.0, 1.2), remaining))
+            slept = True
+
+    async def settle(self, *, estimated: int, actual: Optional[int]) -> None:
+        """Refund (or charge) the difference between estimated and real tokens."""
+
+        if not self._caps[1] or actual is None:
+            return
+        refund = int(estimated) - int(actual)
+        if refund == 0:
+            return
+        if self._settle_script is not None:
+            try:
+                await self._settle_script(keys=[self._keys[1]], args=[self._caps[1], refund])
+                return
+            except Exception as exc:
+                logger.debug("llm.ratelimit.settle_failed", extra={"error": repr(exc)})
+        self._local.settle(self._caps[1], refund)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rpm": self._caps[0],
+            "tpm": self._caps[1],
+            "backend": "redis" if self._acquire_script is not None else "local",
+            **{lane: stats.as_dict() for lane, stats in self._stats.items()},
+        }
+
+    async def _try_acquire(self, tokens: int, reserve: float, stats: RateLimitStats) -> int:
+        if self._acquire_script is not None:
+            try:
+                result = await self._acquire_script(
+                    keys=list(self._keys),
+                    args=[self._caps[0], self._caps[1], tokens, reserve],
+                )
+                return int(result)
+            except Exception as exc:
+                # Fall back to per-process limiting rather than blocking callers.
+                stats.backend_errors += 1
+                logger.warning("llm.ratelimit.backend_error", extra={"error": repr(exc)})
+        return self._local.acquire(self._caps, (1, tokens), reserve)
+
+
+__all__ = [
+    "LANE_BACKGROUND",
+    "LANE_INTERACTIVE",
+    "LLMRateLimiter",
+    "RateLimitShedError",
+    "RateLimitStats",
+]
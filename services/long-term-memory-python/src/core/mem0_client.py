@@ -22,14 +22,23 @@ from typing import Any, Dict, List, Optional
 import yaml
 
 from mem0 import Memory
+from src.core.llm_rate_limiter import LANE_BACKGROUND, LANE_INTERACTIVE, LLMRateLimiter, RateLimitShedError
 from src.models.memory import UserMemory, MemoryMetadata, MemoryCategory
 
+# Mem0 写入时会调用 LLM 做事实抽取和记忆合并，提示词本身的大致 token 开销
+_MEM0_PROMPT_OVERHEAD_TOKENS = 1500
+
 
 class Mem0OperationError(Exception):
     """Mem0操作错误"""
     pass
 
 
+class Mem0QuotaExceeded(Mem0OperationError):
+    """后台写入未获得 LLM 配额而被放弃（可稍后重试）"""
+    pass
+
+
 class Mem0Service:
     """Mem0长期记忆服务客户端
     
@@ -73,8 +82,9 @@ class Mem0Service:
         "aws_bedrock",
     }
 
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], rate_limiter: Optional[LLMRateLimiter] = None):
         self.config = config
+        self.rate_limiter = rate_limiter
         self.logger = logging.getLogger(__name__)
         self._client: Optional[Memory] = None
         self._executor: Optional[ThreadPoolExecutor] = None
@@ -151,6 +161,15 @@ class Mem0Service:
         if not user_id:
             raise ValueError("用户ID不能为空")
     
+    async def _acquire_quota(self, lane: str, text: str, overhead: int = 0) -> None:
+        """向跨服务共享的 LLM 限流器申请配额；后台写入超时未获配额时放弃"""
+        if self.rate_limiter is None:
+            return
+        try:
+            await self.rate_limiter.acquire(lane=lane, tokens=len(text) // 2 + overhead)
+        except RateLimitShedError:
+            raise Mem0QuotaExceeded("LLM配额不足，记忆写入已放弃")
+
     def _extract_memory_id(self, result: Any) -> str:
         """从Mem0结果中提取记忆ID"""
         if isinstance(result, dict):
@@ -172,6 +191,9 @@ class Mem0Service:
             content = data.get("content", "").strip()
             user_id = data.get("user_id", "").strip()
             metadata = data.get("metadata", {})
+
+            # 记忆抽取属于后台任务，让位于直播互动
+            await self._acquire_quota(LANE_BACKGROUND, content, _MEM0_PROMPT_OVERHEAD_TOKENS)
             
             # 在专用线程池中调用Mem0 API
             result = await asyncio.get_running_loop().run_in_executor(
@@ -213,6 +235,9 @@ class Mem0Service:
                 raise ValueError("用户ID不能为空")
             if limit <= 0:
                 raise ValueError("限制数量必须大于0")
+
+            # 检索只需要一次 embedding，且对话链路在等待结果
+            await self._acquire_quota(LANE_INTERACTIVE, query)
             
             # 在线程池中调用Mem0 API
             results = await asyncio.get_running_loop().run_in_executor(
@@ -275,6 +300,8 @@ class Mem0Service:
                 raise ValueError("记忆ID不能为空")
             if not isinstance(data, dict):
                 raise ValueError("更新数据必须是字典")
+
+            await self._acquire_quota(LANE_BACKGROUND, json.dumps(data, ensure_ascii=False), _MEM0_PROMPT_OVERHEAD_TOKENS)
             
             # 在线程池中调用Mem0 API
             result = await asyncio.get_running_loop().run_in_executor(
@@ -72,6 +72,25 @@ class ConfigLoader:
                 except json.JSONDecodeError:
                     logger.warning("Invalid JSON in MEM0_EMBEDDER_CONFIG_JSON; ignoring override")
         
+        # 跨服务共享的 LLM 限流配置
+        if "llm_rate_limit" in config:
+            rl_cfg = config["llm_rate_limit"]
+            enabled = os.getenv("LLM_RATE_LIMIT_ENABLED")
+            if enabled is not None:
+                rl_cfg["enabled"] = enabled.strip().lower() in {"1", "true", "yes", "on"}
+            rl_cfg["key"] = os.getenv("LLM_RATE_LIMIT_KEY", rl_cfg.get("key", "llm:ratelimit"))
+            rl_cfg["rpm"] = int(os.getenv("LLM_RATE_LIMIT_RPM", rl_cfg.get("rpm", 0)))
+            rl_cfg["tpm"] = int(os.getenv("LLM_RATE_LIMIT_TPM", rl_cfg.get("tpm", 0)))
+            rl_cfg["background_reserve"] = float(
+                os.getenv("LLM_RATE_LIMIT_BACKGROUND_RESERVE", rl_cfg.get("background_reserve", 0.3))
+            )
+            rl_cfg["interactive_max_wait"] = float(
+                os.getenv("LLM_RATE_LIMIT_INTERACTIVE_MAX_WAIT", rl_cfg.get("interactive_max_wait", 2.0))
+            )
+            rl_cfg["background_max_wait"] = float(
+                os.getenv("LLM_RATE_LIMIT_BACKGROUND_MAX_WAIT", rl_cfg.get("background_max_wait", 30.0))
+            )
+
         # 服务配置
         if "service" in config:
             config["service"]["host"] = os.getenv("SERVICE_HOST", config["service"]["host"])
@@ -102,6 +121,10 @@ class ConfigLoader:
         """获取Mem0配置"""
         return self.get("mem0", {})
     
+    def get_llm_rate_limit_config(self) -> Dict[str, Any]:
+        """获取LLM限流配置"""
+        return self.get("llm_rate_limit", {})
+    
     def get_channels_config(self) -> Dict[str, str]:
         """获取频道配置"""
         return self.get("channels", {})
@@ -5,7 +5,8 @@ from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
-from main import _handle_ltm_requests, _handle_memory_updates
+from main import MEMORY_RETRY_KEY, _handle_ltm_requests, _handle_memory_updates
+from src.core.mem0_client import Mem0QuotaExceeded
 
 
 @pytest.mark.asyncio
@@ -122,3 +123,66 @@ async def test_handle_ltm_requests_unknown_type_error():
     published = json.loads(redis_client.publish.call_args[0][1])
     assert published["success"] is False
     assert published["error"] == "unknown_request_type:unknown"
+
+
+@pytest.mark.asyncio
+async def test_search_is_not_blocked_by_background_add():
+    redis_client = AsyncMock()
+    mem0 = AsyncMock()
+    add_started = asyncio.Event()
+    release_add = asyncio.Event()
+
+    async def slow_add(data):
+        add_started.set()
+        await release_add.wait()  # 模拟等待后台配额
+        return "m-add"
+
+    mem0.add_memory = AsyncMock(side_effect=slow_add)
+    mem0.search.return_value = []
+    add_request = {"request_id": "a1", "user_id": "u", "type": "add", "data": {"content": "x"}}
+    search_request = {"request_id": "s1", "user_id": "u", "type": "search", "data": {"query": "x"}}
+    redis_client.brpop = AsyncMock(
+        side_effect=[("q", json.dumps(add_request)), ("q", json.dumps(search_request))] + [None] * 100
+    )
+    redis_client.publish = AsyncMock()
+
+    task = asyncio.create_task(_handle_ltm_requests(redis_client, mem0, "q", "ltm_responses"))
+    await asyncio.wait_for(add_started.wait(), timeout=1.0)
+    await asyncio.sleep(0.05)
+
+    published = [json.loads(call.args[1])["request_id"] for call in redis_client.publish.call_args_list]
+    assert published == ["s1"]
+    release_add.set()
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await task
+    published = [json.loads(call.args[1])["request_id"] for call in redis_client.publish.call_args_list]
+    assert published == ["s1", "a1"]
+
+
+@pytest.mark.asyncio
+async def test_shed_memory_update_is_scheduled_for_retry():
+    redis_client = AsyncMock()
+    pubsub = AsyncMock()
+    redis_client.pubsub = MagicMock(return_value=pubsub)
+    message = {"type": "message", "data": json.dumps({"user_id": "user1", "content": "hello"})}
+
+    async def listen():
+        yield message
+        await asyncio.sleep(1)
+
+    pubsub.listen = MagicMock(return_value=listen())
+    mem0 = AsyncMock()
+    mem0.add_memory.side_effect = Mem0QuotaExceeded("shed")
+
+    task = asyncio.create_task(_handle_memory_updates(redis_client, mem0, "memory_updates"))
+    await asyncio.sleep(0.1)
+    task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await task
+
+    key, mapping = redis_client.zadd.call_args[0]
+    entry = json.loads(next(iter(mapping)))
+    assert key == MEMORY_RETRY_KEY
+    assert entry["attempt"] == 1 and entry["memory"]["content"] == "hello"
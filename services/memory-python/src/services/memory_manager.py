@@ -8,8 +8,28 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 import redis.asyncio as redis
 
+from src.core.llm_rate_limiter import LANE_BACKGROUND, LLMRateLimiter, RateLimitShedError
+
 logger = logging.getLogger(__name__)
 
+
+def _build_rate_limiter(redis_client: redis.Redis) -> Optional[LLMRateLimiter]:
+    """按 LLM_RATE_LIMIT_* 环境变量构建与其他服务共享的 LLM 限流器，未启用时返回 None"""
+    if os.getenv("LLM_RATE_LIMIT_ENABLED", "false").strip().lower() not in {"1", "true", "yes", "on"}:
+        return None
+    rpm = int(os.getenv("LLM_RATE_LIMIT_RPM", "0"))
+    tpm = int(os.getenv("LLM_RATE_LIMIT_TPM", "0"))
+    if not (rpm or tpm):
+        return None
+    return LLMRateLimiter(
+        redis_client=redis_client,
+        key=os.getenv("LLM_RATE_LIMIT_KEY", "llm:ratelimit"),
+        rpm=rpm,
+        tpm=tpm,
+        background_reserve=float(os.getenv("LLM_RATE_LIMIT_BACKGROUND_RESERVE", "0.3")),
+        background_max_wait=float(os.getenv("LLM_RATE_LIMIT_BACKGROUND_MAX_WAIT", "30")),
+    )
+
 class MemoryManager:
     def __init__(self, redis_client: redis.Redis, config: dict):
         self.redis_client = redis_client
@@ -29,8 +49,8 @@ class MemoryManager:
         # Pub/Sub频道
         self.memory_update_channel = "memory_updates"
         
-        # 初始化记忆总结器
-        self.summarizer = MemorySummarizer(config)
+        # 初始化记忆总结器（总结属于后台任务，走共享限流器的 background 通道）
+        self.summarizer = MemorySummarizer(config, rate_limiter=_build_rate_limiter(redis_client))
         
     async def store_message(self, user_id: str, message_type: str, content: str, 
                           source: str = "user", require_ai_response: bool = True,
@@ -428,13 +448,15 @@ class MemoryManager:
 class MemorySummarizer:
     """记忆总结器，处理记忆内容的AI总结"""
     
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, rate_limiter: Optional[LLMRateLimiter] = None):
         """初始化记忆总结器
         
         Args:
             config: 配置字典，包含总结相关配置
+            rate_limiter: 跨服务共享的 LLM 限流器，为 None 时不限流
         """
         self.config = config
+        self.rate_limiter = rate_limiter
         self.summary_config = config.get("memory", {}).get("summary", {})
         self.ai_config = self.summary_config.get("ai_config", {})
         self.prompts = self.summary_config.get("prompts", {})
@@ -522,6 +544,14 @@ class MemorySummarizer:
             max_retries = self.ai_config.get("max_retries", 3)
             
             for attempt in range(max_retries):
+                # 等待共享配额；直播互动优先，超时则放弃本次总结，交给重试策略稍后再试
+                estimated_tokens = (len(system_prompt) + len(user_prompt)) // 2 + payload["max_tokens"]
+                if self.rate_limiter is not None:
+                    try:
+                        await self.rate_limiter.acquire(lane=LANE_BACKGROUND, tokens=estimated_tokens)
+                    except RateLimitShedError:
+                        logger.info("Memory summary deferred: shared LLM rate limit reached")
+                        return None
                 try:
                     async with aiohttp.ClientSession(timeout=timeout) as session:
                         async with session.post(
@@ -531,6 +561,11 @@ class MemorySummarizer:
                         ) as response:
                             if response.status == 200:
                                 result = await response.json()
+                                if self.rate_limiter is not None:
+                                    usage = result.get("usage") or {}
+                                    await self.rate_limiter.settle(
+                                        estimated=estimated_tokens, actual=usage.get("total_tokens")
+                                    )
                                 content = result["choices"][0]["message"]["content"]
                                 
                                 # 尝试解析为JSON
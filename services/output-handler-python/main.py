@@ -2,14 +2,20 @@ import asyncio
 import json
 import logging
 import os
+import socket
 import uuid
 from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Dict, Optional
+from typing import AsyncIterator, Dict, Optional
 
+import aiofiles
 import redis.asyncio as redis
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.responses import HTMLResponse
+from src.services.client_writer import POLICIES, POLICY_DROP_OLDEST, ClientWriter
+from src.services.ingest_registry import IngestProducer, IngestRegistry
+from src.services.session_registry import SessionRegistry
+from src.services.ws_mux import MuxServer
 import uvicorn
 import base64
 
@@ -24,8 +30,26 @@ logger = logging.getLogger(__name__)
 redis_client: Optional[redis.Redis] = None
 active_connections: Dict[str, WebSocket] = {}
 task_status: Dict[str, str] = {}
-ingest_ws: Optional[WebSocket] = None  # dialog-engine upstream connection
+ingest_registry = IngestRegistry()  # dialog-engine upstream producer connections
 _chunk_seq: Dict[str, int] = {}  # per-session chunk counters
+_utterances: Dict[str, int] = {}  # per-session utterance counters (seq restarts => new utterance)
+
+# 每个前端连接独立的发送队列与写协程，慢客户端不再拖住 ingest 循环
+client_writers: Dict[str, ClientWriter] = {}
+_send_queue_totals: Dict[str, int] = {"dropped": 0, "slow_disconnects": 0}  # 已结束连接的累计值
+OUTPUT_SEND_QUEUE_SIZE = int(os.getenv("OUTPUT_SEND_QUEUE_SIZE", "128"))
+OUTPUT_SLOW_CLIENT_POLICY = os.getenv("OUTPUT_SLOW_CLIENT_POLICY", POLICY_DROP_OLDEST).strip().lower()
+if OUTPUT_SLOW_CLIENT_POLICY not in POLICIES:
+    logger.warning(f"Unknown OUTPUT_SLOW_CLIENT_POLICY={OUTPUT_SLOW_CLIENT_POLICY}; using {POLICY_DROP_OLDEST}")
+    OUTPUT_SLOW_CLIENT_POLICY = POLICY_DROP_OLDEST
+OUTPUT_SEND_DRAIN_TIMEOUT = float(os.getenv("OUTPUT_SEND_DRAIN_TIMEOUT", "10"))
+OUTPUT_FILE_READ_AHEAD = max(1, int(os.getenv("OUTPUT_FILE_READ_AHEAD", "4")))
+
+# 多副本部署：本节点 ID 与 Redis 会话注册表（会话 → 节点），用于跨节点投递语音分片与控制消息
+OUTPUT_NODE_ID = os.getenv("OUTPUT_NODE_ID") or f"{socket.gethostname()}-{os.getpid()}"
+OUTPUT_SESSION_TTL_SECONDS = int(os.getenv("OUTPUT_SESSION_TTL_SECONDS", "600"))
+session_registry = SessionRegistry(OUTPUT_NODE_ID, ttl_seconds=OUTPUT_SESSION_TTL_SECONDS)
+_node_inbox_task: Optional[asyncio.Task] = None
 
 async def init_redis():
     global redis_client
@@ -44,13 +68,61 @@ async def cleanup_redis():
         await redis_client.close()
     logger.info("Output Handler shutdown")
 
+async def _node_inbox():
+    """订阅本节点的定向投递频道：其他节点转来的语音分片、控制消息与上行 STOP"""
+    refresh_interval = max(1.0, session_registry.ttl_seconds / 3)
+    loop = asyncio.get_event_loop()
+    while True:
+        pubsub = None
+        try:
+            pubsub = redis_client.pubsub()
+            await pubsub.subscribe(session_registry.channel)
+            logger.info(f"Node {OUTPUT_NODE_ID} listening on {session_registry.channel}")
+            last_refresh = loop.time()
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if loop.time() - last_refresh >= refresh_interval:
+                    await session_registry.refresh()
+                    last_refresh = loop.time()
+                if not message:
+                    continue
+                try:
+                    data = json.loads(message["data"])
+                except (TypeError, ValueError):
+                    logger.warning("Node inbox received non-JSON; ignoring")
+                    continue
+                session_registry.received += 1
+                await dispatch_node_message(data)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Node inbox error: {e}")
+            await asyncio.sleep(1.0)
+        finally:
+            if pubsub:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    global _node_inbox_task
     # 启动时执行
     await init_redis()
-    logger.info("Output Handler started - ready to send results")
+    session_registry.redis = redis_client
+    if redis_client:
+        _node_inbox_task = asyncio.create_task(_node_inbox())
+    logger.info(f"Output Handler started - ready to send results (node {OUTPUT_NODE_ID})")
     yield
     # 关闭时执行
+    if _node_inbox_task:
+        _node_inbox_task.cancel()
+        try:
+            await _node_inbox_task
+        except asyncio.CancelledError:
+            pass
+        _node_inbox_task = None
     await cleanup_redis()
 
 app = FastAPI(lifespan=lifespan)
@@ -68,31 +140,41 @@ class OutputHandler:
             return
             
         await websocket.accept()
+        writer = ClientWriter(
+            websocket,
+            max_queue=OUTPUT_SEND_QUEUE_SIZE,
+            policy=OUTPUT_SLOW_CLIENT_POLICY,
+            name=task_id,
+        ).start()
+        client_writers[task_id] = writer
         active_connections[task_id] = websocket
         task_status[task_id] = "connected"
+        await session_registry.register(task_id)
         logger.info(f"Output connection established for task_id: {task_id}")
         
         try:
-            # 等待处理结果
-            await self._wait_for_result(websocket, task_id)
+            # 等待处理结果（所有发送都经该连接自己的发送队列）
+            await self._wait_for_result(writer, task_id)
         except WebSocketDisconnect:
             logger.info(f"Output connection disconnected, task_id: {task_id}")
         except Exception as e:
             logger.error(f"Error in output handler: {e}")
-            try:
-                await websocket.send_text(json.dumps({
-                    "status": "error",
-                    "error": str(e)
-                }))
-            except:
-                pass
+            writer.offer([("text", json.dumps({"status": "error", "error": str(e)}))], droppable=False)
         finally:
+            await writer.close(drain_timeout=OUTPUT_SEND_DRAIN_TIMEOUT)
+            _send_queue_totals["dropped"] += writer.dropped
+            _send_queue_totals["slow_disconnects"] += int(writer.disconnected_slow)
+            if client_writers.get(task_id) is writer:
+                del client_writers[task_id]
             if task_id in active_connections:
                 del active_connections[task_id]
             if task_id in task_status:
                 del task_status[task_id]
+            _chunk_seq.pop(task_id, None)
+            _utterances.pop(task_id, None)
+            await session_registry.unregister(task_id)
     
-    async def _wait_for_result(self, websocket: WebSocket, task_id: str):
+    async def _wait_for_result(self, websocket: ClientWriter, task_id: str):
         if not redis_client:
             await websocket.send_text(json.dumps({
                 "status": "error",
@@ -169,7 +251,7 @@ class OutputHandler:
                 except Exception as e:
                     logger.error(f"Error cleaning up pubsub: {e}")
     
-    async def _send_response(self, websocket: WebSocket, task_id: str, response_data: dict):
+    async def _send_response(self, websocket: ClientWriter, task_id: str, response_data: dict):
         try:
             status = str(response_data.get("status") or "success").lower()
             if status != "success":
@@ -214,7 +296,38 @@ class OutputHandler:
                 "error": str(e)
             }))
     
-    async def _send_audio_chunks(self, websocket: WebSocket, task_id: str, audio_file: str):
+    async def _read_chunks(self, audio_path: Path) -> AsyncIterator[bytes]:
+        """异步读取文件块；后台协程最多预读 OUTPUT_FILE_READ_AHEAD 块，读盘与发送重叠进行"""
+        buffer: asyncio.Queue = asyncio.Queue(maxsize=OUTPUT_FILE_READ_AHEAD)
+
+        async def reader():
+            try:
+                async with aiofiles.open(audio_path, "rb") as f:
+                    while True:
+                        chunk = await f.read(self.chunk_size)
+                        await buffer.put(chunk)
+                        if not chunk:
+                            return
+            except Exception as e:
+                await buffer.put(e)
+
+        reader_task = asyncio.create_task(reader())
+        try:
+            while True:
+                item = await buffer.get()
+                if isinstance(item, Exception):
+                    raise item
+                if not item:
+                    return
+                yield item
+        finally:
+            reader_task.cancel()
+            try:
+                await reader_task
+            except asyncio.CancelledError:
+                pass
+
+    async def _send_audio_chunks(self, websocket: ClientWriter, task_id: str, audio_file: str):
         try:
             audio_path = Path(audio_file)
             if not audio_path.exists():
@@ -227,35 +340,30 @@ class OutputHandler:
             
             logger.info(f"Sending audio file {audio_file} in {total_chunks} chunks")
             
-            with open(audio_path, "rb") as f:
-                while True:
-                    chunk_data = f.read(self.chunk_size)
-                    if not chunk_data:
-                        break
-                        
-                    # 发送音频块元数据
-                    metadata = {
-                        "type": "audio_chunk",
-                        "task_id": task_id,
-                        "chunk_id": chunk_id,
-                        "total_chunks": total_chunks
-                    }
-                    await websocket.send_text(json.dumps(metadata))
-                    
-                    # 发送音频数据
-                    await websocket.send_bytes(chunk_data)
-                    chunk_id += 1
-                    
-                    logger.debug(f"Sent audio chunk {chunk_id}/{total_chunks} for task {task_id}")
-                
-                # 发送音频完成信号
-                await websocket.send_text(json.dumps({
-                    "type": "audio_complete",
-                    "task_id": task_id
-                }))
+            async for chunk_data in self._read_chunks(audio_path):
+                # 发送音频块元数据（send_* 在队列满时等待，文件分片不会被丢弃）
+                metadata = {
+                    "type": "audio_chunk",
+                    "task_id": task_id,
+                    "chunk_id": chunk_id,
+                    "total_chunks": total_chunks
+                }
+                await websocket.send_text(json.dumps(metadata))
                 
-                logger.info(f"Audio transmission completed for task {task_id}")
+                # 发送音频数据
+                await websocket.send_bytes(chunk_data)
+                chunk_id += 1
                 
+                logger.debug(f"Sent audio chunk {chunk_id}/{total_chunks} for task {task_id}")
+            
+            # 发送音频完成信号
+            await websocket.send_text(json.dumps({
+                "type": "audio_complete",
+                "task_id": task_id
+            }))
+            
+            logger.info(f"Audio transmission completed for task {task_id}")
+            
         except Exception as e:
             logger.error(f"Error sending audio chunks: {e}")
             await websocket.send_text(json.dumps({
@@ -267,15 +375,20 @@ class OutputHandler:
         """Relay one speech chunk from dialog-engine to the frontend client.
 
         - Decodes base64 payload to bytes
-        - Sends a metadata JSON (type=audio_chunk) then bytes, matching existing pattern
+        - Queues a metadata JSON (type=audio_chunk) then bytes, matching existing pattern
+        - Never awaits the client socket: the session's writer applies the slow-client policy
         """
-        ws = active_connections.get(session_id)
-        if not ws:
+        writer = client_writers.get(session_id)
+        if not writer:
             logger.debug(f"No frontend WS for session_id={session_id}; dropping chunk")
             return
         try:
             chunk_bytes = base64.b64decode(pcm_b64)
-            seq_val = seq if isinstance(seq, int) else _chunk_seq.get(session_id, 0)
+            expected = _chunk_seq.get(session_id, 0)
+            seq_val = seq if isinstance(seq, int) else expected
+            if isinstance(seq, int) and seq < expected:
+                # seq 重新开始：新的一句话
+                _utterances[session_id] = _utterances.get(session_id, 0) + 1
             _chunk_seq[session_id] = seq_val + 1
             meta = {
                 "type": "audio_chunk",
@@ -283,19 +396,21 @@ class OutputHandler:
                 "chunk_id": seq_val,
                 "total_chunks": None
             }
-            await ws.send_text(json.dumps(meta))
-            await ws.send_bytes(chunk_bytes)
+            writer.offer(
+                [("text", json.dumps(meta)), ("bytes", chunk_bytes)],
+                utterance=_utterances.get(session_id, 0),
+            )
         except Exception as e:
             logger.error(f"Failed to relay chunk to client {session_id}: {e}")
 
     async def relay_control(self, session_id: str, action: str):
-        ws = active_connections.get(session_id)
-        if not ws:
+        writer = client_writers.get(session_id)
+        if not writer:
             return
-        try:
-            await ws.send_text(json.dumps({"type": "control", "action": action, "task_id": session_id}))
-        except Exception:
-            pass
+        writer.offer(
+            [("text", json.dumps({"type": "control", "action": action, "task_id": session_id}))],
+            droppable=False,
+        )
 
 # 初始化处理器
 output_handler = OutputHandler()
@@ -304,6 +419,21 @@ output_handler = OutputHandler()
 async def websocket_output_endpoint(websocket: WebSocket, task_id: str):
     await output_handler.handle_connection(websocket, task_id)
 
+OUTPUT_PATH_PREFIX = "/ws/output/"
+
+def _mux_route(path: str):
+    if not path.startswith(OUTPUT_PATH_PREFIX):
+        return None
+    task_id = path[len(OUTPUT_PATH_PREFIX):]
+    return lambda session: output_handler.handle_connection(session, task_id)
+
+# 网关多路复用入口：一条常驻连接承载多个 /ws/output/{task_id} 会话
+mux_server = MuxServer(_mux_route, max_inbox=int(os.getenv("GATEWAY_WS_MUX_MAX_INBOX", "256")))
+
+@app.websocket("/ws/mux")
+async def websocket_mux_endpoint(websocket: WebSocket):
+    await mux_server.serve(websocket)
+
 def _bool_env(name: str, default: str = "false") -> bool:
     val = os.getenv(name, default).strip().lower()
     return val in {"1", "true", "yes", "on"}
@@ -312,6 +442,51 @@ STREAMING_ENABLED = _bool_env("SYNC_TTS_STREAMING", "false")
 BARGE_IN_ENABLED = _bool_env("SYNC_TTS_BARGE_IN", "false")
 
 
+async def dispatch_ingest_message(data: Dict, *, from_peer: bool = False):
+    """投递一条 ingest 消息：会话在本节点则直接推给前端，否则按注册表转发到所属节点"""
+    mtype = data.get("type")
+    session_id = str(data.get("sessionId") or "")
+    if mtype not in ("SPEECH_CHUNK", "CONTROL"):
+        logger.debug(f"Ingest WS unknown type: {mtype}")
+        return
+    if session_id not in active_connections and not from_peer:
+        node = await session_registry.lookup(session_id)
+        if node and node != OUTPUT_NODE_ID:
+            await session_registry.forward(node, data)
+            return
+    if mtype == "SPEECH_CHUNK":
+        await output_handler.relay_speech_chunk(
+            session_id=session_id,
+            pcm_b64=str(data.get("pcm") or ""),
+            seq=data.get("seq"),
+        )
+    else:
+        action = str(data.get("action") or "").upper()
+        await output_handler.relay_control(session_id, action)
+
+async def dispatch_node_message(data: Dict):
+    """处理其他节点经定向频道转来的消息"""
+    if data.get("type") == "UPSTREAM_CONTROL":
+        session_id = str(data.get("sessionId") or "")
+        action = str(data.get("action") or "").upper()
+        if await ingest_registry.send_control(session_id, action) is None:
+            logger.warning(f"Upstream {action} for session {session_id} has no local producer")
+        return
+    await dispatch_ingest_message(data, from_peer=True)
+
+async def handle_producer_message(producer: IngestProducer, data: Dict):
+    """记录会话归属与吞吐后投递；会话结束时释放归属"""
+    mtype = data.get("type")
+    session_id = str(data.get("sessionId") or "")
+    if mtype == "SPEECH_CHUNK" and session_id:
+        if ingest_registry.claim(session_id, producer):
+            await session_registry.claim_ingest(session_id)
+        ingest_registry.record_chunk(producer, str(data.get("pcm") or ""))
+    await dispatch_ingest_message(data)
+    action = str(data.get("action") or "").upper()
+    if mtype == "CONTROL" and action in ("END", "STOP_ACK") and ingest_registry.release(session_id, producer):
+        await session_registry.release_ingest(session_id)
+
 @app.websocket("/ws/ingest/tts")
 async def websocket_ingest_tts(websocket: WebSocket):
     """Internal WS for dialog-engine to push TTS chunks and receive control.
@@ -325,10 +500,9 @@ async def websocket_ingest_tts(websocket: WebSocket):
         await websocket.accept()
         await websocket.close(code=4403, reason="SYNC_TTS_STREAMING disabled")
         return
-    global ingest_ws
     await websocket.accept()
-    ingest_ws = websocket
-    logger.info("Ingest WS connected (dialog-engine)")
+    producer = ingest_registry.add(websocket, websocket.query_params.get("producer"))
+    logger.info(f"Ingest WS connected (dialog-engine producer {producer.producer_id})")
     try:
         while True:
             msg = await websocket.receive_text()
@@ -337,46 +511,49 @@ async def websocket_ingest_tts(websocket: WebSocket):
             except Exception:
                 logger.warning("Ingest WS received non-JSON; ignoring")
                 continue
-            mtype = data.get("type")
-            if mtype == "SPEECH_CHUNK":
-                await output_handler.relay_speech_chunk(
-                    session_id=str(data.get("sessionId") or ""),
-                    pcm_b64=str(data.get("pcm") or ""),
-                    seq=data.get("seq"),
-                )
-            elif mtype == "CONTROL":
-                action = str(data.get("action") or "").upper()
-                session_id = str(data.get("sessionId") or "")
-                await output_handler.relay_control(session_id, action)
-            else:
-                logger.debug(f"Ingest WS unknown type: {mtype}")
+            await handle_producer_message(producer, data)
     except WebSocketDisconnect:
-        logger.info("Ingest WS disconnected")
+        logger.info(f"Ingest WS disconnected (producer {producer.producer_id})")
     except Exception as e:
         logger.error(f"Ingest WS error: {e}")
     finally:
-        if ingest_ws is websocket:
-            ingest_ws = None
+        for session_id in ingest_registry.remove(producer):
+            await session_registry.release_ingest(session_id)
 
 @app.post("/control/stop")
 async def control_stop(payload: Dict[str, str]):
     """Send STOP control upstream to dialog-engine (temporary control API).
 
     Body: {"sessionId": "..."}
+    STOP goes to the producer that owns the session (the one that sent its
+    first SPEECH_CHUNK), possibly via the node that holds that producer.
     """
     session_id = payload.get("sessionId") if isinstance(payload, dict) else None
     if not session_id:
         raise HTTPException(status_code=400, detail="sessionId required")
     if not BARGE_IN_ENABLED:
         raise HTTPException(status_code=409, detail="SYNC_TTS_BARGE_IN disabled")
-    if not ingest_ws:
-        raise HTTPException(status_code=503, detail="ingest websocket not connected")
     try:
-        await ingest_ws.send_text(json.dumps({"type": "CONTROL", "action": "STOP", "sessionId": session_id}))
-        return {"ok": True}
+        producer_id = await ingest_registry.send_control(session_id, "STOP")
     except Exception as e:
         logger.error(f"Failed to send STOP upstream: {e}")
         raise HTTPException(status_code=500, detail="failed to send stop")
+    if producer_id:
+        return {"ok": True, "producer": producer_id}
+    # 生产者连接在其他节点上：经该节点的定向频道转交
+    node = await session_registry.ingest_node(session_id)
+    if node and node != OUTPUT_NODE_ID:
+        message = {"type": "UPSTREAM_CONTROL", "action": "STOP", "sessionId": session_id}
+        if await session_registry.forward(node, message):
+            return {"ok": True, "via": node}
+    if not ingest_registry.producers:
+        raise HTTPException(status_code=503, detail="ingest websocket not connected")
+    raise HTTPException(status_code=404, detail="no ingest producer for session")
+
+@app.get("/ingest/stats")
+async def ingest_stats():
+    """各 ingest 生产者的会话数与吞吐"""
+    return ingest_registry.stats()
 
 @app.get("/")
 async def get():
@@ -404,10 +581,25 @@ async def get():
 async def get_task_status(task_id: str):
     """获取任务状态"""
     status = task_status.get(task_id, "not_found")
+    writer = client_writers.get(task_id)
     return {
         "task_id": task_id,
         "status": status,
-        "connected": task_id in active_connections
+        "connected": task_id in active_connections,
+        "send_queue": writer.stats() if writer else None
+    }
+
+def send_queue_stats() -> Dict:
+    """所有前端连接发送队列的汇总指标"""
+    writers = list(client_writers.values())
+    return {
+        "policy": OUTPUT_SLOW_CLIENT_POLICY,
+        "max_queue": OUTPUT_SEND_QUEUE_SIZE,
+        "clients": len(writers),
+        "total_depth": sum(w.depth for w in writers),
+        "max_depth": max((w.depth for w in writers), default=0),
+        "dropped": _send_queue_totals["dropped"] + sum(w.dropped for w in writers),
+        "slow_disconnects": _send_queue_totals["slow_disconnects"] + sum(1 for w in writers if w.disconnected_slow),
     }
 
 @app.get("/health")
@@ -420,7 +612,11 @@ async def health_check():
         "active_connections": len(active_connections),
         "streaming_enabled": STREAMING_ENABLED,
         "barge_in_enabled": BARGE_IN_ENABLED,
-        "ingest_connected": ingest_ws is not None
+        "ingest_connected": bool(ingest_registry.producers),
+        "ingest_producers": len(ingest_registry.producers),
+        "send_queues": send_queue_stats(),
+        "ws_mux": mux_server.stats(),
+        "session_registry": session_registry.stats()
     }
 
 if __name__ == "__main__":
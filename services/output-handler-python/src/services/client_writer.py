@@ -0,0 +1,211 @@
+"""
+前端连接的独立发送队列
+
+每个前端连接配一个写协程和一个有界队列，调用方只负责入队，真正的
+``send_text`` / ``send_bytes`` 在该连接自己的写协程里完成。这样某个观众网络变慢
+只会让它自己的队列变长，不会拖住 ingest 循环和其他会话的音频。
+
+队列以"消息组"为单位（例如音频分片的元数据 JSON + 二进制数据），组内帧总是连续发送。
+队列满时，非阻塞的 :meth:`ClientWriter.offer` 按策略处理：
+
+- ``drop_oldest``：丢弃最旧的可丢弃消息组（音频分片）
+- ``latest``：先丢弃旧语句（utterance）的全部音频，只保留最新语句；仍满时再丢最旧的
+- ``disconnect``：判定为慢客户端，以 1013 关闭连接
+
+文本结果、控制消息等不可丢弃的消息不受策略影响；需要背压的场景（音频文件传输）
+使用 :meth:`ClientWriter.put` 等待队列空位。
+"""
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+POLICY_DROP_OLDEST = "drop_oldest"
+POLICY_LATEST = "latest"
+POLICY_DISCONNECT = "disconnect"
+POLICIES = (POLICY_DROP_OLDEST, POLICY_LATEST, POLICY_DISCONNECT)
+
+CLOSE_SLOW_CONSUMER = 1013
+
+Frame = Tuple[str, Any]  # ("text", str) | ("bytes", bytes)
+
+
+@dataclass
+class _Group:
+    frames: List[Frame]
+    droppable: bool
+    utterance: Optional[int]
+
+
+class ClientWriter:
+    """单个前端连接的写协程 + 有界队列"""
+
+    def __init__(
+        self,
+        websocket: Any,
+        *,
+        max_queue: int = 64,
+        policy: str = POLICY_DROP_OLDEST,
+        name: str = "",
+    ) -> None:
+        if policy not in POLICIES:
+            raise ValueError(f"unknown slow-client policy: {policy}")
+        self.websocket = websocket
+        self.max_queue = max(1, max_queue)
+        self.policy = policy
+        self.name = name
+        self.closed = False
+        self.enqueued = 0
+        self.sent = 0
+        self.dropped = 0
+        self.high_watermark = 0
+        self.disconnected_slow = False
+        self._queue: Deque[_Group] = deque()
+        self._ready = asyncio.Event()
+        self._space = asyncio.Event()
+        self._space.set()
+        self._drained = asyncio.Event()
+        self._drained.set()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def start(self) -> "ClientWriter":
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return self
+
+    def offer(self, frames: List[Frame], *, droppable: bool = True, utterance: Optional[int] = None) -> bool:
+        """非阻塞入队；队列满时按策略处理，返回本条消息是否入队"""
+        if self.closed:
+            return False
+        if droppable and len(self._queue) >= self.max_queue:
+            if self.policy == POLICY_DISCONNECT:
+                self._disconnect_slow()
+                return False
+            if self.policy == POLICY_LATEST and utterance is not None:
+                self._drop_where(lambda g: g.droppable and g.utterance is not None and g.utterance < utterance)
+            if len(self._queue) >= self.max_queue and not self._drop_oldest():
+                self.dropped += 1
+                return False
+        self._append(_Group(frames, droppable, utterance))
+        return True
+
+    async def put(self, frames: List[Frame]) -> bool:
+        """等待队列空位后入队（不可丢弃），用于需要背压的顺序传输"""
+        while not self.closed and len(self._queue) >= self.max_queue:
+            self._space.clear()
+            await self._space.wait()
+        if self.closed:
+            return False
+        self._append(_Group(frames, False, None))
+        return True
+
+    async def send_text(self, data: str) -> None:
+        await self.put([("text", data)])
+
+    async def send_bytes(self, data: bytes) -> None:
+        await self.put([("bytes", data)])
+
+    async def close(self, *, drain_timeout: float = 0.0) -> None:
+        """停止写协程；``drain_timeout`` > 0 时先尽量把队列发完"""
+        if drain_timeout > 0 and not self.closed and self._task is not None:
+            try:
+                await asyncio.wait_for(self._drained.wait(), timeout=drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Send queue for {self.name} not drained; discarding {len(self._queue)} messages")
+        self.closed = True
+        self._queue.clear()
+        self._space.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": len(self._queue),
+            "max_queue": self.max_queue,
+            "high_watermark": self.high_watermark,
+            "policy": self.policy,
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "disconnected_slow": self.disconnected_slow,
+        }
+
+    def _append(self, group: _Group) -> None:
+        self._queue.append(group)
+        self.enqueued += 1
+        self.high_watermark = max(self.high_watermark, len(self._queue))
+        self._drained.clear()
+        self._ready.set()
+
+    def _drop_oldest(self) -> bool:
+        for group in self._queue:
+            if group.droppable:
+                self._queue.remove(group)
+                self.dropped += 1
+                return True
+        return False
+
+    def _drop_where(self, predicate) -> None:
+        kept = deque(group for group in self._queue if not predicate(group))
+        self.dropped += len(self._queue) - len(kept)
+        self._queue = kept
+
+    def _disconnect_slow(self) -> None:
+        logger.warning(f"Client {self.name} is too slow (queue {len(self._queue)}); disconnecting")
+        self.disconnected_slow = True
+        self.dropped += len(self._queue) + 1
+        self.closed = True
+        self._queue.clear()
+        self._space.set()
+        asyncio.ensure_future(self._close_socket())
+
+    async def _close_socket(self) -> None:
+        try:
+            await self.websocket.close(code=CLOSE_SLOW_CONSUMER, reason="slow consumer")
+        except Exception:
+            pass
+
+    async def _run(self) -> None:
+        while not self.closed:
+            if not self._queue:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            group = self._queue.popleft()
+            self._space.set()
+            try:
+                for kind, payload in group.frames:
+                    if kind == "bytes":
+                        await self.websocket.send_bytes(payload)
+                    else:
+                        await self.websocket.send_text(payload)
+                self.sent += 1
+            except Exception as e:
+                logger.info(f"Send to client {self.name} failed, stopping writer: {e}")
+                self.closed = True
+                self._queue.clear()
+                self._space.set()
+            if not self._queue:
+                self._drained.set()
+
+
+__all__ = [
+    "CLOSE_SLOW_CONSUMER",
+    "ClientWriter",
+    "POLICIES",
+    "POLICY_DISCONNECT",
+    "POLICY_DROP_OLDEST",
+    "POLICY_LATEST",
+]
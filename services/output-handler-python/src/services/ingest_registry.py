@@ -0,0 +1,135 @@
+"""
+ingest 生产者注册表
+
+dialog-engine（可能有多个副本，且每次 TTS 推流都会新建一条连接）通过 ``/ws/ingest/tts``
+推送语音分片。注册表同时接受多条生产者连接：
+
+- 会话在收到第一条 ``SPEECH_CHUNK`` 时归属到发送它的生产者
+- 上行控制（如 STOP）只发给会话的归属生产者，而不是最后连上的那条连接
+- 生产者发送 ``CONTROL END`` / ``STOP_ACK`` 或断开时释放其会话
+- 按生产者统计分片数、字节数与吞吐
+"""
+import json
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class IngestProducer:
+    """一条生产者连接及其吞吐计数"""
+
+    producer_id: str
+    websocket: Any
+    connected_at: float = field(default_factory=time.monotonic)
+    sessions: Set[str] = field(default_factory=set)
+    chunks: int = 0
+    bytes: int = 0
+    controls_sent: int = 0
+    sessions_total: int = 0
+    last_chunk_at: Optional[float] = None
+
+    def stats(self) -> Dict[str, Any]:
+        uptime = max(time.monotonic() - self.connected_at, 1e-6)
+        return {
+            "producer_id": self.producer_id,
+            "uptime_seconds": round(uptime, 3),
+            "active_sessions": len(self.sessions),
+            "sessions_total": self.sessions_total,
+            "chunks": self.chunks,
+            "bytes": self.bytes,
+            "chunks_per_second": round(self.chunks / uptime, 3),
+            "bytes_per_second": round(self.bytes / uptime, 1),
+            "controls_sent": self.controls_sent,
+            "idle_seconds": round(time.monotonic() - self.last_chunk_at, 3) if self.last_chunk_at else None,
+        }
+
+
+def _b64_decoded_size(data: str) -> int:
+    """由 base64 长度推算解码后的字节数，避免在音频热路径上重复解码"""
+    size = len(data)
+    if not size:
+        return 0
+    padding = 2 if data.endswith("==") else 1 if data.endswith("=") else 0
+    return max(0, size * 3 // 4 - padding)
+
+
+class IngestRegistry:
+    """多生产者注册表：会话 → 生产者"""
+
+    def __init__(self) -> None:
+        self.producers: Dict[str, IngestProducer] = {}
+        self.owners: Dict[str, IngestProducer] = {}
+        self.connections_total = 0
+
+    def add(self, websocket: Any, producer_id: Optional[str] = None) -> IngestProducer:
+        producer_id = producer_id or f"p-{uuid.uuid4().hex[:8]}"
+        if producer_id in self.producers:
+            producer_id = f"{producer_id}-{uuid.uuid4().hex[:4]}"
+        producer = IngestProducer(producer_id, websocket)
+        self.producers[producer_id] = producer
+        self.connections_total += 1
+        return producer
+
+    def remove(self, producer: IngestProducer) -> List[str]:
+        """移除生产者，返回随之释放的会话"""
+        self.producers.pop(producer.producer_id, None)
+        released = [sid for sid in producer.sessions if self.owners.get(sid) is producer]
+        for session_id in released:
+            del self.owners[session_id]
+        producer.sessions.clear()
+        return released
+
+    def claim(self, session_id: str, producer: IngestProducer) -> bool:
+        """记录会话归属；首次归属（或归属易主）时返回 True"""
+        current = self.owners.get(session_id)
+        if current is producer:
+            return False
+        if current is not None:
+            logger.warning(
+                f"Session {session_id} moved from producer {current.producer_id} to {producer.producer_id}"
+            )
+            current.sessions.discard(session_id)
+        self.owners[session_id] = producer
+        producer.sessions.add(session_id)
+        producer.sessions_total += 1
+        return True
+
+    def release(self, session_id: str, producer: IngestProducer) -> bool:
+        if self.owners.get(session_id) is not producer:
+            return False
+        del self.owners[session_id]
+        producer.sessions.discard(session_id)
+        return True
+
+    def owner(self, session_id: str) -> Optional[IngestProducer]:
+        return self.owners.get(session_id)
+
+    def record_chunk(self, producer: IngestProducer, pcm_b64: str) -> None:
+        producer.chunks += 1
+        producer.last_chunk_at = time.monotonic()
+        producer.bytes += _b64_decoded_size(pcm_b64)
+
+    async def send_control(self, session_id: str, action: str) -> Optional[str]:
+        """把上行控制发给会话的归属生产者；返回生产者 ID，无归属时返回 None"""
+        producer = self.owners.get(session_id)
+        if producer is None:
+            return None
+        await producer.websocket.send_text(json.dumps({"type": "CONTROL", "action": action, "sessionId": session_id}))
+        producer.controls_sent += 1
+        return producer.producer_id
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "producers": len(self.producers),
+            "connections_total": self.connections_total,
+            "sessions": len(self.owners),
+            "by_producer": [producer.stats() for producer in self.producers.values()],
+        }
+
+
+__all__ = ["IngestProducer", "IngestRegistry"]
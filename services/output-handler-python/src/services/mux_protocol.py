@@ -0,0 +1,94 @@
+"""
+WebSocket 多路复用：帧格式与载体连接
+
+网关（客户端一侧）与 input-handler / output-handler（``/ws/mux`` 服务端一侧）各自保存
+一份本模块，内容必须逐字节一致；网关的单元测试会比对三份副本。帧格式：
+
+    1 字节帧类型 + 4 字节大端会话 ID + 负载
+
+- OPEN：负载为后端路径（如 `/ws/input`、`/ws/output/<task_id>`）
+- TEXT / BINARY：负载为原始消息内容，只加 5 字节帧头，不做 JSON 二次封装
+- CLOSE：负载为 2 字节关闭码 + UTF-8 原因
+
+所有帧都以二进制 WebSocket 消息发送。
+"""
+import asyncio
+import struct
+from typing import Any, Awaitable, Callable, Tuple
+
+FRAME_OPEN = 1
+FRAME_TEXT = 2
+FRAME_BINARY = 3
+FRAME_CLOSE = 4
+
+HEADER = struct.Struct(">BI")
+CLOSE_CODE = struct.Struct(">H")
+
+CLOSE_NORMAL = 1000
+CLOSE_BACKEND_UNAVAILABLE = 1011
+CLOSE_SLOW_CONSUMER = 1013
+CLOSE_UNKNOWN_PATH = 4404
+
+DEFAULT_MAX_INBOX = 256
+
+
+class MuxProtocolError(ValueError):
+    """多路复用帧格式错误"""
+
+
+def encode_frame(kind: int, session_id: int, payload: bytes = b"") -> bytes:
+    return HEADER.pack(kind, session_id) + payload
+
+
+def decode_frame(frame: bytes) -> Tuple[int, int, bytes]:
+    if len(frame) < HEADER.size:
+        raise MuxProtocolError("frame_too_short")
+    kind, session_id = HEADER.unpack_from(frame)
+    if kind not in (FRAME_OPEN, FRAME_TEXT, FRAME_BINARY, FRAME_CLOSE):
+        raise MuxProtocolError(f"unknown_frame:{kind}")
+    return kind, session_id, frame[HEADER.size :]
+
+
+def encode_close(code: int, reason: str = "") -> bytes:
+    return CLOSE_CODE.pack(code) + reason.encode("utf-8")[:120]
+
+
+def decode_close(payload: bytes) -> Tuple[int, str]:
+    if len(payload) < CLOSE_CODE.size:
+        return CLOSE_NORMAL, ""
+    (code,) = CLOSE_CODE.unpack_from(payload)
+    return code, payload[CLOSE_CODE.size :].decode("utf-8", errors="replace")
+
+
+class Carrier:
+    """载体连接的串行发送封装（多个会话并发写同一条连接）"""
+
+    def __init__(self, send: Callable[[bytes], Awaitable[Any]]) -> None:
+        self._send = send
+        self._lock = asyncio.Lock()
+        self.closed = False
+
+    async def send(self, frame: bytes) -> None:
+        if self.closed:
+            raise ConnectionError("mux_carrier_closed")
+        async with self._lock:
+            await self._send(frame)
+
+
+__all__ = [
+    "CLOSE_BACKEND_UNAVAILABLE",
+    "CLOSE_NORMAL",
+    "CLOSE_SLOW_CONSUMER",
+    "CLOSE_UNKNOWN_PATH",
+    "Carrier",
+    "DEFAULT_MAX_INBOX",
+    "FRAME_BINARY",
+    "FRAME_CLOSE",
+    "FRAME_OPEN",
+    "FRAME_TEXT",
+    "MuxProtocolError",
+    "decode_close",
+    "decode_frame",
+    "encode_close",
+    "encode_frame",
+]
@@ -0,0 +1,182 @@
+"""
+会话注册表（多副本部署）
+
+output-handler 可以水平扩展为多个副本，但前端连接只存在于某一个副本的
+``active_connections`` 中，而 dialog-engine 只连接其中一个副本的 ``/ws/ingest/tts``。
+本模块在 Redis 中记录 ``会话 → 节点``，并为每个节点提供一个定向投递频道：
+
+- ``output:session:<session_id>``：值为持有该前端连接的节点 ID，带 TTL，由节点定期续期
+- ``output:node:<node_id>``：发往该节点的语音分片 / 控制消息（原样转发 ingest 消息）
+- ``output:ingest:<session_id>``：持有该会话 ingest 生产者连接的节点，其他节点收到的
+  上行控制（如 STOP）经该节点的投递频道转交
+
+未连接 Redis 时退化为单节点模式：所有会话都视为本地会话。
+"""
+import json
+import logging
+import time
+from typing import Any, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+SESSION_KEY_PREFIX = "output:session:"
+NODE_CHANNEL_PREFIX = "output:node:"
+INGEST_KEY_PREFIX = "output:ingest:"
+
+# 仅当键仍指向本节点时才删除，避免会话迁移到其他节点后被旧节点误删
+_UNREGISTER_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def node_channel(node_id: str) -> str:
+    return f"{NODE_CHANNEL_PREFIX}{node_id}"
+
+
+class SessionRegistry:
+    """Redis 中的 会话 → 节点 映射，以及节点间的定向投递"""
+
+    def __init__(
+        self,
+        node_id: str,
+        *,
+        redis_client: Any = None,
+        ttl_seconds: int = 600,
+        lookup_cache_seconds: float = 2.0,
+    ) -> None:
+        self.node_id = node_id
+        self.redis = redis_client
+        self.ttl_seconds = max(1, int(ttl_seconds))
+        self.lookup_cache_seconds = max(0.0, lookup_cache_seconds)
+        self.local_sessions: Set[str] = set()
+        self.ingest_sessions: Set[str] = set()
+        self._lookup_cache: Dict[str, Tuple[Optional[str], float]] = {}
+        self.forwarded = 0
+        self.received = 0
+        self.dropped = 0
+
+    @property
+    def channel(self) -> str:
+        return node_channel(self.node_id)
+
+    async def register(self, session_id: str) -> None:
+        self.local_sessions.add(session_id)
+        if not self.redis:
+            return
+        try:
+            await self.redis.set(f"{SESSION_KEY_PREFIX}{session_id}", self.node_id, ex=self.ttl_seconds)
+        except Exception as e:
+            logger.error(f"Failed to register session {session_id}: {e}")
+
+    async def unregister(self, session_id: str) -> None:
+        self.local_sessions.discard(session_id)
+        self._lookup_cache.pop(session_id, None)
+        if not self.redis:
+            return
+        try:
+            await self.redis.eval(_UNREGISTER_SCRIPT, 1, f"{SESSION_KEY_PREFIX}{session_id}", self.node_id)
+        except Exception as e:
+            logger.error(f"Failed to unregister session {session_id}: {e}")
+
+    async def claim_ingest(self, session_id: str) -> None:
+        """登记本节点的某个生产者正在为该会话推流"""
+        self.ingest_sessions.add(session_id)
+        if not self.redis:
+            return
+        try:
+            await self.redis.set(f"{INGEST_KEY_PREFIX}{session_id}", self.node_id, ex=self.ttl_seconds)
+        except Exception as e:
+            logger.error(f"Failed to claim ingest for session {session_id}: {e}")
+
+    async def release_ingest(self, session_id: str) -> None:
+        self.ingest_sessions.discard(session_id)
+        if not self.redis:
+            return
+        try:
+            await self.redis.eval(_UNREGISTER_SCRIPT, 1, f"{INGEST_KEY_PREFIX}{session_id}", self.node_id)
+        except Exception as e:
+            logger.error(f"Failed to release ingest for session {session_id}: {e}")
+
+    async def ingest_node(self, session_id: str) -> Optional[str]:
+        """返回持有该会话生产者连接的节点 ID"""
+        if session_id in self.ingest_sessions:
+            return self.node_id
+        if not self.redis:
+            return None
+        try:
+            node = await self.redis.get(f"{INGEST_KEY_PREFIX}{session_id}")
+        except Exception as e:
+            logger.error(f"Failed to look up ingest node for session {session_id}: {e}")
+            return None
+        return node.decode("utf-8") if isinstance(node, bytes) else node
+
+    async def refresh(self) -> None:
+        """为本节点的会话与 ingest 归属续期（周期调用，间隔应小于 TTL）"""
+        if not self.redis or not (self.local_sessions or self.ingest_sessions):
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for session_id in list(self.local_sessions):
+                pipe.set(f"{SESSION_KEY_PREFIX}{session_id}", self.node_id, ex=self.ttl_seconds)
+            for session_id in list(self.ingest_sessions):
+                pipe.set(f"{INGEST_KEY_PREFIX}{session_id}", self.node_id, ex=self.ttl_seconds)
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to refresh session registry: {e}")
+
+    async def lookup(self, session_id: str) -> Optional[str]:
+        """返回持有会话的节点 ID；本地会话直接返回本节点，远端结果短暂缓存"""
+        if session_id in self.local_sessions:
+            return self.node_id
+        if not self.redis:
+            return None
+        now = time.monotonic()
+        cached = self._lookup_cache.get(session_id)
+        if cached and cached[1] > now:
+            return cached[0]
+        try:
+            node = await self.redis.get(f"{SESSION_KEY_PREFIX}{session_id}")
+        except Exception as e:
+            logger.error(f"Failed to look up session {session_id}: {e}")
+            return None
+        if isinstance(node, bytes):
+            node = node.decode("utf-8")
+        if len(self._lookup_cache) > 10000:
+            self._lookup_cache.clear()
+        self._lookup_cache[session_id] = (node, now + self.lookup_cache_seconds)
+        return node
+
+    async def forward(self, node_id: str, message: Dict[str, Any]) -> bool:
+        """把消息投递到指定节点的频道；返回是否有订阅者收到"""
+        if not self.redis:
+            return False
+        try:
+            receivers = await self.redis.publish(node_channel(node_id), json.dumps(message))
+        except Exception as e:
+            logger.error(f"Failed to forward message to node {node_id}: {e}")
+            return False
+        if receivers:
+            self.forwarded += 1
+            return True
+        # 目标节点已下线：丢弃缓存，下次重新查询
+        self._lookup_cache.pop(str(message.get("sessionId") or ""), None)
+        self.dropped += 1
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "node_id": self.node_id,
+            "redis": self.redis is not None,
+            "local_sessions": len(self.local_sessions),
+            "ingest_sessions": len(self.ingest_sessions),
+            "ttl_seconds": self.ttl_seconds,
+            "forwarded": self.forwarded,
+            "received": self.received,
+            "dropped": self.dropped,
+        }
+
+
+__all__ = ["SessionRegistry", "node_channel"]
@@ -0,0 +1,148 @@
+import asyncio
+import json
+
+import pytest
+
+import main as main_module
+from src.services.client_writer import (
+    CLOSE_SLOW_CONSUMER,
+    ClientWriter,
+    POLICY_DISCONNECT,
+    POLICY_LATEST,
+)
+
+
+class GatedSocket:
+    """send 在 gate 打开前一直阻塞，模拟网络很慢的观众"""
+
+    def __init__(self, open_gate=False):
+        self.gate = asyncio.Event()
+        if open_gate:
+            self.gate.set()
+        self.frames = []
+        self.closed_with = None
+
+    async def send_text(self, data):
+        await self.gate.wait()
+        self.frames.append(data)
+
+    async def send_bytes(self, data):
+        await self.gate.wait()
+        self.frames.append(data)
+
+    async def close(self, code=1000, reason=None):
+        self.closed_with = code
+        self.gate.set()
+
+
+def _chunk(n):
+    return [("text", json.dumps({"chunk_id": n})), ("bytes", bytes([n]))]
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest_bounds_queue_without_blocking_producer():
+    socket = GatedSocket()
+    writer = ClientWriter(socket, max_queue=4).start()
+    await asyncio.sleep(0)
+
+    for n in range(10):
+        writer.offer(_chunk(n))
+    writer.offer([("text", "result")], droppable=False)
+
+    assert writer.depth == 5 and writer.high_watermark == 5
+    socket.gate.set()
+    await writer.close(drain_timeout=1.0)
+    # 最旧的分片被丢弃，不可丢弃的结果保留
+    assert socket.frames[-1] == "result"
+    assert [json.loads(f)["chunk_id"] for f in socket.frames[:-1] if isinstance(f, str)] == [6, 7, 8, 9]
+    assert writer.stats()["dropped"] == 6
+
+
+@pytest.mark.asyncio
+async def test_latest_policy_skips_to_newest_utterance():
+    socket = GatedSocket()
+    writer = ClientWriter(socket, max_queue=3, policy=POLICY_LATEST).start()
+    await asyncio.sleep(0)
+    writer.offer(_chunk(0), utterance=0)
+    await asyncio.sleep(0)  # 第 0 块进入发送
+
+    for n in range(1, 4):
+        writer.offer(_chunk(n), utterance=0)
+    writer.offer(_chunk(10), utterance=1)
+
+    assert writer.depth == 1
+    socket.gate.set()
+    await writer.close(drain_timeout=1.0)
+    assert [json.loads(f)["chunk_id"] for f in socket.frames if isinstance(f, str)] == [0, 10]
+
+
+@pytest.mark.asyncio
+async def test_disconnect_policy_closes_slow_consumer():
+    socket = GatedSocket()
+    writer = ClientWriter(socket, max_queue=2, policy=POLICY_DISCONNECT).start()
+    await asyncio.sleep(0)
+
+    results = [writer.offer(_chunk(n)) for n in range(4)]
+    await asyncio.sleep(0)
+
+    assert results[-1] is False and writer.closed
+    assert socket.closed_with == CLOSE_SLOW_CONSUMER
+    assert writer.offer(_chunk(9)) is False
+    await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_put_applies_backpressure_instead_of_dropping():
+    socket = GatedSocket()
+    writer = ClientWriter(socket, max_queue=1).start()
+    await asyncio.sleep(0)
+    await writer.send_text("first")
+    await asyncio.sleep(0)
+    await writer.send_text("second")
+
+    blocked = asyncio.create_task(writer.send_text("third"))
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+    socket.gate.set()
+    await asyncio.wait_for(blocked, timeout=1.0)
+    await writer.close(drain_timeout=1.0)
+    assert socket.frames == ["first", "second", "third"] and writer.dropped == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_client_does_not_delay_other_sessions(monkeypatch):
+    slow, fast = GatedSocket(), GatedSocket(open_gate=True)
+    writers = {
+        "slow": ClientWriter(slow, max_queue=2).start(),
+        "fast": ClientWriter(fast, max_queue=2).start(),
+    }
+    monkeypatch.setattr(main_module, "client_writers", writers)
+
+    for seq in range(5):
+        for session_id in ("slow", "fast"):
+            await asyncio.wait_for(
+                main_module.output_handler.relay_speech_chunk(session_id, "AAAA", seq=seq), timeout=0.1
+            )
+        await asyncio.sleep(0)
+
+    assert len([f for f in fast.frames if isinstance(f, bytes)]) == 5
+    assert writers["slow"].depth == 2 and writers["slow"].dropped == 2
+    stats = main_module.send_queue_stats()
+    assert stats["clients"] == 2 and stats["max_depth"] == 2
+    for writer in writers.values():
+        await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_audio_file_is_read_ahead_asynchronously(tmp_path):
+    payload = bytes(range(256)) * 1000
+    path = tmp_path / "output.wav"
+    path.write_bytes(payload)
+    socket = GatedSocket(open_gate=True)
+    writer = ClientWriter(socket, max_queue=2).start()
+
+    await main_module.output_handler._send_audio_chunks(writer, "task", str(path))
+    await writer.close(drain_timeout=1.0)
+
+    assert b"".join(f for f in socket.frames if isinstance(f, bytes)) == payload
+    assert json.loads(socket.frames[-1]) == {"type": "audio_complete", "task_id": "task"}
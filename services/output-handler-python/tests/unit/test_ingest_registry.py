@@ -0,0 +1,114 @@
+import base64
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main as main_module
+from src.services.ingest_registry import IngestRegistry, _b64_decoded_size
+
+
+class RecordingSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, data):
+        self.sent.append(json.loads(data))
+
+
+@pytest.mark.asyncio
+async def test_control_goes_to_session_owner_not_latest_producer():
+    registry = IngestRegistry()
+    first, second = RecordingSocket(), RecordingSocket()
+    producer_a = registry.add(first, "engine-a")
+    producer_b = registry.add(second, "engine-b")
+
+    assert registry.claim("s1", producer_a) is True
+    assert registry.claim("s1", producer_a) is False
+    registry.record_chunk(producer_a, "AAAA")
+
+    assert await registry.send_control("s1", "STOP") == "engine-a"
+    assert await registry.send_control("unknown", "STOP") is None
+    assert first.sent == [{"type": "CONTROL", "action": "STOP", "sessionId": "s1"}]
+    assert second.sent == []
+    stats = {item["producer_id"]: item for item in registry.stats()["by_producer"]}
+    assert stats["engine-a"]["chunks"] == 1 and stats["engine-a"]["bytes"] == 3
+    assert stats["engine-b"]["active_sessions"] == 0
+
+
+def test_remove_releases_only_owned_sessions():
+    registry = IngestRegistry()
+    producer_a = registry.add(RecordingSocket())
+    producer_b = registry.add(RecordingSocket())
+    registry.claim("s1", producer_a)
+    registry.claim("s2", producer_b)
+
+    assert registry.remove(producer_a) == ["s1"]
+    assert registry.owner("s1") is None and registry.owner("s2") is producer_b
+    assert registry.release("s2", producer_a) is False
+
+
+def _wait_for_sessions(client, count):
+    deadline = time.time() + 2.0
+    while time.time() < deadline:
+        if client.get("/ingest/stats").json()["sessions"] == count:
+            return
+        time.sleep(0.01)
+    raise AssertionError("ingest sessions were not claimed")
+
+
+def test_stop_reaches_owning_producer_among_many(monkeypatch):
+    monkeypatch.setattr(main_module, "STREAMING_ENABLED", True)
+    monkeypatch.setattr(main_module, "BARGE_IN_ENABLED", True)
+
+    with TestClient(main_module.app) as client:
+        with client.websocket_connect("/ws/ingest/tts?producer=engine-a") as engine_a:
+            with client.websocket_connect("/ws/ingest/tts?producer=engine-b") as engine_b:
+                engine_a.send_text(json.dumps({"type": "SPEECH_CHUNK", "sessionId": "sa", "seq": 0, "pcm": "AAAA"}))
+                engine_b.send_text(json.dumps({"type": "SPEECH_CHUNK", "sessionId": "sb", "seq": 0, "pcm": "AAAA"}))
+                _wait_for_sessions(client, 2)
+
+                response = client.post("/control/stop", json={"sessionId": "sa"})
+                assert response.json() == {"ok": True, "producer": "engine-a"}
+                assert json.loads(engine_a.receive_text()) == {"type": "CONTROL", "action": "STOP", "sessionId": "sa"}
+
+                engine_b.send_text(json.dumps({"type": "CONTROL", "action": "END", "sessionId": "sb"}))
+                _wait_for_sessions(client, 1)
+                assert client.post("/control/stop", json={"sessionId": "sb"}).status_code == 404
+
+        assert client.get("/health").json()["ingest_producers"] == 0
+
+
+@pytest.mark.asyncio
+async def test_producer_message_is_relayed_exactly_once(monkeypatch):
+    registry = IngestRegistry()
+    monkeypatch.setattr(main_module, "ingest_registry", registry)
+    monkeypatch.setitem(main_module.active_connections, "local-session", object())
+    relayed, controls = [], []
+
+    async def fake_relay(session_id, pcm_b64, seq=None):
+        relayed.append(seq)
+
+    async def fake_control(session_id, action):
+        controls.append(action)
+
+    monkeypatch.setattr(main_module.output_handler, "relay_speech_chunk", fake_relay)
+    monkeypatch.setattr(main_module.output_handler, "relay_control", fake_control)
+    producer = registry.add(RecordingSocket(), "engine-a")
+
+    await main_module.handle_producer_message(
+        producer, {"type": "SPEECH_CHUNK", "sessionId": "local-session", "seq": 0, "pcm": "AAAA"}
+    )
+    await main_module.handle_producer_message(
+        producer, {"type": "CONTROL", "action": "END", "sessionId": "local-session"}
+    )
+
+    assert relayed == [0]
+    assert controls == ["END"]
+    assert registry.owner("local-session") is None
+
+
+def test_chunk_bytes_are_counted_without_decoding():
+    for raw in (b"", b"a", b"ab", b"abc", b"abcd", bytes(range(200))):
+        assert _b64_decoded_size(base64.b64encode(raw).decode("ascii")) == len(raw)
@@ -0,0 +1,113 @@
+import json
+
+import pytest
+
+import main as main_module
+from src.services.session_registry import SessionRegistry, node_channel
+
+
+class FakeRedis:
+    """只实现注册表用到的命令；publish 返回订阅者数量"""
+
+    def __init__(self, subscribers=()):
+        self.data = {}
+        self.published = []
+        self.subscribers = set(subscribers)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def eval(self, script, numkeys, key, expected):
+        if self.data.get(key) == expected:
+            del self.data[key]
+            return 1
+        return 0
+
+    async def publish(self, channel, message):
+        self.published.append((channel, json.loads(message)))
+        return 1 if channel in self.subscribers else 0
+
+    def pipeline(self, transaction=True):
+        redis = self
+
+        class Pipeline:
+            def __init__(self):
+                self.ops = []
+
+            def set(self, key, value, ex=None):
+                self.ops.append((key, value))
+
+            async def execute(self):
+                for key, value in self.ops:
+                    await redis.set(key, value)
+
+        return Pipeline()
+
+
+@pytest.mark.asyncio
+async def test_registry_tracks_owner_and_only_owner_unregisters():
+    redis = FakeRedis()
+    node_a = SessionRegistry("a", redis_client=redis, lookup_cache_seconds=0)
+    node_b = SessionRegistry("b", redis_client=redis, lookup_cache_seconds=0)
+
+    await node_a.register("s1")
+    assert await node_b.lookup("s1") == "a"
+
+    # 会话迁移到 b 后，a 的迟到注销不能删掉 b 的登记
+    await node_b.register("s1")
+    await node_a.unregister("s1")
+    assert await node_a.lookup("s1") == "b"
+    await node_b.unregister("s1")
+    assert await node_a.lookup("s1") is None
+
+
+@pytest.mark.asyncio
+async def test_forward_counts_delivery_and_drops_when_node_gone():
+    redis = FakeRedis(subscribers=[node_channel("b")])
+    registry = SessionRegistry("a", redis_client=redis)
+
+    assert await registry.forward("b", {"type": "CONTROL", "sessionId": "s1"}) is True
+    assert await registry.forward("c", {"type": "CONTROL", "sessionId": "s2"}) is False
+    assert (registry.forwarded, registry.dropped) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_ingest_forwards_chunks_for_remote_sessions(monkeypatch):
+    redis = FakeRedis(subscribers=[node_channel("node-b")])
+    registry = SessionRegistry(main_module.OUTPUT_NODE_ID, redis_client=redis)
+    monkeypatch.setattr(main_module, "session_registry", registry)
+    await SessionRegistry("node-b", redis_client=redis).register("remote-session")
+    relayed = []
+
+    async def fake_relay(session_id, pcm_b64, seq=None):
+        relayed.append(session_id)
+
+    monkeypatch.setattr(main_module.output_handler, "relay_speech_chunk", fake_relay)
+    chunk = {"type": "SPEECH_CHUNK", "sessionId": "remote-session", "seq": 0, "pcm": "AAA="}
+
+    await main_module.dispatch_ingest_message(chunk)
+    assert redis.published == [(node_channel("node-b"), chunk)]
+    assert relayed == []
+
+    # 目标节点从自己的频道收到后在本地投递
+    await main_module.dispatch_node_message(chunk)
+    assert relayed == ["remote-session"]
+
+
+@pytest.mark.asyncio
+async def test_control_stop_is_routed_to_ingest_node(monkeypatch):
+    redis = FakeRedis(subscribers=[node_channel("node-b")])
+    registry = SessionRegistry(main_module.OUTPUT_NODE_ID, redis_client=redis)
+    monkeypatch.setattr(main_module, "session_registry", registry)
+    monkeypatch.setattr(main_module, "BARGE_IN_ENABLED", True)
+    await SessionRegistry("node-b", redis_client=redis).claim_ingest("s1")
+
+    result = await main_module.control_stop({"sessionId": "s1"})
+
+    assert result == {"ok": True, "via": "node-b"}
+    assert redis.published == [
+        (node_channel("node-b"), {"type": "UPSTREAM_CONTROL", "action": "STOP", "sessionId": "s1"})
+    ]
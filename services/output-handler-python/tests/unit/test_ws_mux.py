@@ -0,0 +1,14 @@
+from fastapi.testclient import TestClient
+
+import main as main_module
+from src.services.ws_mux import FRAME_CLOSE, FRAME_OPEN, decode_close, decode_frame, encode_frame
+
+
+def test_mux_session_gets_output_handler_close_code():
+    with TestClient(main_module.app) as client:
+        with client.websocket_connect("/ws/mux") as ws:
+            ws.send_bytes(encode_frame(FRAME_OPEN, 9, b"/ws/output/not-a-uuid"))
+            kind, session_id, payload = decode_frame(ws.receive_bytes())
+
+    assert (kind, session_id) == (FRAME_CLOSE, 9)
+    assert decode_close(payload) == (4004, "Invalid task_id format")